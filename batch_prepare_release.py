@@ -0,0 +1,71 @@
+"""
+Run `prepare_release.py` for many mods in one go, like after a Stellaris patch
+
+Every mod folder must sit next to this tool folder, same as for a single release. Each mod is prepared in its own
+worker process. Generated files and logs go into one subfolder per mod of `--outputFolder`, and a combined summary
+with the new version, tag, zip name and timings of every mod is written as JSON.
+"""
+
+### Imports ###
+import argparse
+import dataclasses
+import json
+import sys
+import time
+from pathlib import Path
+
+from methods.batch_methods import prepare_mod_releases
+from methods.input_methods import str2bool
+
+# worker processes import this file again, only the main process runs the batch
+if __name__ == "__main__":
+    ### Command line inputs ###
+    parser = argparse.ArgumentParser()
+    parser.add_argument("versionType", type=str, help="version type to bump, for every mod")
+    parser.add_argument("versionStellaris", type=str, help="Stellaris version to support, for every mod")
+    parser.add_argument("useChangelog", type=str2bool, help="Whether to use changelog files")
+    parser.add_argument("modFolderNames", type=str, nargs="+", help="Names of mod folders (and repositories)")
+    parser.add_argument("--repoOwner", type=str, required=True, help="Github user or organization owning the mod repos")
+    parser.add_argument("--outputFolder", type=str, default="batch_release_output", help="Folder for generated files")
+    parser.add_argument("--summaryFile", type=str, default=None, help="Summary JSON path, default is in the output folder")
+    parser.add_argument("--maxWorkers", type=int, default=None, help="Number of mods to prepare at the same time")
+    args = parser.parse_args()
+
+    ### Batch ###
+    output_folder_path = Path(args.outputFolder).resolve()
+    start_time = time.perf_counter()
+    results = prepare_mod_releases(
+        args.modFolderNames,
+        args.versionType,
+        args.versionStellaris,
+        args.useChangelog,
+        args.repoOwner,
+        Path.cwd(),
+        output_folder_path,
+        max_workers=args.maxWorkers,
+    )
+    elapsed_time = time.perf_counter() - start_time
+
+    ### Summary ###
+    summary_dict = {
+        "version_type": args.versionType,
+        "stellaris_version": args.versionStellaris,
+        "succeeded": sum(result.succeeded for result in results),
+        "failed": sum(not result.succeeded for result in results),
+        "total_seconds": elapsed_time,
+        "mods": [dataclasses.asdict(result) for result in results],
+    }
+    summary_file_path = Path(args.summaryFile) if args.summaryFile else output_folder_path / "summary.json"
+    summary_file_path.parent.mkdir(parents=True, exist_ok=True)
+    with Path.open(summary_file_path, "w") as summary_file_object:
+        json.dump(summary_dict, summary_file_object, indent=4)
+
+    for result in results:
+        if result.succeeded:
+            print(f"{result.mod_folder_name}: {result.release_tag} -> {result.zip_file_name} ({result.timings['wall']:.2f} s)")
+        else:
+            print(f"{result.mod_folder_name}: FAILED, {result.error} (see {result.log_file})")
+    print(f"Prepared {summary_dict['succeeded']}/{len(results)} mods in {elapsed_time:.2f} s, summary in `{summary_file_path}`")
+
+    if summary_dict["failed"]:
+        sys.exit(1)
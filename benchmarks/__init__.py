@@ -0,0 +1 @@
+# needed for import from folder
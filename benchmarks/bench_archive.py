@@ -0,0 +1,98 @@
+"""
+Benchmark for the release archive compression policy on an asset-heavy mod
+
+Generates a mod that is mostly textures and sounds (incompressible bytes in `.dds` and `.ogg` files, like DXT textures
+and Vorbis audio) plus a share of script and loc text, then builds the release zip with deflate for every file (the
+old behaviour) and with the per-extension `CompressionPolicy`, and reports time and size for each. A few assets are
+larger than `stream_member_min_bytes`, so the chunked path is timed too. Run from the repository root:
+
+`python -m benchmarks.bench_archive --megabytes 200 --repeats 3`
+"""
+
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from methods.archive_methods import CompressionPolicy, build_release_zip, default_compression_level, stream_member_min_bytes
+
+# share of the mod size per kind of file
+asset_fraction = 0.85
+# sizes of the generated assets, the last one is streamed in chunks
+asset_sizes = (256_000, 1_000_000, 4_000_000, stream_member_min_bytes + 1_000_000)
+script_block = (
+    "building_{index} = {{\n\tbase_buildtime = {index}\n\tcategory = manufacturing\n\tpotential = {{ always = yes }}\n}}\n"
+)
+
+
+def generate_asset_mod(mod_path: Path, target_megabytes: float, seed: int = 0) -> dict[str, int]:
+    """Asset-heavy mod folder of about `target_megabytes`, returns file counts per kind"""
+    random_generator = random.Random(seed)
+    target_bytes = int(target_megabytes * 1e6)
+    counts = {"assets": 0, "scripts": 0}
+    (mod_path / "gfx" / "models").mkdir(parents=True)
+    (mod_path / "sound").mkdir()
+    (mod_path / "common" / "buildings").mkdir(parents=True)
+
+    asset_bytes = 0
+    while asset_bytes < target_bytes * asset_fraction:
+        asset_size = asset_sizes[counts["assets"] % len(asset_sizes)]
+        is_texture = counts["assets"] % 3 != 0
+        asset_path = (
+            mod_path / "gfx" / "models" / f"texture_{counts['assets']}.dds"
+            if is_texture
+            else mod_path / "sound" / f"sound_{counts['assets']}.ogg"
+        )
+        asset_path.write_bytes(random_generator.randbytes(asset_size))
+        asset_bytes += asset_size
+        counts["assets"] += 1
+
+    script_bytes = 0
+    while asset_bytes + script_bytes < target_bytes:
+        script_string = "".join(
+            script_block.format(index=index) for index in range(counts["scripts"] * 10, counts["scripts"] * 10 + 2000)
+        )
+        script_path = mod_path / "common" / "buildings" / f"buildings_{counts['scripts']}.txt"
+        script_path.write_text(script_string, encoding="utf-8")
+        script_bytes += len(script_string)
+        counts["scripts"] += 1
+    return counts
+
+
+def run_benchmark(target_megabytes: float, repeats: int, max_workers: int | None) -> None:
+    with tempfile.TemporaryDirectory() as temp_folder:
+        temp_path = Path(temp_folder)
+        mod_path = temp_path / "asset_mod"
+        counts = generate_asset_mod(mod_path, target_megabytes)
+        bytes_in = sum(file_path.stat().st_size for file_path in mod_path.rglob("*") if file_path.is_file())
+        print(f"Synthetic mod: {bytes_in / 1e6:.1f} MB, {counts['assets']} assets, {counts['scripts']} script files")
+
+        policies = {
+            "deflate all": CompressionPolicy(default_level=default_compression_level),
+            "mod policy": CompressionPolicy.for_mod_files(),
+        }
+        for name, compression_policy in policies.items():
+            times = []
+            zip_file_path = temp_path / f"{name.replace(' ', '_')}.zip"
+            for _ in range(repeats):
+                start_time = time.perf_counter()
+                result = build_release_zip(
+                    zip_file_path, [mod_path], temp_path, compression_policy=compression_policy, max_workers=max_workers
+                )
+                times.append(time.perf_counter() - start_time)
+            best_time = min(times)
+            print(
+                f"{name:12}: best {best_time:.3f} s, {bytes_in / 1e6 / best_time:.1f} MB/s, "
+                f"{result.bytes_out / 1e6:.2f} MB ({result.bytes_out / bytes_in:.1%}), "
+                f"{result.compressed_count} deflated, {result.stored_count} stored"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--megabytes", type=float, default=100, help="Approximate size of the generated mod")
+    parser.add_argument("--repeats", type=int, default=3, help="Number of timed runs, best is reported")
+    parser.add_argument("--maxWorkers", type=int, default=None, help="Number of compression threads")
+    args = parser.parse_args()
+    run_benchmark(args.megabytes, args.repeats, args.maxWorkers)
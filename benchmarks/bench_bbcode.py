@@ -0,0 +1,70 @@
+"""
+Benchmark for markdown to steam bbcode conversion
+
+Generates a large changelog style markdown file (nested lists, code blocks, inline formatting) and reports the
+conversion throughput, plus a very long line of unpaired emphasis markers and many unclosed links, the worst cases for
+regex based converters. Run from the repository root:
+
+`python -m benchmarks.bench_bbcode --megabytes 10`
+"""
+
+import argparse
+import time
+
+from methods.bbcode_methods import convert_markdown_to_bbcode
+
+
+def generate_changelog_string(target_megabytes: float) -> str:
+    """Synthetic changelog with many entries"""
+    entry = """---
+## [TEST MOD `v0.0.{index}`](https://github.com/example/mod/releases/tag/v0.0.{index}):
+Fixes
+- Item 1, contains [link](https://example.com) and **bold text**
+- Item 2, contains *italic text*, ~~strikethrough~~ and `code text`
+    - Nested item with __underline text__
+        1. Numbered deeper item
+- Item 3:
+    ```
+    multiline
+    code **block**
+    ```
+- Item 4
+
+"""
+    target_chars = int(target_megabytes * 1e6)
+    parts: list[str] = []
+    total_chars = 0
+    index = 0
+    while total_chars < target_chars:
+        part = entry.format(index=index)
+        parts.append(part)
+        total_chars += len(part)
+        index += 1
+    return "".join(parts)
+
+
+def time_conversion(name: str, markdown_string: str, repeats: int) -> None:
+    times = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        convert_markdown_to_bbcode(markdown_string)
+        times.append(time.perf_counter() - start_time)
+    best_time = min(times)
+    size_mb = len(markdown_string) / 1e6
+    print(f"{name:20}: {size_mb:.2f} MB, best {best_time:.3f} s, {size_mb / best_time:.1f} MB/s")
+
+
+def run_benchmark(target_megabytes: float, repeats: int) -> None:
+    time_conversion("changelog", generate_changelog_string(target_megabytes), repeats)
+    # long line of emphasis markers that never pair up
+    time_conversion("unpaired emphasis", "- " + "**a *b ~~c __d " * 20_000 + "\n", repeats)
+    # links that are never closed, each one made the old regex converter scan to the end of the text
+    time_conversion("unclosed links", "- link [a](b \n" * 20_000, repeats)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--megabytes", type=float, default=10, help="Approximate size of the generated changelog")
+    parser.add_argument("--repeats", type=int, default=3, help="Number of timed runs, best is reported")
+    args = parser.parse_args()
+    run_benchmark(args.megabytes, args.repeats)
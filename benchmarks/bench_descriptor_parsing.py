@@ -0,0 +1,68 @@
+"""
+Benchmark for descriptor style file parsing and writing
+
+Generates very large synthetic descriptor/OVERRIDE files and reports the per-line cost of
+`parse_descriptor_to_dict` and `create_descriptor_file`. Run from the repository root:
+
+`python -m benchmarks.bench_descriptor_parsing --lines 1000000`
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from methods.input_methods import create_descriptor_file, parse_descriptor_to_dict
+
+
+def generate_descriptor_string(target_lines: int) -> str:
+    """Synthetic descriptor/OVERRIDE style content mixing plain values, one-line blocks, multi-line blocks and comments"""
+    parts: list[str] = []
+    line_count = 0
+    index = 0
+    while line_count < target_lines:
+        parts.append(f"# comment number {index}\n")
+        parts.append(f'name_{index}_override="Display name {{stellaris_version}} = {index}"\n')
+        parts.append(f'single_{index} = {{ "tag {index}" "tag2" "tag3" }}\n')
+        parts.append(f"multi_{index}={{\n")
+        parts.extend(f'\t"localisation/english/file_{index}_{item}_l_english.yml"\n' for item in range(5))
+        parts.append("}\n\n")
+        line_count += 12
+        index += 1
+    return "".join(parts)
+
+
+def run_benchmark(target_lines: int, repeats: int) -> None:
+    with tempfile.TemporaryDirectory() as temp_dir:
+        descriptor_file_path = Path(temp_dir) / "descriptor.mod"
+        descriptor_string = generate_descriptor_string(target_lines)
+        descriptor_file_path.write_text(descriptor_string, encoding="utf-8")
+        line_count = descriptor_string.count("\n")
+        size_mb = len(descriptor_string.encode("utf-8")) / 1e6
+        print(f"Synthetic descriptor: {line_count} lines, {size_mb:.1f} MB")
+
+        parse_times = []
+        for _ in range(repeats):
+            start_time = time.perf_counter()
+            descriptor_dict = parse_descriptor_to_dict(descriptor_file_path)
+            parse_times.append(time.perf_counter() - start_time)
+        best_parse_time = min(parse_times)
+        print(f"parse:  best {best_parse_time:.3f} s, {best_parse_time / line_count * 1e9:.0f} ns/line")
+
+        output_file_path = Path(temp_dir) / "output_descriptor.mod"
+        write_times = []
+        for _ in range(repeats):
+            start_time = time.perf_counter()
+            create_descriptor_file(descriptor_dict, output_file_path)
+            write_times.append(time.perf_counter() - start_time)
+        best_write_time = min(write_times)
+        written_line_count = output_file_path.read_text(encoding="utf-8").count("\n")
+        print(f"write:  best {best_write_time:.3f} s, {best_write_time / written_line_count * 1e9:.0f} ns/line")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=500_000, help="Approximate number of lines to generate")
+    parser.add_argument("--repeats", type=int, default=3, help="Number of timed runs, best is reported")
+    args = parser.parse_args()
+    run_benchmark(args.lines, args.repeats)
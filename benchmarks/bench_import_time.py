@@ -0,0 +1,93 @@
+"""
+Import time benchmark for the entry scripts
+
+Runs the imports of each entry script in a fresh interpreter with `python -X importtime` and reports the total import
+time and the slowest top-level imports. The scripts themselves are not run, only their import statements, so no mod
+or environment is needed. Run from the repository root:
+
+`python -m benchmarks.bench_import_time --repeats 5`
+"""
+
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+entry_script_names = [
+    "prepare_release.py",
+    "steam_workshop_upload.py",
+    "create_release_zip.py",
+    "batch_prepare_release.py",
+]
+
+
+def get_import_code(script_path: Path) -> str:
+    """Top-level import statements of a script, as code that can be run on its own"""
+    script_tree = ast.parse(script_path.read_text(encoding="utf-8"))
+    import_nodes = [node for node in script_tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    return "\n".join(ast.unparse(node) for node in import_nodes)
+
+
+def measure_import_time(import_code: str) -> dict[str, int]:
+    """
+    Run `import_code` with `-X importtime` in a fresh interpreter
+
+    Returns the cumulative import time in microseconds of every top-level import, plus the sum as `total`.
+    """
+    # no mod configured, importing must not need one
+    env = {key: value for key, value in os.environ.items() if key != "modFolderName"}
+    completed_process = subprocess.run(  # noqa: S603 runs this interpreter on our own code
+        [sys.executable, "-X", "importtime", "-c", import_code],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=env,
+    )
+    import_times = {"total": 0}
+    for line in completed_process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_time, module_name = line.removeprefix("import time:").split("|")
+        # nested imports are indented, only count the top level so nothing is counted twice
+        if module_name.startswith("  "):
+            continue
+        import_times[module_name.strip()] = int(cumulative_time)
+        import_times["total"] += int(cumulative_time)
+    return import_times
+
+
+def run_benchmark(repeats: int, top_count: int, json_file_path: Path | None) -> None:
+    results = {}
+    for script_name in entry_script_names:
+        import_code = get_import_code(Path(script_name))
+        # best of several runs, per module
+        best_import_times: dict[str, int] = {}
+        for _ in range(repeats):
+            for module_name, import_time in measure_import_time(import_code).items():
+                best_import_times[module_name] = min(import_time, best_import_times.get(module_name, import_time))
+        results[script_name] = best_import_times
+
+        slowest_imports = sorted(
+            ((name, time_us) for name, time_us in best_import_times.items() if name != "total"),
+            key=lambda item: item[1],
+            reverse=True,
+        )[:top_count]
+        print(f"{script_name}: {best_import_times['total'] / 1000:.1f} ms")
+        for module_name, import_time in slowest_imports:
+            print(f"    {module_name:40} {import_time / 1000:6.1f} ms")
+
+    if json_file_path is not None:
+        with Path.open(json_file_path, "w") as json_file_object:
+            json.dump(results, json_file_object, indent=4)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeats", type=int, default=5, help="Number of runs per script, best is reported")
+    parser.add_argument("--top", type=int, default=5, help="Number of slowest imports to list per script")
+    parser.add_argument("--json", type=Path, default=None, help="Also write all results to this JSON file")
+    args = parser.parse_args()
+    run_benchmark(args.repeats, args.top, args.json)
@@ -0,0 +1,403 @@
+"""
+Scale benchmark for the release pipeline on a synthetic, very large mod
+
+Generates a mod far bigger than any real one (by default 50k mod files, a 20 MB changelog with thousands of entries,
+200 loc files of 5 MB each and a long workshop description), then times every stage of `prepare_release.py` and of
+the manifest generation in `steam_workshop_upload.py` (everything before steamcmd runs). Stages call the same functions
+with the same inputs as the scripts, through a `ModConfig` for the synthetic mod, so nothing outside the temp folder is
+touched. Results are written to a JSON file so runs on different versions can be compared. Run from the repository
+root:
+
+`python -m benchmarks.bench_scale --scale 0.1 --compare bench_scale_results.json`
+
+The full size run needs about 1.5 GB of disk space in the temp folder.
+"""
+
+import argparse
+import contextlib
+import datetime as dt
+import json
+import os
+import platform
+import random
+import re
+import sys
+import tempfile
+import time
+from collections.abc import Iterator
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import constants_and_overrides as cao
+from methods.archive_methods import build_release_zip
+from methods.changelog_methods import find_changelog_entry, replace_changelog_entry
+from methods.input_methods import (
+    create_descriptor_file,
+    generate_with_template_file,
+    increment_mod_version,
+    mod_version_to_dict,
+    parse_descriptor_to_dict,
+    replace_with_steam_formatting,
+    search_and_replace_in_file,
+)
+from methods.loc_methods import patch_loc_files
+
+mod_folder_name = "scale_test_mod"
+repo_github_path = f"bench/{mod_folder_name}"
+stellaris_version = "v4.0.*"
+version_loc_key = "scale_test_mod_version"
+supported_version_loc_key = "scale_test_mod_stellaris_version"
+# mod folders and file extensions the generated files are spread over, like a big overhaul mod
+mod_content_folders = ("common/buildings", "common/scripted_effects", "events", "gfx/interface", "gfx/portraits", "sound")
+text_file_extensions = (".txt", ".txt", ".txt", ".gui", ".gfx")
+# share of mod files that are incompressible binaries (textures, sounds)
+binary_file_fraction = 0.2
+
+
+@dataclass(slots=True)
+class ScaleParameters:
+    """Size of the generated mod"""
+
+    file_count: int = 50_000
+    file_kilobytes: float = 2
+    changelog_megabytes: float = 20
+    changelog_entry_kilobytes: float = 2
+    loc_file_count: int = 200
+    loc_file_megabytes: float = 5
+    workshop_kilobytes: float = 256
+
+    def scaled(self, scale: float) -> "ScaleParameters":
+        """Counts and total sizes multiplied by `scale`, sizes of single entries kept"""
+        return ScaleParameters(
+            file_count=max(int(self.file_count * scale), 1),
+            file_kilobytes=self.file_kilobytes,
+            changelog_megabytes=self.changelog_megabytes * scale,
+            changelog_entry_kilobytes=self.changelog_entry_kilobytes,
+            loc_file_count=max(int(self.loc_file_count * scale), 1),
+            loc_file_megabytes=self.loc_file_megabytes * scale,
+            workshop_kilobytes=self.workshop_kilobytes * scale,
+        )
+
+
+@contextlib.contextmanager
+def timed(timings: dict[str, float], stage_name: str) -> Iterator[None]:
+    """Add the wall time spent inside the block to `timings`"""
+    start_time = time.perf_counter()
+    yield
+    timings[stage_name] = time.perf_counter() - start_time
+
+
+def repeat_to_size(block: str, target_bytes: float) -> str:
+    """`block` repeated until the text is at least `target_bytes` long"""
+    return block * max(int(target_bytes // len(block)) + 1, 1)
+
+
+def generate_mod_files(mod_files_folder_path: Path, parameters: ScaleParameters, rng: random.Random) -> int:
+    """Small script and binary files spread over the usual mod folders, returns the total bytes written"""
+    file_bytes = int(parameters.file_kilobytes * 1000)
+    script_text = repeat_to_size('building_{index} = {{\n\tbase_buildtime = 300\n\tcategory = "resource"\n}}\n', file_bytes)
+    binary_data = rng.randbytes(file_bytes)
+    total_bytes = 0
+    for index in range(parameters.file_count):
+        folder_path = mod_files_folder_path / mod_content_folders[index % len(mod_content_folders)] / f"set_{index // 1000}"
+        if index % 1000 < len(mod_content_folders):
+            folder_path.mkdir(parents=True, exist_ok=True)
+        if rng.random() < binary_file_fraction:
+            # rotate the data so files don't all compress to the same bytes
+            offset = index % file_bytes
+            data = binary_data[offset:] + binary_data[:offset]
+            (folder_path / f"file_{index}.dds").write_bytes(data)
+        else:
+            data = script_text.format(index=index)[:file_bytes].encode()
+            (folder_path / f"file_{index}{text_file_extensions[index % len(text_file_extensions)]}").write_bytes(data)
+        total_bytes += len(data)
+    return total_bytes
+
+
+def generate_loc_files(mod_files_folder_path: Path, parameters: ScaleParameters) -> list[str]:
+    """Loc files with the version keys at the very end, so the whole file has to be searched"""
+    loc_folder_path = mod_files_folder_path / "localisation/english"
+    loc_folder_path.mkdir(parents=True, exist_ok=True)
+    loc_body = "".join(f' scale_test_key_{index}:0 "Some localised text for key number {index}"\n' for index in range(2000))
+    loc_body = repeat_to_size(loc_body, parameters.loc_file_megabytes * 1e6)
+    loc_file_names = []
+    for index in range(parameters.loc_file_count):
+        loc_file_name = f"localisation/english/scale_test_{index}_l_english.yml"
+        loc_string = f'l_english:\n{loc_body} {version_loc_key}:0 "v1.2.3"\n {supported_version_loc_key}:0 "3.14.x"\n'
+        (mod_files_folder_path / loc_file_name).write_text(loc_string, encoding="utf-8-sig")
+        loc_file_names.append(loc_file_name)
+    return loc_file_names
+
+
+def generate_changelog(parameters: ScaleParameters) -> str:
+    """Changelog with a `WIP` entry on top of thousands of released entries"""
+    item_line = "- Changed something in the mod, with **bold** text, *italics* and a [link](https://example.com)\n"
+    entry_items = repeat_to_size(item_line, parameters.changelog_entry_kilobytes * 1000)
+    entry_count = max(int(parameters.changelog_megabytes * 1e6 // len(entry_items)), 1)
+    entries = [f"---\n## Scale Test Mod `WIP`:\n{entry_items}    - nested item\n---\n\n"]
+    for index in range(entry_count, 0, -1):
+        version = f"v1.{index // 100}.{index % 100}"
+        entries.append(
+            f"---\n## [Scale Test Mod `{version}`](https://github.com/{repo_github_path}/releases/tag/{version}):\n"
+            f"{entry_items}---\n\n"
+        )
+    return "# Changelog\n\n" + "".join(entries)
+
+
+def generate_synthetic_mod(tool_folder_path: Path, parameters: ScaleParameters, seed: int = 0) -> dict[str, int]:
+    """
+    Generate the mod repository next to `tool_folder_path`, the layout the github action uses
+
+    Returns the size in bytes of each kind of generated file.
+    """
+    rng = random.Random(seed)
+    mod_github_folder_path = tool_folder_path.parent / mod_folder_name
+    mod_files_folder_path = mod_github_folder_path / mod_folder_name
+    mod_files_folder_path.mkdir(parents=True)
+
+    sizes = {"mod_files": generate_mod_files(mod_files_folder_path, parameters, rng)}
+    loc_file_names = generate_loc_files(mod_files_folder_path, parameters)
+    sizes["loc_files"] = sum((mod_files_folder_path / loc_file_name).stat().st_size for loc_file_name in loc_file_names)
+
+    (mod_files_folder_path / "descriptor.mod").write_text(
+        f'name="Scale Test Mod"\nversion="v1.2.3"\ntags={{\n\t"Gameplay"\n}}\npicture="thumbnail.png"\n'
+        f'supported_version="v3.14.*"\npath="mod/{mod_folder_name}/{mod_folder_name}"\nremote_file_id="12345"\n',
+        encoding="utf-8",
+    )
+    (mod_files_folder_path / "thumbnail.png").write_bytes(rng.randbytes(200_000))
+
+    loc_file_list = "\n".join(f'\t"{loc_file_name}"' for loc_file_name in loc_file_names)
+    (mod_github_folder_path / "OVERRIDE.txt").write_text(
+        f'extra_loc_files_to_update={{\n{loc_file_list}\n}}\nversion_loc_key="{version_loc_key}"\n'
+        f'supported_version_loc_key="{supported_version_loc_key}"\n',
+        encoding="utf-8",
+    )
+
+    workshop_line = '[list]\n [*] A "feature" of the mod, described at length for the workshop page\n[/list]\n'
+    workshop_string = "[h1]Scale Test Mod[/h1]\nSupports Stellaris version: [b]3.14.x[/b]\n" + repeat_to_size(
+        workshop_line, parameters.workshop_kilobytes * 1000
+    )
+    (mod_github_folder_path / "workshop.txt").write_text(workshop_string, encoding="utf-8")
+    (mod_github_folder_path / "README.md").write_text(
+        "# Scale Test Mod\n\nSupports Stellaris version: `3.14.x`\n", encoding="utf-8"
+    )
+    changelog_string = generate_changelog(parameters)
+    (mod_github_folder_path / "CHANGELOG.md").write_text(changelog_string, encoding="utf-8")
+    sizes["workshop_description"] = len(workshop_string.encode())
+    sizes["changelog"] = len(changelog_string.encode())
+    return sizes
+
+
+def time_prepare_release_stages(config: cao.ModConfig, zip_file_path: Path) -> tuple[dict[str, float], str]:
+    """
+    Run the stages of `prepare_release.py` (minor version bump, with changelog), returns timings and the new version
+
+    Also times building the release zip, the next step of the workflow.
+    """
+    timings: dict[str, float] = {}
+    with timed(timings, "config"):
+        config.resolve_all()
+
+    with timed(timings, "parse_descriptor"):
+        descriptor_dict = parse_descriptor_to_dict(config.descriptor_file_path)
+
+    with timed(timings, "versions"):
+        current_semantic_versions, updated_mod_version = increment_mod_version(
+            descriptor_dict["version"],  # ty:ignore[invalid-argument-type] version is always a str
+            "Minor",
+            possible_version_types=config.possible_version_types,
+            regex_version_pattern=config.regex_version_pattern,
+        )
+        github_release_tag = "v" + ".".join(current_semantic_versions.values())
+        supported_stellaris_version_display = stellaris_version.replace("*", "x").replace("v", "")
+        mod_version_to_dict(stellaris_version, use_format_check=True, possible_version_types=["Major", "Minor", "Patch"])
+
+    with timed(timings, "write_descriptor"):
+        descriptor_dict["version"] = updated_mod_version
+        descriptor_dict["supported_version"] = stellaris_version
+        create_descriptor_file(descriptor_dict, config.descriptor_file_path)
+
+    new_version_string = f"\\g<1>{supported_stellaris_version_display}\\g<2>"
+    with timed(timings, "workshop_description"):
+        search_and_replace_in_file(
+            config.workshop_description_file_path,
+            config.workshop_desc_version_pattern,
+            new_version_string,
+        )
+    with timed(timings, "readme"):
+        search_and_replace_in_file(config.readme_file_path, config.readme_version_pattern, new_version_string)
+
+    with timed(timings, "loc_files"):
+        loc_file_paths = [(config.mod_files_folder_path / file_name).resolve() for file_name in config.loc_files_list]
+        loc_key_values = {
+            config.version_loc_key: updated_mod_version,
+            config.supported_version_loc_key: supported_stellaris_version_display,
+        }
+        patch_loc_files(loc_file_paths, config.loc_key_pattern, loc_key_values)
+
+    github_release_link = config.github_release_link_pattern.format(repo_github_path, github_release_tag)
+    with timed(timings, "changelog"):
+        changelog_replace = f"\\g<1>\\g<2>[\\g<3>{updated_mod_version}\\g<4>]({github_release_link})\\g<5>\\g<6>\\g<7>"
+        match = replace_changelog_entry(
+            config.changelog_file_path,
+            "WIP",
+            config.changelog_search_pattern,
+            changelog_replace,
+            index_file_path=config.changelog_index_file_path,
+        )
+        if match is None:
+            msg = "Generated changelog has no WIP entry"
+            raise ValueError(msg)
+
+    with timed(timings, "release_notes"):
+        release_changelog_entry = f"{match[1]}{match[2]}{match[3]}{updated_mod_version}{match[4]}{match[5]}{match[6]}{match[7]}"
+        generate_with_template_file(
+            config.release_note_template_file_path,
+            config.generated_release_notes_file_path,
+            [config.template_insert_version_pattern, config.template_search_pattern],
+            [f"\\g<1>\\g<2>{supported_stellaris_version_display}\\g<3>", release_changelog_entry],
+            merge_patterns=True,
+        )
+
+    with timed(timings, "release_zip"):
+        build_release_zip(zip_file_path, [config.mod_files_folder_path], config.mod_github_folder_path)
+    return timings, updated_mod_version
+
+
+def time_workshop_manifest_stages(config: cao.ModConfig, mod_version: str) -> dict[str, float]:
+    """Run the stages of `steam_workshop_upload.py` up to writing the manifest, steamcmd is not run"""
+    timings: dict[str, float] = {}
+    with timed(timings, "parse_descriptor"):
+        descriptor_dict = parse_descriptor_to_dict(config.descriptor_file_path)
+
+    with timed(timings, "workshop_description"):
+        workshop_description_file_string = config.workshop_description_file_path.read_text()
+        workshop_description_file_string = workshop_description_file_string.replace('"', '\\"')
+
+    with timed(timings, "changelog_entry"):
+        versioned_changelog_entry_search_pattern = config.versioned_changelog_entry_search_pattern.format(mod_version)
+        match = find_changelog_entry(
+            config.changelog_file_path,
+            mod_version,
+            versioned_changelog_entry_search_pattern,
+            index_file_path=config.changelog_index_file_path,
+        )
+        if match is None:
+            msg = f"No changelog entry found for the version {mod_version}"
+            raise ValueError(msg)
+        change_note_entry = match.group(0)
+
+    with timed(timings, "steam_formatting"):
+        change_note_entry = replace_with_steam_formatting(change_note_entry)
+
+    with timed(timings, "change_note_template"):
+        workshop_change_note_template_string = config.workshop_change_note_template_file_path.read_text().format(
+            release_url=config.github_release_link_pattern.format(repo_github_path, mod_version),
+            mod_title=descriptor_dict["name"],
+            mod_version=mod_version,
+            stellaris_version=stellaris_version,
+        )
+        change_note = re.sub(
+            config.workshop_template_search_pattern,
+            change_note_entry,
+            workshop_change_note_template_string,
+            flags=re.IGNORECASE | re.MULTILINE | re.DOTALL,
+        )
+
+    with timed(timings, "write_manifest"):
+        manifest_content = (
+            f'"workshopitem"\n{{\n    "appid" "281990"\n    "publishedfileid" "{descriptor_dict["remote_file_id"]}"\n'
+            f'    "contentfolder" "{config.mod_files_folder_path}"\n'
+            f'    "previewfile" "{config.mod_files_folder_path / "thumbnail.png"}"\n'
+            f'    "title" "{descriptor_dict["name"]}"\n    "description" "{workshop_description_file_string}"\n'
+            f'    "changenote" "{change_note}"\n}}\n'
+        )
+        with Path.open(config.manifest_file_path, "w") as manifest_file_object:
+            manifest_file_object.write(manifest_content)
+    return timings
+
+
+def print_timings(script_name: str, timings: dict[str, float], previous_timings: dict[str, float]) -> None:
+    print(f"{script_name}: {sum(timings.values()):.2f} s")
+    for stage_name, stage_time in timings.items():
+        comparison = ""
+        if previous_timings.get(stage_name):
+            comparison = f"  ({stage_time / previous_timings[stage_name]:.2f}x previous)"
+        print(f"    {stage_name:24} {stage_time:8.3f} s{comparison}")
+
+
+def run_benchmark(parameters: ScaleParameters, json_file_path: Path, previous_json_file_path: Path | None) -> None:
+    previous_results = {}
+    if previous_json_file_path is not None:
+        with Path.open(previous_json_file_path) as previous_json_file_object:
+            previous_results = json.load(previous_json_file_object)
+
+    with tempfile.TemporaryDirectory(prefix="bench_scale_") as temp_folder:
+        tool_folder_path = Path(temp_folder) / "tool"
+        tool_folder_path.mkdir()
+        # only the templates are read from the tool folder
+        (tool_folder_path / "templates").symlink_to(Path("templates").resolve(), target_is_directory=True)
+        generated_files_folder_path = Path(temp_folder) / "generated"
+        generated_files_folder_path.mkdir()
+
+        start_time = time.perf_counter()
+        sizes = generate_synthetic_mod(tool_folder_path, parameters)
+        generation_time = time.perf_counter() - start_time
+        size_summary = ", ".join(f"{kind} {size / 1e6:.1f} MB" for kind, size in sizes.items())
+        print(f"Generated synthetic mod in {generation_time:.1f} s: {size_summary}")
+
+        # run with the default debug level, like the action does, but silence the prints of the stages
+        config = cao.ModConfig(
+            mod_folder_name,
+            tool_folder_path=tool_folder_path,
+            env={"generatedFilesFolder": str(generated_files_folder_path)},
+        )
+        with contextlib.redirect_stdout(None):
+            prepare_release_timings, updated_mod_version = time_prepare_release_stages(
+                config, generated_files_folder_path / f"{mod_folder_name}.zip"
+            )
+            workshop_manifest_timings = time_workshop_manifest_stages(config, updated_mod_version)
+
+    results = {
+        "date": dt.datetime.now(tz=dt.UTC).isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "parameters": asdict(parameters),
+        "sizes": sizes,
+        "generation": generation_time,
+        "prepare_release.py": prepare_release_timings,
+        "steam_workshop_upload.py": workshop_manifest_timings,
+    }
+    print_timings("prepare_release.py", prepare_release_timings, previous_results.get("prepare_release.py", {}))
+    print_timings(
+        "steam_workshop_upload.py (manifest)",
+        workshop_manifest_timings,
+        previous_results.get("steam_workshop_upload.py", {}),
+    )
+    with Path.open(json_file_path, "w") as json_file_object:
+        json.dump(results, json_file_object, indent=4)
+    print(f"Results written to {json_file_path}")
+
+
+if __name__ == "__main__":
+    default_parameters = ScaleParameters()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=float, default=1, help="Multiply all counts and total sizes, like 0.1 for a quick run")
+    parser.add_argument("--files", type=int, default=default_parameters.file_count, help="Number of mod files")
+    parser.add_argument("--changelogMegabytes", type=float, default=default_parameters.changelog_megabytes)
+    parser.add_argument("--locFiles", type=int, default=default_parameters.loc_file_count, help="Number of loc files")
+    parser.add_argument("--locFileMegabytes", type=float, default=default_parameters.loc_file_megabytes)
+    parser.add_argument("--workshopKilobytes", type=float, default=default_parameters.workshop_kilobytes)
+    parser.add_argument("--json", type=Path, default=Path("bench_scale_results.json"), help="File to write results to")
+    parser.add_argument("--compare", type=Path, default=None, help="Results of an earlier run to compare stage times to")
+    args = parser.parse_args()
+
+    parameters = ScaleParameters(
+        file_count=args.files,
+        changelog_megabytes=args.changelogMegabytes,
+        loc_file_count=args.locFiles,
+        loc_file_megabytes=args.locFileMegabytes,
+        workshop_kilobytes=args.workshopKilobytes,
+    ).scaled(args.scale)
+    run_benchmark(parameters, args.json, args.compare)
@@ -0,0 +1,114 @@
+"""
+Benchmark for multi-pattern regex search and replace
+
+Generates a multi-MB changelog/readme style text and compares a plain `re.sub` loop, the cached sequential
+`SubstitutionEngine` and the merged single-pass engine, checking all three give the same result. Run from the
+repository root:
+
+`python -m benchmarks.bench_substitution --megabytes 8 --patterns 20`
+"""
+
+import argparse
+import re
+import time
+
+from methods.substitution_methods import default_regex_flags, get_substitution_engine
+
+# independent version patterns, like the readme/changelog/workshop updates in `prepare_release.py`
+base_patterns = (
+    r"(## ModName Version \`).+?(\`:)",
+    r"(Mod version: \`).+?(\`)",
+    r"(Mod version: \[b\]).+?(\[/b\])",
+    r"(Supported Stellaris version: \`).+?(\`)",
+    r"(Release date: ).+?(\n)",
+)
+base_replacements = (
+    "\\g<1>v1.2.3\\g<2>",
+    "\\g<1>v1.2.3\\g<2>",
+    "\\g<1>v1.2.3\\g<2>",
+    "\\g<1>4.0.x\\g<2>",
+    "\\g<1>2024-05-31\\g<2>",
+)
+
+
+def generate_patterns(pattern_count: int) -> tuple[tuple[str, ...], tuple[str, ...]]:
+    """The base patterns, plus extra `Submod N version` patterns up to `pattern_count`"""
+    extra_count = max(pattern_count - len(base_patterns), 0)
+    patterns = base_patterns + tuple(f"(Submod {index} version: \\`).+?(\\`)" for index in range(extra_count))
+    replacements = base_replacements + ("\\g<1>v1.2.3\\g<2>",) * extra_count
+    return patterns[:pattern_count], replacements[:pattern_count]
+
+
+def generate_text(target_megabytes: float, pattern_count: int) -> str:
+    """Synthetic text with a match for each pattern every few lines, padded with plain changelog items"""
+    block = (
+        "## ModName Version `v0.0.{index}`:\n"
+        "Mod version: `v0.0.{index}` and Mod version: [b]v0.0.{index}[/b]\n"
+        "Supported Stellaris version: `3.14.x`\n"
+        "Release date: 2023-01-01\n"
+        "- Item 1, contains [link](https://example.com)\n"
+        "- Item 2, contains **bold text** and some more words to pad the line out\n"
+        "- Item 3, plain text without anything to replace at all in this line\n"
+    )
+    block += "".join(
+        f"- Submod {submod_index} version: `v0.0.{{index}}`\n" for submod_index in range(pattern_count - len(base_patterns))
+    )
+    block += "\n"
+    target_chars = int(target_megabytes * 1e6)
+    parts: list[str] = []
+    total_chars = 0
+    index = 0
+    while total_chars < target_chars:
+        part = block.format(index=index)
+        parts.append(part)
+        total_chars += len(part)
+        index += 1
+    return "".join(parts)
+
+
+def time_best(function, text: str, repeats: int) -> tuple[float, str]:  # noqa: ANN001
+    times = []
+    result = ""
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        result = function(text)
+        times.append(time.perf_counter() - start_time)
+    return min(times), result
+
+
+def run_benchmark(target_megabytes: float, pattern_count: int, repeats: int) -> None:
+    patterns, replacements = generate_patterns(pattern_count)
+    text = generate_text(target_megabytes, pattern_count)
+    print(f"Synthetic text: {len(text) / 1e6:.1f} MB, {len(patterns)} patterns")
+
+    def re_sub_loop(text: str) -> str:
+        for pattern, replacement in zip(patterns, replacements, strict=True):
+            text = re.sub(pattern, replacement, text, flags=default_regex_flags)
+        return text
+
+    sequential_engine = get_substitution_engine(patterns, replacements)
+    merged_engine = get_substitution_engine(patterns, replacements, merge=True)
+    candidates = {
+        "re.sub loop": re_sub_loop,
+        "sequential": sequential_engine.apply,
+        "merged": merged_engine.apply,
+    }
+
+    reference_result = None
+    for name, function in candidates.items():
+        best_time, result = time_best(function, text, repeats)
+        if reference_result is None:
+            reference_result = result
+        elif result != reference_result:
+            msg = f"{name} gave a different result than the re.sub loop"
+            raise ValueError(msg)
+        print(f"{name:12}: best {best_time:.3f} s, {len(text) / 1e6 / best_time:.1f} MB/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--megabytes", type=float, default=8, help="Approximate size of the generated text")
+    parser.add_argument("--patterns", type=int, default=5, help="Number of independent patterns to replace")
+    parser.add_argument("--repeats", type=int, default=3, help="Number of timed runs, best is reported")
+    args = parser.parse_args()
+    run_benchmark(args.megabytes, args.patterns, args.repeats)
@@ -0,0 +1,66 @@
+"""
+Benchmark for walking a mod folder with many small files
+
+Compares `Path.rglob("*")` plus `is_file()` (the old way every tool listed the mod files) with `walk_folder`, on a
+generated tree with some junk (a `.git` folder, GIMP sources, editor backups) that the walker drops without entering
+or `stat`-ing it. Run from the repository root:
+
+`python -m benchmarks.bench_walk --files 50000 --repeats 5`
+"""
+
+import argparse
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from methods.walk_methods import WalkRules, walk_folder
+
+files_per_folder = 50
+# every n-th file is junk that the default rules exclude
+junk_every = 10
+junk_suffixes = (".xcf", ".txt~", ".bak")
+
+
+def generate_tree(mod_path: Path, file_count: int) -> None:
+    for index in range(file_count):
+        folder_path = mod_path / "common" / f"folder_{index // files_per_folder}"
+        if index % files_per_folder == 0:
+            folder_path.mkdir(parents=True)
+        suffix = junk_suffixes[index % len(junk_suffixes)] if index % junk_every == 0 else ".txt"
+        (folder_path / f"file_{index}{suffix}").write_bytes(b"")
+    git_folder_path = mod_path / ".git" / "objects"
+    git_folder_path.mkdir(parents=True)
+    for index in range(file_count // 4):
+        (git_folder_path / f"object_{index}").write_bytes(b"")
+
+
+def list_with_rglob(mod_path: Path) -> list[str]:
+    return [file_path.relative_to(mod_path).as_posix() for file_path in mod_path.rglob("*") if file_path.is_file()]
+
+
+def list_with_walker(mod_path: Path) -> list[str]:
+    return [relative_path for relative_path, _ in walk_folder(mod_path, WalkRules())]
+
+
+def time_best(function: Callable[[Path], list[str]], mod_path: Path, repeats: int) -> tuple[float, int]:
+    times = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        file_count = len(function(mod_path))
+        times.append(time.perf_counter() - start_time)
+    return min(times), file_count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=20_000, help="Number of mod files to generate")
+    parser.add_argument("--repeats", type=int, default=5, help="Number of timed runs, best is reported")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_folder:
+        mod_path = Path(temp_folder) / "mod"
+        generate_tree(mod_path, args.files)
+        for name, function in (("rglob + is_file", list_with_rglob), ("walk_folder", list_with_walker)):
+            best_time, file_count = time_best(function, mod_path, args.repeats)
+            print(f"{name:16}: best {best_time * 1000:.1f} ms, {file_count} files")
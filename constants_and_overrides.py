@@ -1,12 +1,27 @@
+"""
+Settings, constants and defaults, plus the per-mod configuration with user overrides applied
+
+Importing this has no side effects. Per-mod values live on `ModConfig`, which is built from explicit inputs and
+resolves every value (and `OVERRIDE.txt`) only when first used. The module-level names used by the scripts,
+like `cao.descriptor_file_path`, still work, they are looked up on a default `ModConfig` made from the environment.
+"""
+
 ### Imports ###
+import functools
 import json
+import os
+from collections.abc import Mapping
 from pathlib import Path
 
+from methods.cache_methods import ParseCache, default_parse_cache_max_bytes, get_tool_version
 from methods.input_methods import get_env_variable
 from methods.override_methods import OverrideClass
+from methods.size_methods import SizeBudget, parse_size_budgets
+from methods.walk_methods import WalkRules
 
 ### Settings ###
-# debug level "SILENT" prints nothing, "INFO" inputs and paths, "DEBUG" prints information about parsing and processing
+# log level passed to `configure_logging` by the scripts
+# "SILENT" logs only warnings and errors, "INFO" inputs and paths, "DEBUG" information about parsing and processing
 debug_level: str = "INFO"  # "SILENT", "INFO", or "DEBUG"
 
 # whether to add a new WIP entry to changelogs for filling in
@@ -19,6 +34,7 @@ default_possible_version_types: list[str] = ["Major", "Minor", "Patch"]
 default_regex_version_pattern = r"^v?\s?(?:(?:\d{1,9}|\*)\.){2}(?:\d{1,9}|\*)"
 
 ## Environment variable names (passed to github action environment)
+github_env_modversion_name = "MOD_VERSION"
 github_env_modreleasetag_name = "MOD_RELEASE_TAG"
 github_env_releasetitle_name = "MOD_RELEASE_TITLE"
 github_env_releasenotesfile_name = "MOD_RELEASENOTES_FILE"
@@ -33,30 +49,20 @@ default_readme_file_name = "README.md"
 default_changelog_file_name = "CHANGELOG.md"
 default_generated_release_notes_filename = "generated_release_notes.md"
 default_manifest_file_name = "manifest.vdf"
-
-## Paths
-mod_folder_name: str | None = get_env_variable("modFolderName", None, debug_level=debug_level)
-# bypass if file ran directly as a standalone
-if __name__ == "__main__":
-    mod_folder_name = "Placeholder"
-
-if not mod_folder_name:
-    msg = "Mod folder name is missing or incomplete, must set an env variable with calling Github repo name"
-    raise ValueError(msg)
-
-mod_repo_name: str = mod_folder_name  # NOTE part of expected `modname/modname/common` structure
-
-# cwd is set to where the python file is,
-# which should be next to the folder with the mod files from the originating mod repository
-mod_github_folder_path: Path = (Path.cwd() / f"../{mod_folder_name}").resolve()
-# and the folder with the actual game mod files (nested one down from github)
-mod_files_folder_path: Path = mod_github_folder_path / mod_folder_name
-
-# file to output the current set of overrideable parameters for convenience
-# NOTE: files for the tool repo don't get committed during a workflow run
-# (not that external parties running the tool would be allowed to)
-# so this file is generated when manually running this script from the dev side
-overrideable_parameters_file_path = Path.cwd() / ".github/" / "overrideable_parameters.json"
+# sidecar offset index of the changelog entries, a generated file so not override-able
+changelog_index_file_name = "changelog_index.json"
+# parsed descriptor, overrides and changelog index, kept between runs by content hash
+parse_cache_folder_name = "parse_cache"
+# sidecar index of the keys in each loc file, a generated file so not override-able
+loc_key_index_file_name = "loc_key_index.json"
+# mod file validation results by content hash, kept in the parse cache folder so they survive between runs
+validation_cache_file_name = "validation_cache.json"
+# size report of the mod content, the last one within budget is kept in the parse cache folder for the next run
+size_report_file_name = "size_report.json"
+# staged content of the workshop items, only the files that pass the walk rules
+workshop_staging_folder_name = "workshop_staging"
+# content snapshots of uploaded workshop items, one JSON per item, kept between runs to skip unchanged uploads
+workshop_snapshot_folder_name = "workshop_snapshots"
 
 ### Defaults ###
 # merely convenient defaults for python script, can be changed
@@ -65,14 +71,16 @@ default_release_note_template_filename = "release_note_template.md"
 default_release_note_template_no_changelog_filename = "release_note_template_no_changelog.md"
 default_workshop_change_note_template_filename = "workshop_change_note_template.md"
 
-# file for giving (potential) extra information to web tools
-default_webhook_json_file_path: Path = mod_github_folder_path / ".github/" / "supported_stellaris_version.json"
+# file for giving (potential) extra information to web tools, relative to the mod repository
+default_webhook_json_file_name = ".github/supported_stellaris_version.json"
 
 ## Regex search patterns
 # loc_something:0 "something"
 # 0 code intentional since numbers other than 0 are generated or messed with by some tool, usually
 # generic localization pattern matching
 default_loc_key_pattern = '(\\s{}:0\\s").+?(")'  # use with .format(loc_key)
+# release date written to `release_date_loc_key`, like 2024-05-31
+default_release_date_format = "%Y-%m-%d"
 
 # "Supports Stellaris version: 1.2.x" with version number bolded in steam BBcode
 default_workshop_desc_version_pattern = r"(Supports Stellaris version: \[b\]).+?(\[/b\])"
@@ -127,130 +135,437 @@ default_versioned_changelog_entry_search_pattern = r"(^---\n)(##\s)(\[.+?\s`){}(
 # for replacing what is inside the horizontal rules in the workshop changenote template
 default_workshop_template_search_pattern = r"(^\[hr\]\[/hr\]\n)(.+?\n)(^\[hr\]\[/hr\]$)"
 
-### Overrides ###
-Overrides = OverrideClass(mod_github_folder_path, debug_level=debug_level)
-overrides_enabled = Overrides.overrides_enabled
-
-## Setting overrides
-add_changelog_WIP_entry = Overrides.get_parameter("add_changelog_WIP_entry", default_add_changelog_WIP_entry)  # noqa: N816
-possible_version_types = Overrides.get_parameter("possible_version_types", default_possible_version_types)
-regex_version_pattern = Overrides.get_parameter("regex_version_pattern", default_regex_version_pattern)
-
-## Path overrides
-descriptor_file_name = Overrides.get_parameter("descriptor_file_name", default_descriptor_file_name)
-# note, descriptor is with mod files, not in higher level repository
-descriptor_file_path = mod_files_folder_path / descriptor_file_name
-workshop_description_file_name = Overrides.get_parameter(
-    "workshop_description_file_name",
-    default_workshop_description_file_name,
-)
-workshop_description_file_path = mod_github_folder_path / workshop_description_file_name
-readme_file_name = Overrides.get_parameter("readme_file_name", default_readme_file_name)
-readme_file_path = mod_github_folder_path / readme_file_name
-changelog_file_name = Overrides.get_parameter("changelog_file_name", default_changelog_file_name)
-changelog_file_path = mod_github_folder_path / changelog_file_name
-
-webhook_json_file_path: Path = Overrides.get_parameter("webhook_json_file_path", default_webhook_json_file_path)
-
-# temp files used by script, kept out of mod files repository so as to not be committed
-generated_release_notes_filename = Overrides.get_parameter(
-    "generated_release_notes_filename",
-    default_generated_release_notes_filename,
-)
-generated_release_notes_file_path = Path.cwd() / generated_release_notes_filename
-manifest_file_name = Overrides.get_parameter("manifest_file_name", default_manifest_file_name)
-manifest_file_path = Path.cwd() / manifest_file_name
-
-# template files
-release_note_template_filename = Overrides.get_parameter(
-    "release_note_template_filename",
-    default_release_note_template_filename,
-)
-release_note_template_overriden = Overrides.overriden_params["release_note_template_filename"]
-# default template file is generic and comes from the deploy repo
-# but otherwise, check user provided one (which can only come from *their* repo)
-if not release_note_template_overriden:
-    release_note_template_file_path = Path.cwd() / "templates/" / release_note_template_filename
-else:
-    release_note_template_file_path = mod_github_folder_path / release_note_template_filename
-
-# no changelog version
-release_note_template_no_changelog_filename = Overrides.get_parameter(
-    "release_note_template_no_changelog_filename",
-    default_release_note_template_no_changelog_filename,
-)
-release_note_template_no_changelog_overriden = Overrides.overriden_params["release_note_template_no_changelog_filename"]
-# same as above
-if not release_note_template_no_changelog_overriden:
-    release_note_template_no_changelog_file_path = Path.cwd() / "templates/" / release_note_template_no_changelog_filename
-else:
-    release_note_template_no_changelog_file_path = mod_github_folder_path / release_note_template_no_changelog_filename
-
-# workshop change note, same as above
-workshop_change_note_template_filename = Overrides.get_parameter(
-    "workshop_change_note_template_filename",
-    default_workshop_change_note_template_filename,
-)
-workshop_change_note_template_overriden = Overrides.overriden_params["workshop_change_note_template_filename"]
-if not workshop_change_note_template_overriden:
-    workshop_change_note_template_file_path = Path.cwd() / "templates/" / workshop_change_note_template_filename
-else:
-    workshop_change_note_template_file_path = mod_github_folder_path / workshop_change_note_template_filename
-
-## Descriptor overrides
-# can supply overrides to the parsed descriptor from the mod github
-descriptor_override_name = Overrides.get_parameter("name", None)
-descriptor_override_version = Overrides.get_parameter("version", None)
-descriptor_override_tags = Overrides.get_parameter("tags", None)
-descriptor_override_picture = Overrides.get_parameter("picture", None)
-descriptor_override_supported_version = Overrides.get_parameter("supported_version", None)
-descriptor_override_path = Overrides.get_parameter("path", None)
-descriptor_override_remote_file_id = Overrides.get_parameter("remote_file_id", None)
-
-## Search pattern overrides
-loc_key_pattern = Overrides.get_parameter("loc_key_pattern", default_loc_key_pattern)
-workshop_desc_version_pattern = Overrides.get_parameter(
-    "workshop_desc_version_pattern",
-    default_workshop_desc_version_pattern,
-)
-readme_version_pattern = Overrides.get_parameter("readme_version_pattern", default_readme_version_pattern)
-github_release_link_pattern = Overrides.get_parameter(
-    "github_release_link_pattern",
-    default_github_release_link_pattern,
-)
-changelog_search_pattern = Overrides.get_parameter("changelog_search_pattern", default_changelog_search_pattern)
-template_search_pattern = Overrides.get_parameter("template_search_pattern", default_template_search_pattern)
-template_insert_version_pattern = Overrides.get_parameter(
-    "template_insert_version_pattern",
-    default_template_insert_version_pattern,
-)
-
-versioned_changelog_entry_search_pattern = Overrides.get_parameter(
-    "versioned_changelog_entry_search_pattern",
-    default_versioned_changelog_entry_search_pattern,
-)
-workshop_template_search_pattern = Overrides.get_parameter(
-    "workshop_template_search_pattern",
-    default_workshop_template_search_pattern,
-)
-
-## Custom logic for handling overriding of loc keys, potentially from multiple files
-if not Overrides.overrides_enabled:
-    loc_files_list = []
-    version_loc_key = None
-else:
-    try:
-        loc_files_list = Overrides.override_dict["extra_loc_files_to_update"]  # list of files
-        version_loc_key = Overrides.override_dict["version_loc_key"]  # loc key to look for, inserted in generic search pattern
-    except KeyError:
-        loc_files_list = []
-        version_loc_key = None
+
+### Per-mod configuration ###
+class ModConfig:
+    """
+    Paths and override-able parameters for one mod
+
+    Nothing is read until used: paths and overrides are resolved on first access and cached. Build one per mod,
+    several can live in the same process.
+    """
+
+    def __init__(
+        self,
+        mod_folder_name: str,
+        *,
+        tool_folder_path: Path | None = None,
+        env: Mapping[str, str] | None = None,
+    ) -> None:
+        """
+        Set up the configuration for a mod
+
+        Parameters
+        ----------
+        mod_folder_name : str
+            Name of the mod folder (and repository), next to the tool folder
+        tool_folder_path : Path | None, optional
+            Folder with the python files and templates, by default the current working directory
+        env : Mapping[str, str] | None, optional
+            Environment to read settings like `generatedFilesFolder` from, by default `os.environ`
+
+        """
+        if not mod_folder_name:
+            msg = "Mod folder name is missing or incomplete, must set an env variable with calling Github repo name"
+            raise ValueError(msg)
+        self.mod_folder_name: str = mod_folder_name
+        self.mod_repo_name: str = mod_folder_name  # NOTE part of expected `modname/modname/common` structure
+        self.tool_folder_path: Path = Path.cwd() if tool_folder_path is None else Path(tool_folder_path)
+        self.env: Mapping[str, str] = os.environ if env is None else env
+
+    @classmethod
+    def from_env(cls, env: Mapping[str, str] | None = None, *, tool_folder_path: Path | None = None) -> "ModConfig":
+        """Config for the mod named by the `modFolderName` env variable, like the github action sets"""
+        env = os.environ if env is None else env
+        mod_folder_name = get_env_variable("modFolderName", None, env=env)
+        return cls(mod_folder_name or "", tool_folder_path=tool_folder_path, env=env)
+
+    ## Paths
+    @functools.cached_property
+    def mod_github_folder_path(self) -> Path:
+        # the tool folder should be next to the folder with the mod files from the originating mod repository
+        return (self.tool_folder_path / f"../{self.mod_folder_name}").resolve()
+
+    @functools.cached_property
+    def mod_files_folder_path(self) -> Path:
+        # the folder with the actual game mod files (nested one down from github)
+        return self.mod_github_folder_path / self.mod_folder_name
+
+    @functools.cached_property
+    def overrideable_parameters_file_path(self) -> Path:
+        # file to output the current set of overrideable parameters for convenience
+        # NOTE: files for the tool repo don't get committed during a workflow run
+        # (not that external parties running the tool would be allowed to)
+        # so this file is generated when manually running this script from the dev side
+        return self.tool_folder_path / ".github/" / "overrideable_parameters.json"
+
+    @functools.cached_property
+    def default_webhook_json_file_path(self) -> Path:
+        return self.mod_github_folder_path / default_webhook_json_file_name
+
+    @functools.cached_property
+    def generated_files_folder_path(self) -> Path:
+        # temp files used by script, kept out of mod files repository so as to not be committed
+        # next to the python files by default, batch runs give every mod its own folder so they don't overwrite each other
+        generated_files_folder = get_env_variable("generatedFilesFolder", None, env=self.env)
+        return self.tool_folder_path if generated_files_folder is None else Path(generated_files_folder)
+
+    @functools.cached_property
+    def workshop_snapshot_folder_path(self) -> Path:
+        # set `workshopSnapshotFolder` to a folder restored by actions/cache, otherwise only useful for local runs
+        workshop_snapshot_folder = get_env_variable("workshopSnapshotFolder", None, env=self.env)
+        if workshop_snapshot_folder is None:
+            return self.generated_files_folder_path / workshop_snapshot_folder_name
+        return Path(workshop_snapshot_folder)
+
+    @functools.cached_property
+    def workshop_staging_folder_path(self) -> Path:
+        return self.generated_files_folder_path / workshop_staging_folder_name
+
+    @functools.cached_property
+    def parse_cache_folder_path(self) -> Path:
+        # set `parseCacheFolder` to a folder restored by actions/cache to reuse parsed files between runs and jobs
+        parse_cache_folder = get_env_variable("parseCacheFolder", None, env=self.env)
+        if parse_cache_folder is None:
+            return self.generated_files_folder_path / parse_cache_folder_name
+        return Path(parse_cache_folder)
+
+    @functools.cached_property
+    def validation_cache_file_path(self) -> Path:
+        # next to the parse cache entries, not counted in its size cap
+        return self.parse_cache_folder_path / validation_cache_file_name
+
+    @functools.cached_property
+    def size_report_file_path(self) -> Path:
+        return self.generated_files_folder_path / size_report_file_name
+
+    @functools.cached_property
+    def previous_size_report_file_path(self) -> Path:
+        # the report of the last run within budget, compared against for growth
+        return self.parse_cache_folder_path / size_report_file_name
+
+    @functools.cached_property
+    def parse_cache(self) -> ParseCache:
+        max_bytes = int(get_env_variable("parseCacheMaxBytes", str(default_parse_cache_max_bytes), env=self.env))
+        return ParseCache(self.parse_cache_folder_path, get_tool_version(self.tool_folder_path), max_bytes=max_bytes)
+
+    ## Overrides
+    @functools.cached_property
+    def Overrides(self) -> OverrideClass:  # noqa: N802 keeps the old module-level name
+        return OverrideClass(self.mod_github_folder_path, self.parse_cache)
+
+    @property
+    def overrides_enabled(self) -> bool:
+        return self.Overrides.overrides_enabled
+
+    def _get_parameter(self, parameter_name: str, parameter_default):  # noqa: ANN001, ANN202 typed by `OverrideClass`
+        return self.Overrides.get_parameter(parameter_name, parameter_default)
+
+    ## Setting overrides
+    @functools.cached_property
+    def add_changelog_WIP_entry(self) -> bool:  # noqa: N802
+        return self._get_parameter("add_changelog_WIP_entry", default_add_changelog_WIP_entry)
+
+    @functools.cached_property
+    def possible_version_types(self) -> list[str]:
+        return self._get_parameter("possible_version_types", default_possible_version_types)
+
+    @functools.cached_property
+    def regex_version_pattern(self) -> str:
+        return self._get_parameter("regex_version_pattern", default_regex_version_pattern)
+
+    ## Path overrides
+    @functools.cached_property
+    def descriptor_file_name(self) -> str:
+        return self._get_parameter("descriptor_file_name", default_descriptor_file_name)
+
+    @functools.cached_property
+    def descriptor_file_path(self) -> Path:
+        # note, descriptor is with mod files, not in higher level repository
+        return self.mod_files_folder_path / self.descriptor_file_name
+
+    @functools.cached_property
+    def workshop_description_file_name(self) -> str:
+        return self._get_parameter("workshop_description_file_name", default_workshop_description_file_name)
+
+    @functools.cached_property
+    def workshop_description_file_path(self) -> Path:
+        return self.mod_github_folder_path / self.workshop_description_file_name
+
+    @functools.cached_property
+    def readme_file_name(self) -> str:
+        return self._get_parameter("readme_file_name", default_readme_file_name)
+
+    @functools.cached_property
+    def readme_file_path(self) -> Path:
+        return self.mod_github_folder_path / self.readme_file_name
+
+    @functools.cached_property
+    def changelog_file_name(self) -> str:
+        return self._get_parameter("changelog_file_name", default_changelog_file_name)
+
+    @functools.cached_property
+    def changelog_file_path(self) -> Path:
+        return self.mod_github_folder_path / self.changelog_file_name
+
+    @functools.cached_property
+    def changelog_index_file_path(self) -> Path:
+        return self.generated_files_folder_path / changelog_index_file_name
+
+    @functools.cached_property
+    def loc_key_index_file_path(self) -> Path:
+        return self.generated_files_folder_path / loc_key_index_file_name
+
+    @functools.cached_property
+    def webhook_json_file_path(self) -> Path:
+        return self._get_parameter("webhook_json_file_path", self.default_webhook_json_file_path)
+
+    @functools.cached_property
+    def generated_release_notes_filename(self) -> str:
+        return self._get_parameter("generated_release_notes_filename", default_generated_release_notes_filename)
+
+    @functools.cached_property
+    def generated_release_notes_file_path(self) -> Path:
+        return self.generated_files_folder_path / self.generated_release_notes_filename
+
+    @functools.cached_property
+    def manifest_file_name(self) -> str:
+        return self._get_parameter("manifest_file_name", default_manifest_file_name)
+
+    @functools.cached_property
+    def manifest_file_path(self) -> Path:
+        return self.generated_files_folder_path / self.manifest_file_name
+
+    ## Template files
+    @functools.cached_property
+    def release_note_template_filename(self) -> str:
+        return self._get_parameter("release_note_template_filename", default_release_note_template_filename)
+
+    @functools.cached_property
+    def release_note_template_overriden(self) -> bool:
+        _ = self.release_note_template_filename  # looking up the filename books whether it was overriden
+        return self.Overrides.overriden_params["release_note_template_filename"]
+
+    @functools.cached_property
+    def release_note_template_file_path(self) -> Path:
+        # default template file is generic and comes from the deploy repo
+        # but otherwise, check user provided one (which can only come from *their* repo)
+        if not self.release_note_template_overriden:
+            return self.tool_folder_path / "templates/" / self.release_note_template_filename
+        return self.mod_github_folder_path / self.release_note_template_filename
+
+    # no changelog version
+    @functools.cached_property
+    def release_note_template_no_changelog_filename(self) -> str:
+        return self._get_parameter(
+            "release_note_template_no_changelog_filename",
+            default_release_note_template_no_changelog_filename,
+        )
+
+    @functools.cached_property
+    def release_note_template_no_changelog_overriden(self) -> bool:
+        _ = self.release_note_template_no_changelog_filename  # looking up the filename books whether it was overriden
+        return self.Overrides.overriden_params["release_note_template_no_changelog_filename"]
+
+    @functools.cached_property
+    def release_note_template_no_changelog_file_path(self) -> Path:
+        # same as above
+        if not self.release_note_template_no_changelog_overriden:
+            return self.tool_folder_path / "templates/" / self.release_note_template_no_changelog_filename
+        return self.mod_github_folder_path / self.release_note_template_no_changelog_filename
+
+    # workshop change note, same as above
+    @functools.cached_property
+    def workshop_change_note_template_filename(self) -> str:
+        return self._get_parameter("workshop_change_note_template_filename", default_workshop_change_note_template_filename)
+
+    @functools.cached_property
+    def workshop_change_note_template_overriden(self) -> bool:
+        _ = self.workshop_change_note_template_filename  # looking up the filename books whether it was overriden
+        return self.Overrides.overriden_params["workshop_change_note_template_filename"]
+
+    @functools.cached_property
+    def workshop_change_note_template_file_path(self) -> Path:
+        if not self.workshop_change_note_template_overriden:
+            return self.tool_folder_path / "templates/" / self.workshop_change_note_template_filename
+        return self.mod_github_folder_path / self.workshop_change_note_template_filename
+
+    ## Descriptor overrides
+    # can supply overrides to the parsed descriptor from the mod github
+    @functools.cached_property
+    def descriptor_override_name(self) -> str | None:
+        return self._get_parameter("name", None)
+
+    @functools.cached_property
+    def descriptor_override_version(self) -> str | None:
+        return self._get_parameter("version", None)
+
+    @functools.cached_property
+    def descriptor_override_tags(self) -> str | None:
+        return self._get_parameter("tags", None)
+
+    @functools.cached_property
+    def descriptor_override_picture(self) -> str | None:
+        return self._get_parameter("picture", None)
+
+    @functools.cached_property
+    def descriptor_override_supported_version(self) -> str | None:
+        return self._get_parameter("supported_version", None)
+
+    @functools.cached_property
+    def descriptor_override_path(self) -> str | None:
+        return self._get_parameter("path", None)
+
+    @functools.cached_property
+    def descriptor_override_remote_file_id(self) -> str | None:
+        return self._get_parameter("remote_file_id", None)
+
+    ## Search pattern overrides
+    @functools.cached_property
+    def loc_key_pattern(self) -> str:
+        return self._get_parameter("loc_key_pattern", default_loc_key_pattern)
+
+    @functools.cached_property
+    def workshop_desc_version_pattern(self) -> str:
+        return self._get_parameter("workshop_desc_version_pattern", default_workshop_desc_version_pattern)
+
+    @functools.cached_property
+    def readme_version_pattern(self) -> str:
+        return self._get_parameter("readme_version_pattern", default_readme_version_pattern)
+
+    @functools.cached_property
+    def github_release_link_pattern(self) -> str:
+        return self._get_parameter("github_release_link_pattern", default_github_release_link_pattern)
+
+    @functools.cached_property
+    def changelog_search_pattern(self) -> str:
+        return self._get_parameter("changelog_search_pattern", default_changelog_search_pattern)
+
+    @functools.cached_property
+    def template_search_pattern(self) -> str:
+        return self._get_parameter("template_search_pattern", default_template_search_pattern)
+
+    @functools.cached_property
+    def template_insert_version_pattern(self) -> str:
+        return self._get_parameter("template_insert_version_pattern", default_template_insert_version_pattern)
+
+    @functools.cached_property
+    def versioned_changelog_entry_search_pattern(self) -> str:
+        return self._get_parameter(
+            "versioned_changelog_entry_search_pattern",
+            default_versioned_changelog_entry_search_pattern,
+        )
+
+    @functools.cached_property
+    def workshop_template_search_pattern(self) -> str:
+        return self._get_parameter("workshop_template_search_pattern", default_workshop_template_search_pattern)
+
+    ## Custom logic for handling overriding of loc keys, potentially from multiple files
+    # the loc keys are inserted in the generic `loc_key_pattern`, all keys are patched in each file in one pass
+    def _get_special_parameter(self, parameter_name: str) -> str | list[str] | None:
+        if not self.overrides_enabled:
+            return None
+        return self.Overrides.override_dict.get(parameter_name)
+
+    # without a list of files, the files defining the loc keys are found with the loc key index
+    @functools.cached_property
+    def loc_files_list(self) -> list[str]:
+        loc_files_list = self._get_special_parameter("extra_loc_files_to_update") or []  # list of files
+        if isinstance(loc_files_list, str):
+            loc_files_list = [loc_files_list]
+        return loc_files_list
+
+    # more workshop items to upload with the main mod, see `methods/workshop_methods.py` for the entry format
+    @functools.cached_property
+    def extra_workshop_items(self) -> list[str]:
+        extra_workshop_items = self._get_special_parameter("extra_workshop_items") or []
+        if isinstance(extra_workshop_items, str):
+            extra_workshop_items = [extra_workshop_items]
+        return extra_workshop_items
+
+    # include and exclude rules for the mod files, from `mod_files_include` and `mod_files_exclude` lists
+    # used by the release zip, the validation and the workshop upload, see `methods/walk_methods.py`
+    @functools.cached_property
+    def walk_rules(self) -> WalkRules:
+        return WalkRules.from_overrides(self.Overrides.override_dict)
+
+    # byte budgets for the mod content like `total=500MB`, see `methods/size_methods.py`
+    @functools.cached_property
+    def size_budgets(self) -> list[SizeBudget]:
+        size_budgets = self._get_special_parameter("size_budgets") or []
+        if isinstance(size_budgets, str):
+            size_budgets = [size_budgets]
+        return parse_size_budgets(size_budgets)
+
+    @functools.cached_property
+    def version_loc_key(self) -> str | None:
+        return self._get_special_parameter("version_loc_key")  # ty:ignore[invalid-return-type] gets the new mod version
+
+    @functools.cached_property
+    def supported_version_loc_key(self) -> str | None:
+        return self._get_special_parameter("supported_version_loc_key")  # ty:ignore[invalid-return-type] gets the supported Stellaris version
+
+    @functools.cached_property
+    def release_date_loc_key(self) -> str | None:
+        return self._get_special_parameter("release_date_loc_key")  # ty:ignore[invalid-return-type] gets the release date
+
+    # format for the release date loc key, passed to `strftime`
+    @functools.cached_property
+    def release_date_format(self) -> str:
+        return self._get_parameter("release_date_format", default_release_date_format)
+
+    def resolve_all(self) -> None:
+        """Resolve every value now, in definition order, for example to list all override-able parameters"""
+        for name, attribute in vars(type(self)).items():
+            if isinstance(attribute, (functools.cached_property, property)):
+                getattr(self, name)
+
+
+### Compatibility shim ###
+# the scripts use `cao.<name>` for per-mod values, these are looked up on a default config made on first use
+_default_config: ModConfig | None = None
+# set in `ModConfig.__init__`, so not found on the class itself
+_config_instance_attribute_names = {"mod_folder_name", "mod_repo_name", "tool_folder_path", "env"}
+
+
+def get_default_config() -> ModConfig:
+    """Default config, built from the process environment (and working directory) on first use"""
+    global _default_config  # noqa: PLW0603 module level cache is the point
+    if _default_config is None:
+        _default_config = ModConfig.from_env()
+    return _default_config
+
+
+def set_default_config(config: ModConfig | None) -> None:
+    """Swap the config used for module-level names, `None` builds a new one from the environment on next use"""
+    global _default_config  # noqa: PLW0603
+    _default_config = config
+
+
+def __getattr__(name: str):  # noqa: ANN202 any config value
+    if name.startswith("_") or not (hasattr(ModConfig, name) or name in _config_instance_attribute_names):
+        msg = f"module {__name__!r} has no attribute {name!r}"
+        raise AttributeError(msg)
+    return getattr(get_default_config(), name)
+
 
 if __name__ == "__main__":
     # save a json with the list of parameters this script supports for overrides
     # useful for automated documentation
-    params_dict = {"overrideable_parameter_names": [param + "_override" for param in Overrides.overriden_params]}
-    params_dict["special_params"] = ["extra_loc_files_to_update", "version_loc_key"]
-    with Path.open(overrideable_parameters_file_path, "w") as params_json_file_object:
+    # bypass the env variable when ran directly as a standalone
+    config = ModConfig("Placeholder")
+    config.resolve_all()
+    params_dict = {"overrideable_parameter_names": [param + "_override" for param in config.Overrides.overriden_params]}
+    params_dict["special_params"] = [
+        "extra_loc_files_to_update",
+        "version_loc_key",
+        "supported_version_loc_key",
+        "release_date_loc_key",
+        "extra_workshop_items",
+        "mod_files_exclude",
+        "mod_files_include",
+        "size_budgets",
+    ]
+    with Path.open(config.overrideable_parameters_file_path, "w") as params_json_file_object:
         json.dump(params_dict, params_json_file_object, indent=4)
-    print(f"Wrote possible override parameters to file `{overrideable_parameters_file_path}`")
+    print(f"Wrote possible override parameters to file `{config.overrideable_parameters_file_path}`")
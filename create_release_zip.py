@@ -0,0 +1,51 @@
+"""
+Build the release zip with mod files + descriptor, replacing the shell `zip -r` step
+
+Run from inside the mod repository, after the descriptor has been copied up next to the mod folder.
+Reuses compressed entries from the previous release zip when one is supplied. Files in the mod folder are filtered
+with the `mod_files_exclude` and `mod_files_include` rules from `OVERRIDE.txt`, see `methods/walk_methods.py`.
+"""
+
+### Imports ###
+import argparse
+import time
+from pathlib import Path
+
+from methods.archive_methods import CompressionPolicy, build_release_zip, default_text_compression_level
+from methods.override_methods import OverrideClass
+from methods.walk_methods import WalkRules
+
+### Command line inputs ###
+parser = argparse.ArgumentParser()
+parser.add_argument("zipFileName", type=str, help="Name of release zip to create")
+parser.add_argument("sourcePaths", type=str, nargs="+", help="Files and folders to add, relative to working directory")
+parser.add_argument("--previousZip", type=str, default=None, help="Previous release zip to reuse unchanged entries from")
+parser.add_argument("--compressionLevel", type=int, default=6, help="Deflate compression level")
+parser.add_argument(
+    "--textCompressionLevel",
+    type=int,
+    default=default_text_compression_level,
+    help="Deflate compression level for script and text files, textures and sounds are always stored",
+)
+parser.add_argument("--overrideFolder", type=str, default=".", help="Folder with the mod's OVERRIDE.txt, the mod repository")
+parser.add_argument("--maxWorkers", type=int, default=None, help="Number of compression threads")
+args = parser.parse_args()
+
+### Build ###
+start_time = time.perf_counter()
+result = build_release_zip(
+    Path(args.zipFileName),
+    [Path(source_path) for source_path in args.sourcePaths],
+    Path.cwd(),
+    previous_zip_file_path=args.previousZip or None,
+    compression_policy=CompressionPolicy.for_mod_files(args.compressionLevel, args.textCompressionLevel),
+    rules=WalkRules.from_overrides(OverrideClass(Path(args.overrideFolder)).override_dict),
+    max_workers=args.maxWorkers,
+)
+elapsed_time = time.perf_counter() - start_time
+
+print(
+    f"Wrote {result.zip_file_path} with {result.entry_count} entries "
+    f"({result.compressed_count} compressed, {result.stored_count} stored, {result.reused_count} reused from previous release) "
+    f"- {result.bytes_in} bytes in, {result.bytes_out} bytes out, {elapsed_time:.2f} s"
+)
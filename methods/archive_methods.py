@@ -0,0 +1,555 @@
+"""
+Functions for building release archives of mod files
+
+Replaces the shell `zip -r` step and the single-threaded `zip_folder` with a builder that:
+
+- compresses entries on a thread pool (`zlib` releases the GIL while compressing),
+- picks the compression per file extension: already-compressed formats (textures, sounds) are stored, script and
+  text files get their own deflate level, see `CompressionPolicy`,
+- streams large members in fixed-size chunks, so memory use doesn't grow with asset size,
+- reuses the already-compressed bytes of unchanged entries from a previous release zip,
+- leaves out files excluded by the mod's walk rules (see `methods.walk_methods`),
+- writes a deterministic archive, so the output is byte-identical regardless of worker count or reuse.
+
+Written against the zip specification (APPNOTE.TXT) directly, since `zipfile` has no public API for
+writing pre-compressed member data.
+"""
+
+import contextlib
+import hashlib
+import os
+import shutil
+import struct
+import tempfile
+import zipfile
+import zlib
+from collections import deque
+from collections.abc import Iterable
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import BinaryIO
+
+from methods.walk_methods import WalkRules, walk_folder
+
+# zip format epoch, used for every entry so builds are reproducible (file mtimes change on every git checkout)
+ZIP_EPOCH_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+default_compression_level = 6  # same as `zip` and `zipfile` defaults
+# script and text files are small and shrink a lot, so the extra deflate effort pays off in download size
+default_text_compression_level = 9
+# formats that are already compressed and barely shrink, deflating them only costs time
+default_stored_extensions = frozenset({".dds", ".png", ".jpg", ".jpeg", ".ogg", ".wav", ".mp3", ".bk2", ".zip"})
+default_text_extensions = frozenset(
+    {".txt", ".yml", ".gui", ".gfx", ".asset", ".mod", ".csv", ".shader", ".fxh", ".lua", ".md", ".json", ".settings"}
+)
+# members at least this big are read, compressed and written in chunks of `archive_chunk_size`
+stream_member_min_bytes = 8 << 20
+archive_chunk_size = 1 << 20
+
+# archive comment identifying how entries were compressed, reuse is only safe if this matches exactly
+archive_fingerprint_format = "stellaris_mod_deploy_action zlib={zlib_version} policy={policy}"
+
+# zip format constants
+_ZIP64_LIMIT = 0xFFFFFFFF
+_ZIP64_COUNT_LIMIT = 0xFFFF
+_UTF8_NAME_FLAG = 0x800
+_VERSION_DEFAULT = 20
+_VERSION_ZIP64 = 45
+_VERSION_MADE_BY = (3 << 8) | _VERSION_ZIP64  # 3 = unix, so external attributes carry unix permissions
+_FILE_EXTERNAL_ATTR = (0o100644 & 0xFFFF) << 16
+_DIR_EXTERNAL_ATTR = ((0o40755 & 0xFFFF) << 16) | 0x10  # 0x10 is the MS-DOS directory bit
+_LOCAL_HEADER_STRUCT = struct.Struct("<4s5H3L2H")
+_CENTRAL_HEADER_STRUCT = struct.Struct("<4s6H3L5H2L")
+_END_RECORD_STRUCT = struct.Struct("<4s4H2LH")
+_ZIP64_END_RECORD_STRUCT = struct.Struct("<4sQ2H2L4Q")
+_ZIP64_END_LOCATOR_STRUCT = struct.Struct("<4sLQL")
+
+
+@dataclass(slots=True)
+class ArchiveEntry:
+    """One member of a release archive, with its compressed payload once processed"""
+
+    arcname: str
+    source_path: Path | None  # None for directories
+    crc: int = 0
+    file_size: int = 0
+    compress_size: int = 0
+    compress_type: int = zipfile.ZIP_STORED
+    data: bytes = b""
+    data_file: BinaryIO | None = None
+    """Compressed payload of a large member, spooled to a temporary file instead of `data`"""
+    stream_source: bool = False
+    """Large stored member, copied from the source file by the writer"""
+    reused: bool = False
+
+    @property
+    def is_dir(self) -> bool:
+        return self.source_path is None
+
+
+@dataclass(slots=True)
+class ArchiveBuildResult:
+    """Summary of a `build_release_zip` run"""
+
+    zip_file_path: Path
+    entry_count: int = 0
+    compressed_count: int = 0
+    stored_count: int = 0
+    reused_count: int = 0
+    bytes_in: int = 0
+    bytes_out: int = 0
+
+
+@dataclass(slots=True, frozen=True)
+class CompressionPolicy:
+    """Deflate level per file extension, 0 stores the file uncompressed"""
+
+    default_level: int = default_compression_level
+    extension_levels: dict[str, int] = field(default_factory=dict)
+    """Lowercase extensions with the dot, like `.dds`"""
+
+    @classmethod
+    def for_mod_files(
+        cls,
+        compression_level: int = default_compression_level,
+        text_compression_level: int = default_text_compression_level,
+    ) -> "CompressionPolicy":
+        """Stores already-compressed assets, deflates script/text files and everything else with the given levels"""
+        extension_levels = dict.fromkeys(default_stored_extensions, 0)
+        extension_levels.update(dict.fromkeys(default_text_extensions, text_compression_level))
+        return cls(default_level=compression_level, extension_levels=extension_levels)
+
+    def get_level(self, arcname: str) -> int:
+        return self.extension_levels.get(Path(arcname).suffix.lower(), self.default_level)
+
+    def describe(self) -> str:
+        """Short stable description for the archive fingerprint"""
+        policy_string = ",".join(f"{extension}={level}" for extension, level in sorted(self.extension_levels.items()))
+        policy_hash = hashlib.sha256(policy_string.encode("utf-8")).hexdigest()[:16]
+        return f"{self.default_level}/{policy_hash}"
+
+
+def collect_archive_entries(
+    source_paths: Iterable[Path], root_path: Path, rules: WalkRules | None = None
+) -> list[ArchiveEntry]:
+    """
+    Walk files and folders and create sorted archive entries with names relative to `root_path`
+
+    Folders are walked with `rules` (relative to each folder), files given directly are always added. Folders get their
+    own directory entry (like `zip -r` does), except `root_path` itself. Sorting makes entry order independent of
+    filesystem iteration order.
+    """
+    root_path = Path(root_path).absolute()
+    entries: dict[str, ArchiveEntry] = {}
+    for source_path in source_paths:
+        source_path = Path(source_path).absolute()
+        if not source_path.is_dir():
+            arcname = source_path.relative_to(root_path).as_posix()
+            entries[arcname] = ArchiveEntry(arcname, source_path)
+            continue
+        arcname_prefix = ""
+        if source_path != root_path:
+            arcname_prefix = source_path.relative_to(root_path).as_posix() + "/"
+            entries[arcname_prefix] = ArchiveEntry(arcname_prefix, None)
+        for relative_path, dir_entry in walk_folder(source_path, rules, include_folders=True):
+            arcname = arcname_prefix + relative_path
+            if dir_entry.is_dir(follow_symlinks=False):
+                entries[arcname + "/"] = ArchiveEntry(arcname + "/", None)
+            else:
+                entries[arcname] = ArchiveEntry(arcname, Path(dir_entry.path))
+    return [entries[arcname] for arcname in sorted(entries)]
+
+
+def compress_bytes(data: bytes, compression_level: int = default_compression_level) -> bytes:
+    """Raw deflate (no zlib header), as stored inside zip members"""
+    compressor = zlib.compressobj(compression_level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+def get_archive_fingerprint(compression_policy: CompressionPolicy) -> str:
+    """Archive comment describing the compressor, previous archives are only reused if their comment matches"""
+    return archive_fingerprint_format.format(zlib_version=zlib.ZLIB_RUNTIME_VERSION, policy=compression_policy.describe())
+
+
+class PreviousArchive:
+    """
+    Read-only view of a previous release zip, used to look up reusable compressed entries by content hash
+
+    Only archives written with the same `compression_policy` are used, so the level of each previous entry is known
+    from its name. Entries are only reused at the same level, the same content compressed at another level (like a
+    `.cfg` copy of a `.txt` file) would give different bytes than a fresh build.
+    """
+
+    def __init__(self, zip_file_path: Path, compression_policy: CompressionPolicy) -> None:
+        self.zip_file_path = Path(zip_file_path)
+        self.usable = False
+        """Whether the previous archive was written with the same compressor settings"""
+        self._candidates: dict[tuple[int, int, int], list[zipfile.ZipInfo]] = {}
+        expected_fingerprint = get_archive_fingerprint(compression_policy)
+
+        if not self.zip_file_path.is_file():
+            return
+        try:
+            with zipfile.ZipFile(self.zip_file_path) as previous_zip:
+                if previous_zip.comment.decode("utf-8", errors="replace") != expected_fingerprint:
+                    return
+                for info in previous_zip.infolist():
+                    if info.is_dir() or info.compress_type != zipfile.ZIP_DEFLATED:
+                        continue
+                    candidate_key = (info.file_size, info.CRC, compression_policy.get_level(info.filename))
+                    self._candidates.setdefault(candidate_key, []).append(info)
+        except zipfile.BadZipFile:
+            return
+        self.usable = True
+
+    def find_compressed(self, data: bytes, crc: int, compression_level: int) -> bytes | None:
+        """
+        Return the raw compressed bytes of a previous entry with the same content and level, if there is one
+
+        Size, CRC and level narrow down candidates, a SHA-256 of the inflated candidate confirms the match.
+        Inflating is several times cheaper than deflating, so this still saves most of the work.
+        """
+        if not self.usable:
+            return None
+        candidates = self._candidates.get((len(data), crc, compression_level))
+        if not candidates:
+            return None
+        content_hash = hashlib.sha256(data).digest()
+        # separate handle per call so lookups are safe to run from worker threads
+        with Path.open(self.zip_file_path, "rb") as previous_file:
+            for info in candidates:
+                previous_file.seek(info.header_offset)
+                local_header = previous_file.read(_LOCAL_HEADER_STRUCT.size)
+                name_length, extra_length = _LOCAL_HEADER_STRUCT.unpack(local_header)[-2:]
+                previous_file.seek(name_length + extra_length, os.SEEK_CUR)
+                compressed = previous_file.read(info.compress_size)
+                try:
+                    inflated = zlib.decompress(compressed, -zlib.MAX_WBITS)
+                except zlib.error:
+                    continue
+                if hashlib.sha256(inflated).digest() == content_hash:
+                    return compressed
+        return None
+
+
+def _process_entry(
+    entry: ArchiveEntry,
+    compression_policy: CompressionPolicy,
+    previous_archive: PreviousArchive | None,
+) -> ArchiveEntry:
+    """Worker: read one file and fill in its payload, stored or compressed, reusing previous bytes when possible"""
+    if entry.is_dir:
+        return entry
+    compression_level = compression_policy.get_level(entry.arcname)
+    source_path: Path = entry.source_path  # ty:ignore[invalid-assignment] checked by is_dir
+    if source_path.stat().st_size >= stream_member_min_bytes:
+        return _process_large_entry(entry, source_path, compression_level)
+
+    data = source_path.read_bytes()
+    entry.file_size = len(data)
+    entry.crc = zlib.crc32(data)
+    if compression_level == 0:
+        entry.compress_type = zipfile.ZIP_STORED
+        entry.data = data
+        entry.compress_size = len(data)
+        return entry
+    entry.compress_type = zipfile.ZIP_DEFLATED
+
+    compressed = None
+    if previous_archive is not None:
+        compressed = previous_archive.find_compressed(data, entry.crc, compression_level)
+    if compressed is not None:
+        entry.reused = True
+    else:
+        compressed = compress_bytes(data, compression_level)
+    entry.data = compressed
+    entry.compress_size = len(compressed)
+    return entry
+
+
+def _process_large_entry(entry: ArchiveEntry, source_path: Path, compression_level: int) -> ArchiveEntry:
+    """
+    Worker: CRC and compress a large file in chunks, with bounded memory
+
+    Stored members are only checksummed here and copied from the source by the writer, deflated members are spooled
+    to a temporary file. Not looked up in the previous archive, that would need the whole file in memory.
+    """
+    crc = 0
+    file_size = 0
+    compressor = None
+    if compression_level != 0:
+        compressor = zlib.compressobj(compression_level, zlib.DEFLATED, -zlib.MAX_WBITS)
+        entry.data_file = tempfile.TemporaryFile()  # noqa: SIM115 closed by the writer once copied into the archive
+    with Path.open(source_path, "rb") as source_file_object:
+        while chunk := source_file_object.read(archive_chunk_size):
+            crc = zlib.crc32(chunk, crc)
+            file_size += len(chunk)
+            if compressor is not None:
+                entry.data_file.write(compressor.compress(chunk))  # ty:ignore[possibly-missing-attribute] set above
+    entry.crc = crc
+    entry.file_size = file_size
+    if compressor is None:
+        entry.compress_type = zipfile.ZIP_STORED
+        entry.compress_size = file_size
+        entry.stream_source = True
+    else:
+        entry.compress_type = zipfile.ZIP_DEFLATED
+        entry.data_file.write(compressor.flush())  # ty:ignore[possibly-missing-attribute] set above
+        entry.compress_size = entry.data_file.tell()  # ty:ignore[possibly-missing-attribute] set above
+        entry.data_file.seek(0)  # ty:ignore[possibly-missing-attribute] set above
+    return entry
+
+
+def _dos_date_time(date_time: tuple[int, int, int, int, int, int]) -> tuple[int, int]:
+    year, month, day, hour, minute, second = date_time
+    dos_date = (year - 1980) << 9 | month << 5 | day
+    dos_time = hour << 11 | minute << 5 | second // 2
+    return dos_date, dos_time
+
+
+class _ZipWriter:
+    """Minimal sequential zip writer for entries that are already compressed"""
+
+    def __init__(self, file_object, date_time: tuple[int, int, int, int, int, int]) -> None:  # noqa: ANN001
+        self.file_object = file_object
+        self.dos_date, self.dos_time = _dos_date_time(date_time)
+        self.offset = 0
+        self.central_directory: list[bytes] = []
+
+    def write_entry(self, entry: ArchiveEntry) -> None:
+        name = entry.arcname.encode("utf-8")
+        header_offset = self.offset
+        needs_zip64 = entry.file_size >= _ZIP64_LIMIT or entry.compress_size >= _ZIP64_LIMIT
+        version = _VERSION_ZIP64 if needs_zip64 else _VERSION_DEFAULT
+
+        if needs_zip64:
+            local_extra = struct.pack("<2H2Q", 1, 16, entry.file_size, entry.compress_size)
+            local_sizes = (_ZIP64_LIMIT, _ZIP64_LIMIT)
+        else:
+            local_extra = b""
+            local_sizes = (entry.compress_size, entry.file_size)
+        local_header = _LOCAL_HEADER_STRUCT.pack(
+            b"PK\x03\x04",
+            version,
+            _UTF8_NAME_FLAG,
+            entry.compress_type,
+            self.dos_time,
+            self.dos_date,
+            entry.crc,
+            *local_sizes,
+            len(name),
+            len(local_extra),
+        )
+        self._write(local_header + name + local_extra)
+        self._write_payload(entry)
+
+        # central directory record, zip64 fields only for the values that overflow
+        zip64_values: list[int] = []
+        file_size, compress_size, offset_field = entry.file_size, entry.compress_size, header_offset
+        if entry.file_size >= _ZIP64_LIMIT:
+            zip64_values.append(entry.file_size)
+            file_size = _ZIP64_LIMIT
+        if entry.compress_size >= _ZIP64_LIMIT:
+            zip64_values.append(entry.compress_size)
+            compress_size = _ZIP64_LIMIT
+        if header_offset >= _ZIP64_LIMIT:
+            zip64_values.append(header_offset)
+            offset_field = _ZIP64_LIMIT
+        central_extra = b""
+        if zip64_values:
+            version = _VERSION_ZIP64
+            central_extra = struct.pack(f"<2H{len(zip64_values)}Q", 1, 8 * len(zip64_values), *zip64_values)
+        self.central_directory.append(
+            _CENTRAL_HEADER_STRUCT.pack(
+                b"PK\x01\x02",
+                _VERSION_MADE_BY,
+                version,
+                _UTF8_NAME_FLAG,
+                entry.compress_type,
+                self.dos_time,
+                self.dos_date,
+                entry.crc,
+                compress_size,
+                file_size,
+                len(name),
+                len(central_extra),
+                0,  # file comment length
+                0,  # disk number
+                0,  # internal attributes
+                _DIR_EXTERNAL_ATTR if entry.is_dir else _FILE_EXTERNAL_ATTR,
+                offset_field,
+            )
+            + name
+            + central_extra
+        )
+        entry.data = b""  # release payload memory as soon as it is on disk
+
+    def close(self, comment: bytes) -> None:
+        central_directory_offset = self.offset
+        for record in self.central_directory:
+            self._write(record)
+        central_directory_size = self.offset - central_directory_offset
+        entry_count = len(self.central_directory)
+
+        if (
+            entry_count >= _ZIP64_COUNT_LIMIT
+            or central_directory_offset >= _ZIP64_LIMIT
+            or central_directory_size >= _ZIP64_LIMIT
+        ):
+            zip64_end_offset = self.offset
+            self._write(
+                _ZIP64_END_RECORD_STRUCT.pack(
+                    b"PK\x06\x06",
+                    _ZIP64_END_RECORD_STRUCT.size - 12,
+                    _VERSION_MADE_BY,
+                    _VERSION_ZIP64,
+                    0,
+                    0,
+                    entry_count,
+                    entry_count,
+                    central_directory_size,
+                    central_directory_offset,
+                )
+            )
+            self._write(_ZIP64_END_LOCATOR_STRUCT.pack(b"PK\x06\x07", 0, zip64_end_offset, 1))
+            entry_count = min(entry_count, _ZIP64_COUNT_LIMIT)
+            central_directory_size = min(central_directory_size, _ZIP64_LIMIT)
+            central_directory_offset = min(central_directory_offset, _ZIP64_LIMIT)
+
+        self._write(
+            _END_RECORD_STRUCT.pack(
+                b"PK\x05\x06",
+                0,
+                0,
+                entry_count,
+                entry_count,
+                central_directory_size,
+                central_directory_offset,
+                len(comment),
+            )
+            + comment
+        )
+
+    def _write_payload(self, entry: ArchiveEntry) -> None:
+        """Write the member data, copying large members in chunks"""
+        if entry.data_file is not None:
+            with entry.data_file:
+                while chunk := entry.data_file.read(archive_chunk_size):
+                    self._write(chunk)
+            entry.data_file = None
+        elif entry.stream_source:
+            written_size = 0
+            with Path.open(entry.source_path, "rb") as source_file_object:  # ty:ignore[invalid-argument-type] not a dir
+                while chunk := source_file_object.read(archive_chunk_size):
+                    self._write(chunk)
+                    written_size += len(chunk)
+            if written_size != entry.file_size:
+                msg = f"{entry.source_path} changed size while it was being archived"
+                raise ValueError(msg)
+        else:
+            self._write(entry.data)
+
+    def _write(self, data: bytes) -> None:
+        self.file_object.write(data)
+        self.offset += len(data)
+
+
+def build_release_zip(  # noqa: PLR0913
+    zip_file_path: Path | str,
+    source_paths: Iterable[Path | str],
+    root_path: Path | str,
+    *,
+    previous_zip_file_path: Path | str | None = None,
+    compression_level: int = default_compression_level,
+    compression_policy: CompressionPolicy | None = None,
+    rules: WalkRules | None = None,
+    max_workers: int | None = None,
+    date_time: tuple[int, int, int, int, int, int] = ZIP_EPOCH_DATE_TIME,
+) -> ArchiveBuildResult:
+    """
+    Build a deterministic zip of mod files, compressing on a thread pool
+
+    Output is byte-identical for the same inputs regardless of `max_workers` or whether a previous archive was reused:
+    entries are sorted, timestamps and permissions are fixed, and reused bytes are only taken from a previous archive
+    written with the same compressor settings (recorded in the archive comment). Files of at least
+    `stream_member_min_bytes` are processed in chunks, so memory use stays bounded for large asset packs.
+
+    Parameters
+    ----------
+    zip_file_path : Path | str
+        Zip file to create, overwritten if it exists
+    source_paths : Iterable[Path | str]
+        Files and folders to add, folders are added recursively
+    root_path : Path | str
+        Archive names are made relative to this folder
+    previous_zip_file_path : Path | str | None, optional
+        Previous release zip to reuse compressed entries from, ignored if missing or made with other settings.
+        Can be `zip_file_path` itself, it's then read from a temporary copy
+    compression_level : int, optional
+        Deflate level for files without a level in the default policy, by default 6
+    compression_policy : CompressionPolicy | None, optional
+        Level per extension, by default `CompressionPolicy.for_mod_files(compression_level)`, which stores
+        textures and sounds and deflates script/text files with level 9
+    rules : WalkRules | None, optional
+        Include and exclude rules for the files in folders, by default only junk like `.git` is left out
+    max_workers : int | None, optional
+        Thread pool size, by default picked by `ThreadPoolExecutor`
+    date_time : tuple, optional
+        Timestamp written for every entry, by default the zip epoch (1980-01-01)
+
+    Returns
+    -------
+    result : ArchiveBuildResult
+        Entry counts and bytes in/out, including how many entries were stored and reused
+
+    """
+    zip_file_path = Path(zip_file_path)
+    if compression_policy is None:
+        compression_policy = CompressionPolicy.for_mod_files(compression_level)
+    fingerprint = get_archive_fingerprint(compression_policy)
+    entries = collect_archive_entries([Path(source_path) for source_path in source_paths], Path(root_path), rules)
+
+    previous_archive = None
+    with contextlib.ExitStack() as exit_stack:
+        if previous_zip_file_path is not None:
+            previous_zip_file_path = Path(previous_zip_file_path)
+            # the output is truncated before the previous entries are read, so rebuilding in place reads from a copy
+            if zip_file_path.is_file() and previous_zip_file_path.is_file() and zip_file_path.samefile(previous_zip_file_path):
+                copy_folder_path = Path(exit_stack.enter_context(tempfile.TemporaryDirectory()))
+                previous_zip_file_path = Path(shutil.copyfile(previous_zip_file_path, copy_folder_path / zip_file_path.name))
+            previous_archive = PreviousArchive(previous_zip_file_path, compression_policy)
+
+        result = ArchiveBuildResult(zip_file_path=zip_file_path, entry_count=len(entries))
+        # same default as `ThreadPoolExecutor`, resolved here since the window below is sized from it
+        if max_workers is None:
+            max_workers = min(32, (os.process_cpu_count() or 1) + 4)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor, Path.open(zip_file_path, "wb") as zip_file_object:
+            writer = _ZipWriter(zip_file_object, date_time)
+            # bounded window of in-flight entries, so compressed payloads don't pile up in memory ahead of the writer
+            window_size = 4 * max_workers
+            pending: deque[Future[ArchiveEntry]] = deque()
+            entry_iterator = iter(entries)
+
+            def submit_next() -> None:
+                entry = next(entry_iterator, None)
+                if entry is not None:
+                    pending.append(executor.submit(_process_entry, entry, compression_policy, previous_archive))
+
+            for _ in range(window_size):
+                submit_next()
+            while pending:
+                entry = pending.popleft().result()
+                submit_next()
+                if not entry.is_dir:
+                    result.bytes_in += entry.file_size
+                    if entry.compress_type == zipfile.ZIP_STORED:
+                        result.stored_count += 1
+                    elif entry.reused:
+                        result.reused_count += 1
+                    else:
+                        result.compressed_count += 1
+                writer.write_entry(entry)
+            writer.close(fingerprint.encode("utf-8"))
+            result.bytes_out = writer.offset
+
+    return result
@@ -0,0 +1,209 @@
+"""
+Functions for running `prepare_release.py` on many mod repositories at once
+
+Mods are prepared on a process pool, each worker can prepare any number of mods one after another by swapping the
+default `ModConfig` used by `prepare_release.py`. The shared modules are imported once in a fork server.
+"""
+
+import contextlib
+import multiprocessing
+import os
+import runpy
+import sys
+import time
+import traceback
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+# env files written by `prepare_release.py`, one set per mod in the batch output folder
+batch_github_env_file_name = "github_env.txt"
+batch_github_output_file_name = "github_output.txt"
+# everything the script prints for one mod
+batch_log_file_name = "prepare_release.log"
+
+# modules shared by all mods, imported once by the fork server instead of once per worker
+batch_preload_modules = ["constants_and_overrides", "methods.input_methods", "methods.loc_methods"]
+
+
+@dataclass(slots=True)
+class ModReleaseResult:
+    """Outcome of preparing the release of one mod in a batch"""
+
+    mod_folder_name: str
+    succeeded: bool = False
+    new_version: str | None = None
+    release_tag: str | None = None
+    release_title: str | None = None
+    zip_file_name: str | None = None
+    release_notes_file: str | None = None
+    log_file: str | None = None
+    outputs: dict[str, str] = field(default_factory=dict)
+    """Step outputs the workflow would get, like `loc_folder_exists`"""
+    timings: dict[str, float] = field(default_factory=dict)
+    """Seconds spent on each part, `config` (setting up `ModConfig`), `pipeline`, and `total` in the worker"""
+    error: str | None = None
+
+
+def read_key_value_file(file_path: Path) -> dict[str, str]:
+    """Read a github env/output style file of `key=value` lines, missing files give an empty dict"""
+    if not file_path.exists():
+        return {}
+    key_values = {}
+    for line in file_path.read_text(encoding="utf-8").splitlines():
+        key, separator, value = line.partition("=")
+        if separator:
+            key_values[key] = value
+    return key_values
+
+
+def prepare_mod_release(  # noqa: PLR0913, PLR0917
+    mod_folder_name: str,
+    version_type: str,
+    stellaris_version: str,
+    use_changelog: bool,  # noqa: FBT001
+    repo_github_path: str,
+    tool_folder_path: Path,
+    output_folder_path: Path,
+) -> ModReleaseResult:
+    """
+    Run `prepare_release.py` for one mod, in the current process
+
+    Meant to run in a worker process: the working directory, environment and `sys.argv` are changed, and the default
+    config of `constants_and_overrides` is swapped for this mod. Output goes to a log file in the mod's output folder,
+    errors are caught and returned in the result.
+    """
+    start_time = time.perf_counter()
+    result = ModReleaseResult(mod_folder_name=mod_folder_name)
+    mod_output_folder_path = (output_folder_path / mod_folder_name).resolve()
+    mod_output_folder_path.mkdir(parents=True, exist_ok=True)
+    github_env_file_path = mod_output_folder_path / batch_github_env_file_name
+    github_output_file_path = mod_output_folder_path / batch_github_output_file_name
+    # start from empty files, so results from an earlier batch can't leak in
+    github_env_file_path.write_text("", encoding="utf-8")
+    github_output_file_path.write_text("", encoding="utf-8")
+
+    os.chdir(tool_folder_path)
+    if str(tool_folder_path) not in sys.path:
+        sys.path.insert(0, str(tool_folder_path))
+    os.environ["modFolderName"] = mod_folder_name  # noqa: SIM112 names are set by the workflow
+    os.environ["generatedFilesFolder"] = str(mod_output_folder_path)  # noqa: SIM112
+    os.environ["GITHUB_ENV"] = str(github_env_file_path)
+    os.environ["GITHUB_OUTPUT"] = str(github_output_file_path)
+    sys.argv = ["prepare_release.py", version_type, stellaris_version, str(use_changelog), mod_folder_name, repo_github_path]
+
+    log_file_path = mod_output_folder_path / batch_log_file_name
+    result.log_file = str(log_file_path)
+    with Path.open(log_file_path, "w", encoding="utf-8") as log_file_object, contextlib.redirect_stdout(log_file_object):
+        try:
+            import constants_and_overrides as cao  # noqa: PLC0415 tool folder is only on the path from here
+
+            config = cao.ModConfig(mod_folder_name, tool_folder_path=tool_folder_path)
+            cao.set_default_config(config)
+            config_time = time.perf_counter()
+            result.timings["config"] = config_time - start_time
+            runpy.run_path(str(tool_folder_path / "prepare_release.py"), run_name="__main__")
+            result.timings["pipeline"] = time.perf_counter() - config_time
+            result.succeeded = True
+        # one broken mod shouldn't stop the batch, errors are reported in the summary (argparse errors are SystemExit)
+        except (Exception, SystemExit) as err:  # noqa: BLE001
+            result.error = "".join(traceback.format_exception_only(err)).strip()
+            traceback.print_exc(file=log_file_object)
+
+    github_env = read_key_value_file(github_env_file_path)
+    result.outputs = read_key_value_file(github_output_file_path)
+    result.new_version = github_env.get("MOD_VERSION")
+    result.release_tag = github_env.get("MOD_RELEASE_TAG")
+    result.release_title = github_env.get("MOD_RELEASE_TITLE")
+    result.zip_file_name = github_env.get("MOD_RELEASE_ZIPFILE_NAME")
+    result.release_notes_file = github_env.get("MOD_RELEASENOTES_FILE")
+    result.timings["total"] = time.perf_counter() - start_time
+    return result
+
+
+def get_batch_mp_context() -> multiprocessing.context.BaseContext:
+    """Fork server with the shared modules preloaded where available (linux), otherwise the platform default"""
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context()
+    mp_context = multiprocessing.get_context("forkserver")
+    mp_context.set_forkserver_preload(batch_preload_modules)
+    return mp_context
+
+
+def prepare_mod_releases(  # noqa: PLR0913, PLR0917
+    mod_folder_names: Iterable[str],
+    version_type: str,
+    stellaris_version: str,
+    use_changelog: bool,  # noqa: FBT001
+    repo_github_owner: str,
+    tool_folder_path: Path,
+    output_folder_path: Path,
+    *,
+    max_workers: int | None = None,
+) -> list[ModReleaseResult]:
+    """
+    Prepare releases for many mods on a process pool
+
+    Parameters
+    ----------
+    mod_folder_names : Iterable[str]
+        Mod folders (and repository names), each next to `tool_folder_path`
+    version_type : str
+        Version type to bump for every mod
+    stellaris_version : str
+        Stellaris version every mod will support
+    use_changelog : bool
+        Whether the mods use changelog files
+    repo_github_owner : str
+        Github user or organization owning the mod repositories, for release links
+    tool_folder_path : Path
+        Folder with `prepare_release.py` and the templates
+    output_folder_path : Path
+        Generated files go in one subfolder per mod
+    max_workers : int | None, optional
+        Process pool size, by default picked by `ProcessPoolExecutor`
+
+    Returns
+    -------
+    results : list[ModReleaseResult]
+        One result per mod, in input order, with timings measured in the worker plus `wall` from submitting to done
+
+    """
+    tool_folder_path = Path(tool_folder_path).resolve()
+    output_folder_path = Path(output_folder_path).resolve()
+    mod_folder_names = list(mod_folder_names)
+    if not mod_folder_names:
+        return []
+
+    submit_times: dict[str, float] = {}
+    done_times: dict[str, float] = {}
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=get_batch_mp_context()) as executor:
+        futures = []
+        for mod_folder_name in mod_folder_names:
+            submit_times[mod_folder_name] = time.perf_counter()
+            future = executor.submit(
+                prepare_mod_release,
+                mod_folder_name,
+                version_type,
+                stellaris_version,
+                use_changelog,
+                f"{repo_github_owner}/{mod_folder_name}",
+                tool_folder_path,
+                output_folder_path,
+            )
+            future.add_done_callback(lambda _, name=mod_folder_name: done_times.__setitem__(name, time.perf_counter()))
+            futures.append(future)
+
+        results = []
+        for mod_folder_name, future in zip(mod_folder_names, futures, strict=True):
+            try:
+                result = future.result()
+            except Exception as err:  # noqa: BLE001 a crashed worker is reported like any other failure
+                result = ModReleaseResult(mod_folder_name=mod_folder_name, error=f"Worker failed: {err!r}")
+            results.append(result)
+
+    for result in results:
+        # includes waiting for a free worker and process startup
+        result.timings["wall"] = done_times[result.mod_folder_name] - submit_times[result.mod_folder_name]
+    return results
@@ -0,0 +1,262 @@
+"""
+Streaming conversion of (changelog style) markdown to steam bbcode
+
+Works line by line with a small amount of state (open lists and an open code block), so memory use does not depend on
+the input size and every line is only looked at once. Handles:
+- nested lists, by indentation, `-`/`*`/`+` items become `[list]` and numbered items become `[olist]`
+- fenced code blocks, kept verbatim in `[code]`, and staying inside a list when indented under an item
+- links, bold, italic, strikethrough, underline (`__`) and inline code
+- horizontal rules and headers, where `## ...:` headers (changelog entry titles) are dropped
+"""
+
+import io
+import re
+from collections.abc import Iterable, Iterator
+
+tab_width = 4
+
+# block patterns are matched against lines with leading whitespace already removed
+horizontal_rule_pattern = re.compile(r"^([-*_])(?:[\t ]*\1){2,}[\t ]*$")
+# changelog entry titles, the workshop change note template already has the mod name and link
+entry_title_pattern = re.compile(r"^## .*:[\t ]*$")
+header_pattern = re.compile(r"^(#{1,6})[\t ]+(.*?)[\t ]*#*[\t ]*$")
+list_item_pattern = re.compile(r"^(?:[-*+]|(\d{1,9})[.)])[\t ]+(.*)$")
+code_fence_pattern = re.compile(r"^(`{3,}|~{3,})")
+
+# inline tokens, tried in order at each position: escapes, code spans and links first, so their contents are left alone
+inline_token_pattern = re.compile(
+    r"""
+    \\([\\`*_~\[\]()\#+\-.!])              # escaped markdown character
+    | `([^`\n]+)`                          # inline code
+    | \[([^\[\]\n]*)\]\(([^()\s]*)\)        # link
+    | (\*+|__|~~)                          # emphasis delimiter, star runs are split up when pairing
+    """,
+    re.VERBOSE,
+)
+# any character that could start an inline token, lines without one are left as-is
+inline_marker_pattern = re.compile(r"[\\`\[*_~]")
+emphasis_tags = {"**": "b", "__": "u", "~~": "strike", "*": "i"}
+
+
+def get_indent_width(leading_whitespace: str) -> int:
+    """Width of leading whitespace, tabs count as `tab_width` spaces"""
+    return len(leading_whitespace.expandtabs(tab_width))
+
+
+def close_emphasis(parts: list[str], open_delimiters: dict[str, int], delimiter: str) -> None:
+    """Helper for `convert_inline_markdown`, turn an open delimiter and the current position into a tag pair"""
+    # anything opened after this delimiter can no longer be closed, and stays as plain text
+    open_kinds = list(open_delimiters)
+    for kind in open_kinds[open_kinds.index(delimiter) + 1 :]:
+        del open_delimiters[kind]
+    tag = emphasis_tags[delimiter]
+    parts[open_delimiters.pop(delimiter)] = f"[{tag}]"
+    parts.append(f"[/{tag}]")
+
+
+def open_emphasis(parts: list[str], open_delimiters: dict[str, int], delimiter: str) -> None:
+    """Helper for `convert_inline_markdown`, add a delimiter that may get closed later"""
+    if delimiter not in open_delimiters:
+        open_delimiters[delimiter] = len(parts)
+    parts.append(delimiter)
+
+
+def convert_inline_markdown(line: str) -> str:
+    """
+    Convert emphasis, inline code and links within one line
+
+    Emphasis delimiters are paired with a stack that holds at most one open delimiter per kind, so a line is converted
+    in one pass. Delimiters that never get closed (or are crossed by another pair) are left as they were.
+    """
+    if not inline_marker_pattern.search(line):
+        return line
+
+    parts: list[str] = []
+    open_delimiters: dict[str, int] = {}
+    """Open emphasis delimiters, innermost last, with the index of their placeholder in `parts`"""
+    position = 0
+    for token_match in inline_token_pattern.finditer(line):
+        token_start = token_match.start()
+        parts.append(line[position:token_start])
+        position = token_match.end()
+        escaped_character, code_text, link_text, link_url, delimiter = token_match.groups()
+        if escaped_character is not None:
+            parts.append(escaped_character)
+        elif code_text is not None:
+            parts.append(f"[b][noparse]{code_text}[/noparse][/b]")
+        elif link_url is not None:
+            parts.append(f"[url={link_url}]{convert_inline_markdown(link_text)}[/url]")
+        else:
+            # like markdown, a delimiter with whitespace after it can't open and with whitespace before it can't close,
+            # and `__` doesn't work inside words
+            character_before = line[token_start - 1] if token_start else " "
+            character_after = line[position] if position < len(line) else " "
+            can_open = not character_after.isspace()
+            can_close = not character_before.isspace()
+            if delimiter == "__":
+                can_open = can_open and not character_before.isalnum()
+                can_close = can_close and not character_after.isalnum()
+
+            # a run of stars can close an exactly matching delimiter, or a `***` run can close italic and bold
+            # innermost first (like ending `**bold *italic***`), whatever is left over opens new delimiters
+            remaining_length = len(delimiter)
+            while can_close and remaining_length:
+                if delimiter[:remaining_length] in open_delimiters:
+                    close_emphasis(parts, open_delimiters, delimiter[:remaining_length])
+                    remaining_length = 0
+                elif len(delimiter) == 3 and open_delimiters and (innermost := next(reversed(open_delimiters))) in {"*", "**"}:  # noqa: PLR2004
+                    remaining_length -= len(innermost)
+                    close_emphasis(parts, open_delimiters, innermost)
+                else:
+                    break
+            if not remaining_length:
+                pass
+            elif not can_open or remaining_length > 3:  # noqa: PLR2004
+                parts.append(delimiter[:remaining_length])
+            elif remaining_length == 3:  # noqa: PLR2004
+                open_emphasis(parts, open_delimiters, "*")
+                open_emphasis(parts, open_delimiters, "**")
+            else:
+                open_emphasis(parts, open_delimiters, delimiter[:remaining_length])
+    parts.append(line[position:])
+    return "".join(parts)
+
+
+class MarkdownToBBCodeConverter:
+    """
+    Line by line markdown to steam bbcode converter
+
+    Feed lines (without line endings) to `convert_line`, then call `finish` to close anything still open.
+    With `lists_only`, only lists (and the code blocks that can interrupt them) are converted.
+    """
+
+    def __init__(self, *, lists_only: bool = False) -> None:
+        self.lists_only = lists_only
+        self.open_lists: list[tuple[int, str, str]] = []
+        """Open lists, innermost last, as (indent width, leading whitespace, tag)"""
+        self.code_fence: str | None = None
+        """Fence of the open code block, if in one"""
+        self.code_fence_whitespace = ""
+        self.pending_blank_lines = 0
+        """Blank lines not yet written, since they are dropped between items of the same list"""
+
+    def _close_lists(self, min_indent_width: int) -> list[str]:
+        """Close all open lists at or deeper than `min_indent_width`"""
+        closed_lines = []
+        while self.open_lists and self.open_lists[-1][0] >= min_indent_width:
+            _, leading_whitespace, tag = self.open_lists.pop()
+            closed_lines.append(f"{leading_whitespace}[/{tag}]")
+        return closed_lines
+
+    def _flush_blank_lines(self) -> list[str]:
+        blank_lines = [""] * self.pending_blank_lines
+        self.pending_blank_lines = 0
+        return blank_lines
+
+    def _convert_list_item(self, leading_whitespace: str, list_item_match: re.Match) -> list[str]:
+        item_number, item_text = list_item_match.groups()
+        indent_width = get_indent_width(leading_whitespace)
+        tag = "list" if item_number is None else "olist"
+
+        output_lines = []
+        # step out of deeper lists, and out of a list of the other kind at the same depth
+        output_lines.extend(self._close_lists(indent_width + 1))
+        if self.open_lists and self.open_lists[-1][0] == indent_width and self.open_lists[-1][2] != tag:
+            output_lines.extend(self._close_lists(indent_width))
+
+        if not self.open_lists or self.open_lists[-1][0] < indent_width:
+            if self.open_lists:
+                # blank lines inside a list are dropped
+                self.pending_blank_lines = 0
+            else:
+                # a new top level list takes the place of one blank line before it
+                self.pending_blank_lines = max(self.pending_blank_lines - 1, 0)
+                output_lines.extend(self._flush_blank_lines())
+            self.open_lists.append((indent_width, leading_whitespace, tag))
+            output_lines.append(f"{leading_whitespace}[{tag}]")
+        self.pending_blank_lines = 0
+
+        if not self.lists_only:
+            item_text = convert_inline_markdown(item_text)
+        output_lines.append(f"{leading_whitespace}[*] {item_text.rstrip()}")
+        return output_lines
+
+    def _leave_lists_for(self, leading_whitespace: str) -> list[str]:
+        """Close lists the next line is not indented under, then write out any held blank lines"""
+        closed_lines = self._close_lists(get_indent_width(leading_whitespace)) if self.open_lists else []
+        if self.open_lists and self.pending_blank_lines:
+            # indented text after a blank line still belongs to the item
+            self.pending_blank_lines = 0
+        return closed_lines + self._flush_blank_lines()
+
+    def convert_line(self, line: str) -> list[str]:  # noqa: PLR0911
+        """Convert one line, returns the finished output lines (zero or more)"""
+        if self.code_fence is not None:
+            if line.strip().startswith(self.code_fence) and not line.strip().strip(self.code_fence[0]):
+                self.code_fence = None
+                return [f"{self.code_fence_whitespace}[/code]"]
+            return [line]
+
+        stripped_line = line.lstrip(" \t")
+        if not stripped_line.strip():
+            self.pending_blank_lines += 1
+            return []
+        leading_whitespace = line[: len(line) - len(stripped_line)]
+        # only try the block patterns that can match, by the first character
+        first_character = stripped_line[0]
+
+        if first_character in "`~" and (code_fence_match := code_fence_pattern.match(stripped_line)):
+            self.code_fence = code_fence_match[1]
+            self.code_fence_whitespace = leading_whitespace
+            return [*self._leave_lists_for(leading_whitespace), f"{leading_whitespace}[code]"]
+
+        if not self.lists_only:
+            if first_character in "-*_" and horizontal_rule_pattern.match(stripped_line):
+                return [*self._leave_lists_for(""), "[hr][/hr]"]
+            if first_character == "#" and entry_title_pattern.match(stripped_line):
+                return self._leave_lists_for("")
+
+        if (first_character in "-*+" or first_character.isdigit()) and (
+            list_item_match := list_item_pattern.match(stripped_line)
+        ):
+            return self._convert_list_item(leading_whitespace, list_item_match)
+
+        output_lines = self._leave_lists_for(leading_whitespace)
+        if self.lists_only:
+            output_lines.append(line)
+        elif first_character == "#" and (header_match := header_pattern.match(stripped_line)):
+            header_level = min(len(header_match[1]), 3)
+            output_lines.append(f"[h{header_level}]{convert_inline_markdown(header_match[2])}[/h{header_level}]")
+        else:
+            output_lines.append(convert_inline_markdown(line))
+        return output_lines
+
+    def finish(self) -> list[str]:
+        """Close any open code block and lists, returns the last output lines"""
+        output_lines = []
+        if self.code_fence is not None:
+            self.code_fence = None
+            output_lines.append(f"{self.code_fence_whitespace}[/code]")
+        output_lines.extend(self._close_lists(0))
+        output_lines.extend(self._flush_blank_lines())
+        return output_lines
+
+
+def convert_markdown_lines_to_bbcode(lines: Iterable[str], *, lists_only: bool = False) -> Iterator[str]:
+    """
+    Convert markdown lines to steam bbcode lines, lazily
+
+    Line endings are stripped from the input lines, and output lines have none.
+    """
+    converter = MarkdownToBBCodeConverter(lists_only=lists_only)
+    for line in lines:
+        yield from converter.convert_line(line.rstrip("\r\n"))
+    yield from converter.finish()
+
+
+def convert_markdown_to_bbcode(markdown_string: str, *, lists_only: bool = False) -> str:
+    """Convert a full markdown string to steam bbcode, keeping a trailing newline if there was one"""
+    bbcode_string = "\n".join(convert_markdown_lines_to_bbcode(io.StringIO(markdown_string), lists_only=lists_only))
+    if markdown_string.endswith("\n"):
+        bbcode_string += "\n"
+    return bbcode_string
@@ -0,0 +1,144 @@
+"""
+Persistent cache of parsed files, shared between workflow runs and jobs
+
+Parsed results (the descriptor, `OVERRIDE.txt`, the changelog entry index) are stored as small JSON files in one cache
+folder, keyed by a SHA-256 of the file content, the kind of result and the tool version. Changing a file or updating
+the tool gives a new key, so stale results are never read, and an entry whose stored key doesn't match its name is
+deleted. The folder is plain files, made to be restored and saved with `actions/cache`.
+
+Reading an entry touches its modification time, and once per run (`evict`, called by the scripts at the end) the least
+recently used entries are removed until the folder fits in its size cap. A cache is safe to share between threads.
+While a file overlay is set (see `file_methods.set_file_overlay`), new entries go to the overlay and the folder is left
+alone: nothing is touched, removed or evicted.
+"""
+
+import functools
+import hashlib
+import json
+import logging
+import os
+import threading
+import tomllib
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from methods.file_methods import get_file_overlay, open_text_file, write_file_if_changed
+
+logger = logging.getLogger(__name__)
+
+# bump when the entry layout changes, so old entries are never read
+parse_cache_format_version = 1
+default_parse_cache_max_bytes = 16_000_000
+# sources of the parsers, a change in any of them invalidates the cache even without a version bump
+tool_source_glob = "methods/*.py"
+
+
+@functools.cache
+def get_tool_version(tool_folder_path: Path) -> str:
+    """Version from `pyproject.toml` plus a short hash of the parser sources, like `0.1.0+3f2a9c1b04de`"""
+    tool_folder_path = Path(tool_folder_path)
+    try:
+        with Path.open(tool_folder_path / "pyproject.toml", "rb") as pyproject_file_object:
+            version = tomllib.load(pyproject_file_object)["project"]["version"]
+    except (OSError, KeyError, tomllib.TOMLDecodeError):
+        version = "unknown"
+    source_hash = hashlib.sha256()
+    for source_file_path in sorted(tool_folder_path.glob(tool_source_glob)):
+        source_hash.update(source_file_path.name.encode("utf-8"))
+        source_hash.update(source_file_path.read_bytes())
+    return f"{version}+{source_hash.hexdigest()[:12]}"
+
+
+class ParseCache:
+    """Parsed results in `folder_path`, keyed by content hash, kind and tool version, capped at `max_bytes`"""
+
+    def __init__(self, folder_path: Path, tool_version: str, *, max_bytes: int = default_parse_cache_max_bytes) -> None:
+        self.folder_path = Path(folder_path)
+        self.tool_version = tool_version
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._counter_lock = threading.Lock()
+
+    def get_key(self, kind: str, content: bytes) -> str:
+        key_hash = hashlib.sha256(f"{parse_cache_format_version}\0{self.tool_version}\0{kind}\0".encode())
+        key_hash.update(content)
+        return key_hash.hexdigest()
+
+    def get_entry_path(self, kind: str, key: str) -> Path:
+        return self.folder_path / kind / f"{key}.json"
+
+    def get(self, kind: str, content: bytes) -> Any | None:  # noqa: ANN401 any JSON value
+        """Cached result for `content`, None on a miss"""
+        key = self.get_key(kind, content)
+        entry_path = self.get_entry_path(kind, key)
+        try:
+            with open_text_file(entry_path) as entry_file_object:
+                entry = json.load(entry_file_object)
+            if entry["key"] != key:
+                msg = f"Cache entry {entry_path} has key {entry['key']}"
+                raise ValueError(msg)  # noqa: TRY301 handled with the other broken entries below
+        except FileNotFoundError:
+            self._count_lookup(hit=False)
+            return None
+        except (OSError, ValueError, KeyError, TypeError):
+            logger.debug("Removing broken cache entry %s", entry_path)
+            if get_file_overlay() is None:
+                entry_path.unlink(missing_ok=True)
+            self._count_lookup(hit=False)
+            return None
+        # most recently used goes last when evicting
+        if get_file_overlay() is None:
+            os.utime(entry_path)
+        self._count_lookup(hit=True)
+        logger.debug("Parse cache hit for %s %s", kind, key[:12])
+        return entry["value"]
+
+    def put(self, kind: str, content: bytes, value: Any) -> None:  # noqa: ANN401 any JSON value
+        key = self.get_key(kind, content)
+        entry = {"key": key, "kind": kind, "tool_version": self.tool_version, "value": value}
+        write_file_if_changed(self.get_entry_path(kind, key), json.dumps(entry), newline="\n")
+
+    def _count_lookup(self, *, hit: bool) -> None:
+        with self._counter_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get_or_parse[T](
+        self,
+        kind: str,
+        content: bytes,
+        parse: Callable[[bytes], T],
+        *,
+        to_json: Callable[[T], Any] = lambda value: value,
+        from_json: Callable[[Any], T] = lambda value: value,
+    ) -> T:
+        """Cached result for `content`, or `parse(content)` which is then cached"""
+        cached_value = self.get(kind, content)
+        if cached_value is not None:
+            return from_json(cached_value)
+        value = parse(content)
+        self.put(kind, content, to_json(value))
+        return value
+
+    def evict(self) -> None:
+        """Remove the least recently used entries until the cache fits in `max_bytes`, not while writing to a file overlay"""
+        if get_file_overlay() is not None:
+            return
+        entries = []
+        for entry_path in self.folder_path.glob("*/*.json"):
+            try:
+                entry_stat = entry_path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((entry_stat.st_mtime_ns, entry_stat.st_size, entry_path))
+        total_bytes = sum(entry_size for _, entry_size, _ in entries)
+        for _, entry_size, entry_path in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            logger.debug("Evicting cache entry %s", entry_path)
+            entry_path.unlink(missing_ok=True)
+            total_bytes -= entry_size
@@ -0,0 +1,287 @@
+"""
+Offset index of the version entries in a changelog
+
+Entries look like `---`, a `## ... `version`...:` header, the change notes, and a closing `---`. Searching for one
+entry with the DOTALL changelog patterns scans the whole file, and a lazy `.+?` in the header part makes a file without
+a match take time quadratic in its length (and lets a match for an older version start at a newer entry's header).
+Instead the file is indexed once, in one pass over its `---` lines, into the version, header and byte range of every
+entry. Looking up an entry then only searches that entry's bytes.
+
+The index is kept in a sidecar JSON file, checked against a hash of the changelog's content, and updated in
+place when an entry is replaced (like promoting the `WIP` entry), so it never has to be rebuilt for that. With a parse
+cache the entries are also kept by changelog content, so a fresh checkout in a later run or job doesn't index again.
+Files the index can't represent exactly (with carriage return line endings) are searched the old way, over the whole text.
+The changelog is always read through `methods.file_methods`, so a rewrite still in the file overlay is what gets indexed.
+"""
+
+import hashlib
+import json
+import re
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from methods.cache_methods import ParseCache
+from methods.file_methods import (
+    open_text_file,
+    read_file_bytes,
+    read_file_text,
+    write_bytes_if_changed,
+    write_file_if_changed,
+)
+from methods.substitution_methods import compile_pattern
+
+# bump when the index layout changes, so old sidecar files are rebuilt
+changelog_index_format_version = 1
+entry_separator = b"---"
+entry_separator_pattern = re.compile(rb"^---$", re.MULTILINE)
+# the version of an entry is whatever is in the first backticks of its header, like ## Mod `v1.2.3`:
+entry_version_pattern = re.compile(r"`([^`\n]+)`")
+
+
+@dataclass(slots=True)
+class ChangelogEntry:
+    """One version entry of a changelog, by byte offsets in the file"""
+
+    version: str | None
+    """Text in the first backticks of the header, like `v1.2.3` or `WIP`, None if there are no backticks"""
+    header: str
+    start: int
+    """Offset of the opening `---` line"""
+    end: int
+    """Offset just after the closing `---` (before its line ending)"""
+
+
+@dataclass(slots=True)
+class ChangelogIndex:
+    """All entries of a changelog file, in file order, with the file state they were indexed from"""
+
+    file_path: str
+    content_hash: str
+    """SHA-256 of the changelog content the entries were indexed from"""
+    entries: list[ChangelogEntry] = field(default_factory=list)
+
+    def find(self, version: str) -> ChangelogEntry | None:
+        """First entry with `version`, or None"""
+        return next((entry for entry in self.entries if entry.version == version), None)
+
+    def is_current(self, file_path: Path, changelog_bytes: bytes | None = None) -> bool:
+        """Whether the index was made from the file as it is now, `changelog_bytes` if it was already read"""
+        if changelog_bytes is None:
+            changelog_bytes = read_file_bytes(file_path)
+        return self.file_path == str(file_path.resolve()) and self.content_hash == get_content_hash(changelog_bytes)
+
+
+def get_content_hash(changelog_bytes: bytes) -> str:
+    return hashlib.sha256(changelog_bytes).hexdigest()
+
+
+def index_changelog_bytes(changelog_bytes: bytes, offset: int = 0) -> list[ChangelogEntry]:
+    r"""
+    Find all entries in changelog bytes, in one pass over the `---` lines
+
+    A `---` line followed by a `##` header opens an entry, and the next `---` line closes it, same as the lazy
+    `(^---\n)(##\s)...(.*?)(^---$)` changelog patterns. Offsets are shifted by `offset`.
+    """
+    entries = []
+    open_entry_start: int | None = None
+    open_entry_header = ""
+    for separator_match in entry_separator_pattern.finditer(changelog_bytes):
+        separator_start, separator_end = separator_match.span()
+        if open_entry_start is not None:
+            header_match = entry_version_pattern.search(open_entry_header)
+            entries.append(
+                ChangelogEntry(
+                    version=header_match[1] if header_match else None,
+                    header=open_entry_header,
+                    start=open_entry_start + offset,
+                    end=separator_end + offset,
+                )
+            )
+            open_entry_start = None
+            continue
+        header_start = separator_end + 1
+        if (
+            changelog_bytes[header_start : header_start + 2] == b"##"
+            and changelog_bytes[header_start + 2 : header_start + 3].isspace()
+        ):
+            header_end = changelog_bytes.find(b"\n", header_start)
+            open_entry_start = separator_start
+            open_entry_header = changelog_bytes[header_start : header_end if header_end != -1 else None].decode("utf-8")
+    return entries
+
+
+def get_changelog_index(
+    changelog_file_path: Path,
+    index_file_path: Path | None = None,
+    parse_cache: ParseCache | None = None,
+) -> ChangelogIndex | None:
+    """
+    Index of a changelog, from the sidecar file if it is still current, otherwise indexed again (and saved)
+
+    Entries indexed before from the same content are taken from `parse_cache`, if given.
+    Returns None for changelogs that can't be indexed exactly (with carriage return line endings), to be searched the old way.
+    """
+    changelog_file_path = Path(changelog_file_path)
+    changelog_bytes = read_file_bytes(changelog_file_path)
+    if index_file_path is not None and index_file_path.exists():
+        try:
+            changelog_index = load_changelog_index(index_file_path)
+        except (ValueError, KeyError, TypeError):
+            changelog_index = None  # broken or outdated sidecar, just index again
+        if changelog_index is not None and changelog_index.is_current(changelog_file_path, changelog_bytes):
+            return changelog_index
+
+    if b"\r" in changelog_bytes:
+        return None
+    if parse_cache is None:
+        entries = index_changelog_bytes(changelog_bytes)
+    else:
+        entries = parse_cache.get_or_parse(
+            "changelog_index",
+            changelog_bytes,
+            index_changelog_bytes,
+            to_json=changelog_entries_to_json,
+            from_json=changelog_entries_from_json,
+        )
+    changelog_index = make_changelog_index(changelog_file_path, changelog_bytes, entries)
+    if index_file_path is not None:
+        save_changelog_index(changelog_index, index_file_path)
+    return changelog_index
+
+
+def changelog_entries_to_json(entries: list[ChangelogEntry]) -> list[dict]:
+    return [asdict(entry) for entry in entries]
+
+
+def changelog_entries_from_json(entry_dicts: list[dict]) -> list[ChangelogEntry]:
+    return [ChangelogEntry(**entry_dict) for entry_dict in entry_dicts]
+
+
+def make_changelog_index(changelog_file_path: Path, changelog_bytes: bytes, entries: list[ChangelogEntry]) -> ChangelogIndex:
+    return ChangelogIndex(
+        file_path=str(changelog_file_path.resolve()), content_hash=get_content_hash(changelog_bytes), entries=entries
+    )
+
+
+def load_changelog_index(index_file_path: Path) -> ChangelogIndex | None:
+    """Read a sidecar index file, None if it was written by another index format version"""
+    with open_text_file(index_file_path) as index_file_object:
+        index_dict = json.load(index_file_object)
+    if index_dict.pop("format_version", None) != changelog_index_format_version:
+        return None
+    index_dict["entries"] = changelog_entries_from_json(index_dict["entries"])
+    return ChangelogIndex(**index_dict)
+
+
+def save_changelog_index(changelog_index: ChangelogIndex, index_file_path: Path) -> None:
+    write_file_if_changed(
+        index_file_path, json.dumps({"format_version": changelog_index_format_version, **asdict(changelog_index)})
+    )
+
+
+def read_changelog_entry(changelog_file_path: Path, entry: ChangelogEntry) -> str:
+    """Text of one entry, from the file overlay if the changelog was written there"""
+    return read_file_bytes(changelog_file_path)[entry.start : entry.end].decode("utf-8")
+
+
+def find_changelog_entry(
+    changelog_file_path: Path,
+    version: str,
+    search_pattern: str,
+    *,
+    index_file_path: Path | None = None,
+    parse_cache: ParseCache | None = None,
+) -> re.Match | None:
+    """
+    Search for the changelog entry of `version` with `search_pattern`, using the offset index
+
+    Only the indexed entry for `version` is searched. If the file can't be indexed, there is no entry for `version`,
+    or the pattern doesn't match that entry (like a custom pattern for another layout), the whole file is searched
+    instead, so the result is the same as a plain `re.search`.
+    """
+    compiled_pattern = compile_pattern(search_pattern)
+    changelog_index = get_changelog_index(changelog_file_path, index_file_path, parse_cache)
+    if changelog_index is not None and (entry := changelog_index.find(version)) is not None:
+        entry_match = compiled_pattern.search(read_changelog_entry(changelog_file_path, entry))
+        if entry_match is not None:
+            return entry_match
+    return compiled_pattern.search(read_file_text(changelog_file_path))
+
+
+def replace_changelog_entry(  # noqa: PLR0913
+    changelog_file_path: Path,
+    version: str,
+    search_pattern: str,
+    replacement: str,
+    *,
+    index_file_path: Path | None = None,
+    parse_cache: ParseCache | None = None,
+) -> re.Match | None:
+    """
+    Replace the changelog entry of `version` (like `WIP`) via regex, and update the index to match
+
+    The entry bytes are swapped out in the file, and the entries after it are shifted in the index instead of indexing
+    the whole file again. Falls back to a regex replace over the whole file in the same cases as `find_changelog_entry`.
+
+    Returns
+    -------
+    match : re.Match | None
+        Match of `search_pattern` on the original entry, to fill in release notes with, None if nothing was replaced
+
+    """
+    compiled_pattern = compile_pattern(search_pattern)
+    changelog_index = get_changelog_index(changelog_file_path, index_file_path, parse_cache)
+    if changelog_index is not None and (entry := changelog_index.find(version)) is not None:
+        changelog_bytes = read_file_bytes(changelog_file_path)
+        entry_string = changelog_bytes[entry.start : entry.end].decode("utf-8")
+        if (entry_match := compiled_pattern.search(entry_string)) is not None:
+            new_entry_bytes = compiled_pattern.sub(replacement, entry_string).encode("utf-8")
+            new_changelog_bytes = changelog_bytes[: entry.start] + new_entry_bytes + changelog_bytes[entry.end :]
+            write_bytes_if_changed(changelog_file_path, new_changelog_bytes)
+            update_changelog_index(changelog_index, new_changelog_bytes, entry, new_entry_bytes, index_file_path)
+            if parse_cache is not None:
+                # the next reader of the new changelog (like the workshop upload) finds its index ready
+                parse_cache.put("changelog_index", new_changelog_bytes, changelog_entries_to_json(changelog_index.entries))
+            return entry_match
+
+    changelog_string = read_file_text(changelog_file_path)
+    entry_match = compiled_pattern.search(changelog_string)
+    if entry_match is not None:
+        write_file_if_changed(changelog_file_path, compiled_pattern.sub(replacement, changelog_string))
+    if index_file_path is not None and changelog_index is not None:
+        get_changelog_index(changelog_file_path, index_file_path, parse_cache)
+    return entry_match
+
+
+def update_changelog_index(
+    changelog_index: ChangelogIndex,
+    changelog_bytes: bytes,
+    replaced_entry: ChangelogEntry,
+    new_entry_bytes: bytes,
+    index_file_path: Path | None,
+) -> None:
+    """
+    Update the index after `replaced_entry` was swapped for `new_entry_bytes` in the file, now `changelog_bytes`
+
+    The new bytes are indexed on their own, which gives the same entries as indexing the whole file when they are
+    whole entries (start with `---`, end with `---`). Otherwise the whole file is indexed again.
+    """
+    if new_entry_bytes.startswith(entry_separator + b"\n") and new_entry_bytes.endswith(entry_separator):
+        size_change = len(new_entry_bytes) - (replaced_entry.end - replaced_entry.start)
+        replaced_position = changelog_index.entries.index(replaced_entry)
+        following_entries = changelog_index.entries[replaced_position + 1 :]
+        for following_entry in following_entries:
+            following_entry.start += size_change
+            following_entry.end += size_change
+        entries = [
+            *changelog_index.entries[:replaced_position],
+            *index_changelog_bytes(new_entry_bytes, replaced_entry.start),
+            *following_entries,
+        ]
+    else:
+        entries = index_changelog_bytes(changelog_bytes)
+
+    changelog_index.entries = entries
+    changelog_index.content_hash = get_content_hash(changelog_bytes)
+    if index_file_path is not None:
+        save_changelog_index(changelog_index, index_file_path)
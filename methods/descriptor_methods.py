@@ -0,0 +1,123 @@
+"""
+Typed model of a paradox `descriptor.mod` file, shared by the release and upload scripts
+
+`ModDescriptor` has a typed field for each key the tools use, and keeps any other keys (like `dependencies`) in
+`extra`. The original key order is remembered, so parsing and serializing again gives back the same file. Types are
+checked once when parsing, and `require` checks for the keys a script needs in one go.
+
+The parsed form can be kept in the parse cache, so later steps and runs can skip parsing, see `load_descriptor`.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from methods.cache_methods import ParseCache
+from methods.file_methods import read_file_bytes, read_file_text
+from methods.input_methods import create_descriptor_file, parse_descriptor_string, serialize_descriptor_dict
+
+logger = logging.getLogger(__name__)
+
+# keys with a typed field in `ModDescriptor`, in field order
+descriptor_typed_keys = ("name", "version", "tags", "picture", "supported_version", "path", "remote_file_id")
+# keys written as `key={ ... }` blocks, all other typed keys are `key="value"`
+descriptor_block_keys = frozenset({"tags"})
+
+
+@dataclass(slots=True)
+class ModDescriptor:
+    """Contents of a `descriptor.mod` file, None for keys it doesn't have"""
+
+    name: str | None = None
+    version: str | None = None
+    tags: list[str] | None = None
+    picture: str | None = None
+    supported_version: str | None = None
+    path: str | None = None
+    remote_file_id: str | None = None
+    extra: dict[str, str | list[str]] = field(default_factory=dict)
+    """Any other keys, in file order"""
+    key_order: list[str] = field(default_factory=list, repr=False)
+    """Keys in the order they were parsed, keys set later are written after them"""
+
+    @classmethod
+    def from_dict(cls, descriptor_dict: dict[str, str | list[str]]) -> "ModDescriptor":
+        """
+        Model of a dict from `parse_descriptor_string`
+
+        Raises
+        ------
+        ValueError
+            If a typed key has the wrong kind of value, like `tags="Gameplay"` instead of a block
+
+        """
+        descriptor = cls(key_order=list(descriptor_dict))
+        for key, value in descriptor_dict.items():
+            if key not in descriptor_typed_keys:
+                descriptor.extra[key] = value
+                continue
+            if (key in descriptor_block_keys) != isinstance(value, list):
+                expected_kind = "a block like {...}" if key in descriptor_block_keys else 'a value like "..."'
+                msg = f'Descriptor key "{key}" must be {expected_kind}, got {value!r}'
+                raise ValueError(msg)
+            setattr(descriptor, key, value)
+        return descriptor
+
+    def to_dict(self) -> dict[str, str | list[str]]:
+        """Keys in their original order, then newly set typed keys, then new extra keys"""
+        values = {key: getattr(self, key) for key in descriptor_typed_keys} | self.extra
+        descriptor_dict = {key: values[key] for key in self.key_order if values.get(key) is not None}
+        for key, value in values.items():
+            if value is not None and key not in descriptor_dict:
+                descriptor_dict[key] = value
+        return descriptor_dict
+
+    @classmethod
+    def parse(cls, descriptor_string: str) -> "ModDescriptor":
+        return cls.from_dict(parse_descriptor_string(descriptor_string))
+
+    @classmethod
+    def from_file(cls, descriptor_file_path: Path) -> "ModDescriptor":
+        logger.debug("Parsing descriptor style file %s", descriptor_file_path)
+        return cls.parse(read_file_text(descriptor_file_path))
+
+    def serialize(self) -> str:
+        return serialize_descriptor_dict(self.to_dict())
+
+    def write(self, descriptor_file_path: Path) -> None:
+        create_descriptor_file(self.to_dict(), descriptor_file_path)
+
+    def require(self, *keys: str, source: Path | str = "descriptor") -> None:
+        """
+        Check that all `keys` are set
+
+        Raises
+        ------
+        ValueError
+            Naming every missing key at once
+
+        """
+        missing_keys = [
+            key for key in keys if not (getattr(self, key) if key in descriptor_typed_keys else self.extra.get(key))
+        ]
+        if missing_keys:
+            msg = f"{', '.join(missing_keys)} missing or empty in {source}"
+            raise ValueError(msg)
+
+
+def load_descriptor(descriptor_file_path: Path, parse_cache: ParseCache | None = None) -> ModDescriptor:
+    """Parsed descriptor, from the parse cache if this exact content was parsed before"""
+    if parse_cache is None:
+        return ModDescriptor.from_file(descriptor_file_path)
+    return parse_cache.get_or_parse(
+        "descriptor",
+        read_file_bytes(descriptor_file_path),
+        lambda descriptor_bytes: ModDescriptor.parse(descriptor_bytes.decode("utf-8")),
+        to_json=ModDescriptor.to_dict,
+        from_json=ModDescriptor.from_dict,
+    )
+
+
+def cache_descriptor(descriptor: ModDescriptor, descriptor_file_path: Path, parse_cache: ParseCache) -> None:
+    """Cache a descriptor just written to `descriptor_file_path`, so the next reader doesn't have to parse it"""
+    parse_cache.put("descriptor", read_file_bytes(descriptor_file_path), descriptor.to_dict())
@@ -0,0 +1,395 @@
+"""
+Functions for writing files atomically, and only when their content changes
+
+Every helper that writes into the mod repository goes through `write_file_if_changed`: the new content is compared
+with what is on disk, and only if it differs is it written to a temporary file next to the target and moved over it
+with `os.replace`. Unchanged files keep their mtime, and a crash never leaves a half-written file behind.
+
+Changed files are recorded, so the commit step can stage exactly those, see `write_changed_files_list`.
+
+Very large text files (generated loc files are tens of MB) can be patched with `stream_rewrite_file` instead, which
+reads, rewrites and writes them in chunks of whole lines, so memory stays bounded however big the file is.
+
+With a `FileOverlay` set (`set_file_overlay`), nothing is written: writes go into the overlay, and reads through
+`read_file_bytes`/`open_text_file` see them. A whole run can then be shown as a diff (`FileOverlay.format_diff`), or
+written out in one batch at the end (`FileOverlay.flush`).
+"""
+
+import difflib
+import io
+import logging
+import os
+import tempfile
+from collections.abc import Callable, Iterable
+from pathlib import Path
+from types import TracebackType
+from typing import Self, TextIO
+
+logger = logging.getLogger(__name__)
+
+changed_files_list_file_name = "changed_files.txt"
+# characters per chunk for `stream_rewrite_file`, rounded up to whole lines
+stream_chunk_size = 1 << 20
+
+_changed_file_paths: dict[Path, None] = {}
+"""Files changed since the last `clear_changed_file_paths`, in the order they were first written"""
+_umask: int | None = None
+_file_overlay: "FileOverlay | None" = None
+
+
+def get_umask() -> int:
+    """Process umask, read once (it can only be read by setting it)"""
+    global _umask  # noqa: PLW0603 cached on first use
+    if _umask is None:
+        _umask = os.umask(0)
+        os.umask(_umask)
+    return _umask
+
+
+def encode_text(text: str, encoding: str = "utf-8", newline: str | None = None) -> bytes:
+    """Bytes that writing `text` in text mode with `encoding` and `newline` would produce"""
+    if newline is None:
+        newline = os.linesep
+    if newline not in {"", "\n"}:
+        text = text.replace("\n", newline)
+    return text.encode(encoding)
+
+
+class AtomicFileWriter:
+    """
+    Binary temporary file next to `file_path`, moved over it on `commit` and removed if never committed
+
+    Use as a context manager, anything not committed when the block ends (also through an exception) is discarded.
+    New files get the default permissions, replaced files keep theirs.
+    """
+
+    def __init__(self, file_path: Path) -> None:
+        self.file_path = Path(file_path)
+        self.file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_descriptor, temp_file_name = tempfile.mkstemp(
+            dir=self.file_path.parent, prefix=f".{self.file_path.name}.", suffix=".tmp"
+        )
+        self.temp_file_path = Path(temp_file_name)
+        self._file_object = os.fdopen(file_descriptor, "wb")
+        self.committed = False
+
+    def write(self, data: bytes) -> None:
+        self._file_object.write(data)
+
+    def commit(self) -> None:
+        self._file_object.close()
+        try:
+            file_mode = self.file_path.stat().st_mode & 0o7777
+        except FileNotFoundError:
+            file_mode = 0o666 & ~get_umask()
+        # mkstemp files are private, give the file the permissions a normal write would have
+        self.temp_file_path.chmod(file_mode)
+        self.temp_file_path.replace(self.file_path)
+        self.committed = True
+        record_changed_file(self.file_path)
+        logger.debug("%s written", self.file_path)
+
+    def discard(self) -> None:
+        self._file_object.close()
+        self.temp_file_path.unlink(missing_ok=True)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        if not self.committed:
+            self.discard()
+
+
+class FileOverlay:
+    """
+    Files written while the overlay is set, kept in memory instead of on disk
+
+    Keyed by absolute path, in the order they were first written. Files not in the overlay are read from disk.
+    """
+
+    def __init__(self) -> None:
+        self.files: dict[Path, bytes] = {}
+
+    def get_bytes(self, file_path: Path) -> bytes | None:
+        """Content of `file_path` as the overlay sees it, None if it doesn't exist"""
+        file_path = Path(file_path).absolute()
+        if file_path in self.files:
+            return self.files[file_path]
+        return self.get_original_bytes(file_path)
+
+    def write_bytes(self, file_path: Path, data: bytes) -> None:
+        self.files[Path(file_path).absolute()] = data
+        logger.debug("%s would be written, kept in the file overlay", file_path)
+
+    def get_original_bytes(self, file_path: Path) -> bytes | None:
+        """Content of `file_path` on disk, None if it doesn't exist"""
+        try:
+            return Path(file_path).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def get_changed_paths(self) -> list[Path]:
+        """Files in the overlay that differ from the file on disk, in the order they were first written"""
+        return [file_path for file_path, data in self.files.items() if self.get_original_bytes(file_path) != data]
+
+    def format_diff(self, file_paths: Iterable[Path] | None = None, root_folder_path: Path | None = None) -> str:
+        """
+        Unified diff of the files in the overlay (all, or just `file_paths`) against the files on disk
+
+        Paths inside `root_folder_path` are shown relative to it with `a/` and `b/` prefixes like `git diff`, others in
+        full. Files that don't decode as UTF-8 are only listed.
+        """
+        root_folder_path = None if root_folder_path is None else Path(root_folder_path).absolute()
+        diff_parts = []
+        for file_path in self.files if file_paths is None else (Path(file_path).absolute() for file_path in file_paths):
+            data = self.files.get(file_path)
+            original_data = self.get_original_bytes(file_path)
+            if data is None or original_data == data:
+                continue
+            if root_folder_path is not None and file_path.is_relative_to(root_folder_path):
+                relative_path = file_path.relative_to(root_folder_path).as_posix()
+                from_label, to_label = f"a/{relative_path}", f"b/{relative_path}"
+            else:
+                from_label = to_label = file_path.as_posix()
+            try:
+                original_lines = [] if original_data is None else original_data.decode("utf-8").splitlines(keepends=True)
+                new_lines = data.decode("utf-8").splitlines(keepends=True)
+            except UnicodeDecodeError:
+                diff_parts.append(f"Binary file {to_label} changed\n")
+                continue
+            diff_lines = difflib.unified_diff(
+                original_lines, new_lines, "/dev/null" if original_data is None else from_label, to_label
+            )
+            # like `diff`, mark a last line without a line ending instead of running it into the next one
+            diff_parts.extend(line if line.endswith("\n") else f"{line}\n\\ No newline at end of file\n" for line in diff_lines)
+        return "".join(diff_parts)
+
+    def flush(self) -> list[Path]:
+        """
+        Write every file in the overlay to disk (atomically, skipping files that are already the same) and clear it
+
+        Returns the paths that were written.
+        """
+        written_file_paths = [
+            file_path for file_path, data in self.files.items() if _write_bytes_to_disk_if_changed(file_path, data)
+        ]
+        logger.info("%s of %s files from the file overlay written", len(written_file_paths), len(self.files))
+        self.files.clear()
+        return written_file_paths
+
+
+class OverlayFileWriter:
+    """Same interface as `AtomicFileWriter`, but commits into a `FileOverlay`"""
+
+    def __init__(self, file_overlay: FileOverlay, file_path: Path) -> None:
+        self.file_overlay = file_overlay
+        self.file_path = Path(file_path)
+        self._buffer = io.BytesIO()
+        self.committed = False
+
+    def write(self, data: bytes) -> None:
+        self._buffer.write(data)
+
+    def commit(self) -> None:
+        self.file_overlay.write_bytes(self.file_path, self._buffer.getvalue())
+        self.committed = True
+        record_changed_file(self.file_path)
+
+    def discard(self) -> None:
+        self._buffer.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        if not self.committed:
+            self.discard()
+
+
+def get_file_overlay() -> FileOverlay | None:
+    return _file_overlay
+
+
+def set_file_overlay(file_overlay: FileOverlay | None) -> None:
+    """Send all writes through this module to `file_overlay` from now on, None to write to disk again"""
+    global _file_overlay  # noqa: PLW0603 process-wide like the changed files
+    _file_overlay = file_overlay
+
+
+def open_file_writer(file_path: Path) -> AtomicFileWriter | OverlayFileWriter:
+    """Writer for `file_path`, into the file overlay if one is set"""
+    if _file_overlay is not None:
+        return OverlayFileWriter(_file_overlay, file_path)
+    return AtomicFileWriter(file_path)
+
+
+def read_file_bytes(file_path: Path) -> bytes:
+    """Content of `file_path`, from the file overlay if it was written there"""
+    if _file_overlay is not None and (data := _file_overlay.get_bytes(file_path)) is not None:
+        return data
+    return Path(file_path).read_bytes()
+
+
+def open_text_file(file_path: Path, *, encoding: str = "utf-8", newline: str | None = None) -> TextIO:
+    """Open `file_path` for reading as text like `Path.open`, from the file overlay if it was written there"""
+    if _file_overlay is not None and (absolute_file_path := Path(file_path).absolute()) in _file_overlay.files:
+        return io.TextIOWrapper(io.BytesIO(_file_overlay.files[absolute_file_path]), encoding=encoding, newline=newline)
+    return Path.open(file_path, encoding=encoding, newline=newline)
+
+
+def read_file_text(file_path: Path, *, encoding: str = "utf-8") -> str:
+    """Like `Path.read_text`, from the file overlay if the file was written there"""
+    with open_text_file(file_path, encoding=encoding) as file_object:
+        return file_object.read()
+
+
+def append_to_file(file_path: Path, text: str, *, encoding: str = "utf-8") -> None:
+    """
+    Append `text` to `file_path` in text mode, like the GitHub env, output and step summary files are written
+
+    Not counted as a changed file. With a file overlay set, the overlay gets the whole file with `text` added.
+    """
+    if _file_overlay is not None:
+        current_data = _file_overlay.get_bytes(file_path) or b""
+        _file_overlay.write_bytes(file_path, current_data + encode_text(text, encoding))
+        return
+    with Path.open(file_path, "a", encoding=encoding) as file_object:
+        file_object.write(text)
+
+
+def write_bytes_if_changed(file_path: Path, data: bytes) -> bool:
+    """
+    Write `data` to `file_path` atomically, unless the file already has exactly this content
+
+    Returns whether the file was written.
+    """
+    if _file_overlay is not None:
+        if _file_overlay.get_bytes(file_path) == data:
+            logger.debug("%s unchanged, not written", file_path)
+            return False
+        with OverlayFileWriter(_file_overlay, file_path) as writer:
+            writer.write(data)
+            writer.commit()
+        return True
+    return _write_bytes_to_disk_if_changed(file_path, data)
+
+
+def _write_bytes_to_disk_if_changed(file_path: Path, data: bytes) -> bool:
+    file_path = Path(file_path)
+    try:
+        current_size = file_path.stat().st_size
+    except FileNotFoundError:
+        current_size = None
+    if current_size == len(data) and file_path.read_bytes() == data:
+        logger.debug("%s unchanged, not written", file_path)
+        return False
+
+    with AtomicFileWriter(file_path) as writer:
+        writer.write(data)
+        writer.commit()
+    return True
+
+
+def write_file_if_changed(file_path: Path, text: str, *, encoding: str = "utf-8", newline: str | None = None) -> bool:
+    """
+    Write `text` to `file_path` atomically, unless the file already has exactly this content
+
+    `encoding` and `newline` work like for `open`, the comparison is on the encoded bytes. Returns whether the file
+    was written.
+    """
+    return write_bytes_if_changed(file_path, encode_text(text, encoding, newline))
+
+
+def stream_rewrite_file(
+    file_path: Path,
+    rewrite_chunk: Callable[[str], str],
+    *,
+    encoding: str = "utf-8",
+    chunk_size: int | None = None,
+) -> bool:
+    r"""
+    Rewrite a text file chunk by chunk, with bounded memory however big the file is
+
+    Chunks are whole lines of about `chunk_size` characters (`stream_chunk_size` by default), with line endings kept
+    exactly as they are. Each chunk is passed to `rewrite_chunk` with the line ending before it prepended, so a
+    pattern starting with `\s` matches a key at the start of the chunk's first line like it would in the whole text.
+    Only line-local rewrites work this way: nothing may match across the end of a chunk, and the prepended line ending
+    must come back unchanged.
+
+    The new file is streamed to a temporary file and moved over the original only if a chunk changed. With a file
+    overlay set, the file is read from and written to the overlay instead, whole in memory.
+    Returns whether the file was written.
+
+    Raises
+    ------
+    ValueError
+        If `rewrite_chunk` changed the line ending in front of a chunk
+
+    """
+    chunk_size = chunk_size or stream_chunk_size
+    changed = False
+    with open_text_file(file_path, encoding=encoding, newline="") as source_file_object, open_file_writer(file_path) as writer:
+        previous_line_end = ""
+        while lines := source_file_object.readlines(chunk_size):
+            chunk = "".join(lines)
+            new_chunk = rewrite_chunk(previous_line_end + chunk)
+            if not new_chunk.startswith(previous_line_end):
+                msg = f"Rewriting {file_path} changed a line ending between chunks, only line-local patterns can be streamed"
+                raise ValueError(msg)
+            new_chunk = new_chunk[len(previous_line_end) :]
+            changed = changed or new_chunk != chunk
+            writer.write(new_chunk.encode(encoding))
+            previous_line_end = chunk[-1]
+        if changed:
+            writer.commit()
+    if not changed:
+        logger.debug("%s unchanged, not written", file_path)
+    return changed
+
+
+def get_changed_file_paths() -> list[Path]:
+    """Absolute paths of the files written since the last `clear_changed_file_paths`"""
+    return list(_changed_file_paths)
+
+
+def record_changed_file(file_path: Path) -> None:
+    """
+    Count `file_path` as changed, for files written elsewhere
+
+    Worker processes have their own copy of the changed files, so what they wrote is recorded in the parent with this.
+    """
+    _changed_file_paths[Path(file_path).absolute()] = None
+
+
+def clear_changed_file_paths() -> None:
+    _changed_file_paths.clear()
+
+
+def write_changed_files_list(list_file_path: Path, root_folder_path: Path) -> list[str]:
+    """
+    Write the changed files inside `root_folder_path` to a file, one posix path relative to it per line
+
+    Made for `git add --pathspec-from-file`, files outside the folder (generated files) are left out.
+    Returns the relative paths.
+    """
+    root_folder_path = Path(root_folder_path).absolute()
+    relative_paths = [
+        changed_file_path.relative_to(root_folder_path).as_posix()
+        for changed_file_path in _changed_file_paths
+        if changed_file_path.is_relative_to(root_folder_path)
+    ]
+    write_file_if_changed(list_file_path, "".join(f"{relative_path}\n" for relative_path in relative_paths), newline="\n")
+    # the list itself is not a change to report
+    _changed_file_paths.pop(Path(list_file_path).absolute(), None)
+    return relative_paths
@@ -1,12 +1,20 @@
 """Functions for handling various user input"""
 
 import argparse
+import logging
 import os
 import re
-import zipfile
+from collections.abc import Mapping
 from pathlib import Path
 from typing import overload
 
+from methods.bbcode_methods import convert_markdown_to_bbcode
+from methods.file_methods import get_file_overlay, read_file_text, stream_rewrite_file, write_file_if_changed
+from methods.log_methods import redacted_text, register_secret, secret_env_variable_names
+from methods.substitution_methods import get_substitution_engine
+
+logger = logging.getLogger(__name__)
+
 
 def str2bool(v: str | None) -> bool:
     """
@@ -48,22 +56,83 @@ def str2bool(v: str | None) -> bool:
 
 
 @overload
-def get_env_variable(env_var_name: str, default: str, debug_level: str = "INFO") -> str: ...
+def get_env_variable(env_var_name: str, default: str, env: Mapping[str, str] | None = None) -> str: ...
 @overload
-def get_env_variable(env_var_name: str, default: Path, debug_level: str = "INFO") -> str | Path: ...
+def get_env_variable(env_var_name: str, default: Path, env: Mapping[str, str] | None = None) -> str | Path: ...
 @overload
-def get_env_variable(env_var_name: str, default: None, debug_level: str = "INFO") -> str | None: ...
+def get_env_variable(env_var_name: str, default: None, env: Mapping[str, str] | None = None) -> str | None: ...
 
 
-def get_env_variable(env_var_name: str, default=None, debug_level: str = "INFO"):
-    """Simple getenv wrapper with debug print"""
-    env_var = os.getenv(env_var_name, default)
-    if debug_level in ["INFO", "DEBUG"]:
-        print(f"{env_var_name}={env_var}")
+def get_env_variable(env_var_name: str, default=None, env: Mapping[str, str] | None = None):
+    """
+    Simple getenv wrapper with an info log, reads `env` instead of the process environment if given
+
+    Values of secrets (`secret_env_variable_names`) are never logged, and are redacted from any later log message.
+    """
+    env_var = os.getenv(env_var_name, default) if env is None else env.get(env_var_name, default)
+    if env_var_name in secret_env_variable_names:
+        register_secret(env_var)
+        logger.info("%s=%s", env_var_name, redacted_text if env_var else env_var)
+    else:
+        logger.info("%s=%s", env_var_name, env_var)
     return env_var
 
 
-def parse_descriptor_to_dict(descriptor_file_path: Path, debug_level: str = "SILENT") -> dict[str, str | list[str]]:
+# single pass tokenizer for descriptor style files, see `parse_descriptor_string`
+# every match takes a whole line, or a whole `{}` block spanning any number of lines, so no position is tried twice
+descriptor_token_pattern = re.compile(
+    r"""
+    ^[ \t]*(?:
+        \#[^\n]*                                # full line comment
+        | ([^\s=\#{}"][^=\n]*)=[ \t]*           # key, split on the first `=` only
+          (?:(\{)([^}]*)\}?                     # then either a block, up to the closing brace
+          | ([^\n]*))                           # or the rest of the line is the value
+        | [^\n]*                                # anything else (blank lines, stray text) is skipped
+    )[^\n]*\n?                                  # rest of the line, so the next match starts on the next line
+    """,
+    re.MULTILINE | re.VERBOSE,
+)
+# items inside a block, quoted items keep inner whitespace, unquoted items are split on whitespace
+descriptor_block_item_pattern = re.compile(r'"([^"\n]*)"|([^\s"]+)')
+descriptor_block_comment_pattern = re.compile(r"^[ \t]*#[^\n]*", re.MULTILINE)
+
+
+def parse_descriptor_string(descriptor_string: str) -> dict[str, str | list[str]]:
+    """
+    Creates a dict of entries from the contents of a paradox descriptor.mod style file
+
+    Runs `descriptor_token_pattern` over the whole string once, see `parse_descriptor_to_dict` for the format details.
+    """
+    debug = logger.isEnabledFor(logging.DEBUG)
+    descriptor_dict: dict[str, str | list[str]] = {}
+
+    # findall gives (key, brace, block items, value) per line or block, key is empty for skipped lines
+    for key, brace, items, value in descriptor_token_pattern.findall(descriptor_string):
+        if not key:
+            continue
+        key = key.rstrip()
+        if not brace:
+            # plain `key="value"` line, quotes stripped like paradox does
+            descriptor_dict[key] = value.strip().strip('"')
+        else:
+            if "#" in items:
+                items = descriptor_block_comment_pattern.sub("", items)
+            # fast path for the usual all-quoted block, odd pieces are inside quotes and even pieces must be whitespace
+            pieces = items.split('"')
+            if len(pieces) % 2 and not "".join(pieces[0::2]).strip():
+                descriptor_dict[key] = pieces[1::2]
+            else:
+                descriptor_dict[key] = [quoted or bare for quoted, bare in descriptor_block_item_pattern.findall(items)]
+        if debug:
+            logger.debug("Saving: '%s' : '%s'", key, descriptor_dict[key])
+
+    if debug:
+        logger.debug("Finished parsing, result = %s", descriptor_dict)
+
+    return descriptor_dict
+
+
+def parse_descriptor_to_dict(descriptor_file_path: Path) -> dict[str, str | list[str]]:
     """
     Creates a dict of entries from a paradox descriptor.mod file
 
@@ -72,21 +141,20 @@ def parse_descriptor_to_dict(descriptor_file_path: Path, debug_level: str = "SIL
     Specifically, this parser has extensions to allow for use with overrides,
     like supporting {} blocks for later formatting in Python in single lines.
 
-    Parser will skip empty lines and comments, indicated with #. This includes empty lines in multi-line blocks.
+    Parser will skip empty lines and comments, indicated with #. This includes empty lines and comments in blocks.
     In-line comments are NOT supported (Stellaris does not support this either).
 
-    NOTE: Curly brackets {} are NOT supported in multi-line blocks and will break parsing.
-    No placeholder-fill-in allowed in 'tags' or similar.
-    Needs some special case handling which I don't even know if anyone wants
+    Values are split from keys on the first `=`, so values may contain `=`.
+    Blocks `key = { "item1" "item2" }` can be on one line or span several, with items on the brace lines too.
+    Quoted block items keep their inner whitespace, unquoted block items are split on whitespace.
+
+    NOTE: No placeholder-fill-in allowed in 'tags' or similar blocks, `{}` inside a block ends it.
 
     Parameters
     ----------
     descriptor_file_path : Path
         Input `pathlib.Path` object pointing to a `descriptor.mod` style file, which will be parsed
 
-    debug_level : str
-        One of "SILENT", "INFO", or "DEBUG", for enabling print statements during parsing
-
     Returns
     -------
     descriptor_dict : dict[str: str | list[str]]
@@ -94,158 +162,43 @@ def parse_descriptor_to_dict(descriptor_file_path: Path, debug_level: str = "SIL
         See tests for examples, like `expected_test_descriptor_dict` in `conftest.py`.
 
     """
-    if debug_level == "DEBUG":
-        print("- Parsing descriptor style file -")
-        print(f"Path: {descriptor_file_path}")
-    descriptor_dict: dict[str, str | list[str]] = {}
-    line_container: list[str] = []
-    multiline_flag = False
-    with Path.open(descriptor_file_path, encoding="utf-8") as descriptor_object:
-        for line in descriptor_object:
-            # debug prints
-            if debug_level == "DEBUG":
-                print()  # implicit newline
-                if multiline_flag:
-                    print("Multiline parsing enabled")
-                print(f"Current line: {line.rstrip('\n')}")
-
-            # skip empty lines and # comments
-            if not line or line.isspace():
-                if debug_level == "DEBUG":
-                    print("Skipping blank line")
-                continue
-            # strip any spaces or tabs before any comment
-            # the simple descriptor format does NOT support inline comments, hence ignoring # not at beginning
-            if line.lstrip().startswith("#"):
-                if debug_level == "DEBUG":
-                    print("Line is comment, skipping")
-                continue
-            # check for normal parsing
-            if not multiline_flag:
-                if "=" in line:
-                    # strip line for trailing spaces and turn line into list with key and value
-                    line = line.rstrip().split("=")
-                    line[0] = line[0].strip()
-                    line[1] = line[1].strip().strip('"')
-
-                    if debug_level == "DEBUG":
-                        print(f"Split line list: {line}")
-
-                    if not line[1].lstrip().startswith("{"):
-                        descriptor_dict[line[0]] = line[1]
-
-                        if debug_level == "DEBUG":
-                            print("Saving line:")
-                            print(f"'{line[0]}' : '{line[1]}'")
-
-                    # the multiline blocks like tags are a problem, so parse those
-                    elif line[1].lstrip().startswith("{"):
-                        if "}" not in line[1]:
-                            if debug_level == "DEBUG":
-                                print("Started multiline")
-
-                            multiline_key = line[0]
-                            multiline_flag = True
-                            # check for anything after the brace - you shouldn't do this but you never know...
-                            index_brace = line[1].find("{")
-                            if not (line[1].endswith("{") or line[1].endswith(" ")):
-                                # save anything after the brace unless the brace is last character (string was stripped already)
-                                extra_item = line[1][index_brace + 1 :].lstrip('"')
-                                line_container.append(extra_item)
-
-                                if debug_level == "DEBUG":
-                                    print(f"Found item after '{{', was: '{extra_item}'")
-                            continue  #  goes to next line
-                        else:
-                            # line is like
-                            # tags = { "tag1" "tag2" "tag3" "tag4" "tag5"}
-                            if debug_level == "DEBUG":
-                                print("Single line listlike")
-
-                            multiline_key = line[0]
-                            index_lbrace = line[1].find("{")
-                            index_rbrace = line[1].find("}")
-                            contents = line[1][index_lbrace + 1 : index_rbrace].strip()
-                            line_container = contents.split('" "')
-                            line_container = [word.strip('"') for word in line_container]
-
-                            if debug_level == "DEBUG":
-                                print("Contents:", line_container)
-
-                            descriptor_dict[multiline_key] = line_container
-                            if debug_level == "DEBUG":
-                                print("Saving line:")
-                                print(f"'{multiline_key}' : '{line_container}'")
-
-                            # clear list of saved tags
-                            line_container: list[str] = []
-
-            # alternate flow
-            elif multiline_flag:
-                if "}" not in line:
-                    line_item = line.strip().strip('"')
-                    line_container.append(line_item)
-
-                    if debug_level == "DEBUG":
-                        print(f"Found item: '{line_item}'")
-
-                if "}" in line:
-                    if debug_level == "DEBUG":
-                        print("Last line in multiline found")
-
-                    line = line.lstrip().strip('"')
-                    # check for anything before the brace - you shouldn't do this but you never know...
-                    index_brace = line.find("}")
-                    if not line.startswith(("}", " ")):
-                        # save anything before the brace unless it's last character
-                        # make sure the quote markers are gone from item
-                        extra_item = line[:index_brace].rstrip('"')
-                        if debug_level == "DEBUG":
-                            print(f"Found item after '}}', was: '{extra_item}'")
-
-                        line_container.append(extra_item)
-
-                    # end multiline
-                    descriptor_dict[multiline_key] = line_container
-                    if debug_level == "DEBUG":
-                        print("Saving line:")
-                        print(f"'{multiline_key}' : '{line_container}'")
-
-                    # clean up
-                    multiline_flag = False
-                    line_container = []
-                    continue  # keep parsing next line
-
-    if debug_level == "DEBUG":
-        print("Finished parsing")
-        print(f"result = {descriptor_dict}")
+    logger.debug("Parsing descriptor style file %s", descriptor_file_path)
+    descriptor_string = read_file_text(descriptor_file_path)
+    return parse_descriptor_string(descriptor_string)
 
-    return descriptor_dict
+
+def serialize_descriptor_dict(descriptor_dict: dict) -> str:
+    """
+    Turns a dictionary into the text of a paradox `descriptor.mod` file
+
+    Very simplistic and rigid formatting, on purpose. Paradox tools are very particular about reading descriptors.
+    """
+    descriptor_parts: list[str] = []
+    # dict order being insertion order is guaranteed in newer python versions so file structure should be preserved
+    for key, item in descriptor_dict.items():
+        # construct line - in case of list we need to write it out tabbed and encased in {}
+        if isinstance(item, str):
+            descriptor_parts.append(f'{key}="{item}"\n')
+        elif isinstance(item, list):
+            descriptor_parts.append(f"{key}={{\n")
+            # \t for tab
+            descriptor_parts.extend(f'\t"{tag}"\n' for tag in item)
+            # end block and continue other items
+            descriptor_parts.append("}\n")
+    return "".join(descriptor_parts)
 
 
 def create_descriptor_file(descriptor_dict: dict, descriptor_file_path: Path) -> None:
     """
     Creates a paradox `descriptor.mod` file from a dictionary
 
-    Very simplistic and rigid file writing, on purpose. Paradox tools are very particular about reading descriptors.
+    Builds the whole file with `serialize_descriptor_dict` and writes it in one go, only if it changed.
     """
-    with Path.open(descriptor_file_path, "w", encoding="utf-8") as descriptor_object:
-        # dict order being insertion order is guaranteed in newer python versions so file structure should be preserved
-        for key, item in descriptor_dict.items():
-            # construct line - in case of list we need to write it out tabbed and encased in {}
-            if isinstance(item, str):
-                line = f'{key}="{item}"\n'
-                descriptor_object.write(line)
-            elif isinstance(item, list):
-                line = f"{key}={{\n"
-                descriptor_object.write(line)
-                for tag in item:
-                    # \t for tab
-                    line = f'\t"{tag}"\n'
-                    descriptor_object.write(line)
-                # end block and continue other items
-                descriptor_object.write("}\n")
-    print(f"File {descriptor_file_path} written")
+    if write_file_if_changed(descriptor_file_path, serialize_descriptor_dict(descriptor_dict)):
+        # with a file overlay set it only lands on disk at the end, if at all
+        logger.info("File %s %s", descriptor_file_path, "written" if get_file_overlay() is None else "would be written")
+    else:
+        logger.info("File %s unchanged", descriptor_file_path)
 
 
 def mod_version_to_dict(
@@ -379,13 +332,14 @@ def increment_mod_version(
     return current_semantic_versions, updated_mod_version
 
 
-def search_and_replace_in_file(
+def search_and_replace_in_file(  # noqa: PLR0913
     file_path: Path,
     pattern: str | list[str],
     replacestr: str | list[str],
     *,
     skip_regex_replace: bool = False,
     return_old_str: bool = False,
+    merge_patterns: bool = False,
 ) -> str | tuple[str, str]:
     """
     Opens a file and replaces a part of it via regex
@@ -402,6 +356,8 @@ def search_and_replace_in_file(
 
     Does NOT work with one pattern and multiple replacestr, how would you simultaneously replace one thing with multiple?
 
+    Set `merge_patterns` if the patterns don't overlap, to apply them all in one pass over the file.
+
     Returns the new file string in case info from file is useful - option to also get old string
 
     Returns
@@ -423,20 +379,18 @@ def search_and_replace_in_file(
 
     """
     # read into holder string for searching
-    file_handle = Path.open(file_path)
-    file_string: str = file_handle.read()
-    file_handle.close()
+    file_string = read_file_text(file_path)
     original_file_string = file_string
 
     if skip_regex_replace is False:
-        file_string = regex_search_and_replace_with_lists_helper(pattern, replacestr, file_string)
+        file_string = regex_search_and_replace_with_lists_helper(
+            pattern, replacestr, file_string, merge_patterns=merge_patterns
+        )
     else:
         pass
 
-    # w overwrites file
-    file_handle = Path.open(file_path, "w")
-    file_handle.write(file_string)
-    file_handle.close()
+    # only touches the file if a replacement changed something
+    write_file_if_changed(file_path, file_string)
 
     if return_old_str:
         return original_file_string, file_string
@@ -444,13 +398,41 @@ def search_and_replace_in_file(
         return file_string
 
 
-def generate_with_template_file(
+def stream_search_and_replace_in_file(
+    file_path: Path,
+    pattern: str | list[str],
+    replacestr: str | list[str],
+    *,
+    merge_patterns: bool = False,
+) -> bool:
+    """
+    Like `search_and_replace_in_file`, but streams the file in chunks of lines so memory stays bounded
+
+    For very large files and line-local patterns only (that never match across a line end), like `loc_key_pattern`.
+    The file strings are never held whole, so only whether the file changed (and was written) is returned.
+
+    Raises
+    ------
+    TypeError
+        If input pattern and replacestr types are incompatible, see `search_and_replace_in_file`
+    ValueError
+        If a pattern changed a line ending between chunks, see `stream_rewrite_file`
+
+    """
+    return stream_rewrite_file(
+        file_path,
+        lambda chunk: regex_search_and_replace_with_lists_helper(pattern, replacestr, chunk, merge_patterns=merge_patterns),
+    )
+
+
+def generate_with_template_file(  # noqa: PLR0913
     template_file_path: Path,
     generated_file_path: Path,
     pattern: str | list,
     replacestr: str | list,
     *,
     skip_regex_replace: bool = False,
+    merge_patterns: bool = False,
 ) -> str:
     """
     Uses a template file to generate a new file with part of it replaced via regex
@@ -471,6 +453,8 @@ def generate_with_template_file(
 
     Does NOT work with one pattern and multiple replacestr, how would you simultaneously replace one thing with multiple?
 
+    Set `merge_patterns` if the patterns don't overlap, to apply them all in one pass over the template.
+
     Returns the file string with replacements made in case info from file is useful
 
     Raises
@@ -480,30 +464,37 @@ def generate_with_template_file(
 
     """
     # read template into holder string
-    file_handle = Path.open(template_file_path)
-    file_string = file_handle.read()
-    file_handle.close()
+    file_string = read_file_text(template_file_path)
 
     if skip_regex_replace is False:
         # fill in to template via regex search
-        file_string = regex_search_and_replace_with_lists_helper(pattern, replacestr, file_string)
+        file_string = regex_search_and_replace_with_lists_helper(
+            pattern, replacestr, file_string, merge_patterns=merge_patterns
+        )
     else:
         pass
 
-    # w writes new file
-    file_handle = Path.open(generated_file_path, "w")
-    file_handle.write(file_string)
-    file_handle.close()
+    # skipped if the generated file is already up to date
+    write_file_if_changed(generated_file_path, file_string)
 
     return file_string
 
 
-def regex_search_and_replace_with_lists_helper(pattern: str | list, replacestr: str | list, file_string: str) -> str:
+def regex_search_and_replace_with_lists_helper(
+    pattern: str | list,
+    replacestr: str | list,
+    file_string: str,
+    *,
+    merge_patterns: bool = False,
+) -> str:
     """
     Helper function to avoid duplicating logic in the two prior functions
 
     Wraps logic for unpacking lists or str input. Could probably be done with overloads, but whatever.
 
+    Patterns are compiled once and cached, see `methods.substitution_methods`.
+    If `merge_patterns` is set, the caller promises the patterns don't overlap and they are applied in one pass.
+
     Raises
     ------
     TypeError
@@ -512,28 +503,18 @@ def regex_search_and_replace_with_lists_helper(pattern: str | list, replacestr:
     """
     if isinstance(pattern, list):
         if isinstance(replacestr, list):
-            for selected_pattern, selected_replacementstr in zip(pattern, replacestr, strict=False):
-                file_string: str = re.sub(
-                    selected_pattern,
-                    selected_replacementstr,
-                    file_string,
-                    flags=re.IGNORECASE | re.MULTILINE | re.DOTALL,
-                )
+            # pairs up to the shorter list, like zip
+            pair_count = min(len(pattern), len(replacestr))
+            patterns, replacements = tuple(pattern[:pair_count]), tuple(replacestr[:pair_count])
         elif isinstance(replacestr, str):
             # reuse the same pattern multiple times
-            for selected_pattern in pattern:
-                file_string: str = re.sub(
-                    selected_pattern,
-                    replacestr,
-                    file_string,
-                    flags=re.IGNORECASE | re.MULTILINE | re.DOTALL,
-                )
+            patterns, replacements = tuple(pattern), (replacestr,) * len(pattern)
         else:
             msg = f"Incompatible `replacestr` type, expected str | list[str] but got {type(replacestr)}"
             raise TypeError(msg)
     elif isinstance(pattern, str):
         if isinstance(replacestr, str):
-            file_string: str = re.sub(pattern, replacestr, file_string, flags=re.IGNORECASE | re.MULTILINE | re.DOTALL)
+            patterns, replacements = (pattern,), (replacestr,)
         else:
             msg = "Passed only one pattern but multiple replacement strings, types must match"
             raise TypeError(msg)
@@ -541,51 +522,38 @@ def regex_search_and_replace_with_lists_helper(pattern: str | list, replacestr:
         msg = f"Input search pattern must be a single str or a list of str, got {type(pattern)}"
         raise TypeError(msg)
 
-    return file_string
+    substitution_engine = get_substitution_engine(patterns, replacements, merge=merge_patterns)
+    return substitution_engine.apply(file_string)
 
 
 def zip_folder(folder_to_zip: Path | str, filename: Path | str) -> None:
     """
-    Zip the provided directory without navigating to that directory using `pathlib` module
+    Zip the provided directory without navigating to that directory
 
-    Adapted from: https://stackoverflow.com/a/68817065
+    Entries are named relative to `folder_to_zip`. Thin wrapper around `build_release_zip`,
+    which compresses in parallel and writes a deterministic archive.
     """
-    # Convert to Path object
-    folder_to_zip = Path(folder_to_zip)
-
-    with zipfile.ZipFile(filename, "w", zipfile.ZIP_DEFLATED) as zip_file:
-        for entry in folder_to_zip.rglob("*"):
-            zip_file.write(entry, entry.relative_to(folder_to_zip))
+    # imported here, the archive machinery is slow to import and most users of this module never zip anything
+    from methods.archive_methods import build_release_zip  # noqa: PLC0415
 
-
-def replace_markdown_list_with_bbcode(match: re.Match) -> str:
-    """Helper for `convert_markdown_lists_to_bbcode` to go into `re.sub`"""
-    items = match.group(1).strip().split("\n")
-    # item.split[] is to preserve whitespace to the left of list item
-    bbcode_items = [f"{item.split('- ')[0]}[*] {item.split('- ')[1].rstrip()}" for item in items if item.strip()]
-    return "[list]\n" + "\n".join(bbcode_items) + "\n[/list]"
+    build_release_zip(filename, [folder_to_zip], folder_to_zip)
 
 
 def convert_markdown_lists_to_bbcode(text: str) -> str:
     """
-    Convert all lists in a passed markdown string to steam bbcode lists
+    Convert all lists in a passed markdown string to steam bbcode lists, leaving all other formatting alone
 
-    NOTE: collapses nested lists, full nested list support would require a full parser
+    Nested lists (by indentation) become nested bbcode lists, see `methods.bbcode_methods`
     """
-    # regex to capture a full markdown list
-    markdown_list_pattern = re.compile(r"^[\t ]*((?:^|\n)[\t ]*- .*(?:\n[\t ]*- .*)*)", re.MULTILINE)
-    # NOTE: does not make separate lists depending on indentation
-
-    # use helper method to replace markdown lists with BBCode lists
-    converted_text = markdown_list_pattern.sub(replace_markdown_list_with_bbcode, text)
-    return converted_text
+    return convert_markdown_to_bbcode(text, lists_only=True)
 
 
 def replace_with_steam_formatting(markdown_string: str) -> str:
     """
-    Very basic format conversion, NOT a proper parser and will not work for arbitrary markdown
+    Convert a markdown changelog entry to steam bbcode, for the workshop change note
 
-    Consider using a proper full parser instead, or keep changelogs very simple and regular
+    Streams over the text once, see `methods.bbcode_methods` for what is supported. Changelog entry titles
+    (`## ...:` lines) are dropped, since the change note template already has the mod name and release link.
 
     Turns something like:
 
@@ -631,13 +599,11 @@ def replace_with_steam_formatting(markdown_string: str) -> str:
     [*] Item 5, contains [b][noparse]code text[/noparse][/b]
     [*] Item 6, contains [u]underline text[/u]
     [*] Item 7:
-    [/list]
         [code]
         multiline
         code
         block
         [/code]
-    [list]
     [*] Item 8
     [/list]
     Misc.
@@ -645,37 +611,13 @@ def replace_with_steam_formatting(markdown_string: str) -> str:
     [*] Item 1
     [*] Item 2
     [*] Item 3
+        [list]
         [*] Item 31
         [*] Item 32
+        [/list]
     [*] Item-4
     [/list]
     [hr][/hr]
     ```
     """
-    # initiate
-    steamed_string = markdown_string
-
-    # simple tag replacements
-    replacement_dict = {
-        r"^[\t ]*---": "[hr][/hr]",  # horizontal rule
-        r"^[\t ]*## .*?:\n": "",  # empty the header line with modname and mod link, we have this already from template
-        r"\[([^\[]+?)\]\((.+?)\)": "[url=\\g<2>]\\g<1>[/url]",  # links
-        r"(?<!\*)(\*\*)(?!\*)(.+?)(?<!\*)(\*\*)(?!\*)": "[b]\\g<2>[/b]",  # bold
-        r"(?<!\*)(\*)(?!\*)(.+?)(?<!\*)(\*)(?!\*)": "[i]\\g<2>[/i]",  # italic
-        r"~~(.+?)~~": "[strike]\\g<1>[/strike]",  # strikethrough
-        r"`([^`\n]+?)`": "[b][noparse]\\g<1>[/noparse][/b]",  # code
-        r"__(.+?)__": "[u]\\g<1>[/u]",  # underline
-        r"```(.+?)```": "[code]\\g<1>[/code]",  # code block
-    }
-    for selected_pattern, selected_replacementstr in replacement_dict.items():
-        steamed_string = re.sub(
-            selected_pattern,
-            selected_replacementstr,
-            steamed_string,
-            flags=re.IGNORECASE | re.MULTILINE | re.DOTALL,
-        )
-
-    # lists
-    steamed_string = convert_markdown_lists_to_bbcode(steamed_string)
-
-    return steamed_string
+    return convert_markdown_to_bbcode(markdown_string)
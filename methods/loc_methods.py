@@ -0,0 +1,329 @@
+"""
+Functions for updating localisation (loc) files
+
+Patches any number of loc keys in any number of loc files, with one streaming scan per file.
+
+Which files to patch can be found with a loc key index: every `localisation/**/*_l_*.yml` file of the mod is parsed
+(in parallel) into the keys it defines, with line numbers and byte offsets. Given the `loc_key_pattern` used for
+patching, only the entries that pattern matches are indexed (like only `:0` entries by default), so every file the
+index finds for a key can be patched. The index is kept in a sidecar JSON file, and only files whose size or
+modification time changed since are parsed again.
+"""
+
+import functools
+import json
+import re
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from methods.file_methods import get_file_overlay, record_changed_file, stream_rewrite_file, write_file_if_changed
+
+# below this total size, worker process startup costs more than patching the files in-process
+parallel_loc_patch_min_bytes = 8_000_000
+# bump when the index layout changes, so old sidecar files are rebuilt
+loc_key_index_format_version = 1
+loc_file_glob = "localisation/**/*_l_*.yml"
+# a loc entry line, like ` my_key:0 "value"`, the language header `l_english:` has no value so never matches
+loc_entry_line_pattern = re.compile(rb'^[ \t]*(?P<loc_key>[\w.\-]+):\d*[ \t]+"')
+# any loc key, put into `loc_key_pattern` to index the entries that pattern can patch
+loc_key_name_pattern = r"(?P<loc_key>[\w.\-]+)"
+
+
+@dataclass(slots=True)
+class LocPatchResult:
+    """Outcome of patching one loc file"""
+
+    file_path: Path
+    matches: dict[str, int] = field(default_factory=dict)
+    """Number of replacements made per loc key, keys with no matches are included with 0"""
+    changed: bool = False
+    """Whether the file content changed, and so was written"""
+
+
+@functools.lru_cache(maxsize=64)
+def compile_loc_key_pattern(loc_key_pattern: str, loc_keys: tuple[str, ...]) -> re.Pattern:
+    r"""
+    Insert every loc key into the generic `loc_key_pattern` at once, as a named `loc_key` alternation
+
+    The generic pattern has a `{}` placeholder for the key and two regex groups around the text to replace,
+    like the default `(\s{}:0\s").+?(")`. Longer keys go first, so a key that is a prefix of another can't shadow it.
+    """
+    keys_alternation = "|".join(re.escape(loc_key) for loc_key in sorted(loc_keys, key=len, reverse=True))
+    return re.compile(
+        loc_key_pattern.format(f"(?P<loc_key>{keys_alternation})"),
+        flags=re.IGNORECASE | re.MULTILINE | re.DOTALL,
+    )
+
+
+@functools.lru_cache(maxsize=16)
+def compile_loc_entry_line_pattern(loc_key_pattern: str | None) -> re.Pattern[bytes]:
+    """Pattern for a loc entry line `loc_key_pattern` can patch, with any key, or any entry line for None"""
+    if loc_key_pattern is None:
+        return loc_entry_line_pattern
+    return re.compile(
+        loc_key_pattern.format(loc_key_name_pattern).encode("utf-8"), flags=re.IGNORECASE | re.MULTILINE | re.DOTALL
+    )
+
+
+def patch_loc_string(loc_string: str, loc_key_pattern: str, loc_key_values: dict[str, str]) -> tuple[str, dict[str, int]]:
+    """
+    Replace the values of all given loc keys in a loc file string, in one scan
+
+    Returns the new string and the number of replacements per key.
+    """
+    compiled_pattern = compile_loc_key_pattern(loc_key_pattern, tuple(loc_key_values))
+    # the surrounding groups are whichever groups are not the inserted key group
+    key_group_index = compiled_pattern.groupindex["loc_key"]
+    surrounding_groups = [index for index in range(1, compiled_pattern.groups + 1) if index != key_group_index]
+    first_group, last_group = surrounding_groups[0], surrounding_groups[-1]
+
+    # IGNORECASE means the matched key text can differ in case from the requested key
+    requested_keys = {loc_key.lower(): loc_key for loc_key in loc_key_values}
+    matches = dict.fromkeys(loc_key_values, 0)
+
+    def replace_loc_value(match: re.Match) -> str:
+        loc_key = requested_keys[match["loc_key"].lower()]
+        matches[loc_key] += 1
+        return match.group(first_group) + loc_key_values[loc_key] + match.group(last_group)
+
+    return compiled_pattern.sub(replace_loc_value, loc_string), matches
+
+
+def patch_loc_file(file_path: Path, loc_key_pattern: str, loc_key_values: dict[str, str]) -> LocPatchResult:
+    """
+    Patch all given loc keys in one loc file, only writing the file back if anything changed
+
+    The file is streamed in chunks of whole lines (see `stream_rewrite_file`), so memory stays bounded for generated loc
+    files of any size. Loc values are single lines, so the loc key pattern never matches across chunks.
+    Line endings are kept exactly as they were, loc files are UTF-8 (with BOM, kept as-is).
+    """
+    matches = dict.fromkeys(loc_key_values, 0)
+
+    def patch_chunk(loc_chunk: str) -> str:
+        new_loc_chunk, chunk_matches = patch_loc_string(loc_chunk, loc_key_pattern, loc_key_values)
+        for loc_key, match_count in chunk_matches.items():
+            matches[loc_key] += match_count
+        return new_loc_chunk
+
+    changed = stream_rewrite_file(file_path, patch_chunk)
+    return LocPatchResult(file_path=file_path, matches=matches, changed=changed)
+
+
+def patch_loc_files(
+    file_paths: Iterable[Path],
+    loc_key_pattern: str,
+    loc_key_values: dict[str, str],
+    *,
+    max_workers: int | None = None,
+) -> list[LocPatchResult]:
+    """
+    Patch many loc keys (version, supported version, release date, ...) in many loc files
+
+    Each file is scanned once for all keys together. Files are patched on a process pool when there is enough data
+    to make that worthwhile, otherwise in order in this process (always while a file overlay is set, the workers would
+    write to disk). Unchanged files are not rewritten.
+
+    Parameters
+    ----------
+    file_paths : Iterable[Path]
+        Loc files to patch
+    loc_key_pattern : str
+        Generic loc search pattern with a `{}` placeholder for the key and two regex groups around the value
+    loc_key_values : dict[str, str]
+        New value for each loc key
+    max_workers : int | None, optional
+        Process pool size, by default picked by `ProcessPoolExecutor`
+
+    Returns
+    -------
+    results : list[LocPatchResult]
+        One result per file, in input order, with matches per key and whether the file changed
+
+    """
+    file_paths = list(file_paths)
+    if not file_paths or not loc_key_values:
+        return [LocPatchResult(file_path=file_path, matches=dict.fromkeys(loc_key_values, 0)) for file_path in file_paths]
+
+    total_bytes = sum(file_path.stat().st_size for file_path in file_paths)
+    if len(file_paths) == 1 or total_bytes < parallel_loc_patch_min_bytes or max_workers == 1 or get_file_overlay() is not None:
+        return [patch_loc_file(file_path, loc_key_pattern, loc_key_values) for file_path in file_paths]
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(patch_loc_file, file_path, loc_key_pattern, loc_key_values) for file_path in file_paths]
+        loc_patch_results = [future.result() for future in futures]
+    # the workers recorded the files they wrote in their own process
+    for loc_patch_result in loc_patch_results:
+        if loc_patch_result.changed:
+            record_changed_file(loc_patch_result.file_path)
+    return loc_patch_results
+
+
+@dataclass(slots=True, frozen=True)
+class LocKeyLocation:
+    """Where a loc key is defined"""
+
+    file_path: str
+    """Posix path relative to the indexed folder"""
+    line_number: int
+    """1-based"""
+    offset: int
+    """Byte offset of the start of the line"""
+
+
+@dataclass(slots=True)
+class LocFileKeys:
+    """Keys defined in one loc file, with the file state they were parsed from"""
+
+    file_size: int
+    file_mtime_ns: int
+    keys: dict[str, list[tuple[int, int]]] = field(default_factory=dict)
+    """Lowercase key to (line number, byte offset) of each definition"""
+
+
+@dataclass(slots=True)
+class LocKeyIndex:
+    """Keys of all loc files under one folder"""
+
+    folder_path: Path
+    files: dict[str, LocFileKeys] = field(default_factory=dict)
+    """Posix path relative to `folder_path` to the keys in that file, sorted by path"""
+    loc_key_pattern: str | None = None
+    """Pattern the indexed entries match, None for every entry line"""
+
+    def find(self, loc_key: str) -> list[LocKeyLocation]:
+        """All definitions of `loc_key` (case insensitive, like the game), in file order"""
+        loc_key = loc_key.lower()
+        return [
+            LocKeyLocation(relative_path, line_number, offset)
+            for relative_path, loc_file_keys in self.files.items()
+            for line_number, offset in loc_file_keys.keys.get(loc_key, [])
+        ]
+
+    def find_files(self, loc_keys: Iterable[str]) -> list[Path]:
+        """Files defining any of `loc_keys`, in path order"""
+        lowercase_keys = {loc_key.lower() for loc_key in loc_keys}
+        return [
+            self.folder_path / relative_path
+            for relative_path, loc_file_keys in self.files.items()
+            if not lowercase_keys.isdisjoint(loc_file_keys.keys)
+        ]
+
+
+def parse_loc_file_keys(file_path: Path, loc_key_pattern: str | None = None) -> LocFileKeys:
+    r"""
+    Keys defined in a loc file, read line by line as bytes so offsets are exact
+
+    With `loc_key_pattern`, only the keys of lines it matches. Lines after the first are searched with their leading
+    line break, like the patcher sees them in the whole file, so a `\s` before the key matches at the line start.
+    """
+    compiled_pattern = compile_loc_entry_line_pattern(loc_key_pattern)
+    file_stat = file_path.stat()
+    loc_file_keys = LocFileKeys(file_size=file_stat.st_size, file_mtime_ns=file_stat.st_mtime_ns)
+    offset = 0
+    with Path.open(file_path, "rb") as loc_file_object:
+        for line_number, line in enumerate(loc_file_object, start=1):
+            if loc_key_pattern is None:
+                line_match = compiled_pattern.match(line.removeprefix(b"\xef\xbb\xbf") if line_number == 1 else line)
+            else:
+                line_match = compiled_pattern.search(line if line_number == 1 else b"\n" + line)
+            if line_match is not None:
+                loc_key = line_match["loc_key"].decode("utf-8").lower()
+                loc_file_keys.keys.setdefault(loc_key, []).append((line_number, offset))
+            offset += len(line)
+    return loc_file_keys
+
+
+def load_loc_key_index(index_file_path: Path, folder_path: Path) -> LocKeyIndex | None:
+    """Read a sidecar index file, None if it is missing, broken, for another folder, or from another format version"""
+    try:
+        with Path.open(index_file_path, encoding="utf-8") as index_file_object:
+            index_dict = json.load(index_file_object)
+        if index_dict["format_version"] != loc_key_index_format_version or index_dict["folder_path"] != str(folder_path):
+            return None
+        return LocKeyIndex(
+            folder_path=folder_path,
+            loc_key_pattern=index_dict["loc_key_pattern"],
+            files={
+                relative_path: LocFileKeys(
+                    file_size=file_dict["file_size"],
+                    file_mtime_ns=file_dict["file_mtime_ns"],
+                    keys={
+                        loc_key: [tuple(location) for location in locations] for loc_key, locations in file_dict["keys"].items()
+                    },
+                )
+                for relative_path, file_dict in index_dict["files"].items()
+            },
+        )
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def save_loc_key_index(loc_key_index: LocKeyIndex, index_file_path: Path) -> None:
+    index_dict = {
+        "format_version": loc_key_index_format_version,
+        "folder_path": str(loc_key_index.folder_path),
+        "loc_key_pattern": loc_key_index.loc_key_pattern,
+        "files": {
+            relative_path: {
+                "file_size": loc_file_keys.file_size,
+                "file_mtime_ns": loc_file_keys.file_mtime_ns,
+                "keys": loc_file_keys.keys,
+            }
+            for relative_path, loc_file_keys in loc_key_index.files.items()
+        },
+    }
+    write_file_if_changed(index_file_path, json.dumps(index_dict))
+
+
+def get_loc_key_index(
+    folder_path: Path,
+    index_file_path: Path | None = None,
+    *,
+    loc_key_pattern: str | None = None,
+    max_workers: int | None = None,
+) -> LocKeyIndex:
+    """
+    Index of the keys in every `localisation/**/*_l_*.yml` file under `folder_path`
+
+    Only keys of entries `loc_key_pattern` matches are indexed, every entry line if None. Files with the same size and
+    modification time as in the sidecar index (made with the same pattern) are taken from it, the rest are parsed, on a
+    process pool if there is enough data to make that worthwhile. The updated index is saved back.
+    """
+    folder_path = Path(folder_path).resolve()
+    previous_index = load_loc_key_index(index_file_path, folder_path) if index_file_path is not None else None
+    previous_files = {}
+    if previous_index is not None and previous_index.loc_key_pattern == loc_key_pattern:
+        previous_files = previous_index.files
+
+    loc_files: dict[str, LocFileKeys | None] = {}
+    file_paths_to_parse: dict[str, Path] = {}
+    for file_path in sorted(folder_path.glob(loc_file_glob)):
+        relative_path = file_path.relative_to(folder_path).as_posix()
+        file_stat = file_path.stat()
+        previous_file_keys = previous_files.get(relative_path)
+        if (
+            previous_file_keys is not None
+            and previous_file_keys.file_size == file_stat.st_size
+            and previous_file_keys.file_mtime_ns == file_stat.st_mtime_ns
+        ):
+            loc_files[relative_path] = previous_file_keys
+        else:
+            loc_files[relative_path] = None
+            file_paths_to_parse[relative_path] = file_path
+
+    total_bytes = sum(file_path.stat().st_size for file_path in file_paths_to_parse.values())
+    if len(file_paths_to_parse) <= 1 or total_bytes < parallel_loc_patch_min_bytes or max_workers == 1:
+        parsed_files = [parse_loc_file_keys(file_path, loc_key_pattern) for file_path in file_paths_to_parse.values()]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            parsed_files = list(
+                executor.map(parse_loc_file_keys, file_paths_to_parse.values(), [loc_key_pattern] * len(file_paths_to_parse))
+            )
+    loc_files.update(zip(file_paths_to_parse, parsed_files, strict=True))
+
+    loc_key_index = LocKeyIndex(folder_path=folder_path, files=loc_files, loc_key_pattern=loc_key_pattern)  # ty:ignore[invalid-argument-type] all parsed now
+    if index_file_path is not None:
+        save_loc_key_index(loc_key_index, index_file_path)
+    return loc_key_index
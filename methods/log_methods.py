@@ -0,0 +1,102 @@
+"""
+Logging setup for the scripts
+
+Everything logs through `logging` with lazy `%s` formatting, so messages below the configured level are never built.
+The scripts call `configure_logging` once with the `debug_level` setting from `constants_and_overrides`:
+
+- "SILENT" only shows warnings and errors,
+- "INFO" adds inputs, paths and results,
+- "DEBUG" adds parsing and processing details.
+
+Setting the `logFormat` env variable to `json` writes one JSON object per line instead of plain text, with any extra
+fields passed as `extra={"fields": {...}}`. Values of secret env variables (like `configVdf`) read through
+`get_env_variable` are replaced by `***` in every message, in both formats.
+"""
+
+import datetime as dt
+import json
+import logging
+import os
+import sys
+from typing import TextIO
+
+log_levels = {"SILENT": logging.WARNING, "INFO": logging.INFO, "DEBUG": logging.DEBUG}
+log_format_env_variable_name = "logFormat"
+
+# env variables whose values must never show up in logs
+secret_env_variable_names = frozenset({"configVdf", "steam_username", "GH_TOKEN", "GITHUB_TOKEN"})
+redacted_text = "***"
+# shorter values would redact ordinary words
+min_secret_length = 4
+
+_secret_values: set[str] = set()
+
+
+def register_secret(value: str | None) -> None:
+    """Redact `value` from all log output from now on"""
+    if value and len(value) >= min_secret_length:
+        _secret_values.add(value)
+
+
+def redact(text: str) -> str:
+    for secret_value in _secret_values:
+        if secret_value in text:
+            text = text.replace(secret_value, redacted_text)
+    return text
+
+
+class RedactingFormatter(logging.Formatter):
+    """Plain text formatter that redacts registered secrets"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return redact(super().format(record))
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per record, with time, level, logger, message and any `fields` passed as extra"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        log_entry = {
+            "time": dt.datetime.fromtimestamp(record.created, tz=dt.UTC).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            log_entry.update(fields)
+        if record.exc_info:
+            log_entry["exception"] = self.formatException(record.exc_info)
+        return redact(json.dumps(log_entry, default=str, ensure_ascii=False))
+
+
+class ScriptLogHandler(logging.StreamHandler):
+    """Handler installed by `configure_logging`, so a later call knows which one to replace"""
+
+
+def configure_logging(
+    debug_level: str = "INFO", log_format: str | None = None, *, stream: TextIO | None = None
+) -> logging.Handler:
+    """
+    Send all log records at `debug_level` and above to `stream` (stdout by default), as text or JSON lines
+
+    Replaces the handler of an earlier call, so it can be called again with another level (or another stdout, like the
+    per-mod log files of a batch run). `log_format` defaults to the `logFormat` env variable, then "text".
+    """
+    if debug_level not in log_levels:
+        msg = f'Debug level must be one of {", ".join(log_levels)}, got "{debug_level}"'
+        raise ValueError(msg)
+    log_format = log_format or os.environ.get(log_format_env_variable_name) or "text"
+    if log_format not in {"text", "json"}:
+        msg = f'Log format must be "text" or "json", got "{log_format}"'
+        raise ValueError(msg)
+
+    root_logger = logging.getLogger()
+    for handler in root_logger.handlers[:]:
+        if isinstance(handler, ScriptLogHandler):
+            root_logger.removeHandler(handler)
+    handler = ScriptLogHandler(sys.stdout if stream is None else stream)
+    handler.setFormatter(JsonLinesFormatter() if log_format == "json" else RedactingFormatter("%(message)s"))
+    root_logger.addHandler(handler)
+    root_logger.setLevel(log_levels[debug_level])
+    return handler
@@ -4,17 +4,21 @@ Support for override functionality in script
 Used for example to allow user to override what is written to `descriptor.mod` file or override regex search patterns
 """
 
+import logging
 from pathlib import Path
 from typing import overload
 
-from methods.input_methods import parse_descriptor_to_dict
+from methods.cache_methods import ParseCache
+from methods.input_methods import parse_descriptor_string, parse_descriptor_to_dict
+
+logger = logging.getLogger(__name__)
 
 
 class OverrideClass:
     """Class to set up and support user overriding parameters/filenames/search patterns, etc."""
 
-    def __init__(self, mod_github_folder_path: Path, debug_level: str = "INFO") -> None:
-        """Fetch all user-specified overrides from a file `OVERRIDE.txt`"""
+    def __init__(self, mod_github_folder_path: Path, parse_cache: ParseCache | None = None) -> None:
+        """Fetch all user-specified overrides from a file `OVERRIDE.txt`, parsed or from `parse_cache`"""
         # file for potential overrides
         # makes no sense to change name, filename MUST be this
         override_file_name = "OVERRIDE.txt"
@@ -30,9 +34,14 @@ class OverrideClass:
 
         if override_file_path.exists():
             self.overrides_enabled = True
-            self.override_dict: dict[str, str | list[str]] = parse_descriptor_to_dict(
-                override_file_path, debug_level=debug_level
-            )
+            if parse_cache is None:
+                self.override_dict = parse_descriptor_to_dict(override_file_path)
+            else:
+                self.override_dict = parse_cache.get_or_parse(
+                    "overrides",
+                    override_file_path.read_bytes(),
+                    lambda override_bytes: parse_descriptor_string(override_bytes.decode("utf-8")),
+                )
 
         self.overriden_params: dict[str, bool] = {}
         """
@@ -41,14 +50,14 @@ class OverrideClass:
         This will correspond to all overrides that were tried *outside* of the class by surrounding script.
         """
 
-        if debug_level == "DEBUG":
-            print("- Overrides: -")
-            print(f"Override setting: {self.overrides_enabled}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("- Overrides: -")
+            logger.debug("Override setting: %s", self.overrides_enabled)
             if self.overrides_enabled:
                 for key, item in self.override_dict.items():
-                    print(f"{key}: {item}")
+                    logger.debug("%s: %s", key, item)
             else:
-                print("No overrides")
+                logger.debug("No overrides")
 
     @overload
     def get_parameter(self, parameter_name: str, parameter_default: str) -> str: ...
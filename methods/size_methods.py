@@ -0,0 +1,362 @@
+"""
+Functions for the size report of the mod content, and checking it against size budgets
+
+The mod folder is walked once (with the mod's walk rules, so the report covers exactly what is zipped and uploaded).
+Raw and estimated compressed sizes are added up per top-level folder (`gfx`, `common`, `localisation`, ...) and per
+extension, and the largest files are listed. The compressed size follows the release zip's `CompressionPolicy`:
+stored files count in full, deflated files are estimated from a compressed sample of their start.
+
+The report is compared with the one from the previous run, and checked against budgets from `OVERRIDE.txt`, each
+`name=size` with decimal (`MB`) or binary (`MiB`) units:
+
+```
+size_budgets={
+    "total=500MB"
+    "compressed=300MB"
+    "growth=50MB"
+    "gfx/=400MB"
+    ".dds=350MB"
+    "file=20MB"
+}
+```
+
+`total` and `compressed` cap the whole mod, `growth` the raw size increase since the previous report, `folder/` one
+top-level folder, `.ext` one extension and `file` the largest single file. Budgets are checked before the release zip
+is built or steamcmd is started, so an accidental texture dump fails fast.
+"""
+
+import json
+import logging
+import math
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from methods.archive_methods import CompressionPolicy, compress_bytes
+from methods.file_methods import append_to_file, write_file_if_changed
+from methods.walk_methods import WalkRules, walk_folder
+
+logger = logging.getLogger(__name__)
+
+# bump when the report layout changes, so an old previous report is ignored
+size_report_format_version = 1
+largest_file_count = 20
+# bytes from the start of a deflated file that are compressed to estimate its ratio
+compression_sample_bytes = 1 << 16
+# key for files directly in the mod folder, in the per-folder totals
+root_folder_key = "."
+no_extension_key = "(none)"
+size_units = {
+    "": 1,
+    "b": 1,
+    "kb": 1000,
+    "mb": 1000**2,
+    "gb": 1000**3,
+    "kib": 1024,
+    "mib": 1024**2,
+    "gib": 1024**3,
+}
+byte_size_pattern = re.compile(r"^\s*(?P<number>\d+(\.\d*)?)\s*(?P<unit>[a-z]*)\s*$", flags=re.IGNORECASE)
+whole_mod_budget_names = ("total", "compressed", "growth", "file")
+
+
+def parse_byte_size(size_string: str) -> int:
+    """
+    Number of bytes in a size like `500MB`, `1.5 GiB` or `1000`
+
+    Raises
+    ------
+    ValueError
+        If the size can't be parsed, or has an unknown unit
+
+    """
+    size_match = byte_size_pattern.match(size_string)
+    if size_match is None or size_match["unit"].lower() not in size_units:
+        msg = f'Size must be a number with an optional unit like "500MB" or "1.5GiB", got "{size_string}"'
+        raise ValueError(msg)
+    return int(float(size_match["number"]) * size_units[size_match["unit"].lower()])
+
+
+def format_byte_size(size: int) -> str:
+    """Size in decimal units with 3 significant digits, like `12.3 MB`, negative for shrinking deltas"""
+    for unit, unit_size in (("GB", 1000**3), ("MB", 1000**2), ("kB", 1000)):
+        if abs(size) >= unit_size:
+            return f"{size / unit_size:.3g} {unit}"
+    return f"{size} B"
+
+
+@dataclass(slots=True)
+class SizeTotals:
+    """File count and sizes of a group of files"""
+
+    file_count: int = 0
+    size: int = 0
+    compressed_size: int = 0
+
+    def add(self, size: int, compressed_size: int) -> None:
+        self.file_count += 1
+        self.size += size
+        self.compressed_size += compressed_size
+
+
+@dataclass(slots=True, frozen=True)
+class FileSize:
+    """Sizes of one file"""
+
+    file_path: str
+    """Posix path relative to the mod folder"""
+    size: int
+    compressed_size: int
+
+
+@dataclass(slots=True)
+class SizeReport:
+    """Sizes of the mod content, in total, per top-level folder and per extension"""
+
+    total: SizeTotals = field(default_factory=SizeTotals)
+    folders: dict[str, SizeTotals] = field(default_factory=dict)
+    """Top-level folder name (`root_folder_key` for files directly in the mod folder) to its totals, largest first"""
+    extensions: dict[str, SizeTotals] = field(default_factory=dict)
+    """Lowercase extension with the dot (`no_extension_key` without one) to its totals, largest first"""
+    largest_files: list[FileSize] = field(default_factory=list)
+    """The `largest_file_count` largest files, largest first"""
+
+    def to_dict(self) -> dict:
+        return {"format_version": size_report_format_version, **asdict(self)}
+
+    @classmethod
+    def from_dict(cls, report_dict: dict) -> "SizeReport":
+        return cls(
+            total=SizeTotals(**report_dict["total"]),
+            folders={name: SizeTotals(**totals) for name, totals in report_dict["folders"].items()},
+            extensions={name: SizeTotals(**totals) for name, totals in report_dict["extensions"].items()},
+            largest_files=[FileSize(**file_size) for file_size in report_dict["largest_files"]],
+        )
+
+
+@dataclass(slots=True, frozen=True)
+class SizeBudget:
+    """Upper limit for one size in the report, see the module docstring for the names"""
+
+    name: str
+    limit: int
+
+    def get_size(self, report: SizeReport, previous_report: SizeReport | None) -> int | None:
+        """Size the budget applies to, None if there is nothing to check (like growth without a previous report)"""
+        if self.name == "total":
+            return report.total.size
+        if self.name == "compressed":
+            return report.total.compressed_size
+        if self.name == "growth":
+            return None if previous_report is None else report.total.size - previous_report.total.size
+        if self.name == "file":
+            return report.largest_files[0].size if report.largest_files else 0
+        if self.name.endswith("/"):
+            totals = report.folders.get(self.name.removesuffix("/"))
+        else:
+            totals = report.extensions.get(self.name.lower())
+        return 0 if totals is None else totals.size
+
+
+def parse_size_budgets(budget_entries: list[str]) -> list[SizeBudget]:
+    """
+    Budgets from `size_budgets` entries like `total=500MB`
+
+    Raises
+    ------
+    ValueError
+        If an entry isn't `name=size`, or the name isn't a known budget, a `folder/` or an `.ext`
+
+    """
+    size_budgets = []
+    for budget_entry in budget_entries:
+        name, separator, size_string = budget_entry.partition("=")
+        name = name.strip()
+        if not separator or not (name in whole_mod_budget_names or name.endswith("/") or name.startswith(".")):
+            msg = (
+                f'Size budget entries must be "name=size" with a name of {", ".join(whole_mod_budget_names)}, '
+                f'a "folder/" or an ".ext", got "{budget_entry}"'
+            )
+            raise ValueError(msg)
+        size_budgets.append(SizeBudget(name, parse_byte_size(size_string)))
+    return size_budgets
+
+
+def estimate_compressed_size(file_path: Path, size: int, compression_level: int) -> int:
+    """Compressed size of a file, exact up to `compression_sample_bytes` and scaled from a sample of its start above"""
+    if compression_level == 0 or size == 0:
+        return size
+    with Path.open(file_path, "rb") as file_object:
+        sample = file_object.read(compression_sample_bytes)
+    compressed_sample_size = len(compress_bytes(sample, compression_level))
+    if len(sample) >= size:
+        return compressed_sample_size
+    return math.ceil(size * compressed_sample_size / len(sample))
+
+
+def build_size_report(
+    folder_path: Path,
+    rules: WalkRules | None = None,
+    *,
+    compression_policy: CompressionPolicy | None = None,
+    max_workers: int | None = None,
+) -> SizeReport:
+    """
+    Size report of every file under `folder_path` that passes `rules`
+
+    Sizes come from the walk itself, only deflated files are read (a sample each), on a thread pool since `zlib`
+    releases the GIL. `compression_policy` is the release zip's, by default `CompressionPolicy.for_mod_files()`.
+    """
+    if compression_policy is None:
+        compression_policy = CompressionPolicy.for_mod_files()
+    file_sizes = [
+        (relative_path, dir_entry.path, dir_entry.stat().st_size)
+        for relative_path, dir_entry in walk_folder(folder_path, rules)
+    ]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        compressed_sizes = list(
+            executor.map(
+                lambda file_size: estimate_compressed_size(
+                    Path(file_size[1]), file_size[2], compression_policy.get_level(file_size[0])
+                ),
+                file_sizes,
+            )
+        )
+
+    size_report = SizeReport()
+    folders: dict[str, SizeTotals] = {}
+    extensions: dict[str, SizeTotals] = {}
+    all_files = []
+    for (relative_path, _, size), compressed_size in zip(file_sizes, compressed_sizes, strict=True):
+        folder_name, separator, _ = relative_path.partition("/")
+        folder_key = folder_name if separator else root_folder_key
+        extension_key = os.path.splitext(relative_path)[1].lower() or no_extension_key  # noqa: PTH122 on the str path
+        size_report.total.add(size, compressed_size)
+        folders.setdefault(folder_key, SizeTotals()).add(size, compressed_size)
+        extensions.setdefault(extension_key, SizeTotals()).add(size, compressed_size)
+        all_files.append(FileSize(relative_path, size, compressed_size))
+
+    # largest first, ties by name so the report is stable
+    size_report.folders = dict(sorted(folders.items(), key=lambda item: (-item[1].size, item[0])))
+    size_report.extensions = dict(sorted(extensions.items(), key=lambda item: (-item[1].size, item[0])))
+    size_report.largest_files = sorted(all_files, key=lambda file_size: (-file_size.size, file_size.file_path))[
+        :largest_file_count
+    ]
+    return size_report
+
+
+def load_size_report(report_file_path: Path) -> SizeReport | None:
+    """Report saved by an earlier run, None if it is missing, broken, or from another format version"""
+    try:
+        with Path.open(report_file_path, encoding="utf-8") as report_file_object:
+            report_dict = json.load(report_file_object)
+        if report_dict["format_version"] != size_report_format_version:
+            return None
+        return SizeReport.from_dict(report_dict)
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def save_size_report(size_report: SizeReport, report_file_path: Path) -> None:
+    write_file_if_changed(report_file_path, json.dumps(size_report.to_dict(), indent=4))
+
+
+def check_size_budgets(
+    size_report: SizeReport, size_budgets: list[SizeBudget], previous_report: SizeReport | None = None
+) -> list[str]:
+    """Descriptions of the exceeded budgets, empty if every budget holds"""
+    exceeded_budgets = []
+    for size_budget in size_budgets:
+        size = size_budget.get_size(size_report, previous_report)
+        if size is not None and size > size_budget.limit:
+            exceeded_budgets.append(
+                f"{size_budget.name} is {format_byte_size(size)}, over the budget of {format_byte_size(size_budget.limit)}"
+            )
+    return exceeded_budgets
+
+
+def format_size_delta(size: int, previous_size: int | None) -> str:
+    if previous_size is None:
+        return ""
+    return f"{'+' if size >= previous_size else ''}{format_byte_size(size - previous_size)}"
+
+
+def format_size_report(size_report: SizeReport, previous_report: SizeReport | None = None, title: str = "mod") -> str:
+    """Markdown tables of a report for the step summary, with the change since `previous_report` per row"""
+    previous_folders = {} if previous_report is None else previous_report.folders
+    previous_extensions = {} if previous_report is None else previous_report.extensions
+    lines = [
+        f"### Content size of `{title}`",
+        "",
+        "| Group | Files | Size | Compressed (est.) | Change |",
+        "| :--- | ---: | ---: | ---: | ---: |",
+    ]
+    group_rows = [
+        ("**total**", size_report.total, None if previous_report is None else previous_report.total),
+        *((f"`{name}/`", totals, previous_folders.get(name)) for name, totals in size_report.folders.items()),
+        *((f"`{name}`", totals, previous_extensions.get(name)) for name, totals in size_report.extensions.items()),
+    ]
+    for group_name, totals, previous_totals in group_rows:
+        # new groups count as grown from nothing once there is a previous report
+        previous_size = previous_totals.size if previous_totals is not None else (0 if previous_report else None)
+        lines.append(
+            f"| {group_name} | {totals.file_count} | {format_byte_size(totals.size)} | "
+            f"{format_byte_size(totals.compressed_size)} | {format_size_delta(totals.size, previous_size)} |"
+        )
+    lines.extend(["", "| Largest files | Size | Compressed (est.) |", "| :--- | ---: | ---: |"])
+    lines.extend(
+        f"| `{file_size.file_path}` | {format_byte_size(file_size.size)} | {format_byte_size(file_size.compressed_size)} |"
+        for file_size in size_report.largest_files
+    )
+    return "\n".join(lines) + "\n\n"
+
+
+def report_content_size(  # noqa: PLR0913
+    folder_path: Path,
+    report_file_path: Path,
+    previous_report_file_path: Path,
+    *,
+    size_budgets: list[SizeBudget],
+    rules: WalkRules | None = None,
+    title: str = "mod",
+) -> SizeReport:
+    """
+    Build the size report of a mod folder, write it out, and check it against `size_budgets`
+
+    The report goes to `report_file_path` as JSON and to the GitHub step summary (`GITHUB_STEP_SUMMARY`) as tables.
+    It is compared with the report at `previous_report_file_path`, and saved there for the next run once every
+    budget holds, so a failed run is compared with the last good one again.
+
+    Raises
+    ------
+    ValueError
+        Listing every exceeded budget
+
+    """
+    size_report = build_size_report(folder_path, rules)
+    previous_report = load_size_report(previous_report_file_path)
+    save_size_report(size_report, report_file_path)
+    step_summary = os.environ.get("GITHUB_STEP_SUMMARY")
+    if step_summary:
+        append_to_file(Path(step_summary), format_size_report(size_report, previous_report, title))
+
+    previous_size = None if previous_report is None else previous_report.total.size
+    logger.info(
+        "Content size of %s: %s in %s files, %s compressed (est.), %s",
+        title,
+        format_byte_size(size_report.total.size),
+        size_report.total.file_count,
+        format_byte_size(size_report.total.compressed_size),
+        f"{format_size_delta(size_report.total.size, previous_size)} since the previous report"
+        if previous_report is not None
+        else "no previous report",
+        extra={"fields": {"size_report": size_report.to_dict()}},
+    )
+    exceeded_budgets = check_size_budgets(size_report, size_budgets, previous_report)
+    if exceeded_budgets:
+        msg = f"Content of {title} is over its size budget: " + "; ".join(exceeded_budgets)
+        raise ValueError(msg)
+    save_size_report(size_report, previous_report_file_path)
+    return size_report
@@ -0,0 +1,159 @@
+"""
+Functions for content snapshots of workshop items, to skip uploads when nothing changed
+
+A snapshot records the relative path, size and SHA-256 of every file in a content folder, plus SHA-256s of the
+title, description and change note the item was uploaded with. Comparing the snapshot saved after the last upload
+with a fresh one gives the exact changed set, or nothing at all when the upload can be skipped.
+
+Snapshots are small JSON files, one per workshop item, meant to be kept between runs with `actions/cache` or as an
+artifact.
+"""
+
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from methods.file_methods import write_file_if_changed
+from methods.walk_methods import WalkRules, walk_folder
+
+snapshot_format_version = 1
+# metadata that is hashed next to the files, any change means the workshop page has to be updated
+snapshot_metadata_names = ("title", "description", "change_note")
+
+
+@dataclass(slots=True, frozen=True)
+class FileRecord:
+    """Size and SHA-256 of one file"""
+
+    size: int
+    sha256: str
+
+
+@dataclass(slots=True)
+class ContentSnapshot:
+    """Files of one content folder and hashes of the metadata it was uploaded with"""
+
+    item_id: str
+    files: dict[str, FileRecord] = field(default_factory=dict)
+    """Posix paths relative to the content folder, sorted"""
+    metadata: dict[str, str] = field(default_factory=dict)
+    """SHA-256 of each of `snapshot_metadata_names`"""
+
+
+@dataclass(slots=True)
+class SnapshotDiff:
+    """Exact differences between two snapshots of the same item"""
+
+    added: list[str] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+    modified: list[str] = field(default_factory=list)
+    metadata: list[str] = field(default_factory=list)
+    """Names of changed metadata, like `description`"""
+    no_previous_snapshot: bool = False
+
+    @property
+    def unchanged(self) -> bool:
+        return not (self.no_previous_snapshot or self.added or self.removed or self.modified or self.metadata)
+
+    def summary(self) -> str:
+        if self.no_previous_snapshot:
+            return "no previous snapshot"
+        if self.unchanged:
+            return "unchanged"
+        counts = [
+            f"{len(changed)} {name}"
+            for name, changed in [("added", self.added), ("removed", self.removed), ("modified", self.modified)]
+            if changed
+        ]
+        if self.metadata:
+            counts.append("changed " + ", ".join(self.metadata))
+        return "; ".join(counts)
+
+
+def hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def hash_file(file_path: Path) -> FileRecord:
+    with Path.open(file_path, "rb") as file_object:
+        digest = hashlib.file_digest(file_object, "sha256")
+    return FileRecord(size=file_path.stat().st_size, sha256=digest.hexdigest())
+
+
+def take_content_snapshot(
+    item_id: str,
+    content_folder_path: Path,
+    metadata: dict[str, str],
+    *,
+    rules: WalkRules | None = None,
+    max_workers: int | None = None,
+) -> ContentSnapshot:
+    """
+    Snapshot every file under `content_folder_path` that passes `rules`, and the metadata texts
+
+    The metadata is the title, description and change note. Files are hashed on a thread pool, `hashlib` releases the
+    GIL for larger reads.
+    """
+    file_paths = dict(
+        sorted((relative_path, Path(dir_entry.path)) for relative_path, dir_entry in walk_folder(content_folder_path, rules))
+    )
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        file_records = list(executor.map(hash_file, file_paths.values()))
+    return ContentSnapshot(
+        item_id=item_id,
+        files=dict(zip(file_paths, file_records, strict=True)),
+        metadata={name: hash_text(text) for name, text in metadata.items()},
+    )
+
+
+def compare_snapshots(previous_snapshot: ContentSnapshot | None, current_snapshot: ContentSnapshot) -> SnapshotDiff:
+    """Changed set from `previous_snapshot` to `current_snapshot`, everything counts as changed without a previous one"""
+    if previous_snapshot is None or previous_snapshot.item_id != current_snapshot.item_id:
+        return SnapshotDiff(added=sorted(current_snapshot.files), no_previous_snapshot=True)
+    previous_files, current_files = previous_snapshot.files, current_snapshot.files
+    return SnapshotDiff(
+        added=sorted(current_files.keys() - previous_files.keys()),
+        removed=sorted(previous_files.keys() - current_files.keys()),
+        modified=sorted(
+            relative_path
+            for relative_path in current_files.keys() & previous_files.keys()
+            if current_files[relative_path] != previous_files[relative_path]
+        ),
+        metadata=sorted(
+            name
+            for name in current_snapshot.metadata.keys() | previous_snapshot.metadata.keys()
+            if current_snapshot.metadata.get(name) != previous_snapshot.metadata.get(name)
+        ),
+    )
+
+
+def save_content_snapshot(snapshot: ContentSnapshot, snapshot_file_path: Path) -> None:
+    snapshot_dict = {
+        "format_version": snapshot_format_version,
+        "item_id": snapshot.item_id,
+        "metadata": snapshot.metadata,
+        "files": {relative_path: [record.size, record.sha256] for relative_path, record in snapshot.files.items()},
+    }
+    # an interrupted save must not leave a truncated snapshot for the next run
+    write_file_if_changed(snapshot_file_path, json.dumps(snapshot_dict, indent=1))
+
+
+def load_content_snapshot(snapshot_file_path: Path) -> ContentSnapshot | None:
+    """Load a saved snapshot, None if it is missing, unreadable, or from another format version"""
+    try:
+        with Path.open(snapshot_file_path, encoding="utf-8") as snapshot_file_object:
+            snapshot_dict = json.load(snapshot_file_object)
+        if snapshot_dict["format_version"] != snapshot_format_version:
+            return None
+        return ContentSnapshot(
+            item_id=snapshot_dict["item_id"],
+            files={
+                relative_path: FileRecord(size=size, sha256=sha256)
+                for relative_path, (size, sha256) in snapshot_dict["files"].items()
+            },
+            metadata=snapshot_dict["metadata"],
+        )
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
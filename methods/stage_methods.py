@@ -0,0 +1,226 @@
+"""
+Functions for running the steps of a script as a small graph of stages
+
+Each stage declares what it reads (`inputs`) and writes (`outputs`), by name: a file, or a value another stage works
+out. A stage runs after the stages writing its inputs, and after earlier stages writing one of its outputs, so the
+result is the same as running the stages in the order they were added. Everything else runs concurrently on a thread
+pool, the stages of the release scripts mostly wait on file I/O.
+
+Stages that start a process pool are added with `main_thread=True`. They run one after another on the calling thread,
+before any other stage, since forking a process while other threads are running can deadlock.
+
+A failing stage doesn't stop the others. The stages that depend on it are skipped, the rest still run, and all errors
+are raised together at the end. The wall time of a run is reported next to its critical path, the longest chain of
+dependent stages, which is what the wall time is bound by now instead of the sum of all stages.
+"""
+
+import logging
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class Stage:
+    """One step of a script, `run` is called without arguments and what it returns is the value of the stage"""
+
+    name: str
+    run: Callable[[], Any]
+    inputs: tuple[str, ...] = ()
+    outputs: tuple[str, ...] = ()
+    dependencies: tuple[str, ...] = ()
+    """Names of the stages that must finish first, worked out from the inputs and outputs"""
+    main_thread: bool = False
+    """Whether the stage runs on the calling thread before the thread pool starts, for stages that fork"""
+
+
+@dataclass(slots=True)
+class StageResult:
+    """Outcome of one stage, times are in seconds from the start of the run"""
+
+    name: str
+    value: Any = None
+    error: Exception | None = None
+    skipped: bool = False
+    start_seconds: float = 0.0
+    wall_seconds: float = 0.0
+
+
+class StageGraph:
+    """Stages of one script (or part of it), in the order they would run one after another"""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.stages: dict[str, Stage] = {}
+        self.results: dict[str, StageResult] = {}
+        self.wall_seconds = 0.0
+        # last stage writing each output so far
+        self._writers: dict[str, str] = {}
+
+    def add_stage(
+        self,
+        name: str,
+        run: Callable[[], Any],
+        *,
+        inputs: Iterable[str] = (),
+        outputs: Iterable[str] = (),
+        main_thread: bool = False,
+    ) -> Stage:
+        """
+        Add a stage, after all stages added so far
+
+        Set `main_thread` for a stage that starts a process pool, it then runs on the calling thread before the others.
+
+        Raises
+        ------
+        ValueError
+            If the name is taken, an input is not an output of an earlier stage, or a `main_thread` stage depends on a
+            stage that isn't one
+
+        """
+        if name in self.stages:
+            msg = f"Stage {name} is already part of {self.name}"
+            raise ValueError(msg)
+        inputs = tuple(inputs)
+        outputs = tuple(outputs)
+        dependencies: dict[str, None] = {}
+        for stage_input in inputs:
+            if stage_input not in self._writers:
+                msg = f"Stage {name} of {self.name} reads {stage_input}, which no earlier stage writes"
+                raise ValueError(msg)
+            dependencies[self._writers[stage_input]] = None
+        for stage_output in outputs:
+            if stage_output in self._writers:
+                dependencies[self._writers[stage_output]] = None
+            self._writers[stage_output] = name
+        if main_thread and not all(self.stages[dependency].main_thread for dependency in dependencies):
+            msg = f"Stage {name} of {self.name} runs on the main thread, so it can only depend on stages that do too"
+            raise ValueError(msg)
+        stage = Stage(name, run, inputs, outputs, tuple(dependencies), main_thread)
+        self.stages[name] = stage
+        return stage
+
+    def get_value(self, name: str) -> Any:  # noqa: ANN401 whatever the stage returned
+        """Value of a stage that finished, for the stages reading its outputs"""
+        return self.results[name].value
+
+    def run(self, *, max_workers: int | None = None) -> dict[str, StageResult]:
+        """
+        Run every stage once its dependencies are done, `max_workers` at a time (thread pool default if None)
+
+        Returns the results by stage name, in the order the stages were added.
+
+        Raises
+        ------
+        ExceptionGroup
+            With the error of every failed stage, raised once all stages that could run have finished
+
+        """
+        self.results = {}
+        start_time = time.perf_counter()
+        pending_stages = dict(self.stages)
+        running_stages: dict[Future[StageResult], str] = {}
+        # no pool threads exist yet, so these can fork safely, they only depend on each other
+        for name, stage in self.stages.items():
+            if stage.main_thread:
+                del pending_stages[name]
+                if not self._skip_if_dependency_failed(stage):
+                    self.results[name] = self._run_stage(stage, start_time)
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=self.name) as executor:
+            while pending_stages or running_stages:
+                # dependencies are always added earlier, so one pass in order settles every stage that can start
+                for name, stage in list(pending_stages.items()):
+                    if any(dependency not in self.results for dependency in stage.dependencies):
+                        continue
+                    del pending_stages[name]
+                    if not self._skip_if_dependency_failed(stage):
+                        running_stages[executor.submit(self._run_stage, stage, start_time)] = name
+                if not running_stages:
+                    break
+                finished_futures, _ = wait(running_stages, return_when=FIRST_COMPLETED)
+                for future in finished_futures:
+                    self.results[running_stages.pop(future)] = future.result()
+        self.wall_seconds = time.perf_counter() - start_time
+        self.results = {name: self.results[name] for name in self.stages}
+        self.log_summary()
+
+        failed_results = [result for result in self.results.values() if result.error is not None]
+        if failed_results:
+            msg = f"{len(failed_results)} of {len(self.stages)} stages of {self.name} failed:\n" + "\n".join(
+                f"{result.name}: {type(result.error).__name__}: {result.error}" for result in failed_results
+            )
+            raise ExceptionGroup(msg, [result.error for result in failed_results])
+        return self.results
+
+    def _skip_if_dependency_failed(self, stage: Stage) -> bool:
+        """Record `stage` as skipped if one of its finished dependencies failed or was skipped itself"""
+        failed_dependencies = [
+            dependency
+            for dependency in stage.dependencies
+            if self.results[dependency].error is not None or self.results[dependency].skipped
+        ]
+        if not failed_dependencies:
+            return False
+        logger.warning("Stage %s skipped, %s did not finish", stage.name, ", ".join(failed_dependencies))
+        self.results[stage.name] = StageResult(stage.name, skipped=True)
+        return True
+
+    @staticmethod
+    def _run_stage(stage: Stage, start_time: float) -> StageResult:
+        stage_start_time = time.perf_counter()
+        result = StageResult(stage.name, start_seconds=stage_start_time - start_time)
+        try:
+            result.value = stage.run()
+        except Exception as err:  # noqa: BLE001 collected and raised together after the run
+            logger.error("Stage %s failed: %s", stage.name, err)  # noqa: TRY400 the traceback comes with the group
+            result.error = err
+        result.wall_seconds = time.perf_counter() - stage_start_time
+        logger.debug("Stage %s done in %.3f s", stage.name, result.wall_seconds)
+        return result
+
+    def get_critical_path(self) -> tuple[list[str], float]:
+        """Longest chain of dependent stages by wall time, and its length in seconds"""
+        path_seconds: dict[str, float] = {}
+        path_previous: dict[str, str | None] = {}
+        for name, stage in self.stages.items():
+            result = self.results.get(name)
+            previous = max(stage.dependencies, key=path_seconds.__getitem__, default=None)
+            path_previous[name] = previous
+            path_seconds[name] = (0.0 if result is None else result.wall_seconds) + (
+                0.0 if previous is None else path_seconds[previous]
+            )
+        if not path_seconds:
+            return [], 0.0
+        last_name: str | None = max(path_seconds, key=path_seconds.__getitem__)
+        critical_path_seconds = path_seconds[last_name]
+        critical_path = []
+        while last_name is not None:
+            critical_path.append(last_name)
+            last_name = path_previous[last_name]
+        return critical_path[::-1], critical_path_seconds
+
+    def log_summary(self) -> None:
+        stage_seconds = sum(result.wall_seconds for result in self.results.values())
+        critical_path, critical_path_seconds = self.get_critical_path()
+        logger.info(
+            "Stages of %s: %.3f s wall, critical path %.3f s (%s), %.3f s summed over %s stages",
+            self.name,
+            self.wall_seconds,
+            critical_path_seconds,
+            " -> ".join(critical_path),
+            stage_seconds,
+            len(self.results),
+            extra={
+                "fields": {
+                    "stage_graph": self.name,
+                    "wall_seconds": self.wall_seconds,
+                    "critical_path": critical_path,
+                    "critical_path_seconds": critical_path_seconds,
+                    "stage_seconds": {name: result.wall_seconds for name, result in self.results.items()},
+                }
+            },
+        )
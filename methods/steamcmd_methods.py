@@ -0,0 +1,224 @@
+"""
+Functions for running steamcmd with a generated runscript
+
+Logging in and building workshop items happen in one steamcmd session, instead of one steamcmd start (bootstrap,
+self-update check, login) per command. steamcmd is run directly from an argument list, no shell involved.
+
+A runscript doesn't stop steamcmd from printing, so the output is checked to tell a failed login (expired or missing
+cached credentials) apart from a failed upload. Output lines are timestamped as they arrive, which times the login and
+each upload inside the one session.
+"""
+
+import logging
+import re
+import subprocess
+import threading
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+default_steamcmd_command = ("steamcmd",)
+
+# lines steamcmd prints for the login, and for each `workshop_build_item`
+login_succeeded_pattern = re.compile(r"^Logging in user .*?\.\.\.OK|^Waiting for user info\.*\s*OK", re.MULTILINE)
+login_failed_pattern = re.compile(
+    r"^Logging in user .*?\.\.\.(?:FAILED|ERROR)|^FAILED login|Login Failure|Steam Guard code|Two-factor code mismatch",
+    re.MULTILINE,
+)
+upload_succeeded_pattern = re.compile(r"^Success\.", re.MULTILINE)
+upload_failed_pattern = re.compile(r"^ERROR! Failed to update workshop item.*$", re.MULTILINE)
+
+
+class SteamcmdError(subprocess.CalledProcessError):
+    """steamcmd did not do everything the runscript asked for, with the reason in `stderr`"""
+
+    def __init__(
+        self,
+        returncode: int,
+        cmd: list[str],
+        output: str | None = None,
+        stderr: str | None = None,
+        *,
+        result: "SteamcmdRunResult | None" = None,
+    ) -> None:
+        super().__init__(returncode, cmd, output=output, stderr=stderr)
+        self.result = result
+        """What steamcmd did get done, like the uploads before the failed one, None if it timed out"""
+
+    def __str__(self) -> str:
+        return self.stderr or super().__str__()
+
+
+class SteamcmdLoginError(SteamcmdError):
+    """steamcmd could not log in, usually the cached credentials in `config.vdf` are invalid or expired"""
+
+
+class SteamcmdUploadError(SteamcmdError):
+    """steamcmd logged in, but a workshop item failed to upload"""
+
+
+@dataclass(slots=True)
+class SteamcmdRunResult:
+    """What happened in one steamcmd session"""
+
+    returncode: int
+    output: str
+    logged_in: bool = False
+    uploaded_manifests: list[Path] = field(default_factory=list)
+    """Manifests of workshop items that were uploaded, in runscript order"""
+    login_seconds: float | None = None
+    """Time from starting steamcmd until it logged in, includes its start up and self-update check"""
+    upload_seconds: list[float] = field(default_factory=list)
+    """Time each uploaded item took, in runscript order"""
+
+
+def quote_runscript_argument(argument: str | Path) -> str:
+    """Quote one runscript argument, refusing anything that could end the argument or the command early"""
+    argument = str(argument)
+    if '"' in argument or "\n" in argument or "\r" in argument:
+        msg = f"steamcmd runscript arguments can't contain quotes or line breaks, got {argument!r}"
+        raise ValueError(msg)
+    return f'"{argument}"'
+
+
+def write_steamcmd_runscript(runscript_file_path: Path, steam_username: str, manifest_file_paths: Sequence[Path]) -> str:
+    """
+    Write a steamcmd runscript that logs in and builds each workshop item manifest in order
+
+    steamcmd is told to never prompt for a password, so invalid cached credentials fail the login instead of waiting for
+    input, and to stop at the first failed command. Returns the runscript text.
+    """
+    runscript_lines = [
+        "@ShutdownOnFailedCommand 1",
+        "@NoPromptForPassword 1",
+        f"login {quote_runscript_argument(steam_username)}",
+        *(f"workshop_build_item {quote_runscript_argument(manifest_file_path)}" for manifest_file_path in manifest_file_paths),
+        "quit",
+    ]
+    runscript = "\n".join(runscript_lines) + "\n"
+    runscript_file_path.parent.mkdir(parents=True, exist_ok=True)
+    with Path.open(runscript_file_path, "w", encoding="utf-8") as runscript_file_object:
+        runscript_file_object.write(runscript)
+    return runscript
+
+
+def check_steamcmd_output(result: SteamcmdRunResult, manifest_file_paths: Sequence[Path], command: list[str]) -> None:
+    """
+    Fill in login and upload status from the steamcmd output, raising if anything failed
+
+    Uploads happen in runscript order and stop at the first failure, so the n-th success belongs to the n-th manifest.
+    """
+    result.logged_in = bool(login_succeeded_pattern.search(result.output)) and not login_failed_pattern.search(result.output)
+    if not result.logged_in:
+        msg = "steamcmd failed to log in, cached credentials in the config VDF are likely invalid or expired"
+        raise SteamcmdLoginError(result.returncode, command, output=result.output, stderr=msg, result=result)
+
+    succeeded_count = len(upload_succeeded_pattern.findall(result.output))
+    result.uploaded_manifests = list(manifest_file_paths[:succeeded_count])
+    if succeeded_count < len(manifest_file_paths) or result.returncode != 0:
+        failure_match = upload_failed_pattern.search(result.output)
+        reason = failure_match[0] if failure_match else f"steamcmd exited with code {result.returncode}"
+        if succeeded_count < len(manifest_file_paths):
+            msg = f"steamcmd failed to upload the workshop item of {manifest_file_paths[succeeded_count]}: {reason}"
+        else:
+            msg = f"steamcmd failed after uploading every workshop item: {reason}"
+        raise SteamcmdUploadError(result.returncode or 1, command, output=result.output, stderr=msg, result=result)
+
+
+def get_step_seconds(timed_lines: Sequence[tuple[float, str]]) -> tuple[float | None, list[float]]:
+    """Login time and the time of each upload, from output lines with their seconds since steamcmd started"""
+    login_seconds = None
+    upload_seconds = []
+    previous_step_end = 0.0
+    for elapsed_seconds, line in timed_lines:
+        if not upload_seconds and login_succeeded_pattern.match(line):
+            login_seconds = previous_step_end = elapsed_seconds
+        elif upload_succeeded_pattern.match(line):
+            upload_seconds.append(elapsed_seconds - previous_step_end)
+            previous_step_end = elapsed_seconds
+    return login_seconds, upload_seconds
+
+
+def _read_timed_lines(stream, timed_lines: list[tuple[float, str]], start_time: float) -> None:  # noqa: ANN001
+    """Reader thread: collect lines with their arrival time"""
+    timed_lines.extend((time.perf_counter() - start_time, line) for line in stream)
+
+
+def run_steamcmd_script(
+    runscript_file_path: Path,
+    manifest_file_paths: Sequence[Path],
+    *,
+    steamcmd_command: Sequence[str] = default_steamcmd_command,
+    timeout: float | None = None,
+) -> SteamcmdRunResult:
+    """
+    Run steamcmd once with a runscript from `write_steamcmd_runscript`
+
+    Parameters
+    ----------
+    runscript_file_path : Path
+        Runscript to run
+    manifest_file_paths : Sequence[Path]
+        Manifests the runscript builds, in the same order, to tell which uploads happened
+    steamcmd_command : Sequence[str], optional
+        Command that starts steamcmd, by default `steamcmd` from the path
+    timeout : float | None, optional
+        Seconds to wait for the whole session, by default no limit
+
+    Returns
+    -------
+    result : SteamcmdRunResult
+        Exit code, full output, and the uploaded manifests
+
+    Raises
+    ------
+    SteamcmdLoginError
+        If steamcmd could not log in, or timed out before it did
+    SteamcmdUploadError
+        If steamcmd logged in, but did not upload every manifest
+
+    """
+    command = [*steamcmd_command, "+runscript", str(runscript_file_path)]
+    timed_lines: list[tuple[float, str]] = []
+    start_time = time.perf_counter()
+    with subprocess.Popen(  # noqa: S603 steamcmd with our own runscript
+        command,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        errors="replace",
+    ) as process:
+        reader_thread = threading.Thread(target=_read_timed_lines, args=(process.stdout, timed_lines, start_time), daemon=True)
+        reader_thread.start()
+        try:
+            returncode = process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired as err:
+            process.kill()
+            process.wait()
+            # the steamcmd launcher script can leave its binary holding the pipe open, don't wait on it for long
+            reader_thread.join(timeout=5)
+            output = "".join(line for _, line in timed_lines)
+            if not login_succeeded_pattern.search(output):
+                msg = f"steamcmd timed out after {timeout} s before logging in"
+                raise SteamcmdLoginError(-1, command, output=output, stderr=msg) from err
+            msg = f"steamcmd timed out after {timeout} s while uploading"
+            raise SteamcmdUploadError(-1, command, output=output, stderr=msg) from err
+        reader_thread.join()
+
+    result = SteamcmdRunResult(returncode=returncode, output="".join(line for _, line in timed_lines))
+    result.login_seconds, result.upload_seconds = get_step_seconds(timed_lines)
+    check_steamcmd_output(result, manifest_file_paths, command)
+    return result
+
+
+def log_steamcmd_log_files(log_dir_path: Path) -> None:
+    """Log every steamcmd log file as an error, to find out why a run failed"""
+    if not log_dir_path.is_dir():
+        logger.error("No steamcmd log folder at %s", log_dir_path)
+        return
+    for log_file_path in sorted(log_dir_path.iterdir()):
+        if log_file_path.is_file():
+            logger.error("######## %s\n%s", log_file_path.name, log_file_path.read_text(errors="replace"))
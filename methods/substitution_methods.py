@@ -0,0 +1,153 @@
+"""
+Precompiled regex search and replace over many patterns
+
+Pattern sets are compiled once (cached by pattern and flags). Sets of patterns that don't overlap can be merged into
+one alternation and applied in a single pass over the text, instead of one full scan per pattern.
+"""
+
+import functools
+import re
+from collections.abc import Sequence
+
+# flags used by all the search and replace helpers
+default_regex_flags = re.IGNORECASE | re.MULTILINE | re.DOTALL
+
+# patterns that can't be wrapped into a bigger alternation without changing their meaning:
+# backreferences (numbers would shift), named groups (names would clash), global inline flags (must come first)
+unmergeable_pattern_pattern = re.compile(r"\\[1-9]|\(\?P[<=]|\(\?<[^=!]|^\(\?[aiLmsux]+\)")
+# group references in replacement templates, escaped backslashes are matched first so they are skipped
+template_group_reference_pattern = re.compile(r"\\\\|\\g<(\d+)>|\\([1-9]\d?)")
+# first character of a pattern, when it is a plain (or escaped) literal that must match: skips opening groups,
+# and refuses anything followed by a quantifier that could make it optional
+template_split_pattern = re.compile(r"\\g<(\d+)>")
+quantified_group_pattern = re.compile(r"(?<!\\)\)[?*{]")
+leading_literal_pattern = re.compile(r"^(?:\((?:\?:)?)*(\\[^A-Za-z0-9]|[^\\.^$*+?{}\[\]|()])(?![?*{])")
+
+
+@functools.lru_cache(maxsize=256)
+def compile_pattern(pattern: str, flags: int = default_regex_flags) -> re.Pattern:
+    """Compile a regex pattern, cached by pattern and flags"""
+    return re.compile(pattern, flags)
+
+
+def shift_template_groups(template: str, offset: int) -> str:
+    """Renumber group references in a replacement template, for a pattern whose groups now start after `offset`"""
+
+    def shift_reference(match: re.Match) -> str:
+        if match[0] == "\\\\":
+            return match[0]
+        group_number = int(match[1] if match[1] is not None else match[2])
+        return f"\\g<{group_number + offset}>"
+
+    return template_group_reference_pattern.sub(shift_reference, template)
+
+
+def split_template(template: str) -> str | tuple[str | int, ...]:
+    """
+    Split a replacement template into literal text and group numbers, to skip parsing it again for every match
+
+    Templates with any other escapes are returned as-is, to be expanded by `re`.
+    """
+    template_parts = template_split_pattern.split(template)
+    if any("\\" in literal for literal in template_parts[0::2]):
+        return template
+    return tuple(int(part) if index % 2 else part for index, part in enumerate(template_parts) if part)
+
+
+def get_leading_literal(pattern: str) -> str | None:
+    """
+    Character every match of `pattern` has to start with, or None if that can't be told from the pattern text
+
+    Conservative, patterns with any alternation are skipped since the first character could come from any branch,
+    and so are patterns with a quantified group since the leading group could be optional.
+    """
+    if "|" in pattern or quantified_group_pattern.search(pattern):
+        return None
+    leading_literal_match = leading_literal_pattern.match(pattern)
+    if leading_literal_match is None:
+        return None
+    return leading_literal_match[1][-1]
+
+
+class SubstitutionEngine:
+    """
+    Ordered set of (pattern, replacement template) pairs, compiled once and applied to any number of strings
+
+    By default pairs are applied one after another, same as calling `re.sub` for each in order.
+
+    With `merge=True` the caller promises the patterns don't overlap: no two patterns match the same text, and no
+    replacement creates or removes a match for a later pattern. All patterns are then merged into one alternation
+    and the text is scanned once. Patterns that can't be merged (backreferences, named groups, global inline flags)
+    silently fall back to sequential application.
+    """
+
+    def __init__(
+        self,
+        patterns: Sequence[str],
+        replacements: Sequence[str],
+        *,
+        flags: int = default_regex_flags,
+        merge: bool = False,
+    ) -> None:
+        if len(patterns) != len(replacements):
+            msg = f"Need one replacement per pattern, got {len(patterns)} patterns and {len(replacements)} replacements"
+            raise ValueError(msg)
+        self.patterns = tuple(patterns)
+        self.replacements = tuple(replacements)
+        self.flags = flags
+        self.compiled_patterns = [compile_pattern(pattern, flags) for pattern in self.patterns]
+
+        self.merged_pattern: re.Pattern | None = None
+        """Single alternation of all patterns, only set if merging was requested and possible"""
+        self._merged_templates: dict[int, str | tuple[str | int, ...]] = {}
+        if merge and len(self.patterns) > 1 and not any(unmergeable_pattern_pattern.search(p) for p in self.patterns):
+            self._build_merged_pattern()
+
+    def _build_merged_pattern(self) -> None:
+        """Wrap each pattern in its own group, so the wrapper group index tells which pattern matched"""
+        wrapped_patterns = []
+        group_offset = 0
+        for compiled_pattern, replacement in zip(self.compiled_patterns, self.replacements, strict=True):
+            wrapper_group_index = group_offset + 1
+            wrapped_patterns.append(f"({compiled_pattern.pattern})")
+            # inner group n is now group wrapper_group_index + n, and \g<0> is the wrapper group itself
+            self._merged_templates[wrapper_group_index] = split_template(
+                shift_template_groups(replacement, wrapper_group_index)
+            )
+            group_offset = wrapper_group_index + compiled_pattern.groups
+        merged_pattern = "|".join(wrapped_patterns)
+
+        # a bare alternation is tried branch by branch at every position of the text, while a single pattern gets
+        # a fast literal prefix scan from `re`, so check the possible first characters once up front where known
+        leading_literals = [get_leading_literal(pattern) for pattern in self.patterns]
+        if None not in leading_literals:
+            leading_characters = "".join(re.escape(character) for character in sorted(set(leading_literals)))  # ty:ignore[no-matching-overload] no Nones here
+            merged_pattern = f"(?=[{leading_characters}])(?:{merged_pattern})"
+        self.merged_pattern = compile_pattern(merged_pattern, self.flags)
+
+    def _expand_merged_match(self, match: re.Match) -> str:
+        # the outermost group closes last, so `lastindex` is the wrapper group of the pattern that matched
+        template = self._merged_templates[match.lastindex]  # ty:ignore[invalid-argument-type] always matched
+        if isinstance(template, str):
+            return match.expand(template)
+        return "".join(part if isinstance(part, str) else (match.group(part) or "") for part in template)
+
+    def apply(self, text: str) -> str:
+        """Run all substitutions on `text`"""
+        if self.merged_pattern is not None:
+            return self.merged_pattern.sub(self._expand_merged_match, text)
+        for compiled_pattern, replacement in zip(self.compiled_patterns, self.replacements, strict=True):
+            text = compiled_pattern.sub(replacement, text)
+        return text
+
+
+@functools.lru_cache(maxsize=64)
+def get_substitution_engine(
+    patterns: tuple[str, ...],
+    replacements: tuple[str, ...],
+    flags: int = default_regex_flags,
+    *,
+    merge: bool = False,
+) -> SubstitutionEngine:
+    """Cached `SubstitutionEngine`, so repeated calls with the same pattern set reuse the compiled patterns"""
+    return SubstitutionEngine(patterns, replacements, flags=flags, merge=merge)
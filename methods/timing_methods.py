@@ -0,0 +1,175 @@
+"""
+Functions for timing the phases of a script run
+
+A `PhaseTimer` records named spans with wall time, CPU time (including finished child processes like steamcmd) and
+bytes read and written by the process. Spans can nest, and measurements taken elsewhere (like steamcmd steps timed from
+its output) can be added as spans too. The report is written as JSON, as a table in the GitHub step summary, and
+optionally as an OpenMetrics text file.
+
+Timing is off unless `timingReport` is set, a disabled timer hands out one shared no-op context manager, so leaving
+spans in the scripts costs next to nothing.
+"""
+
+import contextlib
+import json
+import os
+import time
+from collections.abc import Iterator
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from methods.file_methods import append_to_file, write_file_if_changed
+from methods.input_methods import get_env_variable, str2bool
+
+timing_report_file_name_format = "timing_{script_name}.json"
+openmetrics_metric_prefix = "stellaris_mod_deploy_phase"
+
+# per-process I/O counters on linux, bytes passed through read/write calls (includes pipes, not just disk)
+_proc_io_file_path = Path("/proc/self/io")
+_disabled_span = contextlib.nullcontext()
+
+
+@dataclass(slots=True)
+class TimingSpan:
+    """Measurements of one phase"""
+
+    name: str
+    wall_seconds: float
+    cpu_seconds: float | None = None
+    bytes_read: int | None = None
+    bytes_written: int | None = None
+    depth: int = 0
+    """Nesting level, 0 for top level phases"""
+
+
+def read_process_io() -> tuple[int, int] | None:
+    """Bytes read and written by this process so far, None where the platform doesn't expose it"""
+    try:
+        proc_io_string = _proc_io_file_path.read_text()
+    except OSError:
+        return None
+    counters = dict(line.split(": ", 1) for line in proc_io_string.splitlines() if ": " in line)
+    return int(counters["rchar"]), int(counters["wchar"])
+
+
+def get_cpu_seconds() -> float:
+    """CPU time of this process and its finished child processes"""
+    process_times = os.times()
+    return process_times.user + process_times.system + process_times.children_user + process_times.children_system
+
+
+class PhaseTimer:
+    """Collects timing spans for one script run, does nothing while disabled"""
+
+    def __init__(self, script_name: str, *, enabled: bool = True) -> None:
+        self.script_name = script_name
+        self.enabled = enabled
+        self.spans: list[TimingSpan] = []
+        self._depth = 0
+        self._start_wall = time.perf_counter()
+
+    @classmethod
+    def from_env(cls, script_name: str) -> "PhaseTimer":
+        """Timer enabled by the `timingReport` environment variable"""
+        enabled = str2bool(get_env_variable("timingReport", "false"))
+        return cls(script_name, enabled=enabled)
+
+    def span(self, name: str) -> contextlib.AbstractContextManager:
+        """Context manager timing the block inside it as the phase `name`"""
+        if not self.enabled:
+            return _disabled_span
+        return self._timed_span(name)
+
+    @contextlib.contextmanager
+    def _timed_span(self, name: str) -> Iterator[None]:
+        # placeholder keeps phases in start order when spans nest
+        span = TimingSpan(name, 0.0, depth=self._depth)
+        self.spans.append(span)
+        self._depth += 1
+        start_io = read_process_io()
+        start_cpu = get_cpu_seconds()
+        start_wall = time.perf_counter()
+        try:
+            yield
+        finally:
+            span.wall_seconds = time.perf_counter() - start_wall
+            span.cpu_seconds = get_cpu_seconds() - start_cpu
+            end_io = read_process_io()
+            if start_io is not None and end_io is not None:
+                span.bytes_read = end_io[0] - start_io[0]
+                span.bytes_written = end_io[1] - start_io[1]
+            self._depth -= 1
+
+    def add_span(self, name: str, wall_seconds: float) -> None:
+        """Add a phase measured elsewhere, nested in the currently open span"""
+        if self.enabled:
+            self.spans.append(TimingSpan(name, wall_seconds, depth=self._depth))
+
+    def report(self) -> dict:
+        return {
+            "script": self.script_name,
+            "total_wall_seconds": time.perf_counter() - self._start_wall,
+            "spans": [asdict(span) for span in self.spans],
+        }
+
+    def write_reports(self, generated_files_folder_path: Path) -> Path | None:
+        """
+        Write the JSON report, the step summary table and the OpenMetrics file, as far as they are set up
+
+        The step summary goes to `GITHUB_STEP_SUMMARY` and the OpenMetrics file to `timingOpenMetricsFile`, if set.
+        Returns the path of the JSON report, None while disabled.
+        """
+        if not self.enabled:
+            return None
+        report = self.report()
+        report_file_path = generated_files_folder_path / timing_report_file_name_format.format(script_name=self.script_name)
+        write_file_if_changed(report_file_path, json.dumps(report, indent=4))
+
+        step_summary = get_env_variable("GITHUB_STEP_SUMMARY", None)
+        if step_summary:
+            append_to_file(Path(step_summary), format_step_summary(report))
+        openmetrics_file = get_env_variable("timingOpenMetricsFile", None)
+        if openmetrics_file:
+            write_file_if_changed(Path(openmetrics_file), format_openmetrics(report))
+        return report_file_path
+
+
+def format_step_summary(report: dict) -> str:
+    """Markdown table of the spans in a report, nested spans are indented"""
+    lines = [
+        f"### Timing of `{report['script']}`",
+        "",
+        "| Phase | Wall (s) | CPU (s) | Read (kB) | Written (kB) |",
+        "| :--- | ---: | ---: | ---: | ---: |",
+    ]
+    for span in report["spans"]:
+        indent = "&nbsp;&nbsp;" * span["depth"]
+        cpu_seconds = "" if span["cpu_seconds"] is None else f"{span['cpu_seconds']:.3f}"
+        kilobytes_read = "" if span["bytes_read"] is None else f"{span['bytes_read'] / 1000:.1f}"
+        kilobytes_written = "" if span["bytes_written"] is None else f"{span['bytes_written'] / 1000:.1f}"
+        lines.append(
+            f"| {indent}{span['name']} | {span['wall_seconds']:.3f} | {cpu_seconds} | {kilobytes_read} | {kilobytes_written} |"
+        )
+    lines.append(f"| **total** | {report['total_wall_seconds']:.3f} | | | |")
+    return "\n".join(lines) + "\n\n"
+
+
+def format_openmetrics(report: dict) -> str:
+    """OpenMetrics text exposition of a report, one gauge family per measurement with script and phase labels"""
+    # metric name suffix, span field, unit, help text
+    families = [
+        ("wall_seconds", "wall_seconds", "seconds", "Wall time of the phase"),
+        ("cpu_seconds", "cpu_seconds", "seconds", "CPU time of the phase, including finished child processes"),
+        ("read_bytes", "bytes_read", "bytes", "Bytes read by the process during the phase"),
+        ("written_bytes", "bytes_written", "bytes", "Bytes written by the process during the phase"),
+    ]
+    lines = []
+    for family_suffix, span_field, unit, help_text in families:
+        metric_name = f"{openmetrics_metric_prefix}_{family_suffix}"
+        lines.extend([f"# TYPE {metric_name} gauge", f"# UNIT {metric_name} {unit}", f"# HELP {metric_name} {help_text}."])
+        for span in report["spans"]:
+            if span[span_field] is not None:
+                phase_name = span["name"].replace("\\", "\\\\").replace('"', '\\"')
+                lines.append(f'{metric_name}{{script="{report["script"]}",phase="{phase_name}"}} {span[span_field]}')
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
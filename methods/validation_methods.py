@@ -0,0 +1,300 @@
+r"""
+Functions for checking the mod files for mistakes the game only reports in its error log
+
+Every file of the mod folder (that the walk rules let through) is checked before a release is prepared:
+
+- empty files (a warning, blank files are sometimes used on purpose to override a vanilla file)
+- localisation files: UTF-8 with a BOM, the `l_<language>:` header matching the file name, valid UTF-8
+- line endings: bare `\r`, or a mix of `\r\n` and `\n` in one text file
+- tab characters in `.yml` files
+
+Results are cached per file by SHA-256 of its content in a sidecar JSON file, so after a small edit only the changed
+files are checked again. Files to check are spread over a process pool if there is enough data to make that worthwhile.
+"""
+
+import hashlib
+import json
+import logging
+import re
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from methods.archive_methods import default_text_extensions
+from methods.file_methods import write_file_if_changed
+from methods.walk_methods import WalkRules, walk_folder
+
+logger = logging.getLogger(__name__)
+
+# below this total size, worker process startup costs more than checking the files in-process
+parallel_validation_min_bytes = 8_000_000
+# bump when the checks or the cache layout change, so old results are never used
+validation_cache_format_version = 1
+loc_folder_name = "localisation"
+loc_file_name_pattern = re.compile(r"_l_(?P<language>\w+)\.yml$", flags=re.IGNORECASE)
+# the first line that isn't blank or a comment, like `l_english:`
+loc_header_pattern = re.compile(r"^l_(?P<language>\w+):[ \t]*(#.*)?$")
+utf8_bom = b"\xef\xbb\xbf"
+
+
+@dataclass(slots=True, frozen=True)
+class ValidationIssue:
+    """One problem found in one file"""
+
+    file_path: str
+    """Posix path relative to the validated folder"""
+    check: str
+    """Name of the check, like `loc_bom`"""
+    message: str
+    line_number: int | None = None
+    """1-based, None for problems with the whole file"""
+    is_error: bool = True
+    """Errors stop the release, warnings are only logged"""
+
+    def describe(self) -> str:
+        location = self.file_path if self.line_number is None else f"{self.file_path}:{self.line_number}"
+        return f"{location}: {self.message}"
+
+
+@dataclass(slots=True)
+class ModValidationResult:
+    """Issues in all files of one folder"""
+
+    folder_path: Path
+    issues: list[ValidationIssue] = field(default_factory=list)
+    """Sorted by file path"""
+    checked_count: int = 0
+    """Files checked in this run"""
+    cached_count: int = 0
+    """Files with results from the cache"""
+
+    @property
+    def errors(self) -> list[ValidationIssue]:
+        return [issue for issue in self.issues if issue.is_error]
+
+    @property
+    def warnings(self) -> list[ValidationIssue]:
+        return [issue for issue in self.issues if not issue.is_error]
+
+
+def get_line_number(content: bytes, offset: int) -> int:
+    return content.count(b"\n", 0, offset) + 1
+
+
+def check_line_endings(relative_path: str, content: bytes) -> list[ValidationIssue]:
+    crlf_count = content.count(b"\r\n")
+    bare_cr_match = re.search(rb"\r(?!\n)", content)
+    if bare_cr_match is not None:
+        return [
+            ValidationIssue(
+                relative_path,
+                "line_endings",
+                "bare \\r line ending, use \\n or \\r\\n",
+                line_number=get_line_number(content, bare_cr_match.start()),
+                is_error=False,
+            )
+        ]
+    lf_count = content.count(b"\n") - crlf_count
+    if crlf_count and lf_count:
+        bare_lf_match = re.search(rb"(?<!\r)\n", content)
+        return [
+            ValidationIssue(
+                relative_path,
+                "line_endings",
+                f"mixed line endings, {crlf_count} \\r\\n and {lf_count} \\n",
+                line_number=get_line_number(content, bare_lf_match.start()),  # ty:ignore[possibly-missing-attribute] counted above
+                is_error=False,
+            )
+        ]
+    return []
+
+
+def check_loc_file(relative_path: str, content: bytes) -> list[ValidationIssue]:
+    file_name_match = loc_file_name_pattern.search(relative_path)
+    if file_name_match is None:
+        return [ValidationIssue(relative_path, "loc_file_name", "loc file name must end with `_l_<language>.yml`")]
+    issues = []
+    if not content.startswith(utf8_bom):
+        issues.append(ValidationIssue(relative_path, "loc_bom", "loc file must be UTF-8 with a BOM", line_number=1))
+    loc_bytes = content.removeprefix(utf8_bom)
+    try:
+        loc_string = loc_bytes.decode("utf-8")
+    except UnicodeDecodeError as err:
+        line_number = get_line_number(loc_bytes, err.start)
+        issues.append(ValidationIssue(relative_path, "encoding", f"invalid UTF-8: {err.reason}", line_number=line_number))
+        return issues
+
+    for line_number, line in enumerate(loc_string.splitlines(), start=1):
+        stripped_line = line.strip()
+        if not stripped_line or stripped_line.startswith("#"):
+            continue
+        header_match = loc_header_pattern.match(stripped_line)
+        if header_match is None:
+            issues.append(
+                ValidationIssue(
+                    relative_path,
+                    "loc_header",
+                    f"expected a header like `l_english:`, got `{stripped_line[:40]}`",
+                    line_number=line_number,
+                )
+            )
+        elif header_match["language"].lower() != file_name_match["language"].lower():
+            issues.append(
+                ValidationIssue(
+                    relative_path,
+                    "loc_header",
+                    f"header `l_{header_match['language']}:` doesn't match the file name language "
+                    f"`{file_name_match['language']}`",
+                    line_number=line_number,
+                )
+            )
+        break
+    else:
+        issues.append(ValidationIssue(relative_path, "loc_header", "missing header like `l_english:`"))
+    return issues
+
+
+def check_tabs(relative_path: str, content: bytes) -> list[ValidationIssue]:
+    tab_offset = content.find(b"\t")
+    if tab_offset == -1:
+        return []
+    tab_line_count = sum(b"\t" in line for line in content.splitlines())
+    return [
+        ValidationIssue(
+            relative_path,
+            "tabs",
+            f"tab characters on {tab_line_count} lines, use spaces in .yml files",
+            line_number=get_line_number(content, tab_offset),
+            is_error=False,
+        )
+    ]
+
+
+def is_loc_file(relative_path: str) -> bool:
+    return relative_path.startswith(f"{loc_folder_name}/") and relative_path.lower().endswith(".yml")
+
+
+def is_text_file(relative_path: str) -> bool:
+    return is_loc_file(relative_path) or Path(relative_path).suffix.lower() in default_text_extensions
+
+
+def validate_file_content(relative_path: str, content: bytes) -> list[ValidationIssue]:
+    """All issues in one file, from its path relative to the mod folder and its content"""
+    if not content:
+        return [ValidationIssue(relative_path, "empty_file", "empty file", is_error=False)]
+    issues = []
+    if is_loc_file(relative_path):
+        issues.extend(check_loc_file(relative_path, content))
+    if is_text_file(relative_path):
+        issues.extend(check_line_endings(relative_path, content))
+    if relative_path.lower().endswith(".yml"):
+        issues.extend(check_tabs(relative_path, content))
+    return issues
+
+
+def validate_file(file_path: Path, relative_path: str) -> list[ValidationIssue]:
+    return validate_file_content(relative_path, file_path.read_bytes())
+
+
+def issue_to_json(issue: ValidationIssue) -> list:
+    return [issue.check, issue.message, issue.line_number, issue.is_error]
+
+
+def load_validation_cache(cache_file_path: Path, tool_version: str) -> dict[str, dict]:
+    """Cached results per relative path, empty if the file is missing, broken, or from another format or tool version"""
+    try:
+        with Path.open(cache_file_path, encoding="utf-8") as cache_file_object:
+            cache_dict = json.load(cache_file_object)
+        if cache_dict["format_version"] != validation_cache_format_version or cache_dict["tool_version"] != tool_version:
+            return {}
+        return dict(cache_dict["files"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return {}
+
+
+def save_validation_cache(cache_file_path: Path, tool_version: str, files: dict[str, dict]) -> None:
+    cache_dict = {"format_version": validation_cache_format_version, "tool_version": tool_version, "files": files}
+    write_file_if_changed(cache_file_path, json.dumps(cache_dict))
+
+
+def validate_mod_files(
+    folder_path: Path,
+    cache_file_path: Path | None = None,
+    *,
+    tool_version: str = "",
+    rules: WalkRules | None = None,
+    max_workers: int | None = None,
+) -> ModValidationResult:
+    """
+    Check every file under `folder_path` that passes `rules`
+
+    Parameters
+    ----------
+    folder_path : Path
+        Folder with the game mod files
+    cache_file_path : Path | None, optional
+        Sidecar JSON with the results of earlier runs, by default nothing is cached
+    tool_version : str, optional
+        Version of the tool, results cached by another version are checked again
+    rules : WalkRules | None, optional
+        Include and exclude rules for the files, by default only junk like `.git` is left out
+    max_workers : int | None, optional
+        Process pool size, by default picked by `ProcessPoolExecutor`
+
+    Returns
+    -------
+    ModValidationResult
+        Issues of every file, and how many files were checked or taken from the cache
+
+    """
+    folder_path = Path(folder_path).resolve()
+    cached_files = load_validation_cache(cache_file_path, tool_version) if cache_file_path is not None else {}
+    validation_result = ModValidationResult(folder_path=folder_path)
+
+    files: dict[str, dict] = {}
+    file_paths_to_check: dict[str, Path] = {}
+    for relative_path, dir_entry in walk_folder(folder_path, rules):
+        file_path = Path(dir_entry.path)
+        if dir_entry.stat().st_size == 0:
+            validation_result.issues.extend(validate_file_content(relative_path, b""))
+            continue
+        # binary files only get the size check, no point hashing them
+        if not is_text_file(relative_path):
+            continue
+        with Path.open(file_path, "rb") as file_object:
+            content_hash = hashlib.file_digest(file_object, "sha256").hexdigest()
+        cached_file = cached_files.get(relative_path)
+        if cached_file is not None and cached_file.get("sha256") == content_hash:
+            files[relative_path] = cached_file
+            validation_result.cached_count += 1
+        else:
+            files[relative_path] = {"sha256": content_hash, "issues": None}
+            file_paths_to_check[relative_path] = file_path
+
+    total_bytes = sum(file_path.stat().st_size for file_path in file_paths_to_check.values())
+    if len(file_paths_to_check) <= 1 or total_bytes < parallel_validation_min_bytes or max_workers == 1:
+        checked_issues = [validate_file(file_path, relative_path) for relative_path, file_path in file_paths_to_check.items()]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            checked_issues = list(executor.map(validate_file, file_paths_to_check.values(), file_paths_to_check, chunksize=16))
+    for relative_path, file_issues in zip(file_paths_to_check, checked_issues, strict=True):
+        files[relative_path]["issues"] = [issue_to_json(issue) for issue in file_issues]
+    validation_result.checked_count = len(file_paths_to_check)
+
+    for relative_path, file_dict in files.items():
+        validation_result.issues.extend(
+            ValidationIssue(relative_path, check, message, line_number=line_number, is_error=is_error)
+            for check, message, line_number, is_error in file_dict["issues"]
+        )
+    validation_result.issues.sort(key=lambda issue: (issue.file_path, issue.line_number or 0))
+
+    if cache_file_path is not None:
+        save_validation_cache(cache_file_path, tool_version, files)
+    logger.debug(
+        "Validated %s: %s files checked, %s from cache, %s issues",
+        folder_path,
+        validation_result.checked_count,
+        validation_result.cached_count,
+        len(validation_result.issues),
+    )
+    return validation_result
@@ -0,0 +1,226 @@
+"""
+Functions for walking the mod files, with gitignore-style include and exclude rules
+
+Shared by the release zip, the mod file validation and the workshop upload, so they all see the same files. The
+walker is built on `os.scandir`: file types come from the directory listing, so nothing is `stat`-ed just to be
+walked, and excluded folders are never entered.
+
+Rules use the `.gitignore` syntax, relative to the walked folder:
+
+- `*`, `?` and `[abc]` match within one path segment, `**` matches any number of segments
+- a pattern with a `/` at the start or in the middle is anchored to the folder, otherwise it matches at any depth
+- a trailing `/` only matches folders, `!` in front re-includes what an earlier pattern excluded
+- the last matching pattern wins, and like git, nothing inside an excluded folder can be re-included
+
+Junk like `.git`, GIMP/Photoshop sources and editor backups is always excluded (see `default_exclude_patterns`).
+Mods can exclude more, or list the only files to include, in `OVERRIDE.txt`:
+
+```
+mod_files_exclude={
+    "gfx/source/"
+    "*.blend"
+}
+mod_files_include={
+    "common/**"
+    "localisation/**"
+}
+```
+
+Without `mod_files_include` every file that isn't excluded is walked.
+"""
+
+import os
+import re
+from collections.abc import Iterable, Iterator, Mapping
+from pathlib import Path
+
+default_exclude_patterns = (
+    ".git/",
+    ".svn/",
+    ".hg/",
+    ".vscode/",
+    ".idea/",
+    "__pycache__/",
+    "*.xcf",
+    "*.psd",
+    "*~",
+    "*.bak",
+    "*.orig",
+    "*.swp",
+    "*.tmp",
+    ".DS_Store",
+    "Thumbs.db",
+    "desktop.ini",
+)
+# `OVERRIDE.txt` keys with extra rules, each a list of patterns
+exclude_override_name = "mod_files_exclude"
+include_override_name = "mod_files_include"
+
+
+def translate_pattern(pattern: str) -> str:
+    """Regex for one gitignore-style pattern (without `!` and trailing `/`), matching a whole relative posix path"""
+    anchored = "/" in pattern
+    pattern = pattern.lstrip("/")
+    regex_parts = [] if anchored else ["(?:.*/)?"]
+    index = 0
+    while index < len(pattern):
+        if pattern.startswith("**/", index):
+            regex_parts.append("(?:.*/)?")
+            index += 3
+        elif pattern.startswith("**", index):
+            regex_parts.append(".*")
+            index += 2
+        elif pattern[index] == "*":
+            regex_parts.append("[^/]*")
+            index += 1
+        elif pattern[index] == "?":
+            regex_parts.append("[^/]")
+            index += 1
+        elif pattern[index] == "[" and (class_end := pattern.find("]", index + 2)) != -1:
+            class_content = pattern[index + 1 : class_end]
+            if class_content.startswith("!"):
+                class_content = "^" + class_content[1:]
+            regex_parts.append("[" + class_content.replace("\\", "\\\\") + "]")
+            index = class_end + 1
+        else:
+            regex_parts.append(re.escape(pattern[index]))
+            index += 1
+    return "".join(regex_parts)
+
+
+class PathRules:
+    """
+    Ordered gitignore-style patterns, compiled into one regex for files and one for folders
+
+    The alternatives are in reverse order, so the first one that matches is the last matching pattern, and one regex
+    call decides for any number of patterns.
+    """
+
+    def __init__(self, patterns: Iterable[str]) -> None:
+        self.patterns = [pattern.strip() for pattern in patterns]
+        self.negated: dict[str, bool] = {}
+        """Group name of each pattern to whether it is a `!` pattern"""
+        file_alternatives, folder_alternatives = [], []
+        for index, pattern in enumerate(self.patterns):
+            if not pattern or pattern.startswith("#"):
+                continue
+            negated = pattern.startswith("!")
+            pattern = pattern.removeprefix("!")
+            folder_only = pattern.endswith("/")
+            group_name = f"pattern_{index}"
+            self.negated[group_name] = negated
+            alternative = f"(?P<{group_name}>{translate_pattern(pattern.rstrip('/'))})"
+            folder_alternatives.append(alternative)
+            if not folder_only:
+                file_alternatives.append(alternative)
+        self._file_regex = re.compile("|".join(reversed(file_alternatives))) if file_alternatives else None
+        self._folder_regex = re.compile("|".join(reversed(folder_alternatives))) if folder_alternatives else None
+
+    def __bool__(self) -> bool:
+        return bool(self.negated)
+
+    def match(self, relative_path: str, *, is_folder: bool = False) -> bool | None:
+        """True if the last matching pattern is a normal one, False if it is a `!` pattern, None if nothing matches"""
+        regex = self._folder_regex if is_folder else self._file_regex
+        if regex is None:
+            return None
+        path_match = regex.fullmatch(relative_path)
+        if path_match is None:
+            return None
+        return not self.negated[path_match.lastgroup]  # ty:ignore[invalid-argument-type] one named group per pattern
+
+
+class WalkRules:
+    """Exclude rules (on top of `default_exclude_patterns`), and optional include rules for files"""
+
+    def __init__(
+        self,
+        exclude_patterns: Iterable[str] = (),
+        include_patterns: Iterable[str] = (),
+        *,
+        use_default_excludes: bool = True,
+    ) -> None:
+        exclude_patterns = [*default_exclude_patterns, *exclude_patterns] if use_default_excludes else exclude_patterns
+        self.exclude_rules = PathRules(exclude_patterns)
+        self.include_rules = PathRules(include_patterns)
+
+    @classmethod
+    def from_overrides(cls, override_dict: Mapping[str, str | list[str]]) -> "WalkRules":
+        """Rules from the `mod_files_exclude` and `mod_files_include` lists of a parsed `OVERRIDE.txt`"""
+        rule_lists = []
+        for override_name in (exclude_override_name, include_override_name):
+            patterns = override_dict.get(override_name) or []
+            rule_lists.append([patterns] if isinstance(patterns, str) else patterns)
+        return cls(*rule_lists)
+
+    def is_excluded(self, relative_path: str, *, is_folder: bool = False) -> bool:
+        return bool(self.exclude_rules.match(relative_path, is_folder=is_folder))
+
+    def is_included(self, relative_path: str) -> bool:
+        """Whether a file that isn't excluded should be walked, always true without include rules"""
+        return not self.include_rules or bool(self.include_rules.match(relative_path))
+
+
+def _walk_folder(
+    folder_path: str,
+    relative_folder: str,
+    rules: WalkRules,
+    pending_folders: list[tuple[str, os.DirEntry[str]]] | None,
+) -> Iterator[tuple[str, os.DirEntry[str]]]:
+    """Walk one folder, folders are yielded right away if `pending_folders` is None, else once a file inside is"""
+    with os.scandir(folder_path) as dir_entries:
+        sorted_dir_entries = sorted(dir_entries, key=lambda dir_entry: dir_entry.name)
+    for dir_entry in sorted_dir_entries:
+        relative_path = relative_folder + dir_entry.name
+        if dir_entry.is_dir(follow_symlinks=False):
+            if rules.is_excluded(relative_path, is_folder=True):
+                continue
+            if pending_folders is None:
+                yield relative_path, dir_entry
+            else:
+                pending_folders.append((relative_path, dir_entry))
+            yield from _walk_folder(dir_entry.path, relative_path + "/", rules, pending_folders)
+            # nothing inside was included
+            if pending_folders and pending_folders[-1][0] == relative_path:
+                pending_folders.pop()
+        # symlinked folders are not followed, same as `Path.rglob`, only symlinks need a `stat` to tell
+        elif dir_entry.is_symlink() and dir_entry.is_dir():
+            continue
+        elif not rules.is_excluded(relative_path) and rules.is_included(relative_path):
+            if pending_folders:
+                yield from pending_folders
+                pending_folders.clear()
+            yield relative_path, dir_entry
+
+
+def walk_folder(
+    folder_path: Path | str,
+    rules: WalkRules | None = None,
+    *,
+    include_folders: bool = False,
+) -> Iterator[tuple[str, os.DirEntry[str]]]:
+    """
+    Files under `folder_path` that pass `rules`, as their posix path relative to the folder and their `os.DirEntry`
+
+    Entries are yielded folder by folder, sorted by name within each folder (not sorted by full path). The `DirEntry`
+    caches `stat`, so callers that need file sizes don't pay for a second call. With `include_folders`, folders are
+    yielded before their contents, and with include rules only folders that contain an included file are yielded.
+
+    Parameters
+    ----------
+    folder_path : Path | str
+        Folder to walk
+    rules : WalkRules | None, optional
+        Rules to apply, by default `WalkRules()` which only excludes `default_exclude_patterns`
+    include_folders : bool, optional
+        Whether to yield folders too, by default False
+
+    """
+    rules = WalkRules() if rules is None else rules
+    folder_path = os.fspath(Path(folder_path).absolute())
+    if include_folders and not rules.include_rules:
+        yield from _walk_folder(folder_path, "", rules, None)
+        return
+    for relative_path, dir_entry in _walk_folder(folder_path, "", rules, []):
+        if include_folders or not dir_entry.is_dir(follow_symlinks=False):
+            yield relative_path, dir_entry
@@ -0,0 +1,300 @@
+"""
+Functions for uploading several steam workshop items from one mod repository
+
+Besides the main mod, a repository can publish more workshop items (compatibility patches, "lite" variants, ...),
+listed in `OVERRIDE.txt` as `extra_workshop_items`. Each entry is `folder`, `folder|description file` or
+`folder|description file|descriptor file`, relative to the mod repository:
+
+```
+extra_workshop_items={
+    "my_mod_compat_patch|workshop_compat_patch.txt"
+    "my_mod_lite"
+}
+```
+
+The folder is uploaded as the item content, the descriptor (by default `descriptor.mod` in the folder) gives the
+workshop item ID and title, and the description file defaults to the main mod's workshop description.
+All items get a manifest and are uploaded in one steamcmd session, with a result per item.
+
+Items whose files, title, description and change note are the same as in their last uploaded snapshot (see
+`methods.snapshot_methods`) are left out of the upload.
+
+Only the files that pass the mod's walk rules (see `methods.walk_methods`) are uploaded: every item is staged as a
+folder of hard links to its included files, and that folder is the manifest's content folder.
+"""
+
+import json
+import os
+import shutil
+from collections.abc import Iterable
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from methods.descriptor_methods import ModDescriptor
+from methods.snapshot_methods import (
+    ContentSnapshot,
+    compare_snapshots,
+    load_content_snapshot,
+    save_content_snapshot,
+    take_content_snapshot,
+)
+from methods.walk_methods import WalkRules, walk_folder
+
+if TYPE_CHECKING:
+    from constants_and_overrides import ModConfig
+
+# separates the folder, description file and descriptor file of an `extra_workshop_items` entry
+workshop_item_spec_separator = "|"
+workshop_upload_results_file_name = "workshop_upload_results.json"
+
+
+@dataclass(slots=True)
+class WorkshopItem:
+    """One workshop item to upload, and the files it is made from"""
+
+    name: str
+    """Folder name of the item content, used to name its manifest"""
+    content_folder_path: Path
+    descriptor_file_path: Path
+    description_file_path: Path
+    manifest_file_path: Path
+    upload_folder_path: Path | None = None
+    """Staged copy of the content without excluded files, uploaded instead of `content_folder_path` once set"""
+
+
+@dataclass(slots=True)
+class WorkshopItemResult:
+    """Outcome of uploading one workshop item"""
+
+    name: str
+    manifest_file_path: str
+    item_id: str | None = None
+    title: str | None = None
+    status: str = "not_attempted"
+    """`uploaded`, `unchanged` (skipped), `failed`, or `not_attempted` (login failed, or an earlier item failed)"""
+    error: str | None = None
+    changes: dict[str, list[str]] = field(default_factory=dict)
+    """Files added, removed and modified, and metadata changed since the last uploaded snapshot"""
+
+
+def parse_workshop_item_spec(
+    workshop_item_spec: str,
+    mod_github_folder_path: Path,
+    generated_files_folder_path: Path,
+    *,
+    descriptor_file_name: str,
+    default_description_file_path: Path,
+) -> WorkshopItem:
+    """Make a `WorkshopItem` from one `extra_workshop_items` entry, see the module docstring for the format"""
+    spec_parts = [part.strip() for part in workshop_item_spec.split(workshop_item_spec_separator)]
+    if not spec_parts[0] or len(spec_parts) > 3:  # noqa: PLR2004
+        msg = f'Workshop item entries must be "folder", "folder|description file" or "folder|description file|descriptor file", got "{workshop_item_spec}"'  # noqa: E501
+        raise ValueError(msg)
+    folder, description_file, descriptor_file = spec_parts + [""] * (3 - len(spec_parts))
+    content_folder_path = mod_github_folder_path / folder
+    return WorkshopItem(
+        name=content_folder_path.name,
+        content_folder_path=content_folder_path,
+        descriptor_file_path=mod_github_folder_path / descriptor_file
+        if descriptor_file
+        else content_folder_path / descriptor_file_name,
+        description_file_path=mod_github_folder_path / description_file if description_file else default_description_file_path,
+        manifest_file_path=generated_files_folder_path / f"manifest_{content_folder_path.name}.vdf",
+    )
+
+
+def get_workshop_items(config: "ModConfig") -> list[WorkshopItem]:
+    """The main mod of a config, followed by its `extra_workshop_items`"""
+    main_workshop_item = WorkshopItem(
+        name=config.mod_folder_name,
+        content_folder_path=config.mod_files_folder_path,
+        descriptor_file_path=config.descriptor_file_path,
+        description_file_path=config.workshop_description_file_path,
+        manifest_file_path=config.manifest_file_path,
+    )
+    extra_workshop_items = [
+        parse_workshop_item_spec(
+            workshop_item_spec,
+            config.mod_github_folder_path,
+            config.generated_files_folder_path,
+            descriptor_file_name=config.descriptor_file_name,
+            default_description_file_path=config.workshop_description_file_path,
+        )
+        for workshop_item_spec in config.extra_workshop_items
+    ]
+    return [main_workshop_item, *extra_workshop_items]
+
+
+def get_workshop_item_details(descriptor_file_path: Path) -> tuple[str, str]:
+    """Workshop item ID and title from a descriptor, the item must already be published"""
+    descriptor = ModDescriptor.from_file(descriptor_file_path)
+    descriptor.require("remote_file_id", "name", source=descriptor_file_path)
+    return descriptor.remote_file_id, descriptor.name  # ty:ignore[invalid-return-type] checked by `require`
+
+
+def make_workshop_manifest(  # noqa: PLR0913, PLR0917
+    app_id: str,
+    item_id: str,
+    content_folder_path: Path,
+    title: str,
+    description: str,
+    change_note: str,
+    *,
+    preview_file_path: Path | None = None,
+) -> str:
+    """
+    Contents of a steamcmd `workshop_build_item` manifest
+
+    Quotes in the description are escaped, the change note is inserted as-is. The preview image is the
+    `thumbnail.png` in the content folder, unless `preview_file_path` is given.
+    """
+    escaped_description = description.replace('"', '\\"')
+    if preview_file_path is None:
+        preview_file_path = content_folder_path / "thumbnail.png"
+    return f""""workshopitem"
+{{
+    "appid" "{app_id}"
+    "publishedfileid" "{item_id}"
+    "contentfolder" "{content_folder_path}"
+    "previewfile" "{preview_file_path}"
+    "title" "{title}"
+    "description" "{escaped_description}"
+    "changenote" "{change_note}"
+}}
+"""
+
+
+def write_workshop_manifests(
+    workshop_items: Iterable[WorkshopItem],
+    app_id: str,
+    change_note: str,
+) -> list[WorkshopItemResult]:
+    """Write the manifest of every item, returns a result per item ready to be filled in by the upload"""
+    results = []
+    for workshop_item in workshop_items:
+        if not workshop_item.description_file_path.exists():
+            msg = f"Workshop description file {workshop_item.description_file_path} for {workshop_item.name} is missing"
+            raise ValueError(msg)
+        item_id, title = get_workshop_item_details(workshop_item.descriptor_file_path)
+        manifest_content = make_workshop_manifest(
+            app_id,
+            item_id,
+            workshop_item.upload_folder_path or workshop_item.content_folder_path,
+            title,
+            workshop_item.description_file_path.read_text(),
+            change_note,
+            preview_file_path=workshop_item.content_folder_path / "thumbnail.png",
+        )
+        workshop_item.manifest_file_path.parent.mkdir(parents=True, exist_ok=True)
+        with Path.open(workshop_item.manifest_file_path, "w") as manifest_file_object:
+            manifest_file_object.write(manifest_content)
+        results.append(
+            WorkshopItemResult(
+                name=workshop_item.name,
+                manifest_file_path=str(workshop_item.manifest_file_path),
+                item_id=item_id,
+                title=title,
+            )
+        )
+    return results
+
+
+def stage_workshop_items(workshop_items: Iterable[WorkshopItem], staging_folder_path: Path, rules: WalkRules) -> None:
+    """
+    Stage the included files of every item in a subfolder of `staging_folder_path`, and set its `upload_folder_path`
+
+    Files are hard links where possible, copies otherwise (like across file systems). Any previous staging folder of
+    the item is removed first, so files removed from the mod don't linger.
+    """
+    for workshop_item in workshop_items:
+        upload_folder_path = staging_folder_path / workshop_item.name
+        if upload_folder_path.exists():
+            shutil.rmtree(upload_folder_path)
+        upload_folder_path.mkdir(parents=True)
+        for relative_path, dir_entry in walk_folder(workshop_item.content_folder_path, rules):
+            staged_file_path = upload_folder_path / relative_path
+            staged_file_path.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                os.link(dir_entry.path, staged_file_path)
+            except OSError:
+                shutil.copy2(dir_entry.path, staged_file_path)
+        workshop_item.upload_folder_path = upload_folder_path
+
+
+def get_snapshot_file_path(snapshot_folder_path: Path, item_id: str) -> Path:
+    return snapshot_folder_path / f"{item_id}.json"
+
+
+def check_workshop_item_changes(
+    workshop_items: Iterable[WorkshopItem],
+    results: list[WorkshopItemResult],
+    change_note: str,
+    snapshot_folder_path: Path,
+    rules: WalkRules | None = None,
+) -> list[ContentSnapshot]:
+    """
+    Snapshot each item and compare it with its last uploaded snapshot
+
+    Unchanged items are marked `unchanged`, changed ones get their changed set in `changes`. Returns the new snapshots,
+    in item order, to be saved once the items are uploaded.
+    """
+    snapshots = []
+    for workshop_item, result in zip(workshop_items, results, strict=True):
+        snapshot = take_content_snapshot(
+            result.item_id,  # ty:ignore[invalid-argument-type] always filled in by `write_workshop_manifests`
+            workshop_item.content_folder_path,
+            {
+                "title": result.title or "",
+                "description": workshop_item.description_file_path.read_text(),
+                "change_note": change_note,
+            },
+            rules=rules,
+        )
+        previous_snapshot = load_content_snapshot(get_snapshot_file_path(snapshot_folder_path, snapshot.item_id))
+        snapshot_diff = compare_snapshots(previous_snapshot, snapshot)
+        if snapshot_diff.unchanged:
+            result.status = "unchanged"
+        else:
+            result.changes = {
+                "added": snapshot_diff.added,
+                "removed": snapshot_diff.removed,
+                "modified": snapshot_diff.modified,
+                "metadata": snapshot_diff.metadata,
+            }
+        snapshots.append(snapshot)
+    return snapshots
+
+
+def save_uploaded_snapshots(
+    results: Iterable[WorkshopItemResult], snapshots: Iterable[ContentSnapshot], snapshot_folder_path: Path
+) -> None:
+    """Save the snapshot of every uploaded item, so the next run compares against what is on the workshop"""
+    for result, snapshot in zip(results, snapshots, strict=True):
+        if result.status == "uploaded":
+            save_content_snapshot(snapshot, get_snapshot_file_path(snapshot_folder_path, snapshot.item_id))
+
+
+def fill_in_upload_results(
+    results: list[WorkshopItemResult],
+    uploaded_manifests: Iterable[Path],
+    error: str | None = None,
+) -> None:
+    """
+    Mark uploaded items, and the first item after them as failed if there was an error
+
+    Items are uploaded in order and steamcmd stops at the first failure, anything after it is left as not attempted.
+    """
+    uploaded_manifest_names = {str(manifest_file_path) for manifest_file_path in uploaded_manifests}
+    for result in results:
+        if result.manifest_file_path in uploaded_manifest_names:
+            result.status = "uploaded"
+        elif error is not None:
+            result.status = "failed"
+            result.error = error
+            break
+
+
+def save_workshop_upload_results(results: list[WorkshopItemResult], results_file_path: Path) -> None:
+    with Path.open(results_file_path, "w", encoding="utf-8") as results_file_object:
+        json.dump([asdict(result) for result in results], results_file_object, indent=4)
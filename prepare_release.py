@@ -1,26 +1,174 @@
 ### Imports ###
 import argparse
+import datetime as dt
+import functools
 import json
-import re
+import logging
+import sys
 from pathlib import Path
 
 import constants_and_overrides as cao
+from methods.cache_methods import ParseCache
+from methods.changelog_methods import replace_changelog_entry
+from methods.descriptor_methods import ModDescriptor, cache_descriptor, load_descriptor
+from methods.file_methods import (
+    FileOverlay,
+    append_to_file,
+    changed_files_list_file_name,
+    clear_changed_file_paths,
+    read_file_text,
+    set_file_overlay,
+    write_changed_files_list,
+    write_file_if_changed,
+)
 from methods.input_methods import (
-    create_descriptor_file,
     generate_with_template_file,
     get_env_variable,
     increment_mod_version,
     mod_version_to_dict,
-    parse_descriptor_to_dict,
     search_and_replace_in_file,
     str2bool,
 )
+from methods.loc_methods import get_loc_key_index, patch_loc_files
+from methods.log_methods import configure_logging
+from methods.size_methods import report_content_size
+from methods.stage_methods import StageGraph
+from methods.timing_methods import PhaseTimer
+from methods.validation_methods import validate_mod_files
+from methods.walk_methods import WalkRules
+
+### Overlay mode ###
+# `--plan` and `--apply` are read before anything else, resolving the config can already write to the parse cache
+overlay_mode_parser = argparse.ArgumentParser(add_help=False)
+# both run everything against an in-memory file overlay, nothing is written until the end
+overlay_mode_group = overlay_mode_parser.add_mutually_exclusive_group()
+overlay_mode_group.add_argument(
+    "--plan", action="store_true", help="Print a diff of every file that would change (and the env/outputs), write nothing"
+)
+overlay_mode_group.add_argument(
+    "--apply", action="store_true", help="Write all changed files in one batch at the end, nothing if any step fails"
+)
+overlay_mode_args, _ = overlay_mode_parser.parse_known_args()
+file_overlay = FileOverlay() if overlay_mode_args.plan or overlay_mode_args.apply else None
+set_file_overlay(file_overlay)
+
+### Logging ###
+# level from `cao.debug_level`, JSON lines with `logFormat=json`
+# the plan is printed to stdout, so the logs go to stderr with `--plan`
+configure_logging(cao.debug_level, stream=sys.stderr if overlay_mode_args.plan else None)
+logger = logging.getLogger("prepare_release")
+# checked once, guards the debug output that is expensive to build
+debug = logger.isEnabledFor(logging.DEBUG)
+
+
+### Stages ###
+# steps that don't depend on each other run concurrently, see `methods/stage_methods.py`
+# they get everything from `cao` as arguments, read once up front instead of from several threads at once
+def validate_release_files(
+    mod_files_folder_path: Path, validation_cache_file_path: Path, tool_version: str, rules: WalkRules
+) -> None:
+    """Validate the mod files, only those changed since the last run are checked again"""
+    validation_result = validate_mod_files(
+        mod_files_folder_path, validation_cache_file_path, tool_version=tool_version, rules=rules
+    )
+    for validation_issue in validation_result.warnings:
+        logger.warning("%s", validation_issue.describe(), extra={"fields": {"check": validation_issue.check}})
+    logger.info(
+        "Validated mod files: %s checked, %s from cache, %s errors, %s warnings",
+        validation_result.checked_count,
+        validation_result.cached_count,
+        len(validation_result.errors),
+        len(validation_result.warnings),
+    )
+    if validation_result.errors:
+        msg = "Mod files failed validation:\n" + "\n".join(issue.describe() for issue in validation_result.errors)
+        raise ValueError(msg)
+
+
+def parse_descriptor(descriptor_file_path: Path, parse_cache: ParseCache) -> ModDescriptor:
+    """Descriptor broken down into a typed model, checked once here"""
+    descriptor = load_descriptor(descriptor_file_path, parse_cache)
+    descriptor.require("name", "version", source=descriptor_file_path)
+    return descriptor
+
+
+def write_descriptor(descriptor: ModDescriptor, descriptor_file_path: Path, parse_cache: ParseCache) -> None:
+    descriptor.write(descriptor_file_path)
+    # later steps (like the workshop upload) read the new descriptor from the parse cache
+    cache_descriptor(descriptor, descriptor_file_path, parse_cache)
+    logger.debug("- Descriptor %s -", "written to file" if file_overlay is None else "would be written to file")
+
+
+def update_loc_files(
+    loc_key_values: dict[str, str],
+    loc_file_paths: list[Path] | None,
+    mod_files_folder_path: Path,
+    loc_key_index_file_path: Path,
+    loc_key_pattern: str,
+) -> None:
+    """Patch every requested key in each file in one pass, `loc_file_paths` None to find the files defining the keys"""
+    if loc_file_paths is None:
+        # only the files with entries `loc_key_pattern` can patch, found by parsing every loc file (cached by size and mtime)
+        loc_key_index = get_loc_key_index(mod_files_folder_path, loc_key_index_file_path, loc_key_pattern=loc_key_pattern)
+        missing_loc_keys = [loc_key for loc_key in loc_key_values if not loc_key_index.find(loc_key)]
+        if missing_loc_keys:
+            msg = f"Loc keys {', '.join(missing_loc_keys)} not found in any localisation file of the mod"
+            raise ValueError(msg)
+        loc_file_paths = loc_key_index.find_files(loc_key_values)
+    loc_patch_results = patch_loc_files(loc_file_paths, loc_key_pattern, loc_key_values)
+
+    logger.info(
+        "- Loc keys updated: -\n%s",
+        "\n".join(
+            f"{loc_patch_result.file_path.name} ({'changed' if loc_patch_result.changed else 'unchanged'}): "
+            f"{loc_patch_result.matches}"
+            for loc_patch_result in loc_patch_results
+        ),
+    )
+    # a key the pattern never matched would otherwise be a silent no-op
+    unmatched_loc_keys = [
+        loc_key
+        for loc_key in loc_key_values
+        if not any(loc_patch_result.matches[loc_key] for loc_patch_result in loc_patch_results)
+    ]
+    if unmatched_loc_keys:
+        loc_file_names = ", ".join(loc_file_path.name for loc_file_path in loc_file_paths)
+        msg = f"Loc keys {', '.join(unmatched_loc_keys)} not matched by `loc_key_pattern` in {loc_file_names}"
+        raise ValueError(msg)
+
+
+def update_changelog(  # noqa: PLR0913, PLR0917
+    changelog_file_path: Path,
+    changelog_search_pattern: str,
+    changelog_replace: str,
+    updated_mod_version: str,
+    changelog_index_file_path: Path,
+    parse_cache: ParseCache,
+) -> str:
+    """Release the WIP entry of the changelog, returns the entry for the release notes"""
+    # only the WIP entry is searched, found with the offset index of the changelog (which is updated to match)
+    match = replace_changelog_entry(
+        changelog_file_path,
+        "WIP",
+        changelog_search_pattern,
+        changelog_replace,
+        index_file_path=changelog_index_file_path,
+        parse_cache=parse_cache,
+    )
+    if match is None:
+        msg = f"No WIP entry to release found in {changelog_file_path.name}"
+        raise ValueError(msg)
+
+    # use the match on the original WIP entry, change the WIP to version number, then fill in template
+    # fills in string with groups retrieved from regex search, in order
+    release_changelog_entry = f"{match[1]}{match[2]}{match[3]}{updated_mod_version}{match[4]}{match[5]}{match[6]}{match[7]}"
+    logger.debug("- Finished changelog entry going into release notes: -\n%s", release_changelog_entry)
+    return release_changelog_entry
 
-# TODO: set up `descriptor_dict` as a TypeDict with all expected entries
 
 ### Command line inputs ###
 # the user shouldn't even see these, they're for the github action to call
-parser = argparse.ArgumentParser()
+parser = argparse.ArgumentParser(parents=[overlay_mode_parser])
 parser.add_argument("versionType", type=str, choices=cao.possible_version_types, help="version type to bump")
 parser.add_argument("versionStellaris", type=str, help="Stellaris version to support")
 # argparse does not have a proper bool method, so custom implementation in module
@@ -31,36 +179,80 @@ parser.add_argument("modFolderName", type=str, help="Name of mod folder (and rep
 parser.add_argument("repoGithubpath", type=str, help="Mod repository Github path, username+repo_name")
 args = parser.parse_args()
 
-if cao.debug_level in ["INFO", "DEBUG"]:
-    print("- Inputs -")
-    print("versionType:", args.versionType)
-    print("versionStellaris:", args.versionStellaris)
-    print("useChangelog:", args.useChangelog)
-    print("modFolderName:", args.modFolderName)
-    print("repoGithubpath:", args.repoGithubpath)
+# per-phase timing, only recorded with `timingReport` set
+timer = PhaseTimer.from_env("prepare_release")
+# files written from here on are staged by the commit step, see `changed_files_path` below
+clear_changed_file_paths()
 
-### File paths ###
-if cao.debug_level in ["INFO", "DEBUG"]:
-    print("\n- Paths -")
-    print("Working directory for Python script:", Path.cwd())
-    print("Path to mod files:", cao.mod_github_folder_path)
-    print("Descriptor file location:", cao.descriptor_file_path)
+logger.info(
+    "- Inputs -\nversionType: %s\nversionStellaris: %s\nuseChangelog: %s\nmodFolderName: %s\nrepoGithubpath: %s",
+    args.versionType,
+    args.versionStellaris,
+    args.useChangelog,
+    args.modFolderName,
+    args.repoGithubpath,
+    extra={"fields": {"inputs": vars(args)}},
+)
 
-### File parsing ###
-# grab descriptor and break it down into a python dict
-descriptor_dict = parse_descriptor_to_dict(cao.descriptor_file_path)
+### File paths ###
+if logger.isEnabledFor(logging.INFO):
+    logger.info(
+        "- Paths -\nWorking directory for Python script: %s\nPath to mod files: %s\nDescriptor file location: %s",
+        Path.cwd(),
+        cao.mod_github_folder_path,
+        cao.descriptor_file_path,
+    )
 
-if cao.debug_level == "DEBUG":
-    print("- Extracted descriptor dictionary: -")
-    for key, item in descriptor_dict.items():
-        print(f"{key}: {item}")
+### Checks and file parsing ###
+# before anything is written, so a broken file stops the release instead of reaching players
+# validation only checks files changed since the last run again, see `validation_cache_file_path`
+# the size report is checked against the size budgets in `OVERRIDE.txt`, before the release zip is built
+# validating can start a process pool on large mods, so it runs on the main thread (the loc files too, below)
+check_stages = StageGraph("release checks")
+check_stages.add_stage(
+    "validate mod files",
+    functools.partial(
+        validate_release_files,
+        cao.mod_files_folder_path,
+        cao.validation_cache_file_path,
+        cao.parse_cache.tool_version,
+        cao.walk_rules,
+    ),
+    main_thread=True,
+)
+check_stages.add_stage(
+    "size report",
+    functools.partial(
+        report_content_size,
+        cao.mod_files_folder_path,
+        cao.size_report_file_path,
+        cao.previous_size_report_file_path,
+        size_budgets=cao.size_budgets,
+        rules=cao.walk_rules,
+        title=cao.mod_folder_name,
+    ),
+)
+check_stages.add_stage("parse descriptor", functools.partial(parse_descriptor, cao.descriptor_file_path, cao.parse_cache))
+with timer.span("release checks"):
+    check_stages.run()
+    for stage_result in check_stages.results.values():
+        timer.add_span(stage_result.name, stage_result.wall_seconds)
+descriptor: ModDescriptor = check_stages.get_value("parse descriptor")
+
+if debug:
+    descriptor_dict = descriptor.to_dict()
+    logger.debug(
+        "- Extracted descriptor dictionary: -\n%s",
+        "\n".join(f"{key}: {item}" for key, item in descriptor_dict.items()),
+        extra={"fields": {"descriptor": descriptor_dict}},
+    )
 
 ### Processing ###
 ## Mod version
 # takes the mod version str and increments the selected bit according to semantic versioning
 # also returns a dict with the split up semantic pieces (usually major version, minor version, and patch version)
 current_semantic_versions, updated_mod_version = increment_mod_version(
-    descriptor_dict["version"],  # ty:ignore[invalid-argument-type] version is always a str
+    descriptor.version,  # ty:ignore[invalid-argument-type] checked by `require`
     args.versionType,
     possible_version_types=cao.possible_version_types,
     regex_version_pattern=cao.regex_version_pattern,
@@ -75,10 +267,9 @@ github_release_tag = "v" + ".".join(current_semantic_versions.values())
 # v1.2.3 -> v1_2_3
 for_filename_mod_version = "v" + "_".join(current_semantic_versions.values())
 
-if cao.debug_level == "DEBUG":
-    print(f"Broken down version dict: {current_semantic_versions}")
-    print(f"Post-bump mod version: {updated_mod_version}")
-    print(f"Github release tag to use: {github_release_tag}")
+logger.debug("Broken down version dict: %s", current_semantic_versions)
+logger.debug("Post-bump mod version: %s", updated_mod_version)
+logger.debug("Github release tag to use: %s", github_release_tag)
 
 ## Supported Stellaris version
 # version for display in descriptions, change any asterisks to x
@@ -104,10 +295,9 @@ stellaris_major_minor_version = f"{current_semantic_versions['Major']}.{current_
 supported_stellaris_version_in_name = f"({stellaris_major_minor_version})"  # put in parenthesis
 supported_stellaris_version_in_name = supported_stellaris_version_in_name.replace("v", "")  # just in case
 
-if cao.debug_level == "DEBUG":
-    print(f"Input supported Stellaris version: {args.versionStellaris}")
-    print(f"For display: {supported_stellaris_version_display}")
-    print(f"For mod name: {supported_stellaris_version_in_name}")
+logger.debug("Input supported Stellaris version: %s", args.versionStellaris)
+logger.debug("For display: %s", supported_stellaris_version_display)
+logger.debug("For mod name: %s", supported_stellaris_version_in_name)
 
 ## Processing for descriptor file
 # make path manually, should always prefer relative path
@@ -125,35 +315,45 @@ if cao.descriptor_override_supported_version is None:
 else:
     generated_supported_version = cao.descriptor_override_supported_version
 
-# update dict, these are always generated
-descriptor_dict["version"] = updated_mod_version
-descriptor_dict["path"] = generated_path
-descriptor_dict["supported_version"] = generated_supported_version
+# update descriptor, these are always generated
+descriptor.version = updated_mod_version
+descriptor.path = generated_path
+descriptor.supported_version = generated_supported_version
 
 # check if any other parameters had requested overrides
 if cao.overrides_enabled:
     # check if we want another name - make supported stellaris version available
     # useful for say gigastructures' mod naming convention
     if cao.descriptor_override_name is not None:
-        descriptor_dict["name"] = cao.descriptor_override_name.format(stellaris_version=supported_stellaris_version_in_name)
+        descriptor.name = cao.descriptor_override_name.format(stellaris_version=supported_stellaris_version_in_name)
 
     # misc overrides
     if cao.descriptor_override_tags is not None:
-        descriptor_dict["tags"] = cao.descriptor_override_tags
+        descriptor.tags = cao.descriptor_override_tags
     if cao.descriptor_override_picture is not None:
-        descriptor_dict["picture"] = cao.descriptor_override_picture
+        descriptor.picture = cao.descriptor_override_picture
     if cao.descriptor_override_remote_file_id is not None:
-        descriptor_dict["remote_file_id"] = cao.descriptor_override_remote_file_id
+        descriptor.remote_file_id = cao.descriptor_override_remote_file_id
+
+if debug:
+    descriptor_dict = descriptor.to_dict()
+    logger.debug(
+        "- Updated descriptor dictionary: -\n%s",
+        "\n".join(f"{key}: {item}" for key, item in descriptor_dict.items()),
+        extra={"fields": {"descriptor": descriptor_dict}},
+    )
 
-if cao.debug_level == "DEBUG":
-    print("- Updated descriptor dictionary: -")
-    for key, item in descriptor_dict.items():
-        print(f"{key}: {item}")
+### Release stages ###
+# the descriptor, workshop description, readme, loc files, changelog and webhook json don't depend on each other
+# only the release notes wait for the changelog entry
+release_stages = StageGraph("release files")
 
 ## Finish up with descriptor file
-create_descriptor_file(descriptor_dict, cao.descriptor_file_path)
-if cao.debug_level == "DEBUG":
-    print("- Descriptor written to file -")
+release_stages.add_stage(
+    "write descriptor",
+    functools.partial(write_descriptor, descriptor, cao.descriptor_file_path, cao.parse_cache),
+    outputs=["descriptor.mod"],
+)
 
 ### Update workshop description, if it exists ###
 if cao.workshop_description_file_path.exists():
@@ -162,10 +362,15 @@ if cao.workshop_description_file_path.exists():
     # by default look for "Supports Stellaris version: 1.2.x" with version number bolded in steam BBcode
     new_workshop_desc_version = f"\\g<1>{supported_stellaris_version_display}\\g<2>"
 
-    workshop_file_string = search_and_replace_in_file(
-        cao.workshop_description_file_path,
-        cao.workshop_desc_version_pattern,
-        new_workshop_desc_version,
+    release_stages.add_stage(
+        "workshop description",
+        functools.partial(
+            search_and_replace_in_file,
+            cao.workshop_description_file_path,
+            cao.workshop_desc_version_pattern,
+            new_workshop_desc_version,
+        ),
+        outputs=["workshop.txt"],
     )
 
 ### Similarly update readme file, if it exists ###
@@ -175,27 +380,44 @@ if cao.readme_file_path.exists():
     # by default look for "Supports Stellaris version: `1.2.x`" with version number using code embed in markdown
     new_readme_version = f"\\g<1>{supported_stellaris_version_display}\\g<2>"
 
-    readme_file_string = search_and_replace_in_file(cao.readme_file_path, cao.readme_version_pattern, new_readme_version)
+    release_stages.add_stage(
+        "readme",
+        functools.partial(search_and_replace_in_file, cao.readme_file_path, cao.readme_version_pattern, new_readme_version),
+        outputs=["README.md"],
+    )
 
 ### Update any loc files as requested ###
-# is skipped if there is nothing
-if cao.loc_files_list:
-    for file_name in cao.loc_files_list:
-        loc_file_path = (cao.mod_files_folder_path / file_name).resolve()
-
-        # change mod version in a loc file for access in-game
-        # inserts requested specific key into a generic search pattern for loc files
-        version_loc_key_pattern = cao.loc_key_pattern.format(cao.version_loc_key)
-        # uses regex groups in `version_loc_key_pattern`
-        new_version_loc_key = f"\\g<1>{updated_mod_version}\\g<2>"
-
-        # potential other keys to change to go here
+# every requested key is patched in each file in one pass, files are handled concurrently
+loc_key_values: dict[str, str] = {}
+if cao.version_loc_key:
+    # change mod version in a loc file for access in-game
+    loc_key_values[cao.version_loc_key] = updated_mod_version
+if cao.supported_version_loc_key:
+    loc_key_values[cao.supported_version_loc_key] = supported_stellaris_version_display
+if cao.release_date_loc_key:
+    loc_key_values[cao.release_date_loc_key] = dt.datetime.now(tz=dt.UTC).strftime(cao.release_date_format)
 
-        loc_file_string = search_and_replace_in_file(loc_file_path, version_loc_key_pattern, new_version_loc_key)
+# is skipped if there is nothing
+if loc_key_values:
+    release_stages.add_stage(
+        "loc files",
+        functools.partial(
+            update_loc_files,
+            loc_key_values,
+            [(cao.mod_files_folder_path / file_name).resolve() for file_name in cao.loc_files_list] or None,
+            cao.mod_files_folder_path,
+            cao.loc_key_index_file_path,
+            cao.loc_key_pattern,
+        ),
+        outputs=["loc files"],
+        main_thread=True,
+    )
 
 ### Process changelog ###
 # uses regex groups in `template_insert_version_pattern`
 new_template_insert_version = f"\\g<1>\\g<2>{supported_stellaris_version_display}\\g<3>"
+generated_release_notes_file_path = cao.generated_release_notes_file_path
+logger.debug("- Name and path of output file with release notes: -\n%s", generated_release_notes_file_path)
 
 # user specified to use changelog
 if args.useChangelog:
@@ -220,36 +442,36 @@ if args.useChangelog:
 
     # this replaces the WIP on the latest change entry in the original changelog file from the mod repo
     # and also turns it into a link that will lead to the release we will be creating
-    original_changelog_file_string, new_changelog_file_string = search_and_replace_in_file(
-        cao.changelog_file_path,
-        cao.changelog_search_pattern,
-        changelog_replace,
-        return_old_str=True,
+    release_stages.add_stage(
+        "changelog",
+        functools.partial(
+            update_changelog,
+            cao.changelog_file_path,
+            cao.changelog_search_pattern,
+            changelog_replace,
+            updated_mod_version,
+            cao.changelog_index_file_path,
+            cao.parse_cache,
+        ),
+        outputs=["CHANGELOG.md", "release changelog entry"],
     )
 
-    # fill in template to make a file to bundle as release notes
-    # grab the changelog entry from the original file, change the WIP to version number, then fill in template
-    # note use of extracted changelog string, the source file has been updated already
-    if match := re.search(
-        cao.changelog_search_pattern,
-        original_changelog_file_string,
-        flags=re.IGNORECASE | re.MULTILINE | re.DOTALL,
-    ):
-        # fills in string with groups retrieved from regex search, in order
-        release_changelog_entry = f"{match[1]}{match[2]}{match[3]}{updated_mod_version}{match[4]}{match[5]}{match[6]}{match[7]}"
-
-        if cao.debug_level == "DEBUG":
-            print("- Finished changelog entry going into release notes: -")
-            print(release_changelog_entry)
-            print("- Name and path of output file with release notes: -")
-            print(cao.generated_release_notes_file_path)
-
-    template_file_string = generate_with_template_file(
-        cao.release_note_template_file_path,
-        cao.generated_release_notes_file_path,
-        [cao.template_insert_version_pattern, cao.template_search_pattern],
-        [new_template_insert_version, release_changelog_entry],
-        skip_regex_replace=False,
+    # fill in template to make a file to bundle as release notes, with the released changelog entry
+    release_note_template_file_path = cao.release_note_template_file_path
+    # the version line and the changes block don't overlap, so both are filled in with one pass over the template
+    release_note_patterns = [cao.template_insert_version_pattern, cao.template_search_pattern]
+    release_stages.add_stage(
+        "release notes",
+        lambda: generate_with_template_file(
+            release_note_template_file_path,
+            generated_release_notes_file_path,
+            release_note_patterns,
+            [new_template_insert_version, release_stages.get_value("changelog")],
+            skip_regex_replace=False,
+            merge_patterns=True,
+        ),
+        inputs=["release changelog entry"],
+        outputs=["release notes"],
     )
 
 # user is not using changelogs
@@ -268,25 +490,41 @@ else:
 
     # no change notes, uses template directly
     # dynamically change the supported stellaris version though
-    template_file_string = generate_with_template_file(
-        release_note_template_file_path,
-        cao.generated_release_notes_file_path,
-        cao.template_insert_version_pattern,
-        new_template_insert_version,
-        skip_regex_replace=False,
+    release_stages.add_stage(
+        "release notes",
+        functools.partial(
+            generate_with_template_file,
+            release_note_template_file_path,
+            generated_release_notes_file_path,
+            cao.template_insert_version_pattern,
+            new_template_insert_version,
+            skip_regex_replace=False,
+        ),
+        outputs=["release notes"],
     )
 
+# save a json with the stellaris version for automated parsing by web tools/hooks
+webhook_dict = {"supported_stellaris_version": args.versionStellaris}
+release_stages.add_stage(
+    "webhook json",
+    functools.partial(write_file_if_changed, cao.webhook_json_file_path, json.dumps(webhook_dict)),
+    outputs=["supported_stellaris_version.json"],
+)
+
+# every stage runs even if another fails, all errors are raised together
+with timer.span("release files"):
+    release_stages.run()
+    for stage_result in release_stages.results.values():
+        timer.add_span(stage_result.name, stage_result.wall_seconds)
+
 ### Preparing environment variables to help create release ###
-env_file_path = get_env_variable("GITHUB_ENV", None, debug_level=cao.debug_level)
+env_file_path = get_env_variable("GITHUB_ENV", None)
 
 # save path of generated changelog file
-with Path.open(env_file_path, "a") as envfile:  # type: ignore - false error from parsing a str filename which works fine when the file exists in the actual github env
-    print(f"{cao.github_env_releasenotesfile_name}={cao.generated_release_notes_file_path}", file=envfile)
-
-# save a json with the stellaris version for automated parsing by web tools/hooks
-webhook_dict = {"supported_stellaris_version": args.versionStellaris}
-with Path.open(cao.webhook_json_file_path, "w") as webhook_json_file_object:
-    json.dump(webhook_dict, webhook_json_file_object)
+append_to_file(
+    env_file_path,  # ty:ignore[invalid-argument-type] set in the github env
+    f"{cao.github_env_releasenotesfile_name}={generated_release_notes_file_path}\n",
+)
 
 # output if the `localisation` and `localisation/replace` folders exist
 # just to avoid crashing later
@@ -296,28 +534,83 @@ loc_folder_exists = "true" if localisation_path.is_dir() else "false"
 loc_replace_path = cao.mod_files_folder_path / "localisation/replace/"
 loc_replace_folder_exists = "true" if loc_replace_path.is_dir() else "false"
 
-github_output = get_env_variable("GITHUB_OUTPUT", None, debug_level=cao.debug_level)
-if github_output:
-    with Path.open(Path(github_output), "a") as gh_output_file:
-        gh_output_file.write(f"loc_folder_exists={loc_folder_exists}\n")
-        gh_output_file.write(f"loc_replace_folder_exists={loc_replace_folder_exists}\n")
+# list of the mod repo files that actually changed, so the commit step stages only those
+changed_files_list_file_path = cao.generated_files_folder_path / changed_files_list_file_name
+changed_relative_paths = write_changed_files_list(changed_files_list_file_path, cao.mod_github_folder_path)
+logger.info(
+    "%s changed files in the mod repo", len(changed_relative_paths), extra={"fields": {"changed_files": changed_relative_paths}}
+)
+if debug:
+    logger.debug("Changed files: %s", ", ".join(changed_relative_paths))
+
+logger.info(
+    "Parse cache %s: %s hits, %s misses",
+    cao.parse_cache_folder_path,
+    cao.parse_cache.hits,
+    cao.parse_cache.misses,
+    extra={"fields": {"parse_cache_hits": cao.parse_cache.hits, "parse_cache_misses": cao.parse_cache.misses}},
+)
+
+# timing report (JSON, step summary table, OpenMetrics), if enabled
+timing_report_file_path = timer.write_reports(cao.generated_files_folder_path)
 
-    if cao.debug_level in ["INFO", "DEBUG"]:
-        print("- Output being passed to github: -")
-        print(f"{(Path.open(Path(github_output), 'r')).read()}")
+github_output = get_env_variable("GITHUB_OUTPUT", None)
+if github_output:
+    github_output_lines = [
+        f"loc_folder_exists={loc_folder_exists}\n",
+        f"loc_replace_folder_exists={loc_replace_folder_exists}\n",
+        f"changed_files_path={changed_files_list_file_path.absolute()}\n",
+    ]
+    if timing_report_file_path is not None:
+        github_output_lines.append(f"timing_report_path={timing_report_file_path}\n")
+    append_to_file(Path(github_output), "".join(github_output_lines))
+
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("- Output being passed to github: -\n%s", read_file_text(Path(github_output)))
 else:
     msg = f"Error while writing manifest path to github output, env variable 'GITHUB_OUTPUT' was: {github_output}"
     raise ValueError(msg)
 
 # create title from mod name + the release tag - used for commit message and release title
-release_title = f"{descriptor_dict['name']} {github_release_tag}"
+release_title = f"{descriptor.name} {github_release_tag}"
 # release zipfile name must be acceptable format
 release_zipfile_name = f"{cao.mod_folder_name}_{for_filename_mod_version}.zip"
 # make useful environment variables
-with Path.open(env_file_path, "a") as envfile:  # type: ignore - false error from parsing a str filename which works fine when the file exists in the actual github env
-    print(f"{cao.github_env_releasetitle_name}={release_title}", file=envfile)
-    print(f"{cao.github_env_modreleasetag_name}={github_release_tag}", file=envfile)
-    print(f"{cao.github_env_descriptorfile_name}={cao.descriptor_file_name}", file=envfile)
-    print(f"{cao.github_env_releasezipfile_name}={release_zipfile_name}", file=envfile)
+append_to_file(
+    env_file_path,  # ty:ignore[invalid-argument-type] set in the github env
+    f"{cao.github_env_releasetitle_name}={release_title}\n"
+    f"{cao.github_env_modversion_name}={updated_mod_version}\n"
+    f"{cao.github_env_modreleasetag_name}={github_release_tag}\n"
+    f"{cao.github_env_descriptorfile_name}={cao.descriptor_file_name}\n"
+    f"{cao.github_env_releasezipfile_name}={release_zipfile_name}\n",
+)
+
+### Plan or apply ###
+# everything above went into the file overlay, if one was requested
+if file_overlay is not None:
+    set_file_overlay(None)
+    if args.plan:
+        # a `git diff` of the mod repo, then the env/outputs for the next steps, then the tool's own files by name
+        mod_repo_folder_path = cao.mod_github_folder_path.absolute()
+        github_file_paths = [Path(env_file_path).absolute(), Path(github_output).absolute()]
+        plan_file_paths = file_overlay.get_changed_paths()
+        repo_file_paths = [file_path for file_path in plan_file_paths if file_path.is_relative_to(mod_repo_folder_path)]
+        other_file_paths = [
+            file_path
+            for file_path in plan_file_paths
+            if file_path not in repo_file_paths and file_path not in github_file_paths
+        ]
+        sys.stdout.write(
+            file_overlay.format_diff(repo_file_paths, mod_repo_folder_path) or "# No mod repo files would change\n"
+        )
+        sys.stdout.write("# GitHub env and outputs\n" + file_overlay.format_diff(github_file_paths))
+        sys.stdout.write(f"# {len(other_file_paths)} generated and cache files\n")
+        sys.stdout.writelines(f"# {file_path}\n" for file_path in other_file_paths)
+    else:
+        file_overlay.flush()
+
+# the least recently used parse cache entries are removed once, now that the new ones are written
+if not args.plan:
+    cao.parse_cache.evict()
 
 # release handled by github CLI commands in shell script
@@ -7,41 +7,76 @@ account will be used with steamcmd
 
 ### Imports ###
 import base64
+import logging
 import re
-import subprocess
+import shlex
 from pathlib import Path
 
 import constants_and_overrides as cao
+from methods.changelog_methods import find_changelog_entry
+from methods.descriptor_methods import load_descriptor
 from methods.input_methods import (
     get_env_variable,
     mod_version_to_dict,
-    parse_descriptor_to_dict,
     replace_with_steam_formatting,
     str2bool,
 )
+from methods.log_methods import configure_logging
+from methods.size_methods import report_content_size
+from methods.steamcmd_methods import (
+    SteamcmdLoginError,
+    SteamcmdUploadError,
+    log_steamcmd_log_files,
+    run_steamcmd_script,
+    write_steamcmd_runscript,
+)
+from methods.timing_methods import PhaseTimer
+from methods.workshop_methods import (
+    check_workshop_item_changes,
+    fill_in_upload_results,
+    get_workshop_items,
+    save_uploaded_snapshots,
+    save_workshop_upload_results,
+    stage_workshop_items,
+    workshop_upload_results_file_name,
+    write_workshop_manifests,
+)
+
+timeout_time = 60  # s, per steamcmd step (login, and each item upload)
+steamcmd_runscript_file_name = "steamcmd_runscript.txt"
+
+### Logging ###
+# level from `cao.debug_level`, JSON lines with `logFormat=json`, secrets like `configVdf` are redacted
+configure_logging(cao.debug_level)
+logger = logging.getLogger("steam_workshop_upload")
+# checked once, guards the debug output that is expensive to build
+debug = logger.isEnabledFor(logging.DEBUG)
 
-timeout_time = 60  # s
+# per-phase timing, only recorded with `timingReport` set
+timer = PhaseTimer.from_env("steam_workshop_upload")
 
 ### Environment variables, paths ###
 # secrets
-steam_username = get_env_variable("steam_username", None, debug_level=cao.debug_level)
-config_vdf_contents = get_env_variable("configVdf", None, debug_level=cao.debug_level)
+steam_username = get_env_variable("steam_username", None)
+config_vdf_contents = get_env_variable("configVdf", None)
 # normal env variables
-app_id = get_env_variable("appID", None, debug_level=cao.debug_level)
-input_stellaris_version = get_env_variable("versionStellaris", None, debug_level=cao.debug_level)
-use_changelog = str2bool(get_env_variable("useChangelog", "false", debug_level=cao.debug_level))
-repo_github_path = get_env_variable("repoGithubpath", None, debug_level=cao.debug_level)
+# command to start steamcmd, can be pointed at a fake steamcmd (`python tests/fixtures/fake_steamcmd.py`) for testing
+steamcmd_command = shlex.split(get_env_variable("steamcmdCommand", "steamcmd"))
+app_id = get_env_variable("appID", None)
+input_stellaris_version = get_env_variable("versionStellaris", None)
+use_changelog = str2bool(get_env_variable("useChangelog", "false"))
+repo_github_path = get_env_variable("repoGithubpath", None)
+# upload every item even if it matches its last uploaded snapshot
+force_upload = str2bool(get_env_variable("forceUpload", "false"))
 
 # dependent on docker container image used to set up steamcmd
-home_dir_env_var = get_env_variable("HOME", "/home", debug_level=cao.debug_level)
+home_dir_env_var = get_env_variable("HOME", "/home")
 if home_dir_env_var is None:
     msg = "HOME environment variable is missing - problem with docker image being used that should set this up"
     raise ValueError(msg)
 home_dir_path: Path = Path(home_dir_env_var).resolve()
 
-steam_home_env_var = get_env_variable(
-    "STEAM_HOME", (home_dir_path / ".local/share/Steam").as_posix(), debug_level=cao.debug_level
-)
+steam_home_env_var = get_env_variable("STEAM_HOME", (home_dir_path / ".local/share/Steam").as_posix())
 steam_home_dir_path: Path = Path(steam_home_env_var)
 
 ### Errors ###
@@ -67,38 +102,23 @@ if not repo_github_path:
     raise ValueError(msg)
 
 ### Processing ###
-# find information from mod files
-descriptor_dict = parse_descriptor_to_dict(cao.descriptor_file_path)
-
-if cao.debug_level == "DEBUG":
-    print("- Extracted descriptor dictionary: -")
-    for key, item in descriptor_dict.items():
-        print(f"{key}: {item}")
-
-try:
-    item_id = descriptor_dict["remote_file_id"]
-except KeyError as err:
-    msg = "Published file ID is missing or incomplete, must use an already published workshop object with ID in descriptor"
-    raise ValueError(msg) from err
-
-try:
-    mod_title = descriptor_dict["name"]
-except KeyError as err:
-    msg = "Mod name is missing or incomplete, must have name in descriptor"
-    raise ValueError(msg) from err
-
-# versioning
-try:
-    mod_version: str = descriptor_dict["version"]  # ty:ignore[invalid-assignment] version is always a str
-except KeyError as err:
-    msg = "Mod version is missing or incomplete, must have version in descriptor for this tool"
-    raise ValueError(msg) from err
-try:
-    stellaris_version = descriptor_dict["supported_version"]
-except KeyError as err:
-    msg = "Supported Stellaris version is missing or incomplete, must have supported version in descriptor\
-        \nPDX tools should have caught this; how did you even upload this mod in the first place?"
-    raise ValueError(msg) from err
+# find information from mod files, `prepare_release.py` puts the descriptor it wrote in the parse cache
+with timer.span("parse descriptor"):
+    descriptor = load_descriptor(cao.descriptor_file_path, cao.parse_cache)
+
+if debug:
+    descriptor_dict = descriptor.to_dict()
+    logger.debug(
+        "- Extracted descriptor dictionary: -\n%s",
+        "\n".join(f"{key}: {item}" for key, item in descriptor_dict.items()),
+        extra={"fields": {"descriptor": descriptor_dict}},
+    )
+
+# must use an already published workshop object, and this tool needs the version
+descriptor.require("remote_file_id", "name", "version", "supported_version", source=cao.descriptor_file_path)
+item_id: str = descriptor.remote_file_id  # ty:ignore[invalid-assignment] checked by `require`
+mod_title: str = descriptor.name  # ty:ignore[invalid-assignment] checked by `require`
+mod_version: str = descriptor.version  # ty:ignore[invalid-assignment] checked by `require`
 
 # break down into dict with the mod versions
 current_semantic_mod_version, using_v_prefix, using_v_with_space_prefix = mod_version_to_dict(
@@ -126,10 +146,6 @@ if not cao.workshop_description_file_path.exists():
     msg = f"File with workshop description '{cao.workshop_description_file_name}' is missing, \
     must have one for workshop upload feature"
     raise ValueError(msg)
-workshop_description_file_object = Path.open(cao.workshop_description_file_path)
-workshop_description_file_string = workshop_description_file_object.read()
-workshop_description_file_string = workshop_description_file_string.replace('"', '\\"')  # deliberately escaping quotes
-workshop_description_file_object.close()
 
 # (optional) fetch change note
 if use_changelog:
@@ -137,18 +153,18 @@ if use_changelog:
         msg = f"Requested adding changelog to release notes, but no file '{cao.changelog_file_name}' was provided in repository"
         raise FileNotFoundError(msg)
 
-    change_note_file_object = Path.open(cao.changelog_file_path)
-    change_note_file_string = change_note_file_object.read()
-    change_note_file_object.close()
-
     # insert reference to current mod version
     versioned_changelog_entry_search_pattern = cao.versioned_changelog_entry_search_pattern.format(mod_version)
-    # find the corresponding entry
-    if match := re.search(
-        versioned_changelog_entry_search_pattern,
-        change_note_file_string,
-        flags=re.IGNORECASE | re.MULTILINE | re.DOTALL,
-    ):
+    # find the corresponding entry, only reading that entry via the offset index of the changelog
+    with timer.span("changelog"):
+        match = find_changelog_entry(
+            cao.changelog_file_path,
+            mod_version,
+            versioned_changelog_entry_search_pattern,
+            index_file_path=cao.changelog_index_file_path,
+            parse_cache=cao.parse_cache,
+        )
+    if match:
         change_note_entry = match.group(0)
     else:
         msg = f"No changelog entry found for the version {mod_version} in '{cao.changelog_file_name}'"
@@ -184,19 +200,27 @@ else:
     Automatically deployed from Github
     """
 
+### Content size ###
+# checked against the size budgets in `OVERRIDE.txt` here, before any steamcmd time is spent
+with timer.span("size report"):
+    report_content_size(
+        cao.mod_files_folder_path,
+        cao.size_report_file_path,
+        cao.previous_size_report_file_path,
+        size_budgets=cao.size_budgets,
+        rules=cao.walk_rules,
+        title=cao.mod_folder_name,
+    )
+
 ### Metadata ###
-# make manifest file with metadata
-manifest_content = f""""workshopitem"
-{{
-    "appid" "{app_id}"
-    "publishedfileid" "{item_id}"
-    "contentfolder" "{cao.mod_files_folder_path}"
-    "previewfile" "{cao.mod_files_folder_path / "thumbnail.png"}"
-    "title" "{mod_title}"
-    "description" "{workshop_description_file_string}"
-    "changenote" "{change_note}"
-}}
-"""
+# the main mod, and any extra workshop items from the same repository (all get the same change note)
+with timer.span("manifests"):
+    workshop_items = get_workshop_items(cao.get_default_config())
+    # only the files that pass the mod's include and exclude rules are uploaded, from a staged copy
+    stage_workshop_items(workshop_items, cao.workshop_staging_folder_path, cao.walk_rules)
+
+    # make manifest files with metadata, quotes in the workshop descriptions are escaped
+    workshop_item_results = write_workshop_manifests(workshop_items, app_id, change_note)
 
 # reference file, stellaris
 """
@@ -212,91 +236,147 @@ manifest_content = f""""workshopitem"
 }
 """
 
-with Path.open(cao.manifest_file_path, "w") as manifest_file_object:
-    manifest_file_object.write(manifest_content)
-
-if cao.debug_level in ["INFO", "DEBUG"]:
-    print("Home contents:", list(home_dir_path.iterdir()))
-    print("Steam home contents:", list(steam_home_dir_path.iterdir()))
-    print(".steam/steam contents:", list((home_dir_path / ".steam/steam").iterdir()))
-    print(".steam/root contents:", list((home_dir_path / ".steam/root").iterdir()))
-
-    print("- Manifest: -")
-    print(manifest_content)
-
-### Login ###
-# write the login cache file to make login work
-(steam_home_dir_path / "config").mkdir(exist_ok=True)
-decoded_config_vdf = base64.b64decode(config_vdf_contents)
-config_file_path = steam_home_dir_path / "config" / "config.vdf"
-with Path.open(config_file_path, "wb") as config_file_object:
-    config_file_object.write(decoded_config_vdf)
-config_file_path.chmod(0o777)
-
-if cao.debug_level in ["INFO", "DEBUG"]:
-    print(f"{config_file_path=}")
-    print("Steam/config contents:", list((steam_home_dir_path / "config").iterdir()))
-
-
-def steamcmd_run(command: str, timeout_time: int = 60) -> int:
-    """
-    Function to run steamcmd
-
-    Only exists to avoid having to retype error handling twice. That's it.
-    """
-    try:
-        output = subprocess.run(args=command, shell=True, check=True, timeout=timeout_time)
-        print(output)
-
-    except subprocess.TimeoutExpired as err:
-        print(f"Error: {err}")
-        print("Cached credentials likely invalid, in which case steamcmd falls back to interactive mode, breaking control flow")
-        print(output)
-        msg = "Timed out, cached credentials likely invalid, this makes steamcmd fall back to interactive mode\
-              and break control flow"
-        raise subprocess.CalledProcessError(returncode=2, cmd=command, output=msg, stderr=msg) from err
-
-    except subprocess.CalledProcessError as err:
-        # In case of error, output logs
-        print("Errors during upload:")
-        print(err)
-
-        log_dir_path = steam_home_dir_path / "logs"
-        log_command = ["ls", "-Ralph", log_dir_path]
-        output = subprocess.run(args=log_command, check=False)
-        print(output)
-
-        if log_dir_path.is_dir():
-            for log_filename in log_dir_path.iterdir():
-                log_file_path = log_dir_path / log_filename
-                with Path.open(log_file_path) as f:
-                    print(f"######## {log_filename}")
-                    print(f.read())
-
-        # NOTE: Steamcmd via subprocess raising error code 5 seems to be login expired
-        # maybe figure out how to parse/pass this properly to raise a "login expired" error specifically
-        msg = "Stemcmd failed during upload"
-        raise subprocess.CalledProcessError(returncode=3, cmd=command, output=msg, stderr=msg) from err
-
-    # no raised errors
-    else:
-        return output.returncode
+### Changes ###
+# compare every item with the snapshot from its last upload, unchanged items are skipped
+with timer.span("content snapshots"):
+    workshop_item_snapshots = check_workshop_item_changes(
+        workshop_items, workshop_item_results, change_note, cao.workshop_snapshot_folder_path, cao.walk_rules
+    )
+logger.info("- Changes since the last upload: -")
+for workshop_item_result in workshop_item_results:
+    if workshop_item_result.status == "unchanged":
+        logger.info("%s: unchanged", workshop_item_result.name)
+        continue
+    change_counts = [f"{len(changed)} {name}" for name, changed in workshop_item_result.changes.items() if changed]
+    logger.info(
+        "%s: %s",
+        workshop_item_result.name,
+        ", ".join(change_counts) or "no previous snapshot",
+        extra={"fields": {"item": workshop_item_result.name, "changes": workshop_item_result.changes}},
+    )
+    if debug:
+        for name, changed in workshop_item_result.changes.items():
+            for changed_name in changed:
+                logger.debug("    %s: %s", name, changed_name)
+if force_upload:
+    logger.info("Uploading every item anyway, upload was forced")
+    for workshop_item_result in workshop_item_results:
+        workshop_item_result.status = "not_attempted"
+upload_indices = [
+    index for index, workshop_item_result in enumerate(workshop_item_results) if workshop_item_result.status != "unchanged"
+]
+
+# directory listings are only worth building for debugging
+if debug:
+    logger.debug("Home contents: %s", list(home_dir_path.iterdir()))
+    logger.debug("Steam home contents: %s", list(steam_home_dir_path.iterdir()))
+    logger.debug(".steam/steam contents: %s", list((home_dir_path / ".steam/steam").iterdir()))
+    logger.debug(".steam/root contents: %s", list((home_dir_path / ".steam/root").iterdir()))
+
+if logger.isEnabledFor(logging.INFO):
+    for workshop_item in workshop_items:
+        logger.info("- Manifest for %s: -\n%s", workshop_item.name, workshop_item.manifest_file_path.read_text())
+
+steamcmd_error = None
+if not upload_indices:
+    logger.info("Nothing changed since the last upload, skipping steamcmd")
+else:
+    ### Login ###
+    # write the login cache file to make login work
+    (steam_home_dir_path / "config").mkdir(exist_ok=True)
+    decoded_config_vdf = base64.b64decode(config_vdf_contents)
+    config_file_path = steam_home_dir_path / "config" / "config.vdf"
+    with Path.open(config_file_path, "wb") as config_file_object:
+        config_file_object.write(decoded_config_vdf)
+    config_file_path.chmod(0o777)
+
+    if debug:
+        logger.debug("config_file_path=%s", config_file_path)
+        logger.debug("Steam/config contents: %s", list((steam_home_dir_path / "config").iterdir()))
+
+    ### Upload items ###
+    # login and upload every changed item in one steamcmd session, from a generated runscript
+    # a failed login (invalid cached credentials) is told apart from a failed upload
+    upload_results = [workshop_item_results[index] for index in upload_indices]
+    manifest_file_paths = [workshop_items[index].manifest_file_path for index in upload_indices]
+    steamcmd_runscript_file_path = cao.generated_files_folder_path / steamcmd_runscript_file_name
+    write_steamcmd_runscript(steamcmd_runscript_file_path, steam_username, manifest_file_paths)
+
+    logger.info("Logging in and uploading %d workshop item(s) with steamcmd", len(manifest_file_paths))
+    steamcmd_result = None
+    with timer.span("steamcmd"):
+        try:
+            steamcmd_result = run_steamcmd_script(
+                steamcmd_runscript_file_path,
+                manifest_file_paths,
+                steamcmd_command=steamcmd_command,
+                timeout=timeout_time * (1 + len(manifest_file_paths)),
+            )
+            logger.info("%s", steamcmd_result.output)
+            fill_in_upload_results(upload_results, steamcmd_result.uploaded_manifests)
+        except SteamcmdLoginError as err:
+            steamcmd_error = err
+            for workshop_item_result in upload_results:
+                workshop_item_result.error = str(err)
+        except SteamcmdUploadError as err:
+            steamcmd_error = err
+            uploaded_manifests = err.result.uploaded_manifests if err.result is not None else []
+            fill_in_upload_results(upload_results, uploaded_manifests, error=str(err))
+
+        # login and each upload, timed from when steamcmd printed their results
+        if steamcmd_error is not None:
+            steamcmd_result = steamcmd_error.result
+        if steamcmd_result is not None and steamcmd_result.login_seconds is not None:
+            timer.add_span("login", steamcmd_result.login_seconds)
+            for workshop_item_result, upload_seconds in zip(upload_results, steamcmd_result.upload_seconds, strict=False):
+                timer.add_span(f"upload {workshop_item_result.name}", upload_seconds)
+
+    # only uploaded items get a new snapshot, failed ones are tried again next time
+    save_uploaded_snapshots(workshop_item_results, workshop_item_snapshots, cao.workshop_snapshot_folder_path)
+
+# report results per item
+upload_results_file_path = cao.generated_files_folder_path / workshop_upload_results_file_name
+save_workshop_upload_results(workshop_item_results, upload_results_file_path)
+logger.info("- Workshop upload results: -")
+for workshop_item_result in workshop_item_results:
+    logger.info(
+        "%s (%s): %s",
+        workshop_item_result.name,
+        workshop_item_result.item_id,
+        workshop_item_result.status,
+        extra={"fields": {"item": workshop_item_result.name, "status": workshop_item_result.status}},
+    )
 
+logger.info(
+    "Parse cache %s: %s hits, %s misses",
+    cao.parse_cache_folder_path,
+    cao.parse_cache.hits,
+    cao.parse_cache.misses,
+    extra={"fields": {"parse_cache_hits": cao.parse_cache.hits, "parse_cache_misses": cao.parse_cache.misses}},
+)
+# the least recently used entries are removed once per run
+cao.parse_cache.evict()
 
-print("Testing login")
-login_command = f'steamcmd +login "{steam_username}" +quit'
-retcode = steamcmd_run(login_command, timeout_time)
+# timing report (JSON, step summary table, OpenMetrics), if enabled
+timing_report_file_path = timer.write_reports(cao.generated_files_folder_path)
 
-### Upload item ###
-upload_command = f'steamcmd +login "{steam_username}" +workshop_build_item "{cao.manifest_file_path}" +quit'
-retcode = steamcmd_run(upload_command, timeout_time)
+if steamcmd_error is not None:
+    logger.error("%s", steamcmd_error.output)
+    logger.error("Error: %s", steamcmd_error)
+    log_steamcmd_log_files(steam_home_dir_path / "logs")
+    raise steamcmd_error
 
-# Output the manifest path
+# Output the manifest path of the main mod, and the per item results
 # uses github upload artifact to upload the manifest file for inspection
-github_output = get_env_variable("GITHUB_OUTPUT", None, debug_level=cao.debug_level)
+github_output = get_env_variable("GITHUB_OUTPUT", None)
 if github_output:
     with Path.open(Path(github_output), "a") as gh_output_file:
         gh_output_file.write(f"manifest_path={cao.manifest_file_path}\n")
+        gh_output_file.write(f"upload_results_path={upload_results_file_path}\n")
+        gh_output_file.write(f"snapshot_folder_path={cao.workshop_snapshot_folder_path}\n")
+        gh_output_file.write(f"changed_item_count={len(upload_indices)}\n")
+        if timing_report_file_path is not None:
+            gh_output_file.write(f"timing_report_path={timing_report_file_path}\n")
 else:
     msg = f"Error while writing manifest path to github output, env variable 'GITHUB_OUTPUT' was: {github_output}"
     raise ValueError(msg)
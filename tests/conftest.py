@@ -220,13 +220,11 @@ Fixes
 [*] Item 5, contains [b][noparse]code text[/noparse][/b]
 [*] Item 6, contains [u]underline text[/u]
 [*] Item 7:
-[/list]
     [code]
     multiline
     code
     block
     [/code]
-[list]
 [*] Item 8
 [/list]
 Misc.
@@ -234,8 +232,10 @@ Misc.
 [*] Item 1
 [*] Item 2
 [*] Item 3
+    [list]
     [*] Item 31
     [*] Item 32
+    [/list]
 [*] Item-4
 [/list]
 [hr][/hr]
@@ -0,0 +1,65 @@
+# ruff: noqa: INP001 a standalone script, not part of the test package
+"""
+Stand-in for steamcmd, to test the workshop upload flow offline
+
+Run as `python fake_steamcmd.py +runscript <file>`. Prints what steamcmd prints for a login and for each
+`workshop_build_item` in the runscript, without any network access. Behaviour is picked with env variables:
+
+- `FAKE_STEAMCMD_MODE`: `ok` (default), `login_fail`, `upload_fail` or `hang` (waits forever before logging in)
+- `FAKE_STEAMCMD_FAIL_ITEM`: which `workshop_build_item` fails in `upload_fail` mode, counting from 1 (default 1)
+- `FAKE_STEAMCMD_LOG`: file to append each uploaded manifest path to
+
+Items with a missing manifest file always fail, like the real steamcmd.
+"""
+
+import os
+import shlex
+import sys
+import time
+from pathlib import Path
+
+
+def main() -> int:
+    if len(sys.argv) != 3 or sys.argv[1] != "+runscript":  # noqa: PLR2004
+        print(f"fake steamcmd only supports `+runscript <file>`, got {sys.argv[1:]}")
+        return 1
+    mode = os.environ.get("FAKE_STEAMCMD_MODE", "ok")
+    fail_item = int(os.environ.get("FAKE_STEAMCMD_FAIL_ITEM", "1"))
+    log_file = os.environ.get("FAKE_STEAMCMD_LOG")
+
+    print("Redirecting stderr to '/home/steam/Steam/logs/stderr.txt'")
+    print("[  0%] Checking for available updates...")
+    print("[----] Verifying installation...")
+    print("Steam Console Client (c) Valve Corporation - version 1700000000")
+    item_number = 0
+    for line in Path(sys.argv[2]).read_text(encoding="utf-8").splitlines():
+        command, *arguments = shlex.split(line) or [""]
+        if command == "login":
+            if mode == "hang":
+                print("password: ", end="", flush=True)
+                time.sleep(3600)
+            if mode == "login_fail":
+                print(f"Logging in user '{arguments[0]}' [U:1:1] to Steam Public...FAILED (Invalid Password)")
+                return 5
+            print(f"Logging in user '{arguments[0]}' [U:1:1] to Steam Public...OK")
+            print("Waiting for client config...OK")
+            print("Waiting for user info...OK")
+        elif command == "workshop_build_item":
+            item_number += 1
+            manifest_file_path = Path(arguments[0])
+            print("Preparing update...")
+            if not manifest_file_path.exists() or (mode == "upload_fail" and item_number == fail_item):
+                print("ERROR! Failed to update workshop item (Failure).")
+                return 6
+            print("Uploading content...")
+            print("Success.")
+            if log_file:
+                with Path.open(Path(log_file), "a", encoding="utf-8") as log_file_object:
+                    print(manifest_file_path, file=log_file_object)
+        elif command == "quit":
+            break
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
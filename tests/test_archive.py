@@ -0,0 +1,143 @@
+import zipfile
+from pathlib import Path
+
+import pytest
+
+import methods.archive_methods as am
+import methods.input_methods as im
+
+
+def make_test_mod(root_path: Path) -> Path:
+    """Small mod folder with nested files, some compressible and some not"""
+    mod_path = root_path / "test_mod"
+    (mod_path / "common" / "buildings").mkdir(parents=True)
+    (mod_path / "localisation" / "english").mkdir(parents=True)
+    (mod_path / "gfx").mkdir()
+    (mod_path / "common" / "buildings" / "test_buildings.txt").write_text("building_test = {\n\tbase_buildtime = 10\n}\n" * 200)
+    (mod_path / "localisation" / "english" / "test_l_english.yml").write_text(
+        '﻿l_english:\n test_mod_version:0 "v1.2.3"\n', encoding="utf-8"
+    )
+    (mod_path / "gfx" / "texture.dds").write_bytes(bytes(range(256)) * 64)
+    (mod_path / "descriptor.mod").write_text('name="test name"\n')
+    return mod_path
+
+
+def test_build_release_zip(tmp_path: Path) -> None:
+    mod_path = make_test_mod(tmp_path)
+    descriptor_copy_path = tmp_path / "test_mod.mod"
+    descriptor_copy_path.write_text('name="test name"\n')
+
+    zip_file_path = tmp_path / "release.zip"
+    result = am.build_release_zip(zip_file_path, [mod_path, descriptor_copy_path], tmp_path, max_workers=4)
+    assert result.reused_count == 0
+    assert result.compressed_count == 4  # noqa: PLR2004
+    # the texture is already compressed, so stored
+    assert result.stored_count == 1
+
+    with zipfile.ZipFile(zip_file_path) as zip_file:
+        assert zip_file.testzip() is None
+        names = zip_file.namelist()
+        assert names == sorted(names)
+        assert "test_mod/" in names
+        assert "test_mod.mod" in names
+        for file_path in [*mod_path.rglob("*"), descriptor_copy_path]:
+            if file_path.is_file():
+                arcname = file_path.relative_to(tmp_path).as_posix()
+                assert zip_file.read(arcname) == file_path.read_bytes()
+                assert zip_file.getinfo(arcname).date_time == am.ZIP_EPOCH_DATE_TIME
+        assert zip_file.getinfo("test_mod/gfx/texture.dds").compress_type == zipfile.ZIP_STORED
+        assert zip_file.getinfo("test_mod/descriptor.mod").compress_type == zipfile.ZIP_DEFLATED
+
+    # output must not depend on the number of workers
+    serial_zip_file_path = tmp_path / "serial.zip"
+    am.build_release_zip(serial_zip_file_path, [mod_path, descriptor_copy_path], tmp_path, max_workers=1)
+    assert serial_zip_file_path.read_bytes() == zip_file_path.read_bytes()
+
+    return None
+
+
+def test_build_release_zip_reuse(tmp_path: Path) -> None:
+    mod_path = make_test_mod(tmp_path)
+    previous_zip_file_path = tmp_path / "previous.zip"
+    am.build_release_zip(previous_zip_file_path, [mod_path], tmp_path)
+
+    # change one file, everything else should be reused
+    (mod_path / "descriptor.mod").write_text('name="test name"\nversion="v1.2.4"\n')
+    reused_zip_file_path = tmp_path / "reused.zip"
+    result = am.build_release_zip(reused_zip_file_path, [mod_path], tmp_path, previous_zip_file_path=previous_zip_file_path)
+    assert result.reused_count == 2  # noqa: PLR2004
+    assert result.compressed_count == 1
+    assert result.stored_count == 1
+
+    fresh_zip_file_path = tmp_path / "fresh.zip"
+    am.build_release_zip(fresh_zip_file_path, [mod_path], tmp_path)
+    assert reused_zip_file_path.read_bytes() == fresh_zip_file_path.read_bytes()
+
+    # previous archive with other compressor settings must not be reused
+    result = am.build_release_zip(
+        tmp_path / "level9.zip", [mod_path], tmp_path, previous_zip_file_path=previous_zip_file_path, compression_level=9
+    )
+    assert result.reused_count == 0
+
+    # missing previous archive is not an error
+    result = am.build_release_zip(tmp_path / "other.zip", [mod_path], tmp_path, previous_zip_file_path=tmp_path / "None.zip")
+    assert result.reused_count == 0
+
+    # the same content at another level is compressed again, reusing it would change the output
+    level_folder_path = tmp_path / "levels"
+    level_folder_path.mkdir()
+    level_content = "same_content = { value = 1 }\n" * 300
+    (level_folder_path / "a.bin").write_text(level_content)
+    level_zip_file_path = tmp_path / "levels.zip"
+    am.build_release_zip(level_zip_file_path, [level_folder_path], tmp_path)
+    (level_folder_path / "a.bin").unlink()
+    (level_folder_path / "b.txt").write_text(level_content)
+    result = am.build_release_zip(
+        tmp_path / "levels_reused.zip", [level_folder_path], tmp_path, previous_zip_file_path=level_zip_file_path
+    )
+    assert result.reused_count == 0
+    am.build_release_zip(tmp_path / "levels_fresh.zip", [level_folder_path], tmp_path)
+    assert (tmp_path / "levels_reused.zip").read_bytes() == (tmp_path / "levels_fresh.zip").read_bytes()
+
+    # rebuilding in place still reuses the entries of the zip being replaced
+    result = am.build_release_zip(reused_zip_file_path, [mod_path], tmp_path, previous_zip_file_path=reused_zip_file_path)
+    assert result.reused_count == 3  # noqa: PLR2004
+    assert result.compressed_count == 0
+    assert reused_zip_file_path.read_bytes() == fresh_zip_file_path.read_bytes()
+
+    return None
+
+
+def test_build_release_zip_streaming(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    mod_path = make_test_mod(tmp_path)
+    (mod_path / "gfx" / "big_texture.dds").write_bytes(bytes(range(256)) * 200)
+    (mod_path / "common" / "big_script.txt").write_text("big_script = { value = 1 }\n" * 500)
+    in_memory_zip_file_path = tmp_path / "in_memory.zip"
+    am.build_release_zip(in_memory_zip_file_path, [mod_path], tmp_path)
+
+    # every file streamed in small chunks gives the same archive
+    monkeypatch.setattr(am, "stream_member_min_bytes", 1000)
+    monkeypatch.setattr(am, "archive_chunk_size", 100)
+    streamed_zip_file_path = tmp_path / "streamed.zip"
+    result = am.build_release_zip(streamed_zip_file_path, [mod_path], tmp_path)
+    assert result.stored_count == 2  # noqa: PLR2004
+    with zipfile.ZipFile(streamed_zip_file_path) as zip_file:
+        assert zip_file.testzip() is None
+        assert zip_file.read("test_mod/gfx/big_texture.dds") == (mod_path / "gfx" / "big_texture.dds").read_bytes()
+        assert zip_file.getinfo("test_mod/common/big_script.txt").compress_type == zipfile.ZIP_DEFLATED
+    assert streamed_zip_file_path.read_bytes() == in_memory_zip_file_path.read_bytes()
+
+    return None
+
+
+def test_zip_folder(tmp_path: Path) -> None:
+    mod_path = make_test_mod(tmp_path)
+    zip_file_path = tmp_path / "folder.zip"
+    im.zip_folder(mod_path, zip_file_path)
+
+    with zipfile.ZipFile(zip_file_path) as zip_file:
+        assert "descriptor.mod" in zip_file.namelist()
+        assert "common/buildings/test_buildings.txt" in zip_file.namelist()
+        assert zip_file.read("descriptor.mod") == (mod_path / "descriptor.mod").read_bytes()
+
+    return None
@@ -0,0 +1,137 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import methods.batch_methods as bm
+
+descriptor_str = """name="Test Mod"
+version="v1.2.3"
+tags={
+\t"Gameplay"
+}
+supported_version="v3.14.*"
+path="mod/testmod/testmod"
+"""
+changelog_str = """# Changes
+
+---
+## Test Mod `WIP`:
+- Fixed things
+---
+"""
+
+
+def make_tool_folder(tmp_path: Path) -> Path:
+    """Tool folder next to the mod folders, with the scripts and templates linked from this repository"""
+    tool_folder_path = tmp_path / "tool"
+    tool_folder_path.mkdir()
+    for name in ["prepare_release.py", "constants_and_overrides.py", "methods", "templates"]:
+        (tool_folder_path / name).symlink_to(Path(name).resolve())
+    return tool_folder_path
+
+
+def make_test_mod(tmp_path: Path, mod_folder_name: str) -> Path:
+    mod_github_folder_path = tmp_path / mod_folder_name
+    (mod_github_folder_path / mod_folder_name).mkdir(parents=True)
+    (mod_github_folder_path / ".github").mkdir()
+    (mod_github_folder_path / mod_folder_name / "descriptor.mod").write_text(descriptor_str)
+    (mod_github_folder_path / "CHANGELOG.md").write_text(changelog_str)
+    (mod_github_folder_path / "README.md").write_text("Supports Stellaris version: `3.14.x`\n")
+    return mod_github_folder_path
+
+
+def test_prepare_mod_releases(tmp_path: Path) -> None:
+    tool_folder_path = make_tool_folder(tmp_path)
+    first_mod_path = make_test_mod(tmp_path, "first_mod")
+    make_test_mod(tmp_path, "second_mod")
+    # no descriptor, fails without stopping the batch
+    (tmp_path / "broken_mod").mkdir()
+    output_folder_path = tmp_path / "output"
+
+    results = bm.prepare_mod_releases(
+        ["first_mod", "broken_mod", "second_mod"],
+        "Minor",
+        "v4.0.*",
+        True,  # noqa: FBT003
+        "user",
+        tool_folder_path,
+        output_folder_path,
+        max_workers=2,
+    )
+    assert [result.mod_folder_name for result in results] == ["first_mod", "broken_mod", "second_mod"]
+    first_result, broken_result, second_result = results
+
+    assert first_result.succeeded, first_result.error
+    assert first_result.new_version == "v1.3.0"
+    assert first_result.release_tag == "v1.3.0"
+    assert first_result.zip_file_name == "first_mod_v1_3_0.zip"
+    assert first_result.outputs == {
+        "loc_folder_exists": "false",
+        "loc_replace_folder_exists": "false",
+        "changed_files_path": str(output_folder_path / "first_mod" / "changed_files.txt"),
+    }
+    assert "first_mod/descriptor.mod\n" in Path(first_result.outputs["changed_files_path"]).read_text()
+    assert set(first_result.timings) == {"config", "pipeline", "total", "wall"}
+    assert "https://github.com/user/first_mod/releases/tag/v1.3.0" in (first_mod_path / "CHANGELOG.md").read_text()
+    # generated files are kept apart per mod
+    assert Path(first_result.release_notes_file).parent == output_folder_path / "first_mod"
+    # both template placeholders are filled in, in one pass
+    release_notes_str = Path(first_result.release_notes_file).read_text()
+    assert release_notes_str.startswith("## Supports Stellaris version: `4.0.x`\n")
+    assert "\n---\n## Test Mod `v1.3.0`:\n- Fixed things\n---\n" in release_notes_str
+    assert second_result.succeeded, second_result.error
+    assert second_result.zip_file_name == "second_mod_v1_3_0.zip"
+
+    assert not broken_result.succeeded
+    assert "FileNotFoundError" in broken_result.error
+    assert "Traceback" in Path(broken_result.log_file).read_text()
+
+    return None
+
+
+def get_file_snapshot(folder_path: Path) -> dict[str, bytes]:
+    """Content of every file under `folder_path` by relative path, links (like the tool files) aren't followed"""
+    return {
+        str(file_path.relative_to(folder_path)): file_path.read_bytes()
+        for file_path in sorted(folder_path.rglob("*"))
+        if file_path.is_file() and not file_path.is_symlink()
+    }
+
+
+def test_prepare_release_plan(tmp_path: Path) -> None:
+    tool_folder_path = make_tool_folder(tmp_path)
+    mod_github_folder_path = make_test_mod(tmp_path, "test_mod")
+    # read through the parse cache as soon as the version types are, before the arguments are parsed
+    (mod_github_folder_path / "OVERRIDE.txt").write_text('possible_version_types={\n\t"Minor"\n}\n')
+    output_folder_path = tmp_path / "output"
+    output_folder_path.mkdir()
+    (output_folder_path / "github_env.txt").write_text("")
+    (output_folder_path / "github_output.txt").write_text("")
+    env = os.environ | {
+        "modFolderName": "test_mod",
+        "generatedFilesFolder": str(output_folder_path),
+        "parseCacheFolder": str(tmp_path / "parse_cache"),
+        "GITHUB_ENV": str(output_folder_path / "github_env.txt"),
+        "GITHUB_OUTPUT": str(output_folder_path / "github_output.txt"),
+        "PYTHONDONTWRITEBYTECODE": "1",
+    }
+    file_snapshot = get_file_snapshot(tmp_path)
+
+    completed_process = subprocess.run(
+        [sys.executable, "prepare_release.py", "Minor", "v4.0.*", "true", "test_mod", "user/test_mod", "--plan"],
+        cwd=tool_folder_path,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    assert completed_process.returncode == 0, completed_process.stderr
+    # nothing written, not even to the parse cache
+    assert get_file_snapshot(tmp_path) == file_snapshot
+    assert not (tmp_path / "parse_cache").exists()
+    # stdout is only the plan, the logs went to stderr
+    assert completed_process.stdout.startswith("--- a/")
+    assert '+version="v1.3.0"\n' in completed_process.stdout
+    assert "would be written" in completed_process.stderr
+    assert "would be written" not in completed_process.stdout
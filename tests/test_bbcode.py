@@ -0,0 +1,61 @@
+import methods.bbcode_methods as bm
+
+
+def test_convert_inline_markdown() -> None:
+    assert bm.convert_inline_markdown("**bold *and italic***") == "[b]bold [i]and italic[/i][/b]"
+    assert bm.convert_inline_markdown("`co*de` and \\*stars\\*") == "[b][noparse]co*de[/noparse][/b] and *stars*"
+    assert bm.convert_inline_markdown("[**link**](https://example.com)") == "[url=https://example.com][b]link[/b][/url]"
+    # unpaired, crossed, spaced out and intraword delimiters are left alone
+    assert bm.convert_inline_markdown("*unclosed and **crossed* bold**") == "[i]unclosed and **crossed[/i] bold**"
+    assert bm.convert_inline_markdown("a * b * c, snake__case__name") == "a * b * c, snake__case__name"
+
+    return None
+
+
+def test_convert_markdown_to_bbcode() -> None:
+    markdown_string = """### Sub header
+1. first
+2. second
+   - nested **bullet**
+     1. deeper
+- other kind
+
+- after blank
+  continuation line
+
+After
+```
+- not a list, **not bold**
+```
+___
+"""
+    expected_bbcode_string = """[h3]Sub header[/h3]
+[olist]
+[*] first
+[*] second
+   [list]
+   [*] nested [b]bullet[/b]
+     [olist]
+     [*] deeper
+     [/olist]
+   [/list]
+[/olist]
+[list]
+[*] other kind
+[*] after blank
+  continuation line
+[/list]
+
+After
+[code]
+- not a list, **not bold**
+[/code]
+[hr][/hr]
+"""
+    assert bm.convert_markdown_to_bbcode(markdown_string) == expected_bbcode_string
+
+    # lines are converted lazily, and anything left open is closed at the end
+    bbcode_lines = bm.convert_markdown_lines_to_bbcode(iter(["- item\r\n", "    ```\n", "    code\n"]))
+    assert list(bbcode_lines) == ["[list]", "[*] item", "    [code]", "    code", "    [/code]", "[/list]"]
+
+    return None
@@ -0,0 +1,72 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import methods.cache_methods as cm
+
+
+def test_parse_cache(tmp_path: Path) -> None:
+    parse_cache = cm.ParseCache(tmp_path, "1.0.0")
+    parsed_contents = []
+
+    def parse(content: bytes) -> dict[str, str]:
+        parsed_contents.append(content)
+        return {"content": content.decode("utf-8")}
+
+    assert parse_cache.get_or_parse("test", b"first", parse) == {"content": "first"}
+    assert parse_cache.get_or_parse("test", b"first", parse) == {"content": "first"}
+    assert parse_cache.get_or_parse("test", b"second", parse) == {"content": "second"}
+    assert parsed_contents == [b"first", b"second"]
+    assert (parse_cache.hits, parse_cache.misses) == (1, 2)
+
+    # another kind or tool version never reads the entry
+    assert parse_cache.get("other", b"first") is None
+    assert cm.ParseCache(tmp_path, "1.0.1").get("test", b"first") is None
+
+    # an entry that doesn't belong to its key is removed
+    entry_path = parse_cache.get_entry_path("test", parse_cache.get_key("test", b"first"))
+    entry = json.loads(entry_path.read_text(encoding="utf-8"))
+    entry_path.write_text(json.dumps(entry | {"key": "0" * 64}), encoding="utf-8")
+    assert parse_cache.get("test", b"first") is None
+    assert not entry_path.exists()
+
+
+def test_parse_cache_eviction(tmp_path: Path) -> None:
+    parse_cache = cm.ParseCache(tmp_path, "1.0.0")
+    for index in range(3):
+        parse_cache.put("test", str(index).encode(), "x" * 100)
+        os.utime(parse_cache.get_entry_path("test", parse_cache.get_key("test", str(index).encode())), ns=(index, index))
+    entry_size = parse_cache.get_entry_path("test", parse_cache.get_key("test", b"0")).stat().st_size
+
+    # reading the oldest entry makes it the most recently used
+    assert parse_cache.get("test", b"0") == "x" * 100
+    parse_cache.max_bytes = 2 * entry_size
+    # only evicted when asked to, once per run
+    parse_cache.put("test", b"3", "x" * 100)
+    assert parse_cache.get("test", b"1") is not None
+    os.utime(parse_cache.get_entry_path("test", parse_cache.get_key("test", b"1")), ns=(1, 1))
+    parse_cache.evict()
+    assert parse_cache.get("test", b"1") is None
+    assert parse_cache.get("test", b"0") is not None
+    assert parse_cache.get("test", b"3") is not None
+
+
+def test_parse_cache_threads(tmp_path: Path) -> None:
+    parse_cache = cm.ParseCache(tmp_path, "1.0.0")
+    parse_cache.put("test", b"content", "value")
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda _: parse_cache.get("test", b"content"), range(2000)))
+    assert (parse_cache.hits, parse_cache.misses) == (2000, 0)
+
+
+def test_get_tool_version(tmp_path: Path) -> None:
+    (tmp_path / "methods").mkdir()
+    (tmp_path / "pyproject.toml").write_text('[project]\nversion = "1.2.3"\n', encoding="utf-8")
+    (tmp_path / "methods" / "parser_methods.py").write_text("a = 1\n", encoding="utf-8")
+    tool_version = cm.get_tool_version(tmp_path)
+    assert tool_version.startswith("1.2.3+")
+
+    (tmp_path / "methods" / "parser_methods.py").write_text("a = 2\n", encoding="utf-8")
+    cm.get_tool_version.cache_clear()
+    assert cm.get_tool_version(tmp_path) != tool_version
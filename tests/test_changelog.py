@@ -0,0 +1,155 @@
+import re
+from pathlib import Path
+
+import pytest
+
+import methods.changelog_methods as chm
+import methods.file_methods as fm
+
+changelog_search_pattern = r"(^---\n)(##\s)(.+?\s`)WIP(`)(:\n)(.*?)(^---$)"
+versioned_changelog_entry_search_pattern = r"(^---\n)(##\s)(\[.+?\s`){}(`)(\]\(.+?\))(:\n)(.*?)(^---$)"
+regex_flags = re.IGNORECASE | re.MULTILINE | re.DOTALL
+
+
+@pytest.fixture
+def input_changelog_str() -> str:
+    return """# Changes
+
+---
+## Test Mod `WIP`:
+- Fixed **things**
+- Ünicode ✓
+---
+
+---
+## [Test Mod `v1.2.3`](https://github.com/u/test/releases/tag/v1.2.3):
+- Old
+---
+
+Some text between entries
+---
+
+---
+## [Test Mod `v1.2.2`](https://github.com/u/test/releases/tag/v1.2.2):
+- Older
+---
+"""
+
+
+@pytest.fixture
+def changelog_replace() -> str:
+    return (
+        "\\g<1>\\g<2>\\g<3>WIP\\g<4>\\g<5>- Newest changes\n\\g<7>\n\n"
+        "\\g<1>\\g<2>[\\g<3>v1.3.0\\g<4>](https://github.com/u/test/releases/tag/v1.3.0)\\g<5>\\g<6>\\g<7>"
+    )
+
+
+def test_index_changelog_bytes(input_changelog_str: str) -> None:
+    changelog_bytes = input_changelog_str.encode()
+    entries = chm.index_changelog_bytes(changelog_bytes)
+    assert [entry.version for entry in entries] == ["WIP", "v1.2.3", "v1.2.2"]
+    assert entries[0].header == "## Test Mod `WIP`:"
+    for entry in entries:
+        entry_bytes = changelog_bytes[entry.start : entry.end]
+        assert entry_bytes.startswith(b"---\n## ")
+        assert entry_bytes.endswith(b"\n---")
+
+
+def test_find_changelog_entry(tmp_path: Path, input_changelog_str: str) -> None:
+    changelog_file_path = tmp_path / "CHANGELOG.md"
+    changelog_file_path.write_text(input_changelog_str, encoding="utf-8")
+    index_file_path = tmp_path / "index.json"
+
+    search_pattern = versioned_changelog_entry_search_pattern.format("v1.2.3")
+    match = chm.find_changelog_entry(changelog_file_path, "v1.2.3", search_pattern, index_file_path=index_file_path)
+    assert match is not None
+    assert match[0] == re.search(search_pattern, input_changelog_str, flags=regex_flags)[0]
+    assert index_file_path.exists()
+
+    # a search over the whole file would start at the header of the newer entry, the index finds just this one
+    search_pattern = versioned_changelog_entry_search_pattern.format("v1.2.2")
+    match = chm.find_changelog_entry(changelog_file_path, "v1.2.2", search_pattern, index_file_path=index_file_path)
+    assert match is not None
+    assert match[0] == input_changelog_str[input_changelog_str.rindex("---\n## ") : -1]
+
+    # missing versions fall back to a search over the whole file
+    search_pattern = versioned_changelog_entry_search_pattern.format("v9.9.9")
+    assert chm.find_changelog_entry(changelog_file_path, "v9.9.9", search_pattern, index_file_path=index_file_path) is None
+
+
+def test_replace_changelog_entry_matches_full_regex(tmp_path: Path, input_changelog_str: str, changelog_replace: str) -> None:
+    changelog_file_path = tmp_path / "CHANGELOG.md"
+    changelog_file_path.write_text(input_changelog_str, encoding="utf-8")
+    index_file_path = tmp_path / "index.json"
+
+    match = chm.replace_changelog_entry(
+        changelog_file_path, "WIP", changelog_search_pattern, changelog_replace, index_file_path=index_file_path
+    )
+    expected_match = re.search(changelog_search_pattern, input_changelog_str, flags=regex_flags)
+    assert match is not None
+    assert match.groups() == expected_match.groups()
+    expected_changelog_str = re.sub(changelog_search_pattern, changelog_replace, input_changelog_str, flags=regex_flags)
+    assert changelog_file_path.read_text(encoding="utf-8") == expected_changelog_str
+
+    # the incrementally updated index is current, and the same as indexing the new file from scratch
+    changelog_index = chm.load_changelog_index(index_file_path)
+    assert changelog_index.is_current(changelog_file_path)
+    assert changelog_index.entries == chm.index_changelog_bytes(changelog_file_path.read_bytes())
+    assert [entry.version for entry in changelog_index.entries] == ["WIP", "v1.3.0", "v1.2.3", "v1.2.2"]
+
+
+def test_changelog_index_sidecar_invalidated(tmp_path: Path, input_changelog_str: str) -> None:
+    changelog_file_path = tmp_path / "CHANGELOG.md"
+    changelog_file_path.write_text(input_changelog_str, encoding="utf-8")
+    index_file_path = tmp_path / "index.json"
+    first_index = chm.get_changelog_index(changelog_file_path, index_file_path)
+
+    # still current, loaded from the sidecar
+    assert chm.get_changelog_index(changelog_file_path, index_file_path) == first_index
+
+    changelog_file_path.write_text("# Changes\n\n" + input_changelog_str, encoding="utf-8")
+    new_index = chm.get_changelog_index(changelog_file_path, index_file_path)
+    assert new_index.entries[0].start == first_index.entries[0].start + len("# Changes\n\n")
+
+    index_file_path.write_text("not json", encoding="utf-8")
+    assert chm.get_changelog_index(changelog_file_path, index_file_path).entries == new_index.entries
+
+
+def test_replace_changelog_entry_crlf_fallback(tmp_path: Path, input_changelog_str: str, changelog_replace: str) -> None:
+    changelog_file_path = tmp_path / "CHANGELOG.md"
+    changelog_file_path.write_bytes(input_changelog_str.replace("\n", "\r\n").encode())
+    index_file_path = tmp_path / "index.json"
+    assert chm.get_changelog_index(changelog_file_path, index_file_path) is None
+
+    # same as the old full file regex replace, which reads with universal newlines
+    match = chm.replace_changelog_entry(
+        changelog_file_path, "WIP", changelog_search_pattern, changelog_replace, index_file_path=index_file_path
+    )
+    assert match is not None
+    expected_changelog_str = re.sub(changelog_search_pattern, changelog_replace, input_changelog_str, flags=regex_flags)
+    assert changelog_file_path.read_text(encoding="utf-8") == expected_changelog_str
+
+
+def test_changelog_index_file_overlay(tmp_path: Path, input_changelog_str: str, changelog_replace: str) -> None:
+    changelog_file_path = tmp_path / "CHANGELOG.md"
+    changelog_file_path.write_text(input_changelog_str, encoding="utf-8")
+    index_file_path = tmp_path / "index.json"
+    chm.get_changelog_index(changelog_file_path, index_file_path)
+
+    # the rewrite only exists in the overlay, lookups must see it instead of the file on disk
+    file_overlay = fm.FileOverlay()
+    fm.set_file_overlay(file_overlay)
+    try:
+        chm.replace_changelog_entry(
+            changelog_file_path, "WIP", changelog_search_pattern, changelog_replace, index_file_path=index_file_path
+        )
+        search_pattern = versioned_changelog_entry_search_pattern.format("v1.3.0")
+        match = chm.find_changelog_entry(changelog_file_path, "v1.3.0", search_pattern, index_file_path=index_file_path)
+        changelog_index = chm.get_changelog_index(changelog_file_path, index_file_path)
+        assert changelog_index.is_current(changelog_file_path)
+        assert changelog_index.entries == chm.index_changelog_bytes(fm.read_file_bytes(changelog_file_path))
+    finally:
+        fm.set_file_overlay(None)
+    assert match is not None
+    assert match[7] == "- Fixed **things**\n- Ünicode ✓\n"
+    assert changelog_file_path.read_text(encoding="utf-8") == input_changelog_str
@@ -0,0 +1,66 @@
+from pathlib import Path
+
+import pytest
+
+import constants_and_overrides as cao
+
+
+def make_mod_github_folder(tmp_path: Path, mod_folder_name: str, override_str: str | None = None) -> Path:
+    mod_github_folder_path = tmp_path / mod_folder_name
+    (mod_github_folder_path / mod_folder_name).mkdir(parents=True)
+    if override_str is not None:
+        (mod_github_folder_path / "OVERRIDE.txt").write_text(override_str)
+    return mod_github_folder_path
+
+
+def test_mod_config(tmp_path: Path) -> None:
+    tool_folder_path = tmp_path / "tool"
+    first_mod_path = make_mod_github_folder(
+        tmp_path,
+        "first_mod",
+        'readme_file_name_override="README_custom.md"\nrelease_note_template_filename_override="notes.md"\n'
+        'version_loc_key="first_mod_version"\nextra_loc_files_to_update="localisation/first_l_english.yml"\n',
+    )
+    make_mod_github_folder(tmp_path, "second_mod")
+
+    # two mods side by side in one process, nothing is read until used
+    first_config = cao.ModConfig("first_mod", tool_folder_path=tool_folder_path, env={})
+    second_config = cao.ModConfig("second_mod", tool_folder_path=tool_folder_path, env={"generatedFilesFolder": "gen"})
+    assert "Overrides" not in vars(first_config)
+
+    assert first_config.mod_files_folder_path == first_mod_path / "first_mod"
+    assert first_config.readme_file_path == first_mod_path / "README_custom.md"
+    assert first_config.release_note_template_file_path == first_mod_path / "notes.md"
+    assert first_config.version_loc_key == "first_mod_version"
+    assert first_config.loc_files_list == ["localisation/first_l_english.yml"]
+    assert first_config.generated_release_notes_file_path == tool_folder_path / "generated_release_notes.md"
+    # lookups are cached
+    assert "readme_file_path" in vars(first_config)
+
+    assert not second_config.overrides_enabled
+    assert second_config.readme_file_path.name == "README.md"
+    assert second_config.release_note_template_file_path == tool_folder_path / "templates/release_note_template.md"
+    assert second_config.version_loc_key is None
+    assert second_config.loc_files_list == []
+    assert second_config.generated_release_notes_file_path == Path("gen/generated_release_notes.md")
+
+    with pytest.raises(ValueError, match="Mod folder name is missing"):
+        cao.ModConfig.from_env({})
+
+    return None
+
+
+def test_module_level_names(tmp_path: Path) -> None:
+    make_mod_github_folder(tmp_path, "shim_mod", 'changelog_file_name_override="CHANGES.md"\n')
+    try:
+        cao.set_default_config(cao.ModConfig.from_env({"modFolderName": "shim_mod"}, tool_folder_path=tmp_path / "tool"))
+        assert cao.mod_folder_name == "shim_mod"
+        assert cao.changelog_file_path == tmp_path / "shim_mod" / "CHANGES.md"
+        # plain constants are still plain module attributes
+        assert cao.default_changelog_file_name == "CHANGELOG.md"
+        with pytest.raises(AttributeError):
+            _ = cao.not_a_config_value
+    finally:
+        cao.set_default_config(None)
+
+    return None
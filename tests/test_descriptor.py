@@ -0,0 +1,48 @@
+from pathlib import Path
+
+import pytest
+
+import methods.descriptor_methods as dm
+from methods.cache_methods import ParseCache
+
+
+def test_descriptor_round_trip(descriptor_test_file_path: Path, expected_test_descriptor_dict: dict) -> None:
+    descriptor_string = descriptor_test_file_path.read_text(encoding="utf-8")
+    descriptor = dm.ModDescriptor.parse(descriptor_string)
+
+    assert descriptor.tags == ["Test1", "Test2", "Test3"]
+    assert descriptor.remote_file_id == "11111"
+    assert descriptor.to_dict() == expected_test_descriptor_dict
+    assert descriptor.serialize() == descriptor_string
+
+    # unknown keys keep their place, new keys go at the end, removed keys are left out
+    reordered_string = 'dependencies={\n\t"Other Mod"\n}\nversion="v1"\nname="Mod"\n'
+    descriptor = dm.ModDescriptor.parse(reordered_string)
+    assert descriptor.extra == {"dependencies": ["Other Mod"]}
+    assert descriptor.serialize() == reordered_string
+    descriptor.name = None
+    descriptor.picture = "thumbnail.png"
+    assert list(descriptor.to_dict()) == ["dependencies", "version", "picture"]
+
+    with pytest.raises(ValueError, match='"tags" must be a block'):
+        dm.ModDescriptor.parse('tags="Gameplay"\n')
+    with pytest.raises(ValueError, match=r"remote_file_id, supported_version missing or empty in test\.mod"):
+        descriptor.require("version", "remote_file_id", "supported_version", source="test.mod")
+
+
+def test_load_descriptor_cache(tmp_path: Path, descriptor_test_file_path: Path) -> None:
+    descriptor_file_path = tmp_path / "descriptor.mod"
+    descriptor_file_path.write_bytes(descriptor_test_file_path.read_bytes())
+    parse_cache = ParseCache(tmp_path / "parse_cache", "test")
+
+    descriptor = dm.load_descriptor(descriptor_file_path, parse_cache)
+    assert (parse_cache.hits, parse_cache.misses) == (0, 1)
+    assert dm.load_descriptor(descriptor_file_path, parse_cache) == descriptor
+    assert parse_cache.hits == 1
+
+    # a written descriptor is cached as written, so the next reader doesn't parse
+    descriptor.name = "new name"
+    descriptor.write(descriptor_file_path)
+    dm.cache_descriptor(descriptor, descriptor_file_path, parse_cache)
+    assert dm.load_descriptor(descriptor_file_path, parse_cache).name == "new name"
+    assert (parse_cache.hits, parse_cache.misses) == (2, 1)
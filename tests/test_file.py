@@ -0,0 +1,114 @@
+import os
+import re
+from pathlib import Path
+
+import pytest
+
+import methods.file_methods as fm
+from methods.cache_methods import ParseCache
+from methods.input_methods import search_and_replace_in_file, stream_search_and_replace_in_file
+
+
+def test_write_file_if_changed(tmp_path: Path) -> None:
+    fm.clear_changed_file_paths()
+    file_path = tmp_path / "folder" / "file.txt"
+
+    assert fm.write_file_if_changed(file_path, "line\n", newline="\r\n")
+    assert file_path.read_bytes() == b"line\r\n"
+    assert file_path.stat().st_mode & 0o777 == 0o666 & ~fm.get_umask()
+
+    file_path.chmod(0o600)
+    os.utime(file_path, ns=(0, 0))
+    # same bytes, not written again
+    assert not fm.write_file_if_changed(file_path, "line\n", newline="\r\n")
+    assert file_path.stat().st_mtime_ns == 0
+
+    assert fm.write_file_if_changed(file_path, "ünïcode\n", newline="")
+    assert file_path.read_bytes() == "ünïcode\n".encode()
+    # replaced files keep their permissions, and no temporary files are left behind
+    assert file_path.stat().st_mode & 0o777 == 0o600  # noqa: PLR2004
+    assert [path.name for path in file_path.parent.iterdir()] == ["file.txt"]
+    assert fm.get_changed_file_paths() == [file_path.absolute()]
+
+
+def test_changed_files_list(tmp_path: Path) -> None:
+    fm.clear_changed_file_paths()
+    repo_folder_path = tmp_path / "repo"
+    (repo_folder_path / "mod").mkdir(parents=True)
+    (repo_folder_path / "mod" / "unchanged.txt").write_text("same\n", encoding="utf-8")
+    (repo_folder_path / "mod" / "changed.txt").write_text("old\n", encoding="utf-8")
+
+    search_and_replace_in_file(repo_folder_path / "mod" / "unchanged.txt", "missing", "replacement")
+    search_and_replace_in_file(repo_folder_path / "mod" / "changed.txt", "old", "new")
+    fm.write_file_if_changed(repo_folder_path / "new.json", "{}")
+    fm.write_file_if_changed(tmp_path / "generated" / "outside.txt", "not in the repo")
+
+    list_file_path = tmp_path / "generated" / fm.changed_files_list_file_name
+    relative_paths = fm.write_changed_files_list(list_file_path, repo_folder_path)
+    assert relative_paths == ["mod/changed.txt", "new.json"]
+    assert list_file_path.read_text(encoding="utf-8") == "mod/changed.txt\nnew.json\n"
+    assert list_file_path.absolute() not in fm.get_changed_file_paths()
+
+
+def test_stream_rewrite_file(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    file_path = tmp_path / "file.txt"
+    file_path.write_bytes(b"key:0 a\r\nkey:0 b\nother\rkey:0 c")
+
+    assert fm.stream_rewrite_file(file_path, lambda chunk: re.sub(r"key:0 \w", "key:0 x", chunk), chunk_size=1)
+    assert file_path.read_bytes() == b"key:0 x\r\nkey:0 x\nother\rkey:0 x"
+    os.utime(file_path, ns=(0, 0))
+    assert not fm.stream_rewrite_file(file_path, lambda chunk: chunk.replace("missing", "x"), chunk_size=1)
+    assert file_path.stat().st_mtime_ns == 0
+
+    # joining lines is not line-local, the file is left alone
+    monkeypatch.setattr(fm, "stream_chunk_size", 1)
+    with pytest.raises(ValueError, match="only line-local patterns"):
+        stream_search_and_replace_in_file(file_path, r"\s+", " ")
+    assert file_path.read_bytes() == b"key:0 x\r\nkey:0 x\nother\rkey:0 x"
+    assert [path.name for path in tmp_path.iterdir()] == ["file.txt"]
+
+
+def test_file_overlay(tmp_path: Path) -> None:
+    fm.clear_changed_file_paths()
+    repo_folder_path = tmp_path / "repo"
+    repo_folder_path.mkdir()
+    (repo_folder_path / "README.md").write_text("Supports version: `3.14.x`\n", encoding="utf-8")
+    (repo_folder_path / "loc.yml").write_bytes(b'l_english:\r\n key:0 "v1"\r\n')
+    env_file_path = tmp_path / "github_env"
+    env_file_path.write_text("EARLIER=1\n", encoding="utf-8")
+    cache = ParseCache(tmp_path / "cache", "1.0", max_bytes=0)
+
+    file_overlay = fm.FileOverlay()
+    fm.set_file_overlay(file_overlay)
+    try:
+        search_and_replace_in_file(repo_folder_path / "README.md", "3.14", "4.0")
+        stream_search_and_replace_in_file(repo_folder_path / "loc.yml", '"v1"', '"v2"')
+        fm.write_file_if_changed(repo_folder_path / "new.json", "{}")
+        fm.append_to_file(env_file_path, "MOD_VERSION=v2\n")
+        cache.put("kind", b"content", "value")
+        # reads see the overlay, and the cache entry outlives the eviction until the flush
+        assert fm.read_file_text(repo_folder_path / "README.md") == "Supports version: `4.0.x`\n"
+        assert cache.get("kind", b"content") == "value"
+    finally:
+        fm.set_file_overlay(None)
+
+    # nothing was touched on disk
+    assert (repo_folder_path / "README.md").read_text(encoding="utf-8") == "Supports version: `3.14.x`\n"
+    assert not (repo_folder_path / "new.json").exists()
+    assert env_file_path.read_text(encoding="utf-8") == "EARLIER=1\n"
+    assert not (tmp_path / "cache").exists()
+    assert fm.write_changed_files_list(tmp_path / "changed.txt", repo_folder_path) == ["README.md", "loc.yml", "new.json"]
+
+    repo_diff = file_overlay.format_diff(
+        [repo_folder_path / "README.md", repo_folder_path / "new.json"], root_folder_path=repo_folder_path
+    )
+    assert repo_diff == (
+        "--- a/README.md\n+++ b/README.md\n@@ -1 +1 @@\n-Supports version: `3.14.x`\n+Supports version: `4.0.x`\n"
+        "--- /dev/null\n+++ b/new.json\n@@ -0,0 +1 @@\n+{}\n\\ No newline at end of file\n"
+    )
+    assert f"+++ {env_file_path.as_posix()}\n@@ -1 +1,2 @@\n EARLIER=1\n+MOD_VERSION=v2\n" in file_overlay.format_diff()
+
+    assert len(file_overlay.flush()) == 5  # noqa: PLR2004
+    assert (repo_folder_path / "loc.yml").read_bytes() == b'l_english:\r\n key:0 "v2"\r\n'
+    assert env_file_path.read_text(encoding="utf-8") == "EARLIER=1\nMOD_VERSION=v2\n"
+    assert file_overlay.files == {}
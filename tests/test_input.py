@@ -5,7 +5,9 @@ from pathlib import Path
 
 import pytest
 
+import constants_and_overrides as cao
 import methods.input_methods as im
+import methods.substitution_methods as sm
 
 
 def test_str2bool(input_truey_strings: tuple[str], input_falsey_strings: tuple[str]) -> None:
@@ -38,7 +40,7 @@ def test_parse_descriptor_to_dict(
     }
 
     for test_path, expected_result in test_descriptors.items():
-        result = im.parse_descriptor_to_dict(test_path, debug_level="INFO")
+        result = im.parse_descriptor_to_dict(test_path)
 
         for file_key, test_key in zip(result.keys(), expected_result.keys(), strict=True):
             error_msg = f"Mismatching extracted key vs test key: {file_key} =/= {test_key}"
@@ -53,6 +55,26 @@ def test_parse_descriptor_to_dict(
     return None
 
 
+def test_parse_descriptor_string() -> None:
+    """Edge cases of the tokenizer that the fixtures don't cover"""
+    test_strings = {
+        # `=` inside a value only splits on the first one
+        'name="a = b"\nversion = v1.2.3\n': {"name": "a = b", "version": "v1.2.3"},
+        # block on one line, block closing on an item line, comment and blank line inside a block
+        'tags = { "A B" "C" }\nother={\n\t"D"\n\n\t# comment\n\t"E"}\n': {"tags": ["A B", "C"], "other": ["D", "E"]},
+        # unquoted block items split on whitespace, stray lines without `=` are skipped
+        "stray line\ntags={ a b\n c }\n": {"tags": ["a", "b", "c"]},
+        # placeholders in plain values are kept for later formatting
+        'name="Name {stellaris_version}"': {"name": "Name {stellaris_version}"},
+    }
+    for test_string, expected_result in test_strings.items():
+        result = im.parse_descriptor_string(test_string)
+        error_msg = f"Failed to parse {test_string!r}, got {result}"
+        assert result == expected_result, error_msg
+
+    return None
+
+
 def test_create_descriptor_file(
     input_test_descriptor_dict: dict[str, str],
     tmp_path: Path,
@@ -441,6 +463,24 @@ def test_generate_with_template_file(tmp_path: Path, input_example_changelog_fil
     return None
 
 
+def test_generate_release_notes_merged(tmp_path: Path) -> None:
+    # same patterns and template as the release notes of `prepare_release.py`
+    template_file_path = Path("templates") / cao.default_release_note_template_filename
+    patterns = [cao.default_template_insert_version_pattern, cao.default_template_search_pattern]
+    replacements = ["\\g<1>\\g<2>3.14.x\\g<3>", "---\n## ModName Version `v1.2.3`:\n- Fixed things\n---"]
+
+    merged_str = im.generate_with_template_file(
+        template_file_path, tmp_path / "merged.md", patterns, replacements, merge_patterns=True
+    )
+    sequential_str = im.generate_with_template_file(template_file_path, tmp_path / "sequential.md", patterns, replacements)
+    assert sm.get_substitution_engine(tuple(patterns), tuple(replacements), merge=True).merged_pattern is not None
+    assert merged_str == sequential_str
+    assert merged_str.startswith("## Supports Stellaris version: `3.14.x`\n")
+    assert "\n---\n## ModName Version `v1.2.3`:\n- Fixed things\n---\n" in merged_str
+
+    return None
+
+
 def test_convert_markdown_lists_to_bbcode(input_markdown_lists: str, expected_bbcode_converted_lists: str) -> None:
     output_str = im.convert_markdown_lists_to_bbcode(input_markdown_lists)
     error_msg = f"Conversion of input markdown lists does not match expected steam bbcode lists output\
@@ -0,0 +1,175 @@
+import os
+from pathlib import Path
+
+import pytest
+
+import methods.file_methods as fm
+import methods.loc_methods as lm
+
+default_loc_key_pattern = '(\\s{}:0\\s").+?(")'
+
+
+@pytest.fixture
+def input_loc_file_str() -> str:
+    return """﻿l_english:
+ test_mod_version:0 "v0.0.0"
+ test_mod_version_desc:0 "Mod version v0.0.0 description"
+ test_mod_supported_version:0 "0.0.x"
+ TEST_MOD_RELEASE_DATE:0 "unknown"
+ unrelated_key:0 "test_mod_version:0 is not a key here"
+"""
+
+
+@pytest.fixture
+def expected_loc_file_str() -> str:
+    return """﻿l_english:
+ test_mod_version:0 "v1.2.3"
+ test_mod_version_desc:0 "Mod version v0.0.0 description"
+ test_mod_supported_version:0 "4.0.x"
+ TEST_MOD_RELEASE_DATE:0 "2024-05-31"
+ unrelated_key:0 "test_mod_version:0 is not a key here"
+"""
+
+
+@pytest.fixture
+def loc_key_values() -> dict[str, str]:
+    return {
+        "test_mod_version": "v1.2.3",
+        "test_mod_supported_version": "4.0.x",
+        "test_mod_release_date": "2024-05-31",
+        "missing_key": "nothing",
+    }
+
+
+def test_patch_loc_string(input_loc_file_str: str, expected_loc_file_str: str, loc_key_values: dict[str, str]) -> None:
+    result_str, matches = lm.patch_loc_string(input_loc_file_str, default_loc_key_pattern, loc_key_values)
+    assert result_str == expected_loc_file_str
+    # case-insensitive key match is reported under the requested key, missing keys are reported with 0
+    assert matches == {
+        "test_mod_version": 1,
+        "test_mod_supported_version": 1,
+        "test_mod_release_date": 1,
+        "missing_key": 0,
+    }
+
+    return None
+
+
+def test_patch_loc_files(
+    tmp_path: Path,
+    input_loc_file_str: str,
+    expected_loc_file_str: str,
+    loc_key_values: dict[str, str],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    loc_file_paths = []
+    for index in range(3):
+        loc_file_path = tmp_path / f"test_{index}_l_english.yml"
+        loc_file_path.write_bytes(input_loc_file_str.replace("\n", "\r\n").encode("utf-8"))
+        loc_file_paths.append(loc_file_path)
+    untouched_file_path = tmp_path / "untouched_l_english.yml"
+    untouched_file_path.write_text('﻿l_english:\n other_key:0 "value"\n', encoding="utf-8")
+    os.utime(untouched_file_path, ns=(0, 0))
+    loc_file_paths.append(untouched_file_path)
+
+    # force the process pool even for tiny files
+    monkeypatch.setattr(lm, "parallel_loc_patch_min_bytes", 0)
+    fm.clear_changed_file_paths()
+    results = lm.patch_loc_files(loc_file_paths, default_loc_key_pattern, loc_key_values, max_workers=2)
+    # written in the workers, but recorded here for the changed files list
+    assert fm.get_changed_file_paths() == [loc_file_path.absolute() for loc_file_path in loc_file_paths[:3]]
+
+    assert [result.file_path for result in results] == loc_file_paths
+    for result in results[:3]:
+        assert result.changed is True
+        assert result.matches["test_mod_version"] == 1
+        # line endings and BOM kept as they were
+        assert result.file_path.read_bytes() == expected_loc_file_str.replace("\n", "\r\n").encode("utf-8")
+
+    # nothing matched, so nothing written
+    assert results[3].changed is False
+    assert set(results[3].matches.values()) == {0}
+    assert untouched_file_path.stat().st_mtime_ns == 0
+
+    # with a file overlay, everything stays in this process and off the disk
+    for loc_file_path in loc_file_paths[:3]:
+        loc_file_path.write_bytes(input_loc_file_str.encode("utf-8"))
+    file_overlay = fm.FileOverlay()
+    fm.set_file_overlay(file_overlay)
+    try:
+        results = lm.patch_loc_files(loc_file_paths, default_loc_key_pattern, loc_key_values, max_workers=2)
+    finally:
+        fm.set_file_overlay(None)
+    assert [result.changed for result in results] == [True, True, True, False]
+    assert list(file_overlay.files) == [loc_file_path.absolute() for loc_file_path in loc_file_paths[:3]]
+    assert loc_file_paths[0].read_bytes() == input_loc_file_str.encode("utf-8")
+
+    return None
+
+
+def test_patch_loc_file_streaming(
+    tmp_path: Path,
+    input_loc_file_str: str,
+    expected_loc_file_str: str,
+    loc_key_values: dict[str, str],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    # a chunk of a line or two, so keys land at the start of chunks
+    monkeypatch.setattr(fm, "stream_chunk_size", 16)
+    loc_file_path = tmp_path / "big_l_english.yml"
+    loc_file_path.write_bytes((input_loc_file_str * 50).replace("\n", "\r\n").encode("utf-8"))
+
+    result = lm.patch_loc_file(loc_file_path, default_loc_key_pattern, loc_key_values)
+
+    assert result.changed is True
+    assert result.matches == {
+        "test_mod_version": 50,
+        "test_mod_supported_version": 50,
+        "test_mod_release_date": 50,
+        "missing_key": 0,
+    }
+    assert loc_file_path.read_bytes() == (expected_loc_file_str * 50).replace("\n", "\r\n").encode("utf-8")
+
+
+def test_loc_key_index(tmp_path: Path, input_loc_file_str: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    english_folder_path = tmp_path / "localisation" / "english"
+    english_folder_path.mkdir(parents=True)
+    (english_folder_path / "test_l_english.yml").write_bytes(input_loc_file_str.replace("\n", "\r\n").encode("utf-8"))
+    (english_folder_path / "other_l_english.yml").write_text('l_english:\n # comment:0 "no"\n other_key: "value"\n')
+    (tmp_path / "localisation" / "not_loc.txt").write_text(' test_mod_version:0 "no"\n')
+    index_file_path = tmp_path / "generated" / "loc_key_index.json"
+
+    # force the process pool even for tiny files
+    monkeypatch.setattr(lm, "parallel_loc_patch_min_bytes", 0)
+    loc_key_index = lm.get_loc_key_index(tmp_path, index_file_path, max_workers=2)
+
+    assert list(loc_key_index.files) == ["localisation/english/other_l_english.yml", "localisation/english/test_l_english.yml"]
+    # the BOM and the header line come before the first key
+    first_line_length = len("﻿l_english:\r\n".encode())
+    assert loc_key_index.find("TEST_MOD_VERSION") == [
+        lm.LocKeyLocation("localisation/english/test_l_english.yml", 2, first_line_length)
+    ]
+    assert loc_key_index.find("other_key") == [lm.LocKeyLocation("localisation/english/other_l_english.yml", 3, 29)]
+    assert loc_key_index.find("comment") == []
+    assert loc_key_index.find_files(["test_mod_release_date", "missing_key"]) == [
+        tmp_path / "localisation/english/test_l_english.yml"
+    ]
+
+    # unchanged files come from the sidecar, changed ones are parsed again
+    (english_folder_path / "other_l_english.yml").write_text('l_english:\n new_key:0 "value"\n')
+    parsed_file_paths = []
+    monkeypatch.setattr(
+        lm,
+        "parse_loc_file_keys",
+        lambda file_path, _loc_key_pattern: parsed_file_paths.append(file_path) or lm.LocFileKeys(0, 0),
+    )
+    lm.get_loc_key_index(tmp_path, index_file_path)
+    assert parsed_file_paths == [english_folder_path / "other_l_english.yml"]
+    monkeypatch.undo()
+
+    # with the pattern used for patching, only the entries it can patch are indexed (and the sidecar is made again)
+    (english_folder_path / "other_l_english.yml").write_text('l_english:\n new_key:1 "value"\nold_key:0 "value"\n')
+    loc_key_index = lm.get_loc_key_index(tmp_path, index_file_path, loc_key_pattern='(\\s{}:0\\s").+?(")')
+    assert loc_key_index.find("new_key") == []
+    assert loc_key_index.find("old_key") == [lm.LocKeyLocation("localisation/english/other_l_english.yml", 3, 30)]
+    assert len(loc_key_index.find("test_mod_version")) == 1
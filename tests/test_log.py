@@ -0,0 +1,64 @@
+import json
+import logging
+from collections.abc import Iterator
+
+import pytest
+
+import methods.input_methods as im
+import methods.log_methods as lm
+
+
+@pytest.fixture(autouse=True)
+def restore_logging() -> Iterator[None]:
+    root_logger = logging.getLogger()
+    root_level = root_logger.level
+    yield
+    for handler in root_logger.handlers[:]:
+        if isinstance(handler, lm.ScriptLogHandler):
+            root_logger.removeHandler(handler)
+    root_logger.setLevel(root_level)
+
+
+def test_configure_logging_levels(capsys: pytest.CaptureFixture) -> None:
+    logger = logging.getLogger("test_log")
+    lm.configure_logging("SILENT", "text")
+    logger.info("not shown")
+    logger.warning("shown")
+    assert not logger.isEnabledFor(logging.INFO)
+
+    # a second call replaces the handler instead of adding another one
+    lm.configure_logging("DEBUG", "text")
+    logger.debug("debug %s", "details")
+    assert capsys.readouterr().out == "shown\ndebug details\n"
+
+    with pytest.raises(ValueError, match="Debug level"):
+        lm.configure_logging("VERBOSE")
+    with pytest.raises(ValueError, match="Log format"):
+        lm.configure_logging("INFO", "xml")
+
+
+def test_json_lines_with_redaction(capsys: pytest.CaptureFixture, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("configVdf", "c2VjcmV0IGNvbmZpZw==")
+    monkeypatch.setenv("logFormat", "json")
+    lm.configure_logging("INFO")
+    logger = logging.getLogger("test_log")
+
+    assert im.get_env_variable("configVdf", None) == "c2VjcmV0IGNvbmZpZw=="
+    logger.info("leaked %s", "c2VjcmV0IGNvbmZpZw==", extra={"fields": {"item": "mod", "value": "c2VjcmV0IGNvbmZpZw=="}})
+
+    log_entries = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [log_entry["message"] for log_entry in log_entries] == ["configVdf=***", "leaked ***"]
+    assert log_entries[1]["logger"] == "test_log"
+    assert log_entries[1]["level"] == "INFO"
+    assert log_entries[1]["item"] == "mod"
+    assert log_entries[1]["value"] == "***"
+
+
+def test_disabled_debug_is_not_formatted() -> None:
+    class Exploding:
+        def __str__(self) -> str:
+            raise AssertionError
+
+    lm.configure_logging("INFO", "text")
+    # below the level, arguments are never turned into strings
+    logging.getLogger("test_log").debug("%s", Exploding())
@@ -0,0 +1,75 @@
+import random
+from pathlib import Path
+
+import pytest
+
+import methods.size_methods as sm
+
+
+@pytest.fixture
+def mod_folder_path(tmp_path: Path) -> Path:
+    mod_folder_path = tmp_path / "mod"
+    (mod_folder_path / "gfx").mkdir(parents=True)
+    (mod_folder_path / "common").mkdir()
+    (mod_folder_path / "gfx" / "big.dds").write_bytes(random.Random(0).randbytes(300_000))
+    (mod_folder_path / "gfx" / "small.dds").write_bytes(b"\0" * 1000)
+    (mod_folder_path / "common" / "script.txt").write_bytes(b"key = value\n" * 20_000)
+    (mod_folder_path / "descriptor.mod").write_bytes(b'name="Test"\n')
+    (mod_folder_path / "gfx" / "source.xcf").write_bytes(b"\0" * 5_000_000)
+    return mod_folder_path
+
+
+def test_parse_size_budgets() -> None:
+    assert sm.parse_byte_size("1000") == 1000  # noqa: PLR2004
+    assert sm.parse_byte_size("1.5 MiB") == 1_572_864  # noqa: PLR2004
+    assert sm.parse_size_budgets(["total=500MB", " gfx/ = 2kb", ".DDS=1GB"]) == [
+        sm.SizeBudget("total", 500_000_000),
+        sm.SizeBudget("gfx/", 2000),
+        sm.SizeBudget(".DDS", 1_000_000_000),
+    ]
+    with pytest.raises(ValueError, match="name=size"):
+        sm.parse_size_budgets(["gfx=1MB"])
+    with pytest.raises(ValueError, match="optional unit"):
+        sm.parse_size_budgets(["total=1 parsec"])
+
+
+def test_build_size_report(mod_folder_path: Path) -> None:
+    size_report = sm.build_size_report(mod_folder_path)
+
+    # the GIMP source is excluded by the default walk rules, stored textures count in full
+    assert size_report.total.file_count == 4  # noqa: PLR2004
+    assert size_report.total.size == 301_000 + 240_000 + 12
+    assert list(size_report.folders) == ["gfx", "common", "."]
+    assert size_report.folders["gfx"] == sm.SizeTotals(2, 301_000, 301_000)
+    assert list(size_report.extensions) == [".dds", ".txt", ".mod"]
+    assert [file_size.file_path for file_size in size_report.largest_files] == [
+        "gfx/big.dds",
+        "common/script.txt",
+        "gfx/small.dds",
+        "descriptor.mod",
+    ]
+    # repetitive script text compresses to a small fraction, estimated from a sample
+    assert size_report.folders["common"].compressed_size < 240_000 / 50
+    assert sm.SizeReport.from_dict(size_report.to_dict()) == size_report
+
+
+def test_report_content_size(mod_folder_path: Path, tmp_path: Path) -> None:
+    report_file_path = tmp_path / "generated" / "size_report.json"
+    previous_report_file_path = tmp_path / "cache" / "size_report.json"
+    size_budgets = sm.parse_size_budgets(["total=1MB", "growth=100kB", ".dds=400kB"])
+
+    sm.report_content_size(mod_folder_path, report_file_path, previous_report_file_path, size_budgets=size_budgets)
+    assert sm.load_size_report(previous_report_file_path) == sm.load_size_report(report_file_path)
+
+    # an accidental texture dump, over the growth and extension budgets
+    (mod_folder_path / "gfx" / "dump.dds").write_bytes(b"\0" * 200_000)
+    with pytest.raises(ValueError, match=r"growth is 200 kB, over the budget of 100 kB; \.dds is 501 kB"):
+        sm.report_content_size(mod_folder_path, report_file_path, previous_report_file_path, size_budgets=size_budgets)
+    # the previous report is still the last one within budget
+    previous_report = sm.load_size_report(previous_report_file_path)
+    assert previous_report is not None
+    assert previous_report.total.file_count == 4  # noqa: PLR2004
+    assert sm.load_size_report(report_file_path).total.file_count == 5  # noqa: PLR2004
+
+    summary = sm.format_size_report(sm.load_size_report(report_file_path), previous_report)
+    assert "| `gfx/` | 3 | 501 kB | 501 kB | +200 kB |" in summary
@@ -0,0 +1,60 @@
+from pathlib import Path
+
+import pytest
+
+import methods.snapshot_methods as snm
+
+
+@pytest.fixture
+def content_folder_path(tmp_path: Path) -> Path:
+    content_folder_path = tmp_path / "mod"
+    (content_folder_path / "common" / "buildings").mkdir(parents=True)
+    (content_folder_path / "descriptor.mod").write_text('name="Test Mod"\n')
+    (content_folder_path / "common" / "buildings" / "test_buildings.txt").write_text("building = {}\n")
+    (content_folder_path / "thumbnail.png").write_bytes(bytes(range(256)) * 40)
+    return content_folder_path
+
+
+def take_snapshot(content_folder_path: Path, description: str = "Description") -> snm.ContentSnapshot:
+    return snm.take_content_snapshot(
+        "12345", content_folder_path, {"title": "Test Mod", "description": description, "change_note": "v1.0.0"}
+    )
+
+
+def test_take_content_snapshot(content_folder_path: Path) -> None:
+    snapshot = take_snapshot(content_folder_path)
+    assert list(snapshot.files) == ["common/buildings/test_buildings.txt", "descriptor.mod", "thumbnail.png"]
+    assert snapshot.files["thumbnail.png"] == snm.hash_file(content_folder_path / "thumbnail.png")
+    assert snapshot.files["thumbnail.png"].size == 256 * 40
+    assert snapshot.metadata["title"] == snm.hash_text("Test Mod")
+
+
+def test_compare_snapshots(content_folder_path: Path) -> None:
+    previous_snapshot = take_snapshot(content_folder_path)
+    assert snm.compare_snapshots(previous_snapshot, take_snapshot(content_folder_path)).unchanged
+
+    first_diff = snm.compare_snapshots(None, previous_snapshot)
+    assert first_diff.no_previous_snapshot
+    assert not first_diff.unchanged
+    assert first_diff.added == list(previous_snapshot.files)
+
+    (content_folder_path / "descriptor.mod").write_text('name="Test Mod 2"\n')
+    (content_folder_path / "thumbnail.png").unlink()
+    (content_folder_path / "common" / "new.txt").write_text("new = yes\n")
+    snapshot_diff = snm.compare_snapshots(previous_snapshot, take_snapshot(content_folder_path, "New description"))
+    assert snapshot_diff.added == ["common/new.txt"]
+    assert snapshot_diff.removed == ["thumbnail.png"]
+    assert snapshot_diff.modified == ["descriptor.mod"]
+    assert snapshot_diff.metadata == ["description"]
+    assert snapshot_diff.summary() == "1 added; 1 removed; 1 modified; changed description"
+
+
+def test_content_snapshot_round_trip(tmp_path: Path, content_folder_path: Path) -> None:
+    snapshot = take_snapshot(content_folder_path)
+    snapshot_file_path = tmp_path / "snapshots" / "12345.json"
+    snm.save_content_snapshot(snapshot, snapshot_file_path)
+    assert snm.load_content_snapshot(snapshot_file_path) == snapshot
+
+    snapshot_file_path.write_text("{}")
+    assert snm.load_content_snapshot(snapshot_file_path) is None
+    assert snm.load_content_snapshot(tmp_path / "missing.json") is None
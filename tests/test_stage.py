@@ -0,0 +1,83 @@
+import threading
+import time
+
+import pytest
+
+import methods.stage_methods as sm
+
+
+def test_stage_graph() -> None:
+    # the two independent stages only get past the barrier if they run at the same time
+    barrier = threading.Barrier(2, timeout=5)
+    order = []
+
+    def independent_stage(name: str) -> str:
+        barrier.wait()
+        order.append(name)
+        return name
+
+    def dependent_stage() -> str:
+        time.sleep(0.05)
+        order.append("notes")
+        return f"notes for {stage_graph.get_value('changelog')}"
+
+    stage_graph = sm.StageGraph("release")
+    stage_graph.add_stage("changelog", lambda: independent_stage("changelog"), outputs=["CHANGELOG.md", "entry"])
+    stage_graph.add_stage("readme", lambda: independent_stage("readme"), outputs=["README.md"])
+    stage_graph.add_stage("notes", dependent_stage, inputs=["entry"], outputs=["notes.md"])
+    stage_graph.add_stage("notes again", lambda: order.append("notes again"), outputs=["notes.md"])
+
+    assert stage_graph.stages["notes"].dependencies == ("changelog",)
+    # writing the same output keeps the order they were added in
+    assert stage_graph.stages["notes again"].dependencies == ("notes",)
+    results = stage_graph.run(max_workers=4)
+
+    assert list(results) == ["changelog", "readme", "notes", "notes again"]
+    assert results["notes"].value == "notes for changelog"
+    assert order[2:] == ["notes", "notes again"]
+    critical_path, critical_path_seconds = stage_graph.get_critical_path()
+    assert critical_path == ["changelog", "notes", "notes again"]
+    assert critical_path_seconds >= 0.05  # noqa: PLR2004
+    assert critical_path_seconds < sum(result.wall_seconds for result in results.values())
+
+    with pytest.raises(ValueError, match="reads missing, which no earlier stage writes"):
+        stage_graph.add_stage("broken", lambda: None, inputs=["missing"])
+
+
+def test_stage_graph_errors() -> None:
+    def fail(message: str) -> None:
+        raise ValueError(message)
+
+    stage_graph = sm.StageGraph("release")
+    stage_graph.add_stage("loc files", lambda: fail("loc key missing"), outputs=["loc files"])
+    stage_graph.add_stage("changelog", lambda: fail("no WIP entry"), outputs=["entry"])
+    stage_graph.add_stage("notes", lambda: "notes", inputs=["entry"])
+    stage_graph.add_stage("readme", lambda: "readme")
+
+    # every error is reported, and stages that don't depend on a failed one still run
+    with pytest.raises(
+        ExceptionGroup, match="2 of 4 stages of release failed:\nloc files: ValueError: loc key missing\n"
+    ) as error_info:
+        stage_graph.run()
+    assert [str(error) for error in error_info.value.exceptions] == ["loc key missing", "no WIP entry"]
+    assert stage_graph.results["notes"].skipped
+    assert stage_graph.results["readme"].value == "readme"
+
+
+def test_stage_graph_main_thread() -> None:
+    main_thread = threading.current_thread()
+    stage_graph = sm.StageGraph("release")
+    stage_graph.add_stage("readme", threading.current_thread, outputs=["README.md"])
+    stage_graph.add_stage("validate", threading.current_thread, outputs=["checked"], main_thread=True)
+    stage_graph.add_stage("loc files", threading.active_count, inputs=["checked"], main_thread=True)
+
+    results = stage_graph.run(max_workers=2)
+    assert list(results) == ["readme", "validate", "loc files"]
+    assert results["validate"].value is main_thread
+    assert results["readme"].value is not main_thread
+    # nothing else running yet, so a process pool started here doesn't fork a process with running threads
+    assert results["loc files"].value == 1
+    assert results["loc files"].start_seconds <= results["readme"].start_seconds
+
+    with pytest.raises(ValueError, match="can only depend on stages that do too"):
+        stage_graph.add_stage("broken", lambda: None, inputs=["README.md"], main_thread=True)
@@ -0,0 +1,250 @@
+import base64
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import methods.steamcmd_methods as sm
+import methods.workshop_methods as wm
+
+fake_steamcmd_command = (sys.executable, str(Path("tests/fixtures/fake_steamcmd.py").resolve()))
+
+
+@pytest.fixture
+def manifest_file_paths(tmp_path: Path) -> list[Path]:
+    manifest_file_paths = [tmp_path / "main_manifest.vdf", tmp_path / "patch_manifest.vdf"]
+    for manifest_file_path in manifest_file_paths:
+        manifest_file_path.write_text('"workshopitem"\n{\n}\n')
+    return manifest_file_paths
+
+
+def run_fake_steamcmd(
+    tmp_path: Path, manifest_file_paths: list[Path], monkeypatch: pytest.MonkeyPatch, mode: str, **kwargs: float
+) -> sm.SteamcmdRunResult:
+    monkeypatch.setenv("FAKE_STEAMCMD_MODE", mode)
+    monkeypatch.setenv("FAKE_STEAMCMD_LOG", str(tmp_path / "uploaded.txt"))
+    runscript_file_path = tmp_path / "runscript.txt"
+    sm.write_steamcmd_runscript(runscript_file_path, "build_account", manifest_file_paths)
+    return sm.run_steamcmd_script(runscript_file_path, manifest_file_paths, steamcmd_command=fake_steamcmd_command, **kwargs)
+
+
+def test_write_steamcmd_runscript(tmp_path: Path, manifest_file_paths: list[Path]) -> None:
+    runscript = sm.write_steamcmd_runscript(tmp_path / "runscript.txt", "build_account", manifest_file_paths)
+    assert runscript.splitlines() == [
+        "@ShutdownOnFailedCommand 1",
+        "@NoPromptForPassword 1",
+        'login "build_account"',
+        f'workshop_build_item "{manifest_file_paths[0]}"',
+        f'workshop_build_item "{manifest_file_paths[1]}"',
+        "quit",
+    ]
+    # no smuggling extra commands into the runscript
+    with pytest.raises(ValueError, match="quotes or line breaks"):
+        sm.write_steamcmd_runscript(tmp_path / "runscript.txt", 'name"\nquit', manifest_file_paths)
+
+
+def test_run_steamcmd_script(tmp_path: Path, manifest_file_paths: list[Path], monkeypatch: pytest.MonkeyPatch) -> None:
+    result = run_fake_steamcmd(tmp_path, manifest_file_paths, monkeypatch, "ok")
+    assert result.returncode == 0
+    assert result.logged_in
+    assert result.uploaded_manifests == manifest_file_paths
+    assert result.login_seconds is not None
+    assert len(result.upload_seconds) == len(manifest_file_paths)
+    assert (tmp_path / "uploaded.txt").read_text().splitlines() == [str(path) for path in manifest_file_paths]
+
+
+def test_run_steamcmd_script_login_failure(
+    tmp_path: Path, manifest_file_paths: list[Path], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    with pytest.raises(sm.SteamcmdLoginError, match="failed to log in") as err_info:
+        run_fake_steamcmd(tmp_path, manifest_file_paths, monkeypatch, "login_fail")
+    assert err_info.value.returncode == 5  # noqa: PLR2004
+    assert "Invalid Password" in err_info.value.output
+    assert not (tmp_path / "uploaded.txt").exists()
+
+
+def test_run_steamcmd_script_login_timeout(
+    tmp_path: Path, manifest_file_paths: list[Path], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    with pytest.raises(sm.SteamcmdLoginError, match="timed out"):
+        run_fake_steamcmd(tmp_path, manifest_file_paths, monkeypatch, "hang", timeout=2)
+
+
+def test_run_steamcmd_script_upload_failure(
+    tmp_path: Path, manifest_file_paths: list[Path], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setenv("FAKE_STEAMCMD_FAIL_ITEM", "2")
+    with pytest.raises(sm.SteamcmdUploadError, match=r"patch_manifest\.vdf") as err_info:
+        run_fake_steamcmd(tmp_path, manifest_file_paths, monkeypatch, "upload_fail")
+    assert "ERROR! Failed to update workshop item" in str(err_info.value)
+    # both are still CalledProcessErrors, like before
+    assert isinstance(err_info.value, subprocess.CalledProcessError)
+    assert (tmp_path / "uploaded.txt").read_text().splitlines() == [str(manifest_file_paths[0])]
+
+
+def test_get_step_seconds() -> None:
+    timed_lines = [
+        (1.0, "Steam Console Client (c) Valve Corporation - version 1700000000\n"),
+        (3.0, "Logging in user 'build_account' [U:1:1] to Steam Public...OK\n"),
+        (4.0, "Waiting for user info...OK\n"),
+        (6.5, "Success.\n"),
+        (7.0, "Preparing update...\n"),
+        (10.0, "Success.\n"),
+    ]
+    assert sm.get_step_seconds(timed_lines) == (4.0, [2.5, 3.5])
+    assert sm.get_step_seconds(timed_lines[:1]) == (None, [])
+
+
+def make_upload_layout(tmp_path: Path) -> dict[str, str]:
+    """Tool folder, mod repository and steam home for the upload script, returns the env to run it with"""
+    tool_folder_path = tmp_path / "tool"
+    tool_folder_path.mkdir()
+    for name in ["steam_workshop_upload.py", "constants_and_overrides.py", "methods", "templates"]:
+        (tool_folder_path / name).symlink_to(Path(name).resolve())
+    mod_github_folder_path = tmp_path / "testmod"
+    (mod_github_folder_path / "testmod").mkdir(parents=True)
+    (mod_github_folder_path / "testmod" / "descriptor.mod").write_text(
+        'name="Test Mod"\nversion="v1.3.0"\nsupported_version="v4.0.*"\nremote_file_id="12345"\n'
+    )
+    (mod_github_folder_path / "workshop.txt").write_text('Supports Stellaris version: [b]4.0.x[/b] "quoted"\n')
+    home_path = tmp_path / "home"
+    for steam_folder in [".local/share/Steam", ".steam/steam", ".steam/root"]:
+        (home_path / steam_folder).mkdir(parents=True)
+    (tmp_path / "github_output").touch()
+    (tmp_path / "generated").mkdir()
+    return {
+        **os.environ,
+        "HOME": str(home_path),
+        "steam_username": "build_account",
+        "configVdf": base64.b64encode(b'"InstallConfigStore"\n{\n}\n').decode(),
+        "appID": "281990",
+        "versionStellaris": "v4.0.*",
+        "useChangelog": "false",
+        "modFolderName": "testmod",
+        "repoGithubpath": "user/testmod",
+        "generatedFilesFolder": str(tmp_path / "generated"),
+        "GITHUB_OUTPUT": str(tmp_path / "github_output"),
+        "steamcmdCommand": " ".join(fake_steamcmd_command),
+        "FAKE_STEAMCMD_LOG": str(tmp_path / "uploaded.txt"),
+    }
+
+
+def run_upload_script(tmp_path: Path, env: dict[str, str]) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, "steam_workshop_upload.py"],
+        cwd=tmp_path / "tool",
+        env=env,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+
+
+def test_steam_workshop_upload_offline(tmp_path: Path) -> None:
+    """The whole upload script against the fake steamcmd"""
+    env = make_upload_layout(tmp_path)
+    env |= {"timingReport": "true", "GITHUB_STEP_SUMMARY": str(tmp_path / "step_summary.md")}
+    completed_process = run_upload_script(tmp_path, env)
+    assert completed_process.returncode == 0, completed_process.stdout + completed_process.stderr
+
+    timing_report = json.loads((tmp_path / "generated" / "timing_steam_workshop_upload.json").read_text())
+    assert [span["name"] for span in timing_report["spans"]][-3:] == ["steamcmd", "login", "upload testmod"]
+    assert "| &nbsp;&nbsp;login |" in (tmp_path / "step_summary.md").read_text()
+    manifest_file_path = tmp_path / "generated" / "manifest.vdf"
+    assert '"publishedfileid" "12345"' in manifest_file_path.read_text()
+    assert '\\"quoted\\"' in manifest_file_path.read_text()
+    assert (tmp_path / "uploaded.txt").read_text().splitlines() == [str(manifest_file_path)]
+    assert (tmp_path / "github_output").read_text().splitlines()[0] == f"manifest_path={manifest_file_path}"
+    assert (tmp_path / "home/.local/share/Steam/config/config.vdf").exists()
+
+
+def test_steam_workshop_upload_many_items(tmp_path: Path) -> None:
+    env = make_upload_layout(tmp_path)
+    mod_github_folder_path = tmp_path / "testmod"
+    (mod_github_folder_path / "OVERRIDE.txt").write_text(
+        'extra_workshop_items={\n\t"compat_patch|workshop_compat.txt"\n\t"lite"\n}\n'
+    )
+    for folder, item_id in [("compat_patch", "2222"), ("lite", "3333")]:
+        (mod_github_folder_path / folder).mkdir()
+        (mod_github_folder_path / folder / "descriptor.mod").write_text(
+            f'name="Test Mod {folder}"\nversion="v1.0.0"\nremote_file_id="{item_id}"\n'
+        )
+    (mod_github_folder_path / "workshop_compat.txt").write_text("Compatibility patch\n")
+
+    # the compatibility patch fails, the lite variant is never tried
+    env |= {"FAKE_STEAMCMD_MODE": "upload_fail", "FAKE_STEAMCMD_FAIL_ITEM": "2"}
+    completed_process = run_upload_script(tmp_path, env)
+    assert completed_process.returncode != 0
+    assert "SteamcmdUploadError" in completed_process.stderr
+
+    compat_manifest_string = (tmp_path / "generated/manifest_compat_patch.vdf").read_text()
+    assert '"publishedfileid" "2222"' in compat_manifest_string
+    assert '"description" "Compatibility patch\n"' in compat_manifest_string
+    results = json.loads((tmp_path / "generated" / wm.workshop_upload_results_file_name).read_text())
+    assert [(result["name"], result["item_id"], result["status"]) for result in results] == [
+        ("testmod", "12345", "uploaded"),
+        ("compat_patch", "2222", "failed"),
+        ("lite", "3333", "not_attempted"),
+    ]
+    assert "ERROR! Failed to update workshop item" in results[1]["error"]
+
+    # the main mod is unchanged since its upload, only the other two are uploaded
+    env["FAKE_STEAMCMD_MODE"] = "ok"
+    completed_process = run_upload_script(tmp_path, env)
+    assert completed_process.returncode == 0, completed_process.stdout + completed_process.stderr
+    results = json.loads((tmp_path / "generated" / wm.workshop_upload_results_file_name).read_text())
+    assert [result["status"] for result in results] == ["unchanged", "uploaded", "uploaded"]
+    assert results[1]["changes"]["added"] == ["descriptor.mod"]
+    uploaded_manifest_names = [Path(line).name for line in (tmp_path / "uploaded.txt").read_text().splitlines()]
+    assert uploaded_manifest_names == ["manifest.vdf", "manifest_compat_patch.vdf", "manifest_lite.vdf"]
+
+    # a changed file and a changed description, the rest is skipped without starting steamcmd
+    (mod_github_folder_path / "lite" / "common.txt").write_text("new_file = yes\n")
+    (mod_github_folder_path / "workshop_compat.txt").write_text("Compatibility patch, now with more\n")
+    env["steamcmdCommand"] = f"{sys.executable} -c 'raise SystemExit(1)'"
+    completed_process = run_upload_script(tmp_path, env)
+    assert completed_process.returncode != 0
+    results = json.loads((tmp_path / "generated" / wm.workshop_upload_results_file_name).read_text())
+    assert results[1]["changes"]["metadata"] == ["description"]
+    assert results[2]["changes"]["added"] == ["common.txt"]
+
+    env["steamcmdCommand"] = " ".join(fake_steamcmd_command)
+    assert run_upload_script(tmp_path, env).returncode == 0
+    (tmp_path / "uploaded.txt").unlink()
+    completed_process = run_upload_script(tmp_path, env)
+    assert completed_process.returncode == 0, completed_process.stdout + completed_process.stderr
+    assert "skipping steamcmd" in completed_process.stdout
+    assert not (tmp_path / "uploaded.txt").exists()
+    results = json.loads((tmp_path / "generated" / wm.workshop_upload_results_file_name).read_text())
+    assert [result["status"] for result in results] == ["unchanged"] * 3
+    assert "changed_item_count=0" in (tmp_path / "github_output").read_text()
+
+    # forced uploads ignore the snapshots
+    env["forceUpload"] = "true"
+    assert run_upload_script(tmp_path, env).returncode == 0
+    assert len((tmp_path / "uploaded.txt").read_text().splitlines()) == 3  # noqa: PLR2004
+
+
+def test_parse_workshop_item_spec(tmp_path: Path) -> None:
+    def parse(workshop_item_spec: str) -> wm.WorkshopItem:
+        return wm.parse_workshop_item_spec(
+            workshop_item_spec,
+            tmp_path,
+            tmp_path / "generated",
+            descriptor_file_name="descriptor.mod",
+            default_description_file_path=tmp_path / "workshop.txt",
+        )
+
+    workshop_item = parse("lite")
+    assert workshop_item.descriptor_file_path == tmp_path / "lite/descriptor.mod"
+    assert workshop_item.description_file_path == tmp_path / "workshop.txt"
+    assert workshop_item.manifest_file_path == tmp_path / "generated/manifest_lite.vdf"
+    workshop_item = parse(" patches/compat | compat.txt | patches/compat.mod ")
+    assert workshop_item.name == "compat"
+    assert workshop_item.description_file_path == tmp_path / "compat.txt"
+    assert workshop_item.descriptor_file_path == tmp_path / "patches/compat.mod"
+    with pytest.raises(ValueError, match="Workshop item entries"):
+        parse("a|b|c|d")
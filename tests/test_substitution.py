@@ -0,0 +1,62 @@
+import re
+
+import pytest
+
+import methods.substitution_methods as sm
+
+version_patterns = (
+    r"(## ModName Version \`).+?(\`:)",
+    r"(Mod version: \`).+?(\`)",
+    r"(Mod version: \[b\]).+?(\[/b\])",
+)
+
+
+@pytest.fixture
+def input_versions_str() -> str:
+    return """## ModName Version `v0.0.0`:
+Mod version: `v0.0.0` for Stellaris 3.14
+Mod version: [b]v0.0.0[/b] for Stellaris 3.14
+## ModName Version `v0.0.1`:
+Mod version: `v0.0.1`
+"""
+
+
+def test_substitution_engine_merged(input_versions_str: str) -> None:
+    replacements = ("\\g<1>v1.2.3\\g<2>", "\\1v1.2.3\\2", "\\g<1>v1.2.3\\g<2>")
+    sequential_engine = sm.SubstitutionEngine(version_patterns, replacements)
+    merged_engine = sm.SubstitutionEngine(version_patterns, replacements, merge=True)
+    assert sequential_engine.merged_pattern is None
+    assert merged_engine.merged_pattern is not None
+
+    expected_str = input_versions_str
+    for pattern, replacement in zip(version_patterns, replacements, strict=True):
+        expected_str = re.sub(pattern, replacement, expected_str, flags=sm.default_regex_flags)
+
+    assert sequential_engine.apply(input_versions_str) == expected_str
+    assert merged_engine.apply(input_versions_str) == expected_str
+    # all patterns start with a known character, so the merged pattern checks those before trying every branch
+    assert merged_engine.merged_pattern.pattern.startswith("(?=[\\#M])")
+
+    return None
+
+
+def test_substitution_engine_unmergeable() -> None:
+    # backreferences would point at the wrong group once merged, so this falls back to sequential
+    patterns = (r"(\w)\1", r"(?P<word>cat)")
+    replacements = ("<\\1>", "dog")
+    engine = sm.SubstitutionEngine(patterns, replacements, merge=True)
+    assert engine.merged_pattern is None
+    assert engine.apply("book cat") == "b<o>k dog"
+
+    with pytest.raises(ValueError, match="one replacement per pattern"):
+        sm.SubstitutionEngine(patterns, replacements[:1])
+
+    return None
+
+
+def test_shift_template_groups() -> None:
+    assert sm.shift_template_groups("\\1-\\g<2>-\\\\1-\\g<0>", 3) == "\\g<4>-\\g<5>-\\\\1-\\g<3>"
+    # cached engines are reused for the same pattern set
+    assert sm.get_substitution_engine(version_patterns, ("",) * 3) is sm.get_substitution_engine(version_patterns, ("",) * 3)
+
+    return None
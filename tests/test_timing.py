@@ -0,0 +1,70 @@
+import json
+from pathlib import Path
+
+import pytest
+
+import methods.timing_methods as tm
+
+
+def test_disabled_timer_records_nothing(tmp_path: Path) -> None:
+    timer = tm.PhaseTimer("test", enabled=False)
+    with timer.span("phase"):
+        timer.add_span("measured", 1.0)
+    # the same no-op context manager every time, nothing to allocate
+    assert timer.span("phase") is timer.span("other phase")
+    assert timer.spans == []
+    assert timer.write_reports(tmp_path) is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_timer_spans(tmp_path: Path) -> None:
+    timer = tm.PhaseTimer("test")
+    with timer.span("outer"):
+        with timer.span("inner"):
+            (tmp_path / "file.txt").write_bytes(b"x" * 10_000)
+        timer.add_span("measured", 1.5)
+
+    def fail() -> None:
+        with timer.span("failing"):
+            msg = "failed"
+            raise ValueError(msg)
+
+    with pytest.raises(ValueError, match="failed"):
+        fail()
+
+    assert [(span.name, span.depth) for span in timer.spans] == [("outer", 0), ("inner", 1), ("measured", 1), ("failing", 0)]
+    outer_span, inner_span, measured_span, _ = timer.spans
+    assert outer_span.wall_seconds >= inner_span.wall_seconds
+    assert measured_span.wall_seconds == 1.5  # noqa: PLR2004
+    assert measured_span.cpu_seconds is None
+    if tm.read_process_io() is not None:
+        assert inner_span.bytes_written >= 10_000  # noqa: PLR2004
+
+
+def test_write_reports(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    step_summary_file_path = tmp_path / "step_summary.md"
+    openmetrics_file_path = tmp_path / "metrics.txt"
+    monkeypatch.setenv("GITHUB_STEP_SUMMARY", str(step_summary_file_path))
+    monkeypatch.setenv("timingOpenMetricsFile", str(openmetrics_file_path))
+    timer = tm.PhaseTimer("test")
+    with timer.span('loc "files"'):
+        timer.add_span("measured", 0.25)
+
+    report_file_path = timer.write_reports(tmp_path / "generated")
+    assert report_file_path == tmp_path / "generated" / "timing_test.json"
+    report = json.loads(report_file_path.read_text())
+    assert [span["name"] for span in report["spans"]] == ['loc "files"', "measured"]
+
+    step_summary_lines = step_summary_file_path.read_text().splitlines()
+    assert step_summary_lines[0] == "### Timing of `test`"
+    assert step_summary_lines[5] == "| &nbsp;&nbsp;measured | 0.250 |  |  |  |"
+    assert step_summary_lines[6].startswith("| **total** |")
+
+    openmetrics_lines = openmetrics_file_path.read_text().splitlines()
+    assert openmetrics_lines[-1] == "# EOF"
+    assert "# TYPE stellaris_mod_deploy_phase_wall_seconds gauge" in openmetrics_lines
+    assert 'stellaris_mod_deploy_phase_wall_seconds{script="test",phase="measured"} 0.25' in openmetrics_lines
+    assert any(
+        line.startswith('stellaris_mod_deploy_phase_cpu_seconds{script="test",phase="loc \\"files\\""}')
+        for line in openmetrics_lines
+    )
@@ -0,0 +1,79 @@
+import os
+from pathlib import Path
+
+import pytest
+
+import methods.validation_methods as vm
+
+
+@pytest.fixture
+def mod_folder_path(tmp_path: Path) -> Path:
+    mod_folder_path = tmp_path / "mod"
+    (mod_folder_path / "localisation" / "english").mkdir(parents=True)
+    (mod_folder_path / "common" / "buildings").mkdir(parents=True)
+    (mod_folder_path / "gfx").mkdir()
+    loc_folder_path = mod_folder_path / "localisation" / "english"
+    (loc_folder_path / "good_l_english.yml").write_bytes(b'\xef\xbb\xbf# comment\nl_english:\n key:0 "value"\n')
+    (loc_folder_path / "no_bom_l_english.yml").write_bytes(b'l_english:\n key:0 "value"\n')
+    (loc_folder_path / "wrong_header_l_english.yml").write_bytes(b'\xef\xbb\xbfl_german:\n\tkey:0 "value"\n')
+    (loc_folder_path / "latin1_l_english.yml").write_bytes(b'\xef\xbb\xbfl_english:\n key:0 "caf\xe9"\n')
+    (loc_folder_path / "no_language.yml").write_bytes(b'\xef\xbb\xbfl_english:\n key:0 "value"\n')
+    (mod_folder_path / "common" / "buildings" / "mixed.txt").write_bytes(b"a = {\r\n}\nb = {\r\n}\r\n")
+    (mod_folder_path / "common" / "buildings" / "blank.txt").write_bytes(b"")
+    (mod_folder_path / "gfx" / "texture.dds").write_bytes(b"\r\x00\t\r\n\n")
+    return mod_folder_path
+
+
+def test_validate_file_content() -> None:
+    assert vm.validate_file_content("localisation/a_l_english.yml", b'\xef\xbb\xbfl_english:\r\n key:0 "v"\r\n') == []
+    assert vm.validate_file_content("common/a.txt", b"a\rb\n") == [
+        vm.ValidationIssue("common/a.txt", "line_endings", "bare \\r line ending, use \\n or \\r\\n", 1, is_error=False)
+    ]
+    (header_issue,) = vm.validate_file_content("localisation/a_l_english.yml", b'\xef\xbb\xbf\n\n key:0 "v"\n')
+    assert header_issue.check == "loc_header"
+    assert header_issue.line_number == 3  # noqa: PLR2004
+    (missing_issue,) = vm.validate_file_content("localisation/a_l_english.yml", b"\xef\xbb\xbf# only a comment\n")
+    assert missing_issue.describe() == "localisation/a_l_english.yml: missing header like `l_english:`"
+
+
+def test_validate_mod_files(mod_folder_path: Path, tmp_path: Path) -> None:
+    cache_file_path = tmp_path / "validation_cache.json"
+    validation_result = vm.validate_mod_files(mod_folder_path, cache_file_path, tool_version="1", max_workers=1)
+
+    assert {(issue.file_path, issue.check, issue.line_number) for issue in validation_result.errors} == {
+        ("localisation/english/no_bom_l_english.yml", "loc_bom", 1),
+        ("localisation/english/wrong_header_l_english.yml", "loc_header", 1),
+        ("localisation/english/latin1_l_english.yml", "encoding", 2),
+        ("localisation/english/no_language.yml", "loc_file_name", None),
+    }
+    # binary files only get the empty file check
+    assert {(issue.file_path, issue.check, issue.line_number) for issue in validation_result.warnings} == {
+        ("localisation/english/wrong_header_l_english.yml", "tabs", 2),
+        ("common/buildings/mixed.txt", "line_endings", 2),
+        ("common/buildings/blank.txt", "empty_file", None),
+    }
+    assert validation_result.checked_count == 6  # noqa: PLR2004
+    assert validation_result.cached_count == 0
+
+    # only the changed file is checked again
+    fixed_file_path = mod_folder_path / "localisation" / "english" / "no_bom_l_english.yml"
+    fixed_file_path.write_bytes(b'\xef\xbb\xbfl_english:\n key:0 "value"\n')
+    cached_result = vm.validate_mod_files(mod_folder_path, cache_file_path, tool_version="1", max_workers=1)
+    assert cached_result.checked_count == 1
+    assert cached_result.cached_count == 5  # noqa: PLR2004
+    assert cached_result.issues == [
+        issue for issue in validation_result.issues if issue.file_path != "localisation/english/no_bom_l_english.yml"
+    ]
+
+    # the cache is keyed by content, not by modification time
+    os.utime(fixed_file_path, ns=(0, 0))
+    assert vm.validate_mod_files(mod_folder_path, cache_file_path, tool_version="1").checked_count == 0
+    # and a new tool version checks everything again
+    assert vm.validate_mod_files(mod_folder_path, cache_file_path, tool_version="2").checked_count == 6  # noqa: PLR2004
+
+
+def test_validate_mod_files_parallel(mod_folder_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    serial_result = vm.validate_mod_files(mod_folder_path, max_workers=1)
+    monkeypatch.setattr(vm, "parallel_validation_min_bytes", 0)
+    parallel_result = vm.validate_mod_files(mod_folder_path, max_workers=2)
+    assert parallel_result.issues == serial_result.issues
@@ -0,0 +1,113 @@
+from pathlib import Path
+
+import pytest
+
+import methods.walk_methods as wm
+from methods.archive_methods import collect_archive_entries
+from methods.workshop_methods import WorkshopItem, stage_workshop_items
+
+
+@pytest.fixture
+def mod_folder_path(tmp_path: Path) -> Path:
+    mod_folder_path = tmp_path / "mod"
+    for relative_path in (
+        "descriptor.mod",
+        "thumbnail.png",
+        "common/buildings/buildings.txt",
+        "common/buildings/buildings.txt~",
+        "gfx/models/ship.dds",
+        "gfx/source/ship.xcf",
+        "gfx/source/notes.txt",
+        "gfx/empty/.keep.bak",
+        "localisation/english/mod_l_english.yml",
+        ".git/HEAD",
+    ):
+        file_path = mod_folder_path / relative_path
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_text(relative_path, encoding="utf-8")
+    return mod_folder_path
+
+
+def test_path_rules() -> None:
+    path_rules = wm.PathRules(["# comment", "*.txt", "!keep/*.txt", "/build/", "docs/**/draft?.md", "[!a]x.yml"])
+    assert path_rules.match("a/b/file.txt")
+    assert path_rules.match("keep/file.txt") is False
+    assert path_rules.match("keep/deeper/file.txt")
+    assert path_rules.match("build", is_folder=True)
+    assert path_rules.match("build") is None
+    assert path_rules.match("src/build", is_folder=True) is None
+    assert path_rules.match("docs/draft1.md")
+    assert path_rules.match("docs/a/b/draft2.md")
+    assert path_rules.match("docs/draft10.md") is None
+    assert path_rules.match("bx.yml")
+    assert path_rules.match("ax.yml") is None
+
+
+def test_walk_folder(mod_folder_path: Path) -> None:
+    assert [relative_path for relative_path, _ in wm.walk_folder(mod_folder_path)] == [
+        "common/buildings/buildings.txt",
+        "descriptor.mod",
+        "gfx/models/ship.dds",
+        "gfx/source/notes.txt",
+        "localisation/english/mod_l_english.yml",
+        "thumbnail.png",
+    ]
+
+    rules = wm.WalkRules.from_overrides({"mod_files_exclude": "gfx/source/", "mod_files_include": ["*.txt", "*.yml"]})
+    walked_paths = [
+        relative_path + "/" * dir_entry.is_dir() for relative_path, dir_entry in wm.walk_folder(mod_folder_path, rules)
+    ]
+    assert walked_paths == ["common/buildings/buildings.txt", "localisation/english/mod_l_english.yml"]
+    # with include rules, folders without an included file are left out
+    walked_paths = [
+        relative_path + "/" * dir_entry.is_dir()
+        for relative_path, dir_entry in wm.walk_folder(mod_folder_path, rules, include_folders=True)
+    ]
+    assert walked_paths == [
+        "common/",
+        "common/buildings/",
+        "common/buildings/buildings.txt",
+        "localisation/",
+        "localisation/english/",
+        "localisation/english/mod_l_english.yml",
+    ]
+
+
+def test_walk_consumers(mod_folder_path: Path, tmp_path: Path) -> None:
+    rules = wm.WalkRules(["*.dds"])
+    arcnames = [entry.arcname for entry in collect_archive_entries([mod_folder_path], tmp_path, rules)]
+    # empty folders are kept without include rules, like `zip -r`
+    assert arcnames == [
+        "mod/",
+        "mod/common/",
+        "mod/common/buildings/",
+        "mod/common/buildings/buildings.txt",
+        "mod/descriptor.mod",
+        "mod/gfx/",
+        "mod/gfx/empty/",
+        "mod/gfx/models/",
+        "mod/gfx/source/",
+        "mod/gfx/source/notes.txt",
+        "mod/localisation/",
+        "mod/localisation/english/",
+        "mod/localisation/english/mod_l_english.yml",
+        "mod/thumbnail.png",
+    ]
+
+    workshop_item = WorkshopItem(
+        name="mod",
+        content_folder_path=mod_folder_path,
+        descriptor_file_path=mod_folder_path / "descriptor.mod",
+        description_file_path=tmp_path / "workshop.txt",
+        manifest_file_path=tmp_path / "manifest.vdf",
+    )
+    staging_folder_path = tmp_path / "staging"
+    (staging_folder_path / "mod" / "removed.txt").parent.mkdir(parents=True)
+    (staging_folder_path / "mod" / "removed.txt").write_text("left over", encoding="utf-8")
+    stage_workshop_items([workshop_item], staging_folder_path, rules)
+    assert workshop_item.upload_folder_path == staging_folder_path / "mod"
+    assert [relative_path for relative_path, _ in wm.walk_folder(workshop_item.upload_folder_path)] == [
+        arcname.removeprefix("mod/") for arcname in arcnames if not arcname.endswith("/")
+    ]
+    staged_file_path = workshop_item.upload_folder_path / "descriptor.mod"
+    assert staged_file_path.samefile(mod_folder_path / "descriptor.mod")